@@ -6,6 +6,7 @@ Contiene herramientas para que los administradores puedan inspeccionar el estado
 detallado de las entidades del juego, como personajes, objetos y salas.
 """
 
+import html
 import logging
 from aiogram import types
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,7 +15,7 @@ from sqlalchemy import select
 
 from commands.command import Command
 from src.models import Character, Item, Room
-from src.services import validation_service
+from src.services import validation_service, script_service, reload_service
 
 class CmdExamineCharacter(Command):
     """
@@ -145,9 +146,114 @@ class CmdValidate(Command):
             logging.exception("Fallo al ejecutar /validar")
 
 
+class CmdTrippedScripts(Command):
+    """
+    Comando que lista los scripts con fallos recientes: en espera tras un
+    error o desactivados por el circuit breaker de `script_service`.
+    """
+    names = ["scriptsfallidos", "sfallidos"]
+    lock = "rol(ADMIN)"
+    description = "Lista los scripts en espera o desactivados por errores."
+
+    async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
+        breakers = script_service.get_tripped_scripts()
+        stats = script_service.get_timeout_stats()
+        if not breakers and not stats["timeouts"] and not stats["budget_skips"]:
+            await message.answer("✅ No hay scripts con fallos recientes.")
+            return
+
+        lines = ["<b>--- SCRIPTS CON FALLOS ---</b>"]
+        for number, breaker in enumerate(breakers, start=1):
+            status = "DESACTIVADO" if breaker.disabled else "en espera"
+            entity = f"{breaker.entity_key} ({breaker.entity_label})" if breaker.entity_label else breaker.entity_key
+            lines.append(f"{number}. [{status}] {entity}")
+            lines.append(f"   Script: {breaker.script}")
+            lines.append(f"   Fallos seguidos: {breaker.consecutive_failures} - {breaker.last_error}")
+        if breakers:
+            lines.append("\nUsa /reactivarscript <número> o /reactivarscript todos.")
+
+        if stats["timeouts"]:
+            lines.append("\nCancelados por tiempo:")
+            for script, count in sorted(stats["timeouts"].items(), key=lambda entry: -entry[1]):
+                lines.append(f"   {count}x {script}")
+        if stats["budget_skips"]:
+            skipped = sum(stats["budget_skips"].values())
+            lines.append(f"\nOmitidos por presupuesto del pulse agotado: {skipped}")
+
+        # Los datos (scripts, errores) pueden contener caracteres HTML.
+        body = html.escape('\n'.join(lines[1:]))
+        await message.answer(f"{lines[0]}\n<pre>{body}</pre>", parse_mode="HTML")
+
+
+class CmdResetScript(Command):
+    """
+    Comando que reactiva un script desactivado (o en espera) por el circuit
+    breaker, usando el número que muestra /scriptsfallidos.
+    """
+    names = ["reactivarscript"]
+    lock = "rol(ADMIN)"
+    description = "Reactiva scripts desactivados por errores. Uso: /reactivarscript <número|todos>"
+
+    async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
+        if not args:
+            await message.answer("Uso: /reactivarscript <número|todos> (ver /scriptsfallidos)")
+            return
+
+        if args[0].lower() == "todos":
+            count = script_service.reset_all_script_breakers()
+            await message.answer(f"✅ {count} scripts reactivados.")
+            return
+
+        breakers = script_service.get_tripped_scripts()
+        number = int(args[0]) if args[0].isdigit() else 0
+        if not 1 <= number <= len(breakers):
+            await message.answer("Número inválido. Usa /scriptsfallidos para ver la lista.")
+            return
+        breaker = breakers[number - 1]
+
+        script_service.reset_script_breaker(breaker.entity_key, breaker.script)
+        logging.info(f"{character.name} reactivó el script '{breaker.script}' en {breaker.entity_key}")
+        await message.answer(f"✅ Script reactivado en {breaker.entity_key}: {html.escape(breaker.script)}")
+
+
+class CmdReload(Command):
+    """
+    Comando que recarga los prototipos y scripts globales de `game_data` sin
+    reiniciar el bot. Si hay errores, el juego sigue con los datos anteriores.
+    """
+    names = ["recargar"]
+    lock = "rol(SUPERADMIN)"
+    description = "Recarga prototipos y scripts globales sin reiniciar el bot."
+
+    async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
+        await message.answer("♻️ Recargando game_data...")
+        logging.info(f"{character.name} solicitó la recarga de game_data")
+
+        result = await reload_service.reload_game_data(session)
+        if not result.success:
+            # Un mensaje de Telegram admite 4096 caracteres.
+            errors = result.errors[:15]
+            if len(result.errors) > len(errors):
+                errors.append(f"... y {len(result.errors) - len(errors)} errores más (ver logs)")
+            body = html.escape("\n".join(errors))
+            await message.answer(
+                f"<b>❌ Recarga descartada</b>, se mantienen los datos anteriores:\n<pre>{body}</pre>",
+                parse_mode="HTML"
+            )
+            return
+
+        await message.answer(
+            f"✅ game_data recargado en {result.seconds:.1f}s: {result.rooms} salas, {result.items} items, "
+            f"{result.channels} canales, {result.global_scripts} scripts globales."
+        )
+
+
 # Exportamos la lista de comandos de este módulo.
 DIAGNOSTICS_COMMANDS = [
     CmdExamineCharacter(),
     CmdExamineItem(),
     CmdValidate(),
+    CmdTrippedScripts(),
+    CmdResetScript(),
+    CmdReload(),
 ]
\ No newline at end of file
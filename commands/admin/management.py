@@ -17,6 +17,7 @@ from sqlalchemy import select
 
 from commands.command import Command
 from src.models import Character, Account
+from src.services import account_cache_service, command_service
 from src.services.permission_service import ROLE_HIERARCHY
 
 class CmdSetRole(Command):
@@ -70,6 +71,8 @@ class CmdSetRole(Command):
             old_role = target_account.role
             target_account.role = new_role
             await session.commit()
+            command_service.invalidate_active_command_sets(target_char.id)
+            await account_cache_service.invalidate(target_account.telegram_id)
 
             await message.answer(f"✅ Se ha cambiado el rol de {target_char.name} de '{old_role}' a '{new_role}'.")
 
@@ -25,9 +25,24 @@ class Command:
                     para determinar si el personaje puede ejecutar el comando.
         description (str): Una breve descripción del propósito del comando, utilizada
                            para actualizar la lista de comandos en el cliente de Telegram.
+        needs (set[str] | None): Relaciones del personaje que el comando necesita
+                           tener cargadas (ej: {"room.exits", "inventory"}). El
+                           dispatcher construye con ellas el plan de carga mínimo.
+                           Relaciones válidas: "room", "room.items", "room.exits",
+                           "room.characters", "inventory", "account", "settings".
+                           None (por defecto) carga el grafo completo del personaje,
+                           salvo "room.exits" (las salidas se leen del grafo
+                           del mundo, ver `world_graph_service`).
+                           La cuenta (`character.account`) siempre está disponible.
+        stateless (bool): True si el comando no usa `character` ni `session`
+                          (ej: textos fijos como /ayuda). El dispatcher puede
+                          ejecutarlo desde la caché de cuentas sin consultar la
+                          base de datos; en ese caso recibe `character=None`.
     """
     lock: str = ""
     description: str = "Un comando sin descripción."
+    needs: set[str] | None = None
+    stateless: bool = False
 
     def __init__(self, names: list[str] = None, description: str = None):
         """
@@ -68,7 +83,8 @@ class Command:
 
         Args:
             character (Character): El objeto del personaje que ejecuta el comando,
-                                   precargado con todas sus relaciones.
+                                   precargado con las relaciones de `needs`
+                                   (todas, si `needs` es None).
             session (AsyncSession): La sesión de base de datos activa para esta
                                     interacción.
             message (types.Message): El objeto de mensaje de Aiogram que contiene
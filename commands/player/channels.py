@@ -19,6 +19,7 @@ class CmdChannels(Command):
     """
     names = ["canales"]
     description = "Muestra los canales disponibles y tu estado de suscripción."
+    needs = channel_service.get_channel_command_needs()
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         try:
@@ -56,6 +57,7 @@ class CmdEnableChannel(Command):
     """
     names = ["activarcanal"]
     description = "Activa un canal para recibir sus mensajes. Uso: /activarcanal [nombre]"
+    needs = channel_service.get_channel_command_needs()
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         if not args:
@@ -79,6 +81,7 @@ class CmdDisableChannel(Command):
     """
     names = ["desactivarcanal"]
     description = "Desactiva un canal para no recibir sus mensajes. Uso: /desactivarcanal [nombre]"
+    needs = channel_service.get_channel_command_needs()
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         if not args:
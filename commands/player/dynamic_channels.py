@@ -26,6 +26,8 @@ class CmdDynamicChannel(Command):
     Clase de comando genérica para enviar un mensaje a un canal de chat.
     La instancia de esta clase sabe a qué canal pertenece por su nombre.
     """
+    needs = channel_service.get_channel_command_needs()
+
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         try:
             # El nombre principal del comando (ej: "novato") es la clave del canal.
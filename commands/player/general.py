@@ -15,9 +15,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from collections import Counter
 
 from commands.command import Command
-from src.models import Character, Item, Exit, Room
+from src.models import Character, Item, Room
 from src.utils.presenters import show_current_room, format_item_look, format_inventory, format_who_list
-from src.services import script_service, online_service, permission_service, broadcaster_service
+from src.services import script_service, online_service, permission_service, broadcaster_service, world_graph_service
 from src.services import event_service, EventType, EventPhase, EventContext
 from src.utils.pagination import paginate_list, format_pagination_footer
 from src.templates import ICONS
@@ -98,9 +98,8 @@ class CmdLook(Command):
                     room=character.room
                 )
 
-                await event_service.trigger_event(
+                await event_service.dispatch_after_event(
                     event_type=EventType.ON_LOOK,
-                    phase=EventPhase.AFTER,
                     context=after_context
                 )
                 return
@@ -118,12 +117,9 @@ class CmdLook(Command):
 
             # 5. Buscar si es una dirección/salida para ver sala aledaña.
             from src.utils.presenters import format_room
-            target_exit = next(
-                (exit_obj for exit_obj in character.room.exits_from if exit_obj.name == target_string),
-                None
-            )
+            target_exit = world_graph_service.get_world_graph().get_exit(character.room_id, target_string)
 
-            if target_exit and target_exit.to_room:
+            if target_exit:
                 # Cargar sala destino con relaciones necesarias
                 from sqlalchemy import select
                 from sqlalchemy.orm import selectinload
@@ -134,8 +130,7 @@ class CmdLook(Command):
                     .where(Room.id == target_exit.to_room_id)
                     .options(
                         selectinload(Room.items),
-                        selectinload(Room.characters).selectinload(Character.account),
-                        selectinload(Room.exits_from).selectinload(Exit.to_room)
+                        selectinload(Room.characters).selectinload(Character.account)
                     )
                 )
                 adjacent_room = result.scalar_one_or_none()
@@ -164,6 +159,7 @@ class CmdSay(Command):
     names = ["decir", "'"]
     lock = ""
     description = "Habla con las personas que están en tu misma sala."
+    needs = set()
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         if not args:
@@ -188,6 +184,7 @@ class CmdEmotion(Command):
     names = ["emocion", "emote", "me"]
     lock = ""
     description = "Expresa una emoción o acción. Uso: /emocion se rasca la nariz"
+    needs = set()
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         if not args:
@@ -211,6 +208,7 @@ class CmdInventory(Command):
     """Comando para mostrar el inventario del jugador o el de un contenedor con paginación automática."""
     names = ["inventario", "inv", "i"]
     description = "Muestra tu inventario o el de un contenedor. Uso: /inv [contenedor] [página]"
+    needs = {"inventory", "room.items"}
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         try:
@@ -344,6 +342,8 @@ class CmdHelp(Command):
     names = ["ayuda", "help"]
     lock = ""
     description = "Muestra una lista con los comandos básicos del juego."
+    needs = set()
+    stateless = True
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         help_text = (
@@ -428,6 +428,7 @@ class CmdPray(Command):
     """Comando que permite al jugador rezar a los dioses."""
     names = ["orar", "rezar"]
     description = "Rezas a los dioses en busca de inspiración."
+    needs = set()
     lock = ""
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
@@ -443,6 +444,7 @@ class CmdDisconnect(Command):
     """Comando para desconectarse inmediatamente del juego."""
     names = ["desconectar", "logout", "salir"]
     description = "Te desconecta inmediatamente del juego."
+    needs = set()
     lock = ""
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
@@ -474,6 +476,7 @@ class CmdAFK(Command):
     """Comando para ponerse AFK (Away From Keyboard) manualmente con mensaje opcional."""
     names = ["afk"]
     description = "Te marca como AFK con un mensaje opcional. Uso: /afk [mensaje]"
+    needs = set()
     lock = ""
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
@@ -503,6 +506,7 @@ class CmdWhisper(Command):
     """Comando para enviar un mensaje privado a un jugador en la misma sala."""
     names = ["susurrar", "whisper"]
     description = "Susurra un mensaje privado a un jugador en tu sala. Uso: /susurrar <jugador> <mensaje>"
+    needs = {"room.characters"}
     lock = ""
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
@@ -552,6 +556,8 @@ class CmdRules(Command):
     names = ["reglas", "rules"]
     lock = ""
     description = "Muestra las reglas de convivencia del servidor."
+    needs = set()
+    stateless = True
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         try:
@@ -562,7 +568,7 @@ class CmdRules(Command):
 
         except Exception:
             await message.answer("❌ Ocurrió un error al mostrar las reglas.")
-            logging.exception(f"Fallo al ejecutar /reglas para {character.name}")
+            logging.exception(f"Fallo al ejecutar /reglas para el usuario {message.from_user.id}")
 
 
 # Exportamos la lista de comandos de este módulo.
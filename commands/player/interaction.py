@@ -302,9 +302,8 @@ class CmdGet(Command):
                 room=character.room
             )
 
-            await event_service.trigger_event(
+            await event_service.dispatch_after_event(
                 event_type=EventType.ON_GET,
-                phase=EventPhase.AFTER,
                 context=after_context
             )
 
@@ -401,9 +400,8 @@ class CmdDrop(Command):
                 room=character.room
             )
 
-            await event_service.trigger_event(
+            await event_service.dispatch_after_event(
                 event_type=EventType.ON_DROP,
-                phase=EventPhase.AFTER,
                 context=after_context
             )
 
@@ -528,9 +526,8 @@ class CmdPut(Command):
                 extra={"container": container}
             )
 
-            await event_service.trigger_event(
+            await event_service.dispatch_after_event(
                 event_type=EventType.ON_PUT,
-                phase=EventPhase.AFTER,
                 context=after_context
             )
 
@@ -641,9 +638,8 @@ class CmdTake(Command):
                 extra={"container": container}
             )
 
-            await event_service.trigger_event(
+            await event_service.dispatch_after_event(
                 event_type=EventType.ON_TAKE,
-                phase=EventPhase.AFTER,
                 context=after_context
             )
 
@@ -845,12 +841,12 @@ class CmdGive(Command):
             # Actualizar comandos del que da si el item otorgaba command sets
             if item_to_give.prototype.get("grants_command_sets"):
                 refreshed_character = await player_service.get_character_with_relations_by_id(session, character.id)
-                await command_service.sync_telegram_commands(refreshed_character)
+                await command_service.update_telegram_commands(refreshed_character)
 
             # Actualizar comandos del que recibe si el item otorga command sets
             if item_to_give.prototype.get("grants_command_sets"):
                 refreshed_target = await player_service.get_character_with_relations_by_id(session, target_character.id)
-                await command_service.sync_telegram_commands(refreshed_target)
+                await command_service.update_telegram_commands(refreshed_target)
 
             await session.commit()
 
@@ -23,6 +23,7 @@ class CmdItems(Command):
     """Comando para listar todos los items de la sala actual con paginación."""
     names = ["items"]
     description = "Muestra todos los items de la sala. Uso: /items [página]"
+    needs = {"room.items"}
     lock = ""
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
@@ -65,6 +66,7 @@ class CmdCharacters(Command):
     """Comando para listar todos los personajes en la sala actual con paginación."""
     names = ["personajes"]
     description = "Muestra todos los personajes en la sala. Uso: /personajes [página]"
+    needs = {"room.characters"}
     lock = ""
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
@@ -8,7 +8,8 @@ personaje por el mundo del juego.
 Utiliza una única clase genérica, `CmdMove`, que se instancia para cada una de
 las direcciones posibles (norte, sur, etc.), cada una con sus propios alias.
 Esto evita la duplicación de código y mantiene la lógica de movimiento en un
-solo lugar.
+solo lugar. `CmdGo` (`/ir`) reutiliza el mismo flujo para recorrer varias
+salidas en un solo comando.
 """
 
 import logging
@@ -16,31 +17,35 @@ from aiogram import types
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from commands.command import Command
+from src.config import settings
 from src.models.character import Character
-from src.services import player_service, command_service, permission_service, broadcaster_service
-from src.services import event_service, EventType, EventPhase, EventContext
-from src.utils.presenters import show_current_room
-
-# Mapeo de direcciones opuestas para los mensajes de llegada
-OPPOSITE_DIRECTIONS = {
-    "norte": "sur",
-    "sur": "norte",
-    "este": "oeste",
-    "oeste": "este",
-    "arriba": "abajo",
-    "abajo": "arriba",
-    "noreste": "suroeste",
-    "suroeste": "noreste",
-    "noroeste": "sureste",
-    "sureste": "noroeste",
-}
+from src.services import movement_service, world_graph_service
+from src.templates import ICONS
+from src.utils.presenters import send_room_view
+
 
 class CmdMove(Command):
     """
     Comando genérico que gestiona el movimiento del jugador en una dirección.
     La dirección específica se determina por el nombre principal del comando
     (el primer elemento en la lista `names`).
+
+    El trabajo lo hace `movement_service`: el jugador ve la nueva sala en
+    cuanto se confirma el cambio, y los avisos a las salas, los eventos AFTER
+    y el menú de comandos se procesan después, en segundo plano.
     """
+
+    @property
+    def needs(self) -> set[str] | None:
+        """
+        La sala de origen (contexto de los eventos) más lo que exijan los locks
+        de las salidas del mundo. None si algún lock no se puede analizar.
+        """
+        lock_relations = world_graph_service.get_world_graph().exit_lock_relations
+        if lock_relations is None:
+            return None
+        return {"room"} | lock_relations
+
     async def execute(
         self,
         character: Character,
@@ -52,121 +57,125 @@ class CmdMove(Command):
             # 1. Determinar la dirección basándose en el comando invocado.
             direction = self.names[0]
 
-            # 2. Buscar si existe una salida válida en esa dirección.
-            target_exit = next(
-                (exit_obj for exit_obj in character.room.exits_from if exit_obj.name == direction),
-                None
-            )
-
-            if not target_exit:
-                await message.answer("No puedes ir en esa dirección.")
+            # 2. Camino crítico: salida, lock, eventos BEFORE y cambio de sala.
+            result = await movement_service.move_character(session, character, direction)
+            if not result.success:
+                await message.answer(result.message)
                 return
 
-            # 3. Comprobar permisos (Locks) con access type "traverse".
-            #    Llamamos al permission_service para evaluar el lock de la salida.
-            can_pass, error_message = await permission_service.can_execute(
-                character,
-                target_exit.locks,
-                access_type="traverse"
-            )
-            if not can_pass:
-                # Si `can_execute` devuelve un mensaje personalizado, lo usamos.
-                # Si no, usamos un mensaje genérico.
-                await message.answer(error_message or "Esa salida está bloqueada.")
+            # 3. Mostrar al jugador su nueva ubicación antes que nada.
+            await send_room_view(message, result.destination_room, character)
+
+            # 4. Avisos a las salas, eventos AFTER y menú de comandos en segundo plano.
+            movement_service.dispatch_side_effects(character, result)
+
+        except Exception:
+            await message.answer("❌ Ocurrió un error al intentar moverte.")
+            logging.exception(f"Fallo al ejecutar /mover ({self.names[0]}) para {character.name}")
+
+class CmdGo(CmdMove):
+    """
+    Comando para recorrer varias salidas seguidas: `/ir norte norte este`,
+    `/ir n n e` o `/ir 2n1e`.
+
+    Cada paso se comprueba en orden (lock y eventos BEFORE) y el recorrido se
+    detiene en el primer bloqueo. El jugador recibe una sola vista de la sala
+    final con el resumen del camino.
+    """
+    names = ["ir"]
+    description = "Recorre varias salidas seguidas. Ej: /ir 3n2e"
+
+    async def execute(
+        self,
+        character: Character,
+        session: AsyncSession,
+        message: types.Message,
+        args: list[str]
+    ):
+        try:
+            # 1. Interpretar el recorrido.
+            try:
+                directions = movement_service.parse_path(args)
+            except ValueError as e:
+                await message.answer(str(e))
                 return
 
-            # 4. Guardar la sala de origen y destino para eventos
-            origin_room = character.room
-            destination_room_id = target_exit.to_room_id
-
-            # 5. EVENTO BEFORE ON_LEAVE - Puede cancelar el movimiento
-            leave_context = EventContext(
-                session=session,
-                character=character,
-                target=None,
-                room=origin_room,
-                extra={"destination_room_id": destination_room_id, "direction": direction}
-            )
-
-            leave_result = await event_service.trigger_event(
-                event_type=EventType.ON_LEAVE,
-                phase=EventPhase.BEFORE,
-                context=leave_context
-            )
-
-            # Si un script BEFORE cancela el movimiento, detener
-            if leave_result.cancel_action:
-                await message.answer(leave_result.message or "No puedes salir de aquí ahora.")
+            # 2. Recorrerlo hasta el final o hasta el primer bloqueo.
+            result = await movement_service.walk_path(session, character, directions)
+            if not result.success:
+                await message.answer(result.message)
                 return
 
-            # 6. Notificar a la sala de origen que el personaje se fue
-            await broadcaster_service.send_message_to_room(
-                session=session,
-                room_id=origin_room.id,
-                message_text=f"<i>{character.name} se ha ido hacia el {direction}.</i>",
-                exclude_character_id=character.id
-            )
-
-            # 7. EVENTO AFTER ON_LEAVE - Efectos al salir
-            await event_service.trigger_event(
-                event_type=EventType.ON_LEAVE,
-                phase=EventPhase.AFTER,
-                context=leave_context
-            )
-
-            # 8. Mover al personaje a la nueva sala
-            await player_service.teleport_character(session, character.id, destination_room_id)
-
-            # 9. Refrescar character para obtener la nueva sala
-            refreshed_character = await player_service.get_character_with_relations_by_id(session, character.id)
-            destination_room = refreshed_character.room
-
-            # 10. EVENTO BEFORE ON_ENTER - Puede cancelar la entrada (raro pero posible)
-            enter_context = EventContext(
-                session=session,
-                character=refreshed_character,
-                target=None,
-                room=destination_room,
-                extra={"origin_room_id": origin_room.id, "direction": direction}
-            )
-
-            enter_result = await event_service.trigger_event(
-                event_type=EventType.ON_ENTER,
-                phase=EventPhase.BEFORE,
-                context=enter_context
-            )
-
-            # Si un script BEFORE cancela la entrada, el personaje queda en el limbo
-            # (No implementamos rollback aquí por simplicidad)
-            if enter_result.cancel_action:
-                await message.answer(enter_result.message or "No puedes entrar ahí.")
+            # 3. Una sola vista de la sala final, con el resumen del camino.
+            header = f"<i>Recorres: {', '.join(step.name for step in result.path)}.</i>"
+            if result.message:
+                header += f"\n<i>Te detienes: {result.message}</i>"
+            await send_room_view(message, result.destination_room, character, header=header)
+
+            # 4. Avisos agrupados por sala, eventos AFTER y menú en segundo plano.
+            movement_service.dispatch_side_effects(character, result)
+
+        except Exception:
+            await message.answer("❌ Ocurrió un error al intentar moverte.")
+            logging.exception(f"Fallo al ejecutar /ir para {character.name}")
+
+
+class CmdPath(Command):
+    """
+    Comando que indica el camino más corto hasta una sala, por nombre, key o
+    ID, teniendo en cuenta las salidas que el personaje puede atravesar.
+    """
+    names = ["camino"]
+    description = "Muestra cómo llegar a una sala. Ej: /camino plaza central"
+
+    @property
+    def needs(self) -> set[str] | None:
+        """Lo que exijan los locks de las salidas (se evalúan todos para filtrar el camino)."""
+        lock_relations = world_graph_service.get_world_graph().exit_lock_relations
+        return None if lock_relations is None else set(lock_relations)
+
+    async def execute(
+        self,
+        character: Character,
+        session: AsyncSession,
+        message: types.Message,
+        args: list[str]
+    ):
+        if not args:
+            await message.answer("Uso: /camino <nombre de la sala>")
+            return
+
+        try:
+            target = world_graph_service.find_room(" ".join(args))
+            if not target:
+                await message.answer("No conozco ningún lugar con ese nombre.")
                 return
 
-            # 11. Notificar a la sala de destino que el personaje llegó
-            opposite_direction = OPPOSITE_DIRECTIONS.get(direction, "alguna parte")
-            await broadcaster_service.send_message_to_room(
-                session=session,
-                room_id=destination_room_id,
-                message_text=f"<i>{character.name} ha llegado desde el {opposite_direction}.</i>",
-                exclude_character_id=character.id
-            )
+            passable_locks = await world_graph_service.get_passable_locks(character)
+            path = world_graph_service.find_path(character.room_id, target.id, passable_locks)
 
-            # 12. EVENTO AFTER ON_ENTER - Efectos al entrar
-            await event_service.trigger_event(
-                event_type=EventType.ON_ENTER,
-                phase=EventPhase.AFTER,
-                context=enter_context
-            )
+            if path is None:
+                await message.answer(f"No encuentras ningún camino hacia {target.name}.")
+                return
+            if not path:
+                await message.answer(f"Ya estás en {target.name}.")
+                return
 
-            # 13. Actualizar la lista de comandos del jugador en Telegram
-            await command_service.update_telegram_commands(refreshed_character)
+            lines = [f"{ICONS['map']} <b>CAMINO A {target.name.upper()}</b>"]
+            lines.extend(f"    - {step.name} → {step.to_room_name}" for step in path)
+            lines.append("")
+            if len(path) <= settings.movement_speedwalk_max_steps:
+                lines.append(f"Usa: {movement_service.build_walk_command(path)}")
+            else:
+                lines.append(f"{len(path)} pasos: recórrelo en varios tramos con /ir.")
 
-            # 14. Mostrar al jugador la descripción de su nueva ubicación
-            await show_current_room(message)
+            body = "\n".join(lines)
+            await message.answer(f"<pre>{body}</pre>", parse_mode="HTML")
 
         except Exception:
-            await message.answer("❌ Ocurrió un error al intentar moverte.")
-            logging.exception(f"Fallo al ejecutar /mover ({self.names[0]}) para {character.name}")
+            await message.answer("❌ Ocurrió un error al buscar el camino.")
+            logging.exception(f"Fallo al ejecutar /camino para {character.name}")
+
 
 # --- Creación del Command Set con descripciones ---
 # Se crea una instancia de `CmdMove` para cada dirección, asignando sus alias
@@ -182,4 +191,6 @@ MOVEMENT_COMMANDS = [
     CmdMove(names=["noroeste", "no"], description="Moverse hacia el noroeste."),
     CmdMove(names=["sureste", "se"], description="Moverse hacia el sureste."),
     CmdMove(names=["suroeste", "so"], description="Moverse hacia el suroeste."),
+    CmdGo(),
+    CmdPath(),
 ]
\ No newline at end of file
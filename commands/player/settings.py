@@ -25,6 +25,7 @@ class CmdConfig(Command):
     """
     names = ["config", "opciones"]
     description = "Muestra las opciones de configuración disponibles."
+    needs = set()
 
     async def execute(self, character: Character, session: AsyncSession, message: types.Message, args: list[str]):
         try:
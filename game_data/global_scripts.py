@@ -15,14 +15,39 @@ Ejemplo de uso en prototipo:
     "scripts": {
         "after_on_use": "global:curar_personaje(cantidad=50, mensaje='Te sientes mejor')"
     }
+
+Scripts con cálculo pesado (`cpu_bound=True`):
+Un script que pasa mucho tiempo calculando (descripciones procedurales,
+tiradas sobre tablas de botín grandes, generación de mapas) bloquearía el
+event loop y, con él, los comandos de todos los jugadores. Estos scripts se
+registran en dos partes:
+- `compute`: función síncrona y pura, definida a nivel de módulo, que recibe
+  solo los parámetros del script y devuelve un resultado. Se ejecuta en un
+  `ProcessPoolExecutor`, así que parámetros y resultado deben ser picklables.
+- `function`: función async que se ejecuta en el loop con el contexto, los
+  parámetros y `resultado=<lo devuelto por compute>`, y aplica los efectos
+  (base de datos, mensajes de Telegram).
+El tiempo máximo del script incluye el cálculo, pero al superarlo solo se
+cancela la corrutina que espera: el proceso del pool no se puede interrumpir
+y sigue ocupado hasta terminar `compute`. Un `compute` debe tener un coste
+acotado por sus parámetros (ver `repartir_botin`).
 """
 
-from typing import Any, Dict, Callable, List
+from typing import Any, Dict, Callable, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from functools import partial
+import asyncio
 import logging
+import multiprocessing
+import pickle
+import random
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config import settings
+
 
 @dataclass
 class GlobalScriptDefinition:
@@ -34,6 +59,60 @@ class GlobalScriptDefinition:
     params: Dict[str, type]             # Parámetros esperados con sus tipos
     description: str                    # Descripción del script
     category: str = "utility"           # Categoría (utility, combat, narrative, etc.)
+    cpu_bound: bool = False             # True = `compute` se ejecuta en otro proceso
+    compute: Optional[Callable] = None  # Parte pura del script (solo si cpu_bound)
+
+
+# ============================================================================
+# POOL DE PROCESOS (scripts cpu_bound)
+# ============================================================================
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Crea el pool la primera vez que se usa."""
+    global _process_pool
+    if _process_pool is None:
+        # "spawn": hacer fork de un proceso con un event loop y conexiones
+        # abiertas puede dejar al hijo bloqueado o compartiendo sockets.
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.scripts_process_pool_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+async def run_cpu_bound(compute: Callable, params: Dict[str, Any]) -> Any:
+    """
+    Ejecuta `compute(**params)` en el pool de procesos sin bloquear el loop.
+
+    Con `scripts.process_pool_workers = 0` se ejecuta en el propio proceso
+    (útil en desarrollo y tests).
+
+    Si la corrutina se cancela (p. ej. por el tiempo máximo del script), el
+    cálculo ya enviado sigue ocupando un proceso hasta terminar: mientras
+    tanto las siguientes llamadas esperan en la cola del pool.
+    """
+    global _process_pool
+    if settings.scripts_process_pool_workers <= 0:
+        return compute(**params)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_process_pool(), partial(compute, **params))
+    except BrokenProcessPool:
+        # Un proceso del pool murió: el pool ya no sirve, se recrea en la siguiente llamada.
+        _process_pool = None
+        raise
+
+
+def shutdown_process_pool():
+    """Detiene el pool de procesos, si se llegó a crear."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
 
 
 class GlobalScriptRegistry:
@@ -52,31 +131,67 @@ class GlobalScriptRegistry:
         function: Callable,
         params: Dict[str, type],
         description: str,
-        category: str = "utility"
+        category: str = "utility",
+        cpu_bound: bool = False,
+        compute: Optional[Callable] = None
     ):
         """
         Registra un script global.
 
         Args:
             name: Nombre único del script (ej: "curar_personaje")
-            function: Función async que implementa el script
+            function: Función async que implementa el script (con cpu_bound,
+                      la que aplica el resultado de `compute`)
             params: Dict con nombres de parámetros y sus tipos
             description: Descripción del script
             category: Categoría del script
+            cpu_bound: True si el script hace un cálculo pesado que debe
+                       ejecutarse fuera del event loop
+            compute: Función pura y picklable (a nivel de módulo) con el
+                     cálculo. Obligatoria si cpu_bound es True.
+
+        Raises:
+            ValueError: Si cpu_bound es True y `compute` falta o no es picklable
         """
         if name in self._scripts:
             logging.warning(f"Script global '{name}' ya está registrado. Se sobrescribirá.")
 
+        if cpu_bound:
+            if compute is None:
+                raise ValueError(f"Script global '{name}': cpu_bound requiere una función 'compute'")
+            try:
+                pickle.dumps(compute)
+            except Exception as e:
+                raise ValueError(
+                    f"Script global '{name}': 'compute' debe ser una función a nivel de módulo (picklable): {e}"
+                ) from e
+            function = self._make_offloaded(params, compute, function)
+
         self._scripts[name] = GlobalScriptDefinition(
             name=name,
             function=function,
             params=params,
             description=description,
-            category=category
+            category=category,
+            cpu_bound=cpu_bound,
+            compute=compute
         )
 
         logging.info(f"Script global registrado: {name} (categoría: {category})")
 
+    @staticmethod
+    def _make_offloaded(params: Dict[str, type], compute: Callable, apply: Callable) -> Callable:
+        """
+        Función async que ejecuta `compute` con los parámetros del script en el
+        pool de procesos y luego `apply` en el loop con `resultado=`.
+        """
+        async def run_offloaded(**kwargs):
+            compute_params = {key: kwargs[key] for key in params if key in kwargs}
+            resultado = await run_cpu_bound(compute, compute_params)
+            return await apply(**kwargs, resultado=resultado)
+
+        return run_offloaded
+
     def get(self, name: str) -> GlobalScriptDefinition | None:
         """Obtiene un script global por nombre."""
         return self._scripts.get(name)
@@ -115,11 +230,8 @@ class GlobalScriptRegistry:
         """
         script_def = self.get(name)
 
-        if not script_def:
-            raise ValueError(f"Script global '{name}' no encontrado")
-
         # Validar parámetros
-        self._validate_params(script_def, params)
+        self.validate_params(name, params)
 
         # Ejecutar script
         try:
@@ -129,6 +241,21 @@ class GlobalScriptRegistry:
             logging.exception(f"Error ejecutando script global '{name}'")
             raise
 
+    def validate_params(self, name: str, params: Dict[str, Any]):
+        """
+        Valida los parámetros de una llamada a un script global. Lo usan
+        `execute` y `script_service.compile_script` (al compilar una vez).
+
+        Raises:
+            ValueError: Si el script no existe o los parámetros son inválidos
+        """
+        script_def = self.get(name)
+
+        if not script_def:
+            raise ValueError(f"Script global '{name}' no encontrado")
+
+        self._validate_params(script_def, params)
+
     def _validate_params(
         self,
         script_def: GlobalScriptDefinition,
@@ -269,14 +396,10 @@ async def script_teleport_aleatorio(
         character: Personaje a teleportar
         mensaje: Mensaje a mostrar
     """
-    from sqlalchemy import select, func
-    from src.models import Room
-    from src.services import broadcaster_service, narrative_service
+    from src.services import broadcaster_service, narrative_service, world_graph_service
 
-    # Obtener sala aleatoria
-    query = select(Room).order_by(func.random()).limit(1)
-    result = await session.execute(query)
-    random_room = result.scalar_one_or_none()
+    # Obtener sala aleatoria (del grafo del mundo, sin consultar la base de datos)
+    random_room = world_graph_service.get_random_room()
 
     if not random_room:
         logging.warning("No hay salas disponibles para teleport aleatorio")
@@ -379,6 +502,137 @@ async def script_spawn_item(
     logging.info(f"Script global 'spawn_item': {item_key} spawneado en {room.name}")
 
 
+# ============================================================================
+# SCRIPTS GLOBALES - BOTÍN (cpu_bound)
+# ============================================================================
+
+# Tope de tiradas (y de items creados) por llamada. El coste del cálculo está
+# en el tamaño de la tabla; crear los items y avisar a la sala ocurre en el
+# event loop, así que su número debe ser pequeño.
+MAX_TIRADAS_BOTIN = 20
+
+
+def calcular_botin(tabla: str, tiradas: int) -> List[str]:
+    """
+    Parte pura de `repartir_botin`: tira `tiradas` veces sobre la tabla.
+
+    Se ejecuta en el pool de procesos, así que no toca BD ni Telegram.
+
+    Args:
+        tabla: Entradas "item_key:peso" separadas por comas (peso 1 si se omite).
+               Ej: "pocion_curacion:5, espada_viviente:1"
+        tiradas: Número de tiradas (cada tirada da un item)
+
+    Returns:
+        Lista con el item_key obtenido en cada tirada
+    """
+    keys, pesos = [], []
+    for entrada in tabla.split(","):
+        key, _, peso = entrada.strip().partition(":")
+        if not key:
+            continue
+        keys.append(key.strip())
+        pesos.append(max(int(peso), 0) if peso.strip() else 1)
+
+    if not keys or sum(pesos) == 0:
+        return []
+
+    return random.choices(keys, weights=pesos, k=min(max(tiradas, 0), MAX_TIRADAS_BOTIN))
+
+
+async def script_repartir_botin(
+    session: AsyncSession,
+    room: Any,
+    tabla: str,
+    tiradas: int,
+    resultado: List[str],
+    **context
+):
+    """
+    Crea en la sala los items obtenidos por `calcular_botin`.
+
+    Args:
+        session: Sesión de BD
+        room: Sala donde aparece el botín
+        tabla: Tabla de botín (ver `calcular_botin`)
+        tiradas: Número de tiradas
+        resultado: Item keys devueltos por `calcular_botin`
+        **context: Resto del contexto (target, character...), no se usa
+    """
+    from src.models import Item
+    from src.services import broadcaster_service, narrative_service
+    from game_data.item_prototypes import ITEM_PROTOTYPES
+
+    item_keys = [key for key in resultado if key in ITEM_PROTOTYPES]
+    if len(item_keys) < len(resultado):
+        unknown = sorted(set(resultado) - set(item_keys))
+        logging.warning(f"Script global 'repartir_botin': prototipos inexistentes {unknown}")
+
+    if not item_keys:
+        return
+
+    new_items = [Item(key=item_key, room_id=room.id) for item_key in item_keys[:MAX_TIRADAS_BOTIN]]
+    session.add_all(new_items)
+    await session.flush()
+
+    # Un solo aviso a la sala con todos los items (agrupando repetidos).
+    counts: Dict[str, int] = {}
+    for new_item in new_items:
+        counts[new_item.get_name()] = counts.get(new_item.get_name(), 0) + 1
+    names = [name if count == 1 else f"{name} (x{count})" for name, count in counts.items()]
+
+    if len(new_items) == 1:
+        narrative_msg = narrative_service.get_random_narrative("item_spawn", item_name=names[0])
+    else:
+        item_names = names[0] if len(names) == 1 else f"{', '.join(names[:-1])} y {names[-1]}"
+        narrative_msg = narrative_service.get_random_narrative("item_spawn_many", item_names=item_names)
+
+    await broadcaster_service.send_message_to_room(
+        session=session,
+        room_id=room.id,
+        message_text=narrative_msg
+    )
+
+    await session.commit()
+    logging.info(f"Script global 'repartir_botin': {len(new_items)} items en {room.name}")
+
+
+# ============================================================================
+# SCRIPTS GLOBALES - SCHEDULING
+# ============================================================================
+
+async def script_programar_script(
+    session: AsyncSession,
+    segundos: int,
+    script: str,
+    target: Any = None,
+    room: Any = None,
+    character: Any = None,
+    **context
+):
+    """
+    Ejecuta otro script dentro de `segundos` segundos con el mismo contexto
+    (target, room y character), usando la cola de retardos.
+
+    Ejemplo en prototipo:
+        "after_on_use": "global:programar_script(segundos=30, script=\"cerrar_trampilla\")"
+
+    Args:
+        session: Sesión de BD
+        segundos: Retraso en segundos
+        script: Script string a ejecutar (local o "global:...")
+    """
+    from src.services import delay_queue_service, script_service
+
+    parsed = script_service.compile_script(script)
+    if parsed.function is None or parsed.errors:
+        logging.warning(f"Script global 'programar_script': '{script}' no es un script válido")
+        return
+
+    context_ids = delay_queue_service.context_ids_for(target=target, room=room, character=character)
+    await delay_queue_service.schedule_in(segundos, script, context_ids)
+
+
 # ============================================================================
 # REGISTRO DE SCRIPTS GLOBALES
 # ============================================================================
@@ -422,4 +676,24 @@ def register_all_global_scripts():
         category="utility"
     )
 
+    # Botín (cálculo en el pool de procesos)
+    global_script_registry.register(
+        name="repartir_botin",
+        function=script_repartir_botin,
+        params={"tabla": str, "tiradas": int},
+        description="Reparte en la sala items tirados sobre una tabla de botín",
+        category="loot",
+        cpu_bound=True,
+        compute=calcular_botin
+    )
+
+    # Scheduling
+    global_script_registry.register(
+        name="programar_script",
+        function=script_programar_script,
+        params={"segundos": int, "script": str},
+        description="Ejecuta otro script dentro de N segundos",
+        category="scheduling"
+    )
+
     logging.info(f"✅ {len(global_script_registry.list_all())} scripts globales registrados")
@@ -452,10 +452,13 @@ else:
         "scripts": {
             "after_on_look": """
 import random
+from datetime import timedelta
 from src.services import state_service
 
-# Verificar cooldown (evitar spam)
-if await state_service.is_on_cooldown(target, 'mensaje_estatua'):
+# Cooldown de 30 segundos (evitar spam). Comprobar y establecer en una sola
+# operación: dos jugadores mirando a la vez no reciben ambos el mensaje.
+acquired, _ = await state_service.try_acquire_cooldown(target, 'mensaje_estatua', timedelta(seconds=30))
+if not acquired:
     return
 
 # Mensajes aleatorios
@@ -467,10 +470,6 @@ mensajes = [
 
 mensaje = random.choice(mensajes)
 await context.send_message(character, mensaje)
-
-# Establecer cooldown de 30 segundos
-from datetime import timedelta
-await state_service.set_cooldown(target, 'mensaje_estatua', timedelta(seconds=30))
 """
         },
         "display": {
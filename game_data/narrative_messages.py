@@ -26,6 +26,14 @@ NARRATIVE_MESSAGES = {
         "<i>El tejido de la realidad se desgarra brevemente, expulsando {item_name}.</i>",
     ],
 
+    # Varios objetos que aparecen a la vez (script global repartir_botin)
+    "item_spawn_many": [
+        "<i>{item_names} aparecen de la nada.</i>",
+        "<i>{item_names} se materializan con un destello de luz.</i>",
+        "<i>Un portal dimensional deposita en el suelo {item_names}.</i>",
+        "<i>Las sombras se arremolinan y revelan {item_names}.</i>",
+    ],
+
     # Mensajes para la destrucción de objetos en una sala (/destruirobjeto)
     "item_destroy_room": [
         "<i>{item_name} se desvanece en el aire.</i>",
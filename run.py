@@ -6,8 +6,8 @@ Este script es el responsable de orquestar el arranque del bot. Sus tareas princ
 1. Configurar el sistema de logging global para toda la aplicación.
 2. Definir y registrar las funciones `on_startup` y `on_shutdown` que se ejecutarán
    al iniciar y detener el bot, respectivamente.
-3. Iniciar el "polling" de Aiogram, que es el bucle principal que escucha los
-   mensajes de Telegram.
+3. Iniciar el bucle principal que escucha los mensajes de Telegram: "polling"
+   de Aiogram por defecto, o un servidor webhook si `[webhook] enabled = true`.
 
 Para ejecutar la aplicación, se llama a este script desde el `entrypoint.sh`
 dentro del contenedor Docker.
@@ -17,10 +17,13 @@ import logging
 import asyncio
 import sys
 from aiogram import executor
+from aiogram.utils.executor import Executor
 from sqlalchemy import select
 
 from src.bot.dispatcher import dp
-from src.services import world_loader_service, scheduler_service, online_service, validation_service
+from src.bot.update_scheduler import update_scheduler
+from src.bot import webhook
+from src.services import world_loader_service, scheduler_service, online_service, validation_service, command_service, account_cache_service, movement_service, event_service, delay_queue_service, reload_service
 from src.db import async_session_factory
 from src.config import settings
 from src.models import Account
@@ -54,6 +57,7 @@ async def _ensure_superadmin_exists(session):
         logging.info(f"Actualizando cuenta {superadmin_id} al rol de Superadmin.")
         superadmin_account.role = "SUPERADMIN"
         await session.commit()
+        await account_cache_service.invalidate(superadmin_id)
     else:
         logging.info("Cuenta de Superadmin verificada.")
 
@@ -66,16 +70,18 @@ async def on_startup(dispatcher):
     logging.info("Iniciando secuencia de arranque del bot...")
 
     try:
-        # 0. VALIDACIONES CRÍTICAS: Ejecutar antes de cualquier inicialización.
-        #    Si hay errores de configuración, el bot no debe arrancar.
-        validation_service.validate_all()
-
-        # 1. Registrar scripts globales
+        # 0. Registrar scripts globales (la validación los necesita).
         from game_data.global_scripts import register_all_global_scripts
         register_all_global_scripts()
 
-        # 2. Inicia el sistema de scheduling (tick + cron).
+        # 1. VALIDACIONES CRÍTICAS: Ejecutar antes de cualquier inicialización.
+        #    Si hay errores de configuración, el bot no debe arrancar.
+        validation_service.validate_all()
+
+        # 2. Inicia el sistema de scheduling (tick + cron) y la cola de retardos
+        #    (scripts diferidos y timestamps, incluidos los vencidos durante el reinicio).
         scheduler_service.start()
+        delay_queue_service.start()
 
         # 3. Crea una sesión de base de datos para las tareas de inicialización.
         async with async_session_factory() as session:
@@ -95,6 +101,14 @@ async def on_startup(dispatcher):
         )
         logging.info("Job para chequeo de desconexiones añadido.")
 
+        # 4b. Opcionalmente, recargar game_data al detectar cambios en sus archivos.
+        if settings.reload_watch_game_data:
+            reload_service.start_watcher()
+
+        # 5. En modo webhook, registrar la URL del endpoint en Telegram.
+        if settings.webhook_enabled:
+            await webhook.configure_webhook(dispatcher)
+
         logging.info("✅ Secuencia de arranque finalizada. El bot está en línea.")
 
     except Exception:
@@ -111,7 +125,20 @@ async def on_shutdown(dispatcher):
     Se asegura de que los servicios se apaguen de forma limpia.
     """
     logging.warning("Iniciando secuencia de apagado del bot...")
+    # Dejar terminar los comandos de jugadores que ya estaban en cola.
+    await update_scheduler.shutdown(settings.dispatcher_shutdown_timeout_seconds)
     scheduler_service.shutdown()
+    await delay_queue_service.shutdown()
+    # Terminar los avisos y eventos AFTER de los últimos movimientos.
+    await movement_service.wait_for_side_effects()
+    # Terminar los eventos AFTER diferidos de los últimos comandos.
+    await event_service.wait_for_after_events()
+    # Detener los procesos de los scripts globales cpu_bound. Va después de
+    # las esperas anteriores: un script AFTER pendiente volvería a crear el pool.
+    from game_data.global_scripts import shutdown_process_pool
+    shutdown_process_pool()
+    # Enviar los menús de comandos que aún estaban esperando su debounce.
+    await command_service.flush_pending_menu_updates()
     logging.warning("Bot detenido.")
 
 
@@ -126,7 +153,51 @@ def main():
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    executor.start_polling(dp, on_startup=on_startup, on_shutdown=on_shutdown)
+    if settings.webhook_enabled:
+        _start_webhook()
+    else:
+        _start_polling()
+
+
+def _start_polling():
+    """Arranca el bot en modo long polling."""
+    logging.info(
+        f"Arrancando en modo polling (timeout={settings.polling_timeout_seconds}s, "
+        f"relax={settings.polling_relax_seconds}s, fast={settings.polling_fast})."
+    )
+    executor.start_polling(
+        dp,
+        on_startup=on_startup,
+        on_shutdown=on_shutdown,
+        timeout=settings.polling_timeout_seconds,
+        relax=settings.polling_relax_seconds,
+        fast=settings.polling_fast,
+    )
+
+
+def _start_webhook():
+    """Arranca el bot en modo webhook (servidor aiohttp)."""
+    try:
+        webhook.validate_webhook_settings()
+    except ValueError as e:
+        logging.critical(f"❌ No se puede arrancar en modo webhook: {e}")
+        sys.exit(1)
+
+    ssl_context = webhook.build_ssl_context()
+    logging.info(
+        f"Arrancando en modo webhook en {settings.webhook_host}:{settings.webhook_port}"
+        f"{settings.webhook_path} ({'TLS propio' if ssl_context else 'TLS en el proxy'})."
+    )
+    bot_executor = Executor(dp)
+    bot_executor.on_startup(on_startup)
+    bot_executor.on_shutdown(on_shutdown)
+    bot_executor.start_webhook(
+        webhook_path=settings.webhook_path,
+        request_handler=webhook.SecretTokenWebhookHandler,
+        host=settings.webhook_host,
+        port=settings.webhook_port,
+        ssl_context=ssl_context,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,40 @@
+#!/bin/bash
+# scripts/generate_webhook_cert.sh
+#
+# Genera un certificado autofirmado para probar el modo webhook en local.
+#
+# Uso:
+#   ./scripts/generate_webhook_cert.sh [host] [directorio_salida]
+#
+# Ejemplo:
+#   ./scripts/generate_webhook_cert.sh 127.0.0.1 certs
+#
+# Después, en gameconfig.toml:
+#   [webhook]
+#   enabled = true
+#   url = "https://127.0.0.1:8443"
+#   ssl_certificate = "certs/webhook_cert.pem"
+#   ssl_private_key = "certs/webhook_pkey.pem"
+#   upload_certificate = true
+
+set -e
+
+HOST="${1:-127.0.0.1}"
+OUT_DIR="${2:-certs}"
+
+mkdir -p "$OUT_DIR"
+
+# Si el host es una IP, se añade como SAN de tipo IP; si no, como DNS.
+if [[ "$HOST" =~ ^[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+$ ]]; then
+    SAN="IP:${HOST}"
+else
+    SAN="DNS:${HOST}"
+fi
+
+openssl req -newkey rsa:2048 -sha256 -nodes -x509 -days 365 \
+    -keyout "$OUT_DIR/webhook_pkey.pem" \
+    -out "$OUT_DIR/webhook_cert.pem" \
+    -subj "/CN=${HOST}" \
+    -addext "subjectAltName=${SAN}"
+
+echo "✅ Certificado generado en $OUT_DIR/webhook_cert.pem (clave: $OUT_DIR/webhook_pkey.pem) para ${HOST}"
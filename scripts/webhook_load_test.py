@@ -0,0 +1,169 @@
+# scripts/webhook_load_test.py
+"""
+Herramienta de pruebas de carga para el modo webhook.
+
+Tiene dos subcomandos que se usan juntos:
+
+1. `fake-api`: Levanta un doble local de la Bot API de Telegram que responde
+   `ok` a cualquier método (sendMessage, setMyCommands, setWebhook...). Se
+   configura en el bot con `[telegram_api] server_url`, de modo que las
+   respuestas del bot no salen a Internet.
+
+2. `send`: Envía N actualizaciones sintéticas (mensajes de texto) al webhook
+   del bot con una concurrencia dada y muestra la latencia observada.
+
+Ejemplo:
+    python scripts/webhook_load_test.py fake-api --port 8081
+    # gameconfig.toml: [telegram_api] server_url = "http://127.0.0.1:8081"
+    #                  [webhook] enabled = true, url = "https://127.0.0.1:8443"
+    python run.py
+    python scripts/webhook_load_test.py send --url https://127.0.0.1:8443/webhook \\
+        --updates 2000 --concurrency 50 --users 200 --insecure
+"""
+
+import argparse
+import asyncio
+import itertools
+import ssl
+import statistics
+import time
+
+from aiohttp import ClientSession, TCPConnector, web
+
+
+# ==============================================================================
+# DOBLE DE LA BOT API
+# ==============================================================================
+
+_message_ids = itertools.count(1)
+
+
+async def _fake_api_handler(request: web.Request) -> web.Response:
+    """Responde a cualquier método de la Bot API con un resultado genérico."""
+    method = request.match_info["method"].lower()
+    request.app["calls"][method] = request.app["calls"].get(method, 0) + 1
+
+    if method == "getme":
+        result = {"id": 1, "is_bot": True, "first_name": "Runegram", "username": "runegram_bot"}
+    elif method.startswith("send") or method.startswith("edit"):
+        result = {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": {"id": 1, "type": "private"},
+        }
+    else:
+        result = True
+
+    return web.json_response({"ok": True, "result": result})
+
+
+async def _print_stats(app: web.Application):
+    """Muestra cada 5 segundos cuántas llamadas ha recibido el doble."""
+    async def _loop():
+        while True:
+            await asyncio.sleep(5)
+            if app["calls"]:
+                print(f"Llamadas recibidas: {dict(sorted(app['calls'].items()))}")
+    app["stats_task"] = asyncio.create_task(_loop())
+
+
+def run_fake_api(host: str, port: int):
+    """Arranca el doble de la Bot API."""
+    app = web.Application()
+    app["calls"] = {}
+    app.router.add_route("*", "/bot{token}/{method}", _fake_api_handler)
+    app.on_startup.append(_print_stats)
+    web.run_app(app, host=host, port=port)
+
+
+# ==============================================================================
+# GENERADOR DE ACTUALIZACIONES
+# ==============================================================================
+
+def _build_update(update_id: int, user_id: int, text: str) -> dict:
+    """Construye una actualización de Telegram con un mensaje de texto."""
+    entities = []
+    if text.startswith("/"):
+        entities.append({"type": "bot_command", "offset": 0, "length": len(text.split()[0])})
+
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Carga{user_id}"},
+            "text": text,
+            "entities": entities,
+        },
+    }
+
+
+async def send_updates(url: str, total: int, concurrency: int, users: int, text: str,
+                       secret_token: str, insecure: bool):
+    """Envía `total` actualizaciones al webhook y muestra las latencias."""
+    ssl_context = None
+    if insecure:
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret_token} if secret_token else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with ClientSession(connector=TCPConnector(ssl=ssl_context, limit=concurrency)) as session:
+        async def _send(update_id: int):
+            nonlocal errors
+            update = _build_update(update_id, 100000 + update_id % users, text)
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.post(url, json=update, headers=headers) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_send(i) for i in range(1, total + 1)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f"Enviadas {total} actualizaciones en {elapsed:.2f}s ({total / elapsed:.1f}/s), errores: {errors}")
+    print(f"Latencia media: {statistics.mean(latencies) * 1000:.1f} ms, p95: {p95 * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pruebas de carga del modo webhook de Runegram.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    api_parser = subparsers.add_parser("fake-api", help="Levanta un doble local de la Bot API.")
+    api_parser.add_argument("--host", default="127.0.0.1")
+    api_parser.add_argument("--port", type=int, default=8081)
+
+    send_parser = subparsers.add_parser("send", help="Envía actualizaciones sintéticas al webhook.")
+    send_parser.add_argument("--url", required=True, help="URL completa del webhook.")
+    send_parser.add_argument("--updates", type=int, default=1000)
+    send_parser.add_argument("--concurrency", type=int, default=40)
+    send_parser.add_argument("--users", type=int, default=100, help="Número de telegram_id distintos.")
+    send_parser.add_argument("--text", default="/mirar")
+    send_parser.add_argument("--secret-token", default="")
+    send_parser.add_argument("--insecure", action="store_true", help="No verificar el certificado (autofirmado).")
+
+    args = parser.parse_args()
+    if args.command == "fake-api":
+        run_fake_api(args.host, args.port)
+    else:
+        asyncio.run(send_updates(
+            args.url, args.updates, args.concurrency, args.users,
+            args.text, args.secret_token, args.insecure,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ proactivos fuera del flujo normal de un comando).
 """
 
 from aiogram import Bot
+from aiogram.bot.api import TelegramAPIServer, TELEGRAM_PRODUCTION
 
 from src.config import settings
 
@@ -20,4 +21,12 @@ from src.config import settings
 # que a su vez lo carga desde las variables de entorno.
 # `settings.bot_token.get_secret_value()` es la forma correcta de acceder
 # al valor de un `SecretStr` de Pydantic.
-bot = Bot(token=settings.bot_token.get_secret_value())
\ No newline at end of file
+#
+# Si `[telegram_api] server_url` está definido, las llamadas a la API se dirigen
+# a ese servidor (ej: un servidor local de la Bot API para pruebas de carga).
+api_server = (
+    TelegramAPIServer.from_base(settings.telegram_api_server_url)
+    if settings.telegram_api_server_url
+    else TELEGRAM_PRODUCTION
+)
+bot = Bot(token=settings.bot_token.get_secret_value(), server=api_server)
\ No newline at end of file
@@ -13,6 +13,7 @@ Responsabilidades:
 2.  **Gestión de Estados (FSM):** Configura el almacenamiento de estados finitos
     (Finite State Machine), que permite crear conversaciones de varios pasos
     (ej: creación de personaje, menús interactivos).
+3.  **Middlewares:** Registra los middlewares globales (ej: control de flood).
 """
 
 from aiogram import Dispatcher
@@ -20,6 +21,7 @@ from aiogram.contrib.fsm_storage.redis import RedisStorage2
 
 from src.config import settings
 from src.bot.bot import bot
+from src.bot.middlewares import FloodControlMiddleware
 
 # 1. Configuración del Almacenamiento de Estados (FSM - Finite State Machine)
 # Se utiliza Redis (`RedisStorage2`) como backend para almacenar el estado de
@@ -38,4 +40,10 @@ storage = RedisStorage2(
 # 2. Creación de la Instancia del Dispatcher
 # Se crea una instancia única del `Dispatcher` para toda la aplicación,
 # vinculándola con la instancia del `bot` y el `storage` configurado.
-dp = Dispatcher(bot, storage=storage)
\ No newline at end of file
+dp = Dispatcher(bot, storage=storage)
+
+# 3. Registro de Middlewares
+# El control de flood se ejecuta antes que cualquier manejador, de modo que los
+# mensajes que exceden el límite se descartan sin abrir una sesión de BD.
+if settings.flood_control_enabled:
+    dp.middleware.setup(FloodControlMiddleware())
@@ -0,0 +1,148 @@
+# src/bot/middlewares.py
+"""
+Módulo de Middlewares de Aiogram.
+
+Los middlewares se ejecutan antes que cualquier manejador, por lo que son el
+lugar adecuado para aplicar políticas globales que deben actuar antes de abrir
+una sesión de base de datos.
+
+Middlewares disponibles:
+- `FloodControlMiddleware`: Limita la frecuencia de mensajes y clics en
+  botones por jugador usando un "token bucket" en Redis.
+"""
+
+import logging
+import redis.asyncio as redis
+from aiogram import types
+from aiogram.dispatcher.handler import CancelHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from src.config import settings
+
+
+# --- Configuración del Middleware ---
+
+# Cliente de Redis dedicado para el control de flood.
+redis_client = redis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    db=settings.redis_db,
+    decode_responses=True
+)
+
+# Script Lua del token bucket. Se ejecuta de forma atómica en Redis, así que
+# dos actualizaciones simultáneas del mismo jugador no pueden gastar el mismo token.
+# El instante actual sale del reloj de Redis (TIME), no del de cada proceso del
+# bot: con varios procesos y relojes desajustados, el bucket sigue siendo uno.
+#
+# KEYS[1] = clave del bucket
+# ARGV[1] = capacidad (ráfaga máxima)
+# ARGV[2] = tokens que se recuperan por segundo
+# ARGV[3] = TTL de la clave (segundos)
+# Devuelve 1 si se consumió un token, 0 si el bucket estaba vacío.
+TOKEN_BUCKET_SCRIPT = """
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local tokens = tonumber(data[1])
+local ts = tonumber(data[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+local elapsed = math.max(0, now - ts)
+tokens = math.min(capacity, tokens + elapsed * rate)
+
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return allowed
+"""
+
+_token_bucket = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+
+def _get_bucket_key(telegram_id: int) -> str:
+    """Genera la clave de Redis para el bucket de un jugador."""
+    return f"flood:bucket:{telegram_id}"
+
+
+def _get_warned_key(telegram_id: int) -> str:
+    """Genera la clave de Redis para el aviso de flood ya enviado."""
+    return f"flood:warned:{telegram_id}"
+
+
+async def consume_token(telegram_id: int) -> bool:
+    """
+    Intenta consumir un token del bucket del jugador.
+
+    Returns:
+        bool: True si la actualización puede procesarse. Si Redis no responde,
+              también devuelve True: es preferible dejar pasar un comando a
+              bloquear a todos los jugadores.
+    """
+    capacity = settings.flood_control_burst
+    rate = settings.flood_control_refill_per_second
+    # TTL: tiempo suficiente para que el bucket vuelva a estar lleno.
+    ttl = max(1, int(capacity / rate) + 1) if rate > 0 else 3600
+
+    try:
+        allowed = await _token_bucket(
+            keys=[_get_bucket_key(telegram_id)],
+            args=[capacity, rate, ttl],
+        )
+        return bool(allowed)
+    except Exception as e:
+        logging.warning(f"Control de flood no disponible para {telegram_id}: {e}")
+        return True
+
+
+async def should_warn(telegram_id: int) -> bool:
+    """
+    Devuelve True solo la primera vez dentro de la ventana de aviso, para que
+    un jugador que envía muchos mensajes no reciba muchos avisos.
+    """
+    try:
+        return bool(await redis_client.set(
+            _get_warned_key(telegram_id),
+            "1",
+            nx=True,
+            ex=settings.flood_control_warning_cooldown_seconds,
+        ))
+    except Exception:
+        return False
+
+
+class FloodControlMiddleware(BaseMiddleware):
+    """
+    Descarta los mensajes y callbacks que superan la frecuencia permitida.
+
+    Actúa en la fase `pre_process`, antes de los filtros y manejadores, por lo
+    que una actualización descartada no abre ninguna sesión de base de datos
+    ni llega a la cola del `update_scheduler`.
+    """
+
+    async def on_pre_process_message(self, message: types.Message, data: dict):
+        if not await consume_token(message.from_user.id):
+            if settings.flood_control_action == "warn" and await should_warn(message.from_user.id):
+                await message.answer("⏳ Vas demasiado rápido. Espera un momento antes de enviar más comandos.")
+            raise CancelHandler()
+
+    async def on_pre_process_callback_query(self, callback: types.CallbackQuery, data: dict):
+        if not await consume_token(callback.from_user.id):
+            # Respondemos siempre al callback para que el botón deje de "cargar",
+            # pero el aviso visible solo se muestra una vez.
+            text = None
+            if settings.flood_control_action == "warn" and await should_warn(callback.from_user.id):
+                text = "⏳ Vas demasiado rápido."
+            await callback.answer(text)
+            raise CancelHandler()
@@ -0,0 +1,113 @@
+# src/bot/update_scheduler.py
+"""
+Módulo del Planificador de Actualizaciones por Usuario.
+
+Aiogram procesa las actualizaciones de Telegram de forma concurrente. Esto
+significa que dos mensajes rápidos del mismo jugador (ej: dos `/coger`) pueden
+ejecutarse en paralelo contra el mismo `Character`, con sesiones de base de
+datos distintas que compiten entre sí. Además, no existe ningún límite global
+de sesiones simultáneas, por lo que una ráfaga de mensajes puede agotar el
+pool de conexiones de asyncpg.
+
+El `UpdateScheduler` resuelve ambos problemas:
+1.  **Orden por jugador:** Cada `telegram_id` tiene su propia cola FIFO. Las
+    tareas de un mismo jugador se ejecutan de una en una, en orden de llegada.
+2.  **Concurrencia acotada:** Un semáforo global limita cuántas tareas (de
+    jugadores distintos) se ejecutan a la vez.
+
+Cada cola tiene una única corrutina "drenadora" que vive solo mientras haya
+trabajo pendiente; no existen workers permanentes.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable
+
+from src.config import settings
+
+
+class UpdateScheduler:
+    """
+    Ejecuta tareas serializadas por usuario con un límite global de concurrencia.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue_per_user: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue_per_user = max_queue_per_user
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._queues: dict[int, deque] = {}
+        self._drainers: dict[int, asyncio.Task] = {}
+
+    def pending_count(self, user_id: int) -> int:
+        """Devuelve cuántas tareas tiene encoladas un usuario."""
+        queue = self._queues.get(user_id)
+        return len(queue) if queue else 0
+
+    def submit(self, user_id: int, func: Callable[..., Awaitable], *args, **kwargs) -> bool:
+        """
+        Encola una tarea para un usuario.
+
+        Args:
+            user_id: telegram_id del usuario que originó la actualización.
+            func: Función asíncrona a ejecutar.
+            *args, **kwargs: Argumentos para `func`.
+
+        Returns:
+            bool: True si se encoló, False si la cola del usuario estaba llena.
+        """
+        queue = self._queues.setdefault(user_id, deque())
+        if len(queue) >= self.max_queue_per_user:
+            logging.warning(f"Cola de actualizaciones llena para el usuario {user_id}, se descarta la tarea.")
+            return False
+
+        queue.append((func, args, kwargs))
+
+        if user_id not in self._drainers:
+            self._drainers[user_id] = asyncio.create_task(self._drain(user_id))
+        return True
+
+    async def _drain(self, user_id: int):
+        """
+        Ejecuta en orden todas las tareas de la cola de un usuario.
+
+        El semáforo se adquiere por tarea (no por cola), de modo que un jugador
+        con muchos comandos pendientes no monopoliza un hueco del pool.
+        """
+        queue = self._queues[user_id]
+        try:
+            while queue:
+                func, args, kwargs = queue.popleft()
+                async with self._semaphore:
+                    try:
+                        await func(*args, **kwargs)
+                    except Exception:
+                        logging.exception(f"Error no manejado en una tarea encolada del usuario {user_id}")
+        finally:
+            # Entre el último `while queue` y este bloque no hay ningún `await`,
+            # así que no se puede perder una tarea encolada justo ahora.
+            self._queues.pop(user_id, None)
+            self._drainers.pop(user_id, None)
+
+    async def shutdown(self, timeout: float = 10.0):
+        """
+        Espera a que terminen las tareas en curso (hasta `timeout` segundos)
+        y cancela el resto.
+        """
+        drainers = list(self._drainers.values())
+        if not drainers:
+            return
+
+        logging.info(f"Esperando a {len(drainers)} colas de actualizaciones pendientes...")
+        done, pending = await asyncio.wait(drainers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logging.warning(f"Se cancelaron {len(pending)} colas de actualizaciones al apagar el bot.")
+
+
+# Instancia única para toda la aplicación.
+update_scheduler = UpdateScheduler(
+    max_concurrent=settings.dispatcher_max_concurrent_updates,
+    max_queue_per_user=settings.dispatcher_max_queue_per_user,
+)
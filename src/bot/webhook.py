@@ -0,0 +1,111 @@
+# src/bot/webhook.py
+"""
+Módulo de Soporte para el Modo Webhook.
+
+Por defecto el bot funciona con "long polling": una única conexión que pide
+lotes de actualizaciones a Telegram con `getUpdates`. Como alternativa, este
+módulo permite arrancar un servidor aiohttp (a través del executor de webhooks
+de Aiogram) al que Telegram envía cada actualización por HTTPS.
+
+Ventajas del modo webhook:
+- Menor latencia por actualización (Telegram las empuja en cuanto llegan).
+- Telegram abre varias conexiones en paralelo (`max_connections`).
+- Varios procesos del bot pueden atender el mismo endpoint detrás de un proxy.
+
+Responsabilidades:
+1. Construir el contexto SSL cuando se usa un certificado propio (autofirmado).
+2. Registrar el webhook en Telegram al arrancar (`configure_webhook`).
+3. Validar la cabecera secreta que Telegram envía en cada petición.
+
+La configuración se lee de las secciones `[webhook]` y `[polling]` de
+`gameconfig.toml`, salvo el token secreto (`WEBHOOK_SECRET_TOKEN`), que es una
+credencial y se lee de `.env`.
+"""
+
+import hmac
+import logging
+import ssl
+from aiohttp import web
+from aiogram import Dispatcher
+from aiogram.dispatcher.webhook import WebhookRequestHandler
+from aiogram.types import InputFile
+
+from src.config import settings
+
+# Cabecera que Telegram añade a cada petición cuando el webhook tiene `secret_token`.
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class SecretTokenWebhookHandler(WebhookRequestHandler):
+    """
+    Manejador de peticiones del webhook que rechaza las que no traen el
+    `secret_token` configurado. El endpoint es público: sin token (algo que
+    `validate_webhook_settings` impide al arrancar) se rechazan todas.
+    """
+
+    async def post(self):
+        expected = settings.webhook_secret_token.get_secret_value()
+        received = self.request.headers.get(SECRET_TOKEN_HEADER, "")
+        if not expected or not hmac.compare_digest(received.encode(), expected.encode()):
+            logging.warning(f"Petición al webhook rechazada desde {self.request.remote}: token secreto inválido.")
+            raise web.HTTPUnauthorized()
+        return await super().post()
+
+
+def validate_webhook_settings():
+    """
+    Comprueba la configuración del modo webhook antes de arrancar.
+
+    Raises:
+        ValueError: Si falta la URL pública o el token secreto. Sin token,
+                    cualquiera podría enviar actualizaciones falsas al endpoint.
+    """
+    if not settings.webhook_url:
+        raise ValueError("[webhook] url es obligatorio en modo webhook.")
+    if not settings.webhook_secret_token.get_secret_value():
+        raise ValueError(
+            "WEBHOOK_SECRET_TOKEN es obligatorio en modo webhook: sin él, el endpoint "
+            "público aceptaría actualizaciones falsas. Defínelo en el archivo .env."
+        )
+
+
+def get_webhook_url() -> str:
+    """Devuelve la URL pública completa que se registra en Telegram."""
+    return f"{settings.webhook_url.rstrip('/')}{settings.webhook_path}"
+
+
+def build_ssl_context() -> ssl.SSLContext | None:
+    """
+    Construye el contexto SSL del servidor si se configuró un certificado.
+
+    Returns:
+        El contexto SSL, o None si el TLS lo termina un proxy inverso.
+    """
+    if not settings.webhook_ssl_certificate:
+        return None
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(settings.webhook_ssl_certificate, settings.webhook_ssl_private_key)
+    return context
+
+
+async def configure_webhook(dispatcher: Dispatcher):
+    """
+    Registra el webhook en Telegram. Se ejecuta en el arranque del bot.
+
+    Si el certificado es autofirmado (`upload_certificate = true`), se envía
+    a Telegram para que confíe en él.
+    """
+    url = get_webhook_url()
+    certificate = None
+    if settings.webhook_upload_certificate and settings.webhook_ssl_certificate:
+        certificate = InputFile(settings.webhook_ssl_certificate)
+
+    await dispatcher.bot.set_webhook(
+        url,
+        certificate=certificate,
+        max_connections=settings.webhook_max_connections,
+        drop_pending_updates=settings.webhook_drop_pending_updates,
+        secret_token=settings.webhook_secret_token.get_secret_value(),
+    )
+    logging.info(f"Webhook registrado en {url} (max_connections={settings.webhook_max_connections}).")
@@ -34,6 +34,10 @@ class Settings(BaseSettings):
     # Telegram
     bot_token: SecretStr
 
+    # Token secreto del webhook: Telegram lo envía en cada petición y el bot
+    # rechaza las que no lo traen. Obligatorio con [webhook] enabled = true.
+    webhook_secret_token: SecretStr = SecretStr("")
+
     # El ID de Telegram del usuario que tendrá el rol de Superadmin.
     superadmin_telegram_id: int
 
@@ -82,9 +86,101 @@ class Settings(BaseSettings):
     moderation_appeal_preview_length: int = 100
     moderation_banned_accounts_per_page: int = 10
 
+    # Recepción de Actualizaciones: Long Polling
+    polling_timeout_seconds: int = 20
+    polling_relax_seconds: float = 0.1
+    polling_fast: bool = True
+
+    # Recepción de Actualizaciones: Webhook
+    webhook_enabled: bool = False
+    webhook_url: str = ""
+    webhook_path: str = "/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8443
+    webhook_ssl_certificate: str = ""
+    webhook_ssl_private_key: str = ""
+    webhook_upload_certificate: bool = False
+    webhook_max_connections: int = 40
+    webhook_drop_pending_updates: bool = False
+
+    # Servidor de la Bot API (vacío = api.telegram.org)
+    telegram_api_server_url: str = ""
+
+    # Control de Flood
+    flood_control_enabled: bool = True
+    flood_control_burst: int = 5
+    flood_control_refill_per_second: float = 1.5
+    flood_control_action: str = "warn"
+    flood_control_warning_cooldown_seconds: int = 10
+
+    # Planificador de Actualizaciones (Dispatcher)
+    dispatcher_max_concurrent_updates: int = 10
+    dispatcher_max_queue_per_user: int = 5
+    dispatcher_shutdown_timeout_seconds: float = 10.0
+
+    # Menú de Comandos de Telegram
+    telegram_menu_debounce_seconds: float = 1.0
+    telegram_menu_fingerprint_ttl_days: int = 30
+
+    # Caché de CommandSets activos por personaje
+    command_sets_cache_ttl_seconds: float = 30.0
+
+    # Caché de Cuentas (rol, ban y personaje por telegram_id)
+    account_cache_enabled: bool = True
+    account_cache_local_max_entries: int = 10000
+    account_cache_local_ttl_seconds: float = 5.0
+    account_cache_redis_ttl_seconds: int = 3600
+
+    # Broadcasting
+    broadcasting_max_concurrent_sends: int = 20
+
+    # Movimiento
+    movement_speedwalk_max_steps: int = 20
+
+    # Eventos (fase AFTER en segundo plano)
+    events_defer_after_events: bool = True
+    events_after_queue_size: int = 1000
+    events_after_workers: int = 4
+
+    # Scripts (circuit breaker por entidad y script, tiempos máximos)
+    scripts_breaker_enabled: bool = True
+    scripts_breaker_max_failures: int = 5
+    scripts_breaker_base_backoff_seconds: float = 2.0
+    scripts_breaker_max_backoff_seconds: float = 300.0
+    scripts_timeout_event_seconds: float = 2.0
+    scripts_timeout_tick_seconds: float = 1.0
+    scripts_timeout_cron_seconds: float = 5.0
+    scripts_pulse_budget_seconds: float = 1.5
+    scripts_process_pool_workers: int = 2
+
+    # Cola de Retardos (scripts diferidos en Redis)
+    delay_queue_poll_interval_seconds: float = 1.0
+    delay_queue_batch_size: int = 50
+
+    # Recarga en caliente de game_data
+    reload_watch_game_data: bool = False
+    reload_watch_interval_seconds: float = 5.0
+
+    # Estado transiente de scripts (Redis)
+    state_transient_backend: str = "keys"
+
     # Gameplay General
     gameplay_debug_mode: bool = False
 
+    @validator("flood_control_action")
+    def validate_flood_control_action(cls, value):
+        """El control de flood solo admite descartar en silencio o avisar una vez."""
+        if value not in ("drop", "warn"):
+            raise ValueError("flood_control.action debe ser 'drop' o 'warn'")
+        return value
+
+    @validator("state_transient_backend")
+    def validate_state_transient_backend(cls, value):
+        """El estado transiente se guarda como una clave por valor o un hash por entidad."""
+        if value not in ("keys", "hash"):
+            raise ValueError("state.transient_backend debe ser 'keys' o 'hash'")
+        return value
+
     # ===============================
     # Propiedades Computadas
     # ===============================
@@ -26,10 +26,11 @@ from aiogram.dispatcher.filters.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.bot.dispatcher import dp
+from src.bot.update_scheduler import update_scheduler
 from src.db import async_session_factory
-from src.services import player_service, online_service
+from src.services import player_service, online_service, movement_service
 from src.utils.inline_keyboards import parse_callback_data
-from src.utils.presenters import show_current_room
+from src.utils.presenters import show_current_room, send_room_view
 
 
 # ===========================
@@ -114,72 +115,18 @@ async def handle_movement(
     # Actualizar actividad
     await online_service.update_last_seen(session, character)
 
-    # Buscar la salida en la sala actual
-    exit_found = None
-    for exit in character.room.exits_from:
-        if exit.name.lower() == direction.lower():
-            exit_found = exit
-            break
-
-    if not exit_found:
-        await callback.answer(f"No hay salida hacia {direction}.", show_alert=True)
-        return
-
-    # Verificar permisos de la salida (si tiene lock)
-    if exit_found.locks:
-        from src.services import permission_service
-        can_use, error_msg = await permission_service.can_execute(character, exit_found.locks)
-        if not can_use:
-            await callback.answer(error_msg or "No puedes usar esa salida.", show_alert=True)
-            return
-
-    # Obtener sala de destino
-    if not exit_found.to_room:
-        await callback.answer("Error: Salida sin destino.", show_alert=True)
+    # Camino crítico del movimiento (salida, lock, eventos BEFORE y cambio de sala)
+    result = await movement_service.move_character(session, character, direction)
+    if not result.success:
+        await callback.answer(result.message, show_alert=True)
         return
 
-    # Notificaciones sociales
-    from src.services import broadcaster_service, command_service
-
-    old_room_id = character.room_id
-    new_room_id = exit_found.to_room_id
-
-    # Notificar a la sala de origen
-    await broadcaster_service.send_message_to_room(
-        session=session,
-        room_id=old_room_id,
-        message_text=f"<i>{character.name} se ha ido hacia {direction}.</i>",
-        exclude_character_id=character.id
-    )
-
-    # Mover al personaje usando el servicio
-    await player_service.teleport_character(session, character.id, new_room_id)
-
-    # Notificar a la sala de destino
-    opposite_direction = {
-        "norte": "sur", "sur": "norte",
-        "este": "oeste", "oeste": "este",
-        "noreste": "suroeste", "suroeste": "noreste",
-        "noroeste": "sureste", "sureste": "noroeste",
-        "arriba": "abajo", "abajo": "arriba"
-    }.get(direction.lower(), "otra dirección")
-
-    await broadcaster_service.send_message_to_room(
-        session=session,
-        room_id=new_room_id,
-        message_text=f"<i>{character.name} ha llegado desde {opposite_direction}.</i>",
-        exclude_character_id=character.id
-    )
-
-    # Actualizar comandos de Telegram (por si la sala otorga nuevos command sets)
-    refreshed_character = await player_service.get_character_with_relations_by_id(session, character.id)
-    if refreshed_character:
-        await command_service.update_telegram_commands(refreshed_character)
-
     # Mostrar nueva sala al jugador (con botones)
-    # IMPORTANTE: Pasamos session Y character para evitar usar telegram_id incorrecto del mensaje
     # edit=False para enviar mensaje nuevo y mantener historial de movimientos
-    await show_current_room(callback.message, edit=False, session=session, character=refreshed_character)
+    await send_room_view(callback.message, result.destination_room, character, edit=False)
+
+    # Avisos a las salas, eventos AFTER y menú de comandos en segundo plano
+    movement_service.dispatch_side_effects(character, result)
     await callback.answer()
 
 
@@ -640,10 +587,20 @@ CALLBACK_HANDLERS = {
 @dp.callback_query_handler(lambda c: True)
 async def callback_query_router(callback: types.CallbackQuery):
     """
-    Router principal que recibe todos los callback queries y los distribuye.
+    Router principal que recibe todos los callback queries.
 
-    Este handler intercepta TODOS los clics en botones inline y decide
-    qué función específica debe manejar cada acción.
+    Este handler intercepta TODOS los clics en botones inline y los encola en
+    la cola FIFO del jugador, junto con sus comandos de texto, para que un
+    botón de movimiento y un comando no se ejecuten en paralelo.
+    """
+    if not update_scheduler.submit(callback.from_user.id, route_callback_query, callback):
+        await callback.answer("⏳ Tienes demasiadas acciones pendientes.")
+
+
+async def route_callback_query(callback: types.CallbackQuery):
+    """
+    Decide qué función específica debe manejar cada acción y la ejecuta.
+    Se ejecuta desde la cola del jugador en el `update_scheduler`.
     """
     async with async_session_factory() as session:
         try:
@@ -679,8 +636,23 @@ async def process_character_name(message: types.Message, state: FSMContext):
     Procesa el nombre del personaje cuando el usuario responde en el flujo FSM.
 
     Este handler se activa cuando el FSM está en estado 'waiting_for_name'
-    y el usuario envía un mensaje de texto.
+    y el usuario envía un mensaje de texto. Como el resto de mensajes, se
+    procesa a través de la cola del jugador.
     """
+    if not update_scheduler.submit(message.from_user.id, _create_character_from_name, message, state):
+        await message.answer("⏳ Tienes demasiados comandos pendientes. Espera un momento.")
+
+
+async def _create_character_from_name(message: types.Message, state: FSMContext):
+    """Valida el nombre recibido y crea el personaje."""
+    # El handler eligió este mensaje con el estado FSM del momento en que
+    # llegó. Si una tarea anterior de la cola ya creó el personaje (dos
+    # mensajes seguidos), este mensaje ya no es un nombre: es un comando.
+    if await state.get_state() != CharacterCreationStates.waiting_for_name.state:
+        from src.handlers.player.dispatcher import process_command_message
+        await process_command_message(message)
+        return
+
     async with async_session_factory() as session:
         try:
             from src.config import settings
@@ -7,8 +7,12 @@ La función `main_command_dispatcher` está registrada para interceptar **todos*
 los mensajes de texto enviados por los jugadores.
 
 Actúa como el "cerebro" del juego, orquestando el siguiente flujo para cada mensaje:
-1. Obtiene el contexto del jugador (Cuenta, Personaje) desde la base de datos.
-2. Verifica si la cuenta está baneada (Sistema de Baneos).
+1. Consulta la caché de cuentas (`account_cache_service`). Con ella responde
+   sin tocar la base de datos a los jugadores baneados y a los comandos
+   `stateless` (ej: /ayuda).
+2. Obtiene el contexto del jugador (Cuenta, Personaje) desde la base de datos,
+   cargando solo las relaciones que el comando invocado declara en `needs`,
+   y verifica si la cuenta está baneada (Sistema de Baneos).
    - Si está baneada, bloquea todos los comandos excepto `/apelar`.
 3. Actualiza el estado de actividad del jugador (online/AFK).
 4. Maneja casos especiales como el comando `/start`.
@@ -17,16 +21,25 @@ Actúa como el "cerebro" del juego, orquestando el siguiente flujo para cada men
 6. Busca el comando invocado dentro de los sets activos.
 7. Verifica los permisos (`permission_service`).
 8. Ejecuta el método `.execute()` del comando encontrado.
+
+El manejador no ejecuta este flujo directamente: lo encola en el
+`update_scheduler`, que garantiza que los comandos de un mismo jugador se
+procesen en orden y limita cuántos se procesan a la vez en todo el bot.
 """
 
 import logging
+import time
 from aiogram import types
 from aiogram.types import InputFile # <-- Importación añadida
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.bot.dispatcher import dp
+from src.bot.update_scheduler import update_scheduler
 from src.db import async_session_factory
-from src.services import player_service, permission_service, online_service, command_service, ban_service
+from src.services import (
+    player_service, permission_service, online_service, command_service, ban_service, account_cache_service,
+    state_service
+)
 from src.utils.inline_keyboards import create_character_creation_keyboard
 
 # Importaciones de CommandSets de Jugador
@@ -76,73 +89,202 @@ COMMAND_SETS = {
     "ban_management": BAN_MANAGEMENT_COMMANDS,
 }
 
+# Índice alias -> (nombre del CommandSet, instancia de comando). Los aliases son
+# únicos en todo el juego (lo garantiza `validation_service`), así que un alias
+# identifica un comando.
+_command_index: dict | None = None
+
+# Comandos que un jugador baneado puede seguir usando.
+APPEAL_COMMAND_NAMES = ("apelar", "appeal")
+
+
+def _get_command_index() -> dict:
+    """Construye (una sola vez) el índice de comandos por alias."""
+    global _command_index
+    if _command_index is None:
+        _command_index = {}
+        for set_name, commands in COMMAND_SETS.items():
+            for cmd_instance in commands:
+                for alias in cmd_instance.names:
+                    _command_index.setdefault(alias, (set_name, cmd_instance))
+    return _command_index
+
+
+def invalidate_command_index():
+    """Descarta el índice de comandos; se reconstruye en el siguiente mensaje."""
+    global _command_index
+    _command_index = None
+
+
+def get_command_load_profile(cmd_instance) -> set[str] | None:
+    """
+    Calcula las relaciones del personaje que hay que cargar para ejecutar un
+    comando: las que declara en `needs` más las que requiere su lock.
+
+    Returns:
+        set[str] con las relaciones, o None si hay que cargar el grafo completo.
+    """
+    if cmd_instance.needs is None:
+        return None
+
+    lock_relations = permission_service.get_lock_relations(cmd_instance.lock)
+    if lock_relations is None:
+        return None
+
+    return set(cmd_instance.needs) | lock_relations
+
+
 @dp.message_handler(content_types=types.ContentTypes.TEXT)
 async def main_command_dispatcher(message: types.Message):
     """
     Manejador principal que intercepta todos los mensajes de texto y los
-    enruta al comando correspondiente.
+    encola en la cola FIFO del jugador para su procesamiento.
+    """
+    if not update_scheduler.submit(message.from_user.id, process_command_message, message):
+        await message.answer("⏳ Tienes demasiados comandos pendientes. Espera un momento.")
+
+
+def _build_ban_message(reason: str | None, expires_at, has_appealed: bool) -> str:
+    """Construye el aviso que recibe un jugador baneado al usar un comando."""
+    ban_message = f"🚫 <b>Tu cuenta ha sido bloqueada.</b>\n\n"
+    ban_message += f"<b>Razón:</b> {reason}\n\n"
+
+    # Verificar si el ban es temporal
+    if expires_at:
+        ban_message += f"<b>Expira:</b> {expires_at.strftime('%Y-%m-%d %H:%M UTC')}\n\n"
+
+    # Información sobre apelación
+    if not has_appealed:
+        ban_message += "Tienes <b>una única oportunidad</b> de apelar este bloqueo usando:\n"
+        ban_message += "/apelar [tu explicación]"
+    else:
+        ban_message += "Ya has enviado una apelación. Los administradores la revisarán pronto."
+    return ban_message
+
+
+async def _block_banned_message(message: types.Message, input_text: str, reason, expires_at, has_appealed) -> bool:
+    """
+    Responde a un jugador baneado si su mensaje no es `/apelar`.
+
+    Returns:
+        bool: True si el mensaje quedó bloqueado (no hay que seguir procesándolo).
+    """
+    if input_text.startswith('/'):
+        # Permitir SOLO el comando /apelar para usuarios baneados
+        if message.get_command(pure=True).lower() in APPEAL_COMMAND_NAMES:
+            return False
+        await message.answer(_build_ban_message(reason, expires_at, has_appealed), parse_mode="HTML")
+        return True
+
+    # Mensaje sin comando (no empieza con /)
+    await message.answer(
+        "🚫 Tu cuenta está bloqueada. Solo puedes usar /apelar para apelar el bloqueo.",
+        parse_mode="HTML"
+    )
+    return True
+
+
+async def _clear_afk(message: types.Message, character_id: int, input_text: str):
+    """Elimina el estado AFK del personaje si el comando no es /afk."""
+    if input_text.lower().startswith('/afk'):
+        return
+
+    from src.services.online_service import redis_client
+    was_afk = await redis_client.delete(f"afk:{character_id}")
+
+    # Si estaba AFK, notificar que volvió
+    if was_afk:
+        await message.answer("<i>Ya no estás AFK.</i>", parse_mode="HTML")
+
+
+async def _answer_from_snapshot(message: types.Message, session: AsyncSession, input_text: str,
+                                snapshot: account_cache_service.AccountSnapshot, indexed_cmd) -> bool:
+    """
+    Intenta resolver el mensaje solo con la instantánea de la cuenta, sin
+    consultar la base de datos.
+
+    Returns:
+        bool: True si el mensaje quedó resuelto.
+    """
+    if snapshot.is_banned:
+        return await _block_banned_message(
+            message, input_text, snapshot.ban_reason, snapshot.ban_expires_at, snapshot.has_appealed
+        )
+
+    if not indexed_cmd or snapshot.character_id is None:
+        return False
+
+    # Solo comandos `stateless`, sin lock y de un CommandSet base del personaje:
+    # así no hace falta calcular los sets activos ni evaluar permisos.
+    set_name, cmd_instance = indexed_cmd
+    if not cmd_instance.stateless or cmd_instance.lock or set_name not in snapshot.command_sets:
+        return False
+
+    if await online_service.touch_last_seen(snapshot.character_id):
+        await message.answer("<i>Te has reconectado al juego.</i>", parse_mode="HTML")
+    await _clear_afk(message, snapshot.character_id, input_text)
+
+    args = message.get_args().split() if message.get_args() else []
+    await cmd_instance.execute(None, session, message, args)
+    return True
+
+
+async def process_command_message(message: types.Message):
+    """
+    Procesa un mensaje de texto y lo enruta al comando correspondiente.
+    Se ejecuta desde la cola del jugador en el `update_scheduler`.
     """
+    # La sesión no abre una conexión hasta la primera consulta, así que las
+    # respuestas servidas desde la caché de cuentas no tocan la base de datos.
     async with async_session_factory() as session:
         try:
-            # 1. Obtener el contexto del jugador.
-            account = await player_service.get_or_create_account(session, message.from_user.id)
+            input_text = message.text.strip()
+
+            # 1. Identificar el comando para cargar solo las relaciones que
+            #    necesita. Los mensajes que no son comandos conocidos solo
+            #    necesitan cuenta y personaje; /start muestra la sala y necesita
+            #    el grafo completo.
+            load_profile = set()
+            indexed_cmd = None
+            if input_text.lower().startswith('/start'):
+                load_profile = None
+            elif input_text.startswith('/'):
+                indexed_cmd = _get_command_index().get(message.get_command(pure=True).lower())
+                if indexed_cmd:
+                    load_profile = get_command_load_profile(indexed_cmd[1])
+
+            # 2. Intentar responder desde la caché de cuentas. Un ban temporal
+            #    vencido invalida la instantánea: hay que desbanear en la BD.
+            snapshot = await account_cache_service.get_snapshot(message.from_user.id)
+            if snapshot and snapshot.is_ban_expired():
+                snapshot = None
+            if snapshot and await _answer_from_snapshot(message, session, input_text, snapshot, indexed_cmd):
+                return
+
+            # 3. Obtener el contexto del jugador desde la base de datos.
+            loaded_at = time.time()
+            account = await player_service.get_or_create_account(session, message.from_user.id, needs=load_profile)
             if not account:
                 await message.answer("Error crítico al acceder a tu cuenta.")
                 return
             character = account.character
-            input_text = message.text.strip()
 
-            # 2. Verificar si la cuenta está baneada (Sistema de Baneos).
-            if await ban_service.is_account_banned(session, account):
-                # Parsear comando para verificar si es /apelar
-                if input_text.startswith('/'):
-                    cmd_name = message.get_command(pure=True).lower()
-
-                    # Permitir SOLO el comando /apelar para usuarios baneados
-                    if cmd_name == "apelar" or cmd_name == "appeal":
-                        # Continuar con el flujo normal para ejecutar /apelar
-                        pass
-                    else:
-                        # Bloquear cualquier otro comando
-                        ban_message = f"🚫 <b>Tu cuenta ha sido bloqueada.</b>\n\n"
-                        ban_message += f"<b>Razón:</b> {account.ban_reason}\n\n"
-
-                        # Verificar si el ban es temporal
-                        if account.ban_expires_at:
-                            ban_message += f"<b>Expira:</b> {account.ban_expires_at.strftime('%Y-%m-%d %H:%M UTC')}\n\n"
-
-                        # Información sobre apelación
-                        if not account.has_appealed:
-                            ban_message += "Tienes <b>una única oportunidad</b> de apelar este bloqueo usando:\n"
-                            ban_message += "/apelar [tu explicación]"
-                        else:
-                            ban_message += "Ya has enviado una apelación. Los administradores la revisarán pronto."
-
-                        await message.answer(ban_message, parse_mode="HTML")
-                        return
-                else:
-                    # Mensaje sin comando (no empieza con /)
-                    await message.answer(
-                        "🚫 Tu cuenta está bloqueada. Solo puedes usar /apelar para apelar el bloqueo.",
-                        parse_mode="HTML"
-                    )
-                    return
+            # 4. Verificar si la cuenta está baneada (Sistema de Baneos).
+            is_banned = await ban_service.is_account_banned(session, account)
+            if snapshot is None:
+                await account_cache_service.store_snapshot(account, loaded_at)
 
-            # 3. Actualizar estado de actividad (online/AFK).
+            if is_banned and await _block_banned_message(
+                message, input_text, account.ban_reason, account.ban_expires_at, account.has_appealed
+            ):
+                return
+
+            # 5. Actualizar estado de actividad (online/AFK).
             if character:
                 await online_service.update_last_seen(session, character)
+                await _clear_afk(message, character.id, input_text)
 
-                # Eliminar estado AFK si el comando no es /afk
-                if not input_text.lower().startswith('/afk'):
-                    from src.services.online_service import redis_client
-                    afk_key = f"afk:{character.id}"
-                    was_afk = await redis_client.delete(afk_key)
-
-                    # Si estaba AFK, notificar que volvió
-                    if was_afk:
-                        await message.answer("<i>Ya no estás AFK.</i>", parse_mode="HTML")
-
-            # 3. Manejo especial para el comando /start.
+            # 6. Manejo especial para el comando /start.
             if input_text.lower().startswith('/start'):
                 if character is None:
 
@@ -176,10 +318,10 @@ async def main_command_dispatcher(message: types.Message):
                     await show_current_room(message)
                 return
 
-            # 4. Validar que el jugador tenga un personaje para la mayoría de los comandos.
+            # 7. Validar que el jugador tenga un personaje para la mayoría de los comandos.
             # Esta lógica se ha movido dentro del parseo para simplificar.
 
-            # 5. Parsear el comando y sus argumentos.
+            # 8. Parsear el comando y sus argumentos.
             if not input_text.startswith('/'):
                 await message.answer("Comando desconocido. Los comandos deben empezar con / (ej: /mirar, /norte).")
                 return
@@ -187,10 +329,16 @@ async def main_command_dispatcher(message: types.Message):
             cmd_name = message.get_command(pure=True).lower()
             args = message.get_args().split() if message.get_args() else []
 
-            # 6. Obtener la lista dinámica de CommandSets activos.
+            # 9. Obtener la lista dinámica de CommandSets activos.
+            #    Si no están en caché hay que recorrer inventario y sala, que
+            #    pueden no estar cargados con el perfil mínimo del comando.
+            if character and not command_service.has_cached_active_command_sets(character):
+                await player_service.load_character_relations(
+                    session, character, command_service.ACTIVE_SETS_RELATIONS
+                )
             active_sets_names = await command_service.get_active_command_sets_for_character(character)
 
-            # 7. Buscar y ejecutar el comando.
+            # 10. Buscar y ejecutar el comando.
             found_cmd = None
             for set_name in active_sets_names:
                 for cmd_instance in COMMAND_SETS.get(set_name, []):
@@ -218,7 +366,9 @@ async def main_command_dispatcher(message: types.Message):
                 await message.answer(error_message or "No puedes hacer eso.")
                 return
 
-            await found_cmd.execute(character, session, message, args)
+            # Los scripts del comando comparten las lecturas del estado transiente.
+            with state_service.command_cache():
+                await found_cmd.execute(character, session, message, args)
 
         except Exception:
             # Captura final para cualquier error no manejado en las capas inferiores.
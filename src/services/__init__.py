@@ -21,6 +21,11 @@ from src.services import world_service
 from src.services import world_loader_service
 from src.services import item_service
 from src.services import tag_service
+from src.services import account_cache_service
+from src.services import world_graph_service
+from src.services import movement_service
+from src.services import delay_queue_service
+from src.services import reload_service
 
 # Script Services - importar singletons directamente
 from src.services.event_service import event_service, EventType, EventPhase, EventContext, EventResult
@@ -43,6 +48,9 @@ __all__ = [
     "world_loader_service",
     "item_service",
     "tag_service",
+    "account_cache_service",
+    "world_graph_service",
+    "movement_service",
 
     # Script Services
     "event_service",
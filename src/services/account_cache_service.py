@@ -0,0 +1,234 @@
+# src/services/account_cache_service.py
+"""
+Módulo de Servicio de Caché de Cuentas.
+
+Cada actualización de Telegram empieza identificando al jugador: cuenta,
+personaje, rol y estado de ban. Estos datos cambian muy pocas veces, pero se
+consultaban en Postgres en cada mensaje, incluso para responder a un jugador
+baneado o para mostrar `/ayuda`.
+
+Este servicio guarda una "instantánea" (`AccountSnapshot`) de esos datos por
+`telegram_id` en dos niveles:
+1.  **LRU en memoria:** Acotado en tamaño y con un TTL corto, para que otros
+    procesos del bot (ej: varios workers detrás de un webhook) no sirvan datos
+    obsoletos durante mucho tiempo.
+2.  **Redis:** Compartido por todos los procesos, con un TTL más largo.
+
+Invalidación:
+Los servicios que modifican estos datos (`ban_service`, `player_service` y el
+comando `/asignarrol`) llaman a `invalidate()` después de hacer commit. La
+invalidación también deja una marca temporal en Redis, de modo que una lectura
+de la base de datos anterior a la invalidación no puede volver a guardar una
+instantánea obsoleta (ver `store_snapshot`).
+
+Si Redis no responde, el servicio "falla abierto": las lecturas devuelven None
+y el dispatcher consulta la base de datos como siempre.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import redis.asyncio as redis
+
+from src.config import settings
+from src.models.account import Account
+
+
+# --- Configuración del Servicio ---
+
+# Cliente de Redis dedicado para las instantáneas de cuentas.
+redis_client = redis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    db=settings.redis_db,
+    decode_responses=True
+)
+
+# Guarda la instantánea solo si no hubo una invalidación posterior a la lectura
+# de la base de datos que la originó.
+#
+# KEYS[1] = clave de la instantánea
+# KEYS[2] = clave de la marca de invalidación
+# ARGV[1] = instantánea serializada (JSON)
+# ARGV[2] = instante en que se leyó la cuenta de la base de datos
+# ARGV[3] = TTL de la instantánea (segundos)
+# Devuelve 1 si se guardó, 0 si la lectura era anterior a una invalidación.
+STORE_SNAPSHOT_SCRIPT = """
+local invalidated_at = tonumber(redis.call('GET', KEYS[2]))
+if invalidated_at ~= nil and invalidated_at >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[3]))
+return 1
+"""
+
+_store_snapshot = redis_client.register_script(STORE_SNAPSHOT_SCRIPT)
+
+# Caché local: telegram_id -> (instante de expiración, instantánea).
+_local_cache: OrderedDict[int, tuple[float, "AccountSnapshot"]] = OrderedDict()
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """
+    Datos de una cuenta necesarios para enrutar una actualización sin
+    consultar la base de datos.
+    """
+    account_id: int
+    character_id: int | None
+    role: str
+    command_sets: tuple[str, ...]
+    is_banned: bool
+    ban_reason: str | None
+    ban_expires_at: datetime | None
+    has_appealed: bool
+
+    def is_ban_expired(self, now: datetime | None = None) -> bool:
+        """
+        True si el ban es temporal y ya venció. La instantánea no sirve en ese
+        caso: hay que pasar por `ban_service.is_account_banned`, que desbanea.
+        """
+        if not self.is_banned or not self.ban_expires_at:
+            return False
+        return (now or datetime.utcnow()) >= self.ban_expires_at
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["command_sets"] = list(self.command_sets)
+        if self.ban_expires_at:
+            data["ban_expires_at"] = self.ban_expires_at.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "AccountSnapshot":
+        data = json.loads(raw)
+        data["command_sets"] = tuple(data["command_sets"])
+        if data["ban_expires_at"]:
+            data["ban_expires_at"] = datetime.fromisoformat(data["ban_expires_at"])
+        return cls(**data)
+
+
+# --- Funciones de Ayuda (Internas) ---
+
+def _get_snapshot_key(telegram_id: int) -> str:
+    """Genera la clave de Redis de la instantánea de una cuenta."""
+    return f"account_cache:{telegram_id}"
+
+
+def _get_invalidated_key(telegram_id: int) -> str:
+    """Genera la clave de Redis con el instante de la última invalidación."""
+    return f"account_cache:invalidated:{telegram_id}"
+
+
+def _remember_locally(telegram_id: int, snapshot: AccountSnapshot):
+    """Guarda la instantánea en el LRU local, desalojando las más antiguas."""
+    _local_cache[telegram_id] = (time.monotonic() + settings.account_cache_local_ttl_seconds, snapshot)
+    _local_cache.move_to_end(telegram_id)
+    while len(_local_cache) > settings.account_cache_local_max_entries:
+        _local_cache.popitem(last=False)
+
+
+def snapshot_from_account(account: Account) -> AccountSnapshot:
+    """Construye la instantánea de una cuenta con su personaje ya cargado."""
+    character = account.character
+    return AccountSnapshot(
+        account_id=account.id,
+        character_id=character.id if character else None,
+        role=account.role,
+        command_sets=tuple(character.command_sets or ()) if character else (),
+        is_banned=account.is_banned,
+        ban_reason=account.ban_reason,
+        ban_expires_at=account.ban_expires_at,
+        has_appealed=account.has_appealed,
+    )
+
+
+# --- Funciones Principales del Servicio ---
+
+async def get_snapshot(telegram_id: int) -> AccountSnapshot | None:
+    """
+    Devuelve la instantánea de la cuenta, primero desde memoria y después
+    desde Redis. None si no está en caché (o la caché está desactivada).
+    """
+    if not settings.account_cache_enabled:
+        return None
+
+    entry = _local_cache.get(telegram_id)
+    if entry:
+        expires_at, snapshot = entry
+        if time.monotonic() < expires_at:
+            _local_cache.move_to_end(telegram_id)
+            return snapshot
+        del _local_cache[telegram_id]
+
+    try:
+        raw = await redis_client.get(_get_snapshot_key(telegram_id))
+    except Exception as e:
+        logging.warning(f"Caché de cuentas no disponible para {telegram_id}: {e}")
+        return None
+
+    if not raw:
+        return None
+
+    try:
+        snapshot = AccountSnapshot.from_json(raw)
+    except (ValueError, KeyError, TypeError):
+        logging.warning(f"Instantánea de cuenta corrupta para {telegram_id}, se descarta.")
+        return None
+
+    _remember_locally(telegram_id, snapshot)
+    return snapshot
+
+
+async def store_snapshot(account: Account, loaded_at: float) -> None:
+    """
+    Guarda la instantánea de una cuenta recién leída de la base de datos.
+
+    Args:
+        account: Cuenta con su relación `character` cargada.
+        loaded_at: `time.time()` tomado ANTES de leer la cuenta. Si la cuenta
+                   se invalidó después de ese instante, la lectura puede estar
+                   obsoleta y no se guarda.
+    """
+    if not settings.account_cache_enabled:
+        return
+
+    snapshot = snapshot_from_account(account)
+    try:
+        stored = await _store_snapshot(
+            keys=[_get_snapshot_key(account.telegram_id), _get_invalidated_key(account.telegram_id)],
+            args=[snapshot.to_json(), loaded_at, settings.account_cache_redis_ttl_seconds],
+        )
+    except Exception as e:
+        logging.warning(f"No se pudo guardar la instantánea de la cuenta {account.telegram_id}: {e}")
+        return
+
+    if stored:
+        _remember_locally(account.telegram_id, snapshot)
+
+
+async def invalidate(telegram_id: int) -> None:
+    """
+    Descarta la instantánea de una cuenta. Debe llamarse después del commit
+    de cualquier cambio en el rol, el ban, la apelación o el personaje.
+    """
+    _local_cache.pop(telegram_id, None)
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(_get_snapshot_key(telegram_id))
+            pipe.set(
+                _get_invalidated_key(telegram_id),
+                time.time(),
+                ex=settings.account_cache_redis_ttl_seconds,
+            )
+            await pipe.execute()
+    except Exception as e:
+        logging.warning(f"No se pudo invalidar la instantánea de la cuenta {telegram_id}: {e}")
+
+
+def clear_local_cache() -> None:
+    """Vacía el LRU en memoria de este proceso (usado en tests)."""
+    _local_cache.clear()
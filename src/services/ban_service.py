@@ -15,6 +15,7 @@ Responsabilidades:
 3. Verificar estado de ban considerando expiración temporal
 4. Proporcionar listados paginados de cuentas baneadas
 5. Logging exhaustivo de todas las operaciones para auditoría
+6. Invalidar la caché de cuentas (`account_cache_service`) tras cada cambio
 """
 
 import logging
@@ -27,6 +28,7 @@ from sqlalchemy.orm import selectinload
 from src.models.account import Account
 from src.models.character import Character
 from src.config import settings
+from src.services import account_cache_service
 
 
 async def is_account_banned(session: AsyncSession, account: Account) -> bool:
@@ -88,6 +90,7 @@ async def _auto_unban_expired(session: AsyncSession, account: Account) -> None:
         # Mantener has_appealed y appeal_text para historial
 
         await session.commit()
+        await account_cache_service.invalidate(account.telegram_id)
 
         logging.info(f"Cuenta {account.id} desbaneada automáticamente por expiración")
 
@@ -146,6 +149,7 @@ async def ban_account(
         account.ban_expires_at = expires_at
 
         await session.commit()
+        await account_cache_service.invalidate(account.telegram_id)
 
         # Logging detallado para auditoría
         ban_type = "temporal" if expires_at else "permanente"
@@ -203,6 +207,7 @@ async def unban_account(session: AsyncSession, character: Character) -> None:
         account.appealed_at = None
 
         await session.commit()
+        await account_cache_service.invalidate(account.telegram_id)
 
         # Logging detallado
         logging.info(
@@ -263,6 +268,7 @@ async def submit_appeal(
         account.appealed_at = now
 
         await session.commit()
+        await account_cache_service.invalidate(account.telegram_id)
 
         # Logging
         logging.info(
@@ -449,6 +455,8 @@ async def check_and_expire_bans(session: AsyncSession) -> int:
 
         if count > 0:
             await session.commit()
+            for account in expired_accounts:
+                await account_cache_service.invalidate(account.telegram_id)
             logging.info(f"Desbaneadas automáticamente {count} cuentas por expiración de ban")
 
         return count
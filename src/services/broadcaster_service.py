@@ -14,15 +14,22 @@ Centralizar la comunicación aquí ofrece varias ventajas:
 3.  **Desacoplamiento:** El resto de los servicios (scripts, canales, etc.) no
     necesitan saber los detalles de cómo se envía un mensaje; simplemente
     llaman a una función en este servicio.
+
+Además de personajes y salas sueltas, `send_message_to_area` alcanza todas las
+salas a un radio dado (campanas, gritos, explosiones) usando las tablas de
+distancias del grafo del mundo, y envía los mensajes en paralelo con un límite
+de envíos simultáneos.
 """
 
+import asyncio
 import logging
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from src.bot.bot import bot
-from src.models import Character
+from src.config import settings
+from src.models import Account, Character
 
 
 async def send_message_to_character(
@@ -115,4 +122,90 @@ async def send_message_to_room(
             character=char,
             message_text=message_text,
             parse_mode=parse_mode
-        )
\ No newline at end of file
+        )
+
+
+async def _send_to_chat(semaphore: asyncio.Semaphore, chat_id: int, message_text: str, parse_mode: str):
+    """Envía un mensaje a un chat respetando el límite de envíos simultáneos."""
+    async with semaphore:
+        try:
+            await bot.send_message(chat_id=chat_id, text=message_text, parse_mode=parse_mode)
+        except Exception:
+            logging.exception(f"BROADCASTER: No se pudo enviar mensaje al chat {chat_id}")
+
+
+def _pick_distance_message(distance: int, message_text: str, distance_messages: dict[int, str] | None) -> str:
+    """
+    Elige el texto para una distancia: la variante con la mayor distancia
+    mínima que no supere `distance`, o `message_text` si ninguna aplica.
+    """
+    if not distance_messages:
+        return message_text
+    applicable = [min_distance for min_distance in distance_messages if min_distance <= distance]
+    return distance_messages[max(applicable)] if applicable else message_text
+
+
+async def send_message_to_area(
+    session: AsyncSession,
+    room_id: int,
+    radius: int,
+    message_text: str,
+    distance_messages: dict[int, str] | None = None,
+    exclude_character_id: int | None = None,
+    parse_mode: str = "HTML"
+) -> int:
+    """
+    Envía un mensaje a los personajes online de todas las salas a `radius`
+    pasos o menos de una sala (siguiendo las salidas, sin tener en cuenta locks).
+
+    Los destinatarios se resuelven de una vez: salas desde la tabla de
+    distancias cacheada del grafo, personajes con una sola consulta y estado
+    online con un solo MGET. Los envíos se hacen en paralelo, con un máximo de
+    `broadcasting_max_concurrent_sends` a la vez.
+
+    Args:
+        session (AsyncSession): La sesión de base de datos activa.
+        room_id (int): Sala de origen del efecto (distancia 0).
+        radius (int): Máximo de pasos desde la sala de origen.
+        message_text (str): Texto por defecto.
+        distance_messages (dict[int, str], optional): Variantes por distancia
+            mínima, ej: `{2: "<i>A lo lejos, suena una campana.</i>"}`.
+        exclude_character_id (int, optional): Personaje a excluir.
+        parse_mode (str): El modo de parseo de Telegram.
+
+    Returns:
+        int: Cantidad de mensajes enviados (o intentados).
+    """
+    # Importar aquí para evitar importaciones circulares
+    from src.services import online_service, world_graph_service
+
+    distances = world_graph_service.get_distances(room_id, radius)
+    if not distances:
+        logging.warning(f"BROADCASTER: Se intentó enviar un mensaje de área desde una sala inexistente ({room_id}).")
+        return 0
+
+    # 1. Personajes presentes en el área, con su chat, en una sola consulta.
+    result = await session.execute(
+        select(Character.id, Character.room_id, Account.telegram_id)
+        .join(Character.account)
+        .where(Character.room_id.in_(list(distances)))
+    )
+    present = [row for row in result.all() if row.id != exclude_character_id]
+
+    # 2. Estado online de todos ellos con un solo MGET.
+    online_ids = await online_service.get_online_character_ids([row.id for row in present])
+
+    # 3. Envío en paralelo con límite de concurrencia.
+    semaphore = asyncio.Semaphore(settings.broadcasting_max_concurrent_sends)
+    sends = [
+        _send_to_chat(
+            semaphore,
+            row.telegram_id,
+            _pick_distance_message(distances[row.room_id], message_text, distance_messages),
+            parse_mode
+        )
+        for row in present
+        if row.id in online_ids
+    ]
+    await asyncio.gather(*sends)
+    return len(sends)
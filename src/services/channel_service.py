@@ -17,11 +17,64 @@ import logging
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from src.models import Character, CharacterSetting
 from src.services import broadcaster_service
 from game_data.channel_prototypes import CHANNEL_PROTOTYPES
 
+def get_channel_command_needs() -> set[str] | None:
+    """
+    Devuelve las relaciones del personaje que necesitan los comandos de canal:
+    sus configuraciones más las que requieran los filtros de audiencia.
+
+    Returns:
+        set[str], o None si algún filtro de audiencia requiere el grafo completo.
+    """
+    from src.services import permission_service
+
+    needs = {"settings"}
+    for data in CHANNEL_PROTOTYPES.values():
+        audience_relations = permission_service.get_lock_relations(data.get("audience", ""))
+        if audience_relations is None:
+            return None
+        needs.update(audience_relations)
+    return needs
+
+
+async def _get_default_channels(characters: list[Character]) -> dict[int, list[str]]:
+    """
+    Calcula los canales activados por defecto de varios personajes.
+
+    Cada filtro de audiencia se evalúa una sola vez para todos los personajes
+    con `permission_service.can_execute_many`.
+
+    Returns:
+        dict[int, list[str]]: ID del personaje -> claves de canal activas.
+    """
+    from src.services import permission_service
+
+    default_channels = {character.id: [] for character in characters}
+
+    for key, data in CHANNEL_PROTOTYPES.items():
+        # Activar si tiene default_on=True
+        if data.get("default_on", False):
+            for channels in default_channels.values():
+                channels.append(key)
+            continue
+
+        # Activar si tiene audience Y el personaje tiene permisos
+        audience_filter = data.get("audience", "")
+        if audience_filter:
+            allowed = await permission_service.can_execute_many(characters, audience_filter)
+            for character, can_access in zip(characters, allowed):
+                if can_access:
+                    default_channels[character.id].append(key)
+                    logging.info(f"Canal '{key}' activado por defecto para {character.name} (tiene permisos de audience)")
+
+    return default_channels
+
+
 async def get_or_create_settings(session: AsyncSession, character: Character) -> CharacterSetting:
     """
     Obtiene las configuraciones para un personaje. Si no existen, las crea con
@@ -46,23 +99,7 @@ async def get_or_create_settings(session: AsyncSession, character: Character) ->
     logging.info(f"Creando configuraciones por defecto para el personaje {character.name}")
 
     # Determinar qué canales deben estar activados por defecto.
-    default_channels = []
-
-    from src.services import permission_service
-
-    for key, data in CHANNEL_PROTOTYPES.items():
-        # Activar si tiene default_on=True
-        if data.get("default_on", False):
-            default_channels.append(key)
-            continue
-
-        # Activar si tiene audience Y el personaje tiene permisos
-        audience_filter = data.get("audience", "")
-        if audience_filter:
-            can_access, _ = await permission_service.can_execute(character, audience_filter)
-            if can_access:
-                default_channels.append(key)
-                logging.info(f"Canal '{key}' activado por defecto para {character.name} (tiene permisos de audience)")
+    default_channels = (await _get_default_channels([character]))[character.id]
 
     new_settings = CharacterSetting(
         character_id=character.id,
@@ -76,6 +113,34 @@ async def get_or_create_settings(session: AsyncSession, character: Character) ->
 
     return character.settings
 
+async def ensure_settings_many(session: AsyncSession, characters: list[Character]) -> None:
+    """
+    Versión masiva de `get_or_create_settings`: crea las configuraciones que
+    falten con un único commit y las asigna a cada personaje en memoria.
+
+    Los personajes deben tener `settings` (y las relaciones que pidan los
+    filtros de audiencia) ya cargadas.
+    """
+    missing = [character for character in characters if not character.settings]
+    if not missing:
+        return
+
+    logging.info(f"Creando configuraciones por defecto para {len(missing)} personajes")
+    default_channels = await _get_default_channels(missing)
+
+    new_settings = {
+        character.id: CharacterSetting(
+            character_id=character.id,
+            active_channels={"active_channels": default_channels[character.id]}
+        )
+        for character in missing
+    }
+    session.add_all(new_settings.values())
+    await session.commit()
+
+    for character in missing:
+        set_committed_value(character, "settings", new_settings[character.id])
+
 async def is_channel_active(settings: CharacterSetting, channel_key: str) -> bool:
     """Comprueba si un canal está en la lista de canales activos de un jugador."""
     if not settings:
@@ -105,26 +170,25 @@ async def broadcast_to_channel(session: AsyncSession, channel_key: str, message:
         result = await session.execute(query)
         all_characters = result.scalars().all()
 
-        # 4. Iterar y enviar el mensaje a los que estén suscritos y cumplan con audiencia.
-        for char in all_characters:
-            if char.id == exclude_character_id:
-                continue
-
-            settings = await get_or_create_settings(session, char)
-            if not await is_channel_active(settings, channel_key):
-                continue
-
-            # Validar permiso de audiencia si existe filtro.
-            if audience_filter:
-                from src.services import permission_service
-                can_receive, _ = await permission_service.can_execute(char, audience_filter)
-                if not can_receive:
-                    logging.debug(
-                        f"Saltando mensaje de canal '{channel_key}' a {char.name}: "
-                        "no cumple filtro de audiencia"
-                    )
-                    continue
+        # 4. Quedarse con los suscritos. Las configuraciones que falten se
+        #    crean todas juntas.
+        characters = [char for char in all_characters if char.id != exclude_character_id]
+        await ensure_settings_many(session, characters)
+        recipients = [char for char in characters if await is_channel_active(char.settings, channel_key)]
+
+        # 5. Validar el filtro de audiencia para todos los suscritos de una vez.
+        if audience_filter and recipients:
+            from src.services import permission_service
+            allowed = await permission_service.can_execute_many(recipients, audience_filter)
+            skipped = [char.name for char, can_receive in zip(recipients, allowed) if not can_receive]
+            if skipped:
+                logging.debug(
+                    f"Saltando mensaje de canal '{channel_key}' a {len(skipped)} personajes: "
+                    "no cumplen filtro de audiencia"
+                )
+            recipients = [char for char, can_receive in zip(recipients, allowed) if can_receive]
 
+        for char in recipients:
             await broadcaster_service.send_message_to_character(char, formatted_message)
     except Exception:
         logging.exception(f"Error al transmitir al canal '{channel_key}'")
@@ -12,13 +12,29 @@ Responsabilidades Clave:
    de Telegram, proporcionando una experiencia de usuario (UX) reactiva.
 """
 
+import asyncio
+import hashlib
 import logging
+import time
+import redis.asyncio as redis
 from aiogram.types import BotCommand, BotCommandScopeChat
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.bot.bot import bot
+from src.config import settings
 from src.models import Character
 
+
+# --- Configuración del Servicio ---
+
+# Cliente de Redis dedicado para guardar la huella del menú de cada chat.
+redis_client = redis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    db=settings.redis_db,
+    decode_responses=True
+)
+
 def get_command_sets() -> dict:
     """
     Obtiene el diccionario `COMMAND_SETS` del dispatcher de forma segura para
@@ -27,14 +43,83 @@ def get_command_sets() -> dict:
     from src.handlers.player.dispatcher import COMMAND_SETS
     return COMMAND_SETS
 
+# Sets que se otorgan automáticamente a las cuentas con rol ADMIN o superior.
+ADMIN_COMMAND_SETS = ["spawning", "admin_movement", "admin_info", "diagnostics", "management", "search", "ban_management"]
+
+# --- Caché de CommandSets Activos ---
+# Calcular los sets activos implica recorrer todo el inventario del personaje y
+# consultar los prototipos de cada objeto. Como el resultado solo cambia cuando
+# cambia el contexto (sets base, objetos que otorgan sets, sala o rol), se
+# memoriza por personaje junto a la "huella" (fingerprint) de ese contexto.
+# Los objetos no forman parte de la huella: los movimientos de objetos
+# invalidan la entrada explícitamente (ver item_service), pero solo en el
+# proceso que los hace. Con varios procesos del bot, las entradas de los demás
+# se corrigen al caducar (`[command_sets] cache_ttl_seconds`).
+#
+# Formato: character_id -> (fingerprint, sets_activos, caduca_en)
+# donde fingerprint = (sets_base, room_id, rol) y caduca_en es time.monotonic()
+_active_sets_cache: dict[int, tuple[tuple, tuple[str, ...], float]] = {}
+
+
+def _cheap_fingerprint(character: Character) -> tuple:
+    """
+    Devuelve la parte de la huella de contexto que se puede calcular en O(1)
+    (sin recorrer el inventario): sets base, sala actual y rol de la cuenta.
+    """
+    role = character.account.role if character.account else None
+    return (tuple(character.command_sets or ()), character.room_id, role)
+
+
+# Relaciones del personaje que se leen al calcular los sets activos sin caché.
+ACTIVE_SETS_RELATIONS = {"inventory", "room"}
+
+
+def has_cached_active_command_sets(character: Character) -> bool:
+    """
+    Indica si los sets activos del personaje pueden servirse desde la caché,
+    es decir, sin necesidad de tener cargados su inventario ni su sala.
+    """
+    cached = _active_sets_cache.get(character.id)
+    if not cached:
+        return False
+    return cached[2] > time.monotonic() and cached[0] == _cheap_fingerprint(character)
+
+
+def invalidate_active_command_sets(character_id: int | None = None):
+    """
+    Invalida la caché de CommandSets activos.
+
+    Debe llamarse cuando cambia algo que la huella barata no detecta por sí
+    sola, principalmente los movimientos de objetos (el inventario no se
+    recorre en cada consulta).
+
+    Args:
+        character_id: Personaje cuya entrada se invalida. Si es None, se vacía
+                      la caché completa (ej: tras recargar prototipos).
+    """
+    if character_id is None:
+        _active_sets_cache.clear()
+    else:
+        _active_sets_cache.pop(character_id, None)
+
+
 async def get_active_command_sets_for_character(character: Character) -> list[str]:
     """
     Construye la lista de nombres de CommandSets activos para un personaje
     basándose en su contexto actual (base, equipo, sala, rol).
+
+    El resultado se memoriza por personaje durante
+    `[command_sets] cache_ttl_seconds`. Si los sets base, la sala y el rol no
+    han cambiado y ningún movimiento de objetos invalidó la entrada, se
+    devuelve la lista cacheada sin volver a recorrer el inventario.
     """
     if not character:
         return ["character_creation"]
 
+    if has_cached_active_command_sets(character):
+        # Devolvemos una copia: los llamadores pueden modificar la lista.
+        return list(_active_sets_cache[character.id][1])
+
     # 1. Empezamos con los sets base del personaje desde la BD.
     active_sets = set(character.command_sets)
 
@@ -53,9 +138,148 @@ async def get_active_command_sets_for_character(character: Character) -> list[st
 
     # 4. Añadimos sets de administrador si el rol de la cuenta es el adecuado.
     if character.account and character.account.role in ["ADMIN", "SUPERADMIN"]:
-        active_sets.update(["spawning", "admin_movement", "admin_info", "diagnostics", "management", "search", "ban_management"])
+        active_sets.update(ADMIN_COMMAND_SETS)
+
+    result = tuple(sorted(active_sets))
+    if settings.command_sets_cache_ttl_seconds > 0:
+        expires_at = time.monotonic() + settings.command_sets_cache_ttl_seconds
+        _active_sets_cache[character.id] = (_cheap_fingerprint(character), result, expires_at)
+
+    return list(result)
+
+
+# --- Sincronización del Menú de Telegram ---
+# `set_my_commands` es una llamada lenta a la API de Telegram y la mayoría de las
+# veces se envía exactamente la misma lista. Guardamos en Redis un hash de la
+# última lista enviada a cada chat y solo llamamos a la API cuando cambia.
+# Además, los cambios se "agrupan" (debounce): si el jugador se mueve varias
+# veces seguidas, solo se envía el último menú calculado.
 
-    return sorted(list(active_sets))
+# Menús pendientes de enviar. Formato: telegram_id -> (comandos, huella, nombre_para_logs)
+_pending_menus: dict[int, tuple[list[BotCommand], str, str]] = {}
+
+# Tareas en segundo plano que vacían la cola de cada chat.
+_flush_tasks: dict[int, asyncio.Task] = {}
+
+
+def _get_menu_fingerprint_key(telegram_id: int) -> str:
+    """Genera la clave de Redis para la huella del menú de un chat."""
+    return f"telegram_menu:{telegram_id}"
+
+
+def _compute_menu_fingerprint(commands: list[BotCommand]) -> str:
+    """Calcula un hash estable de la lista de comandos (orden incluido)."""
+    payload = "\n".join(f"{cmd.command}:{cmd.description}" for cmd in commands)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+async def _build_telegram_commands(character: Character | None) -> list[BotCommand]:
+    """Construye la lista de objetos BotCommand que la API de Telegram espera."""
+    COMMAND_SETS = get_command_sets()
+
+    # Si hay personaje, obtener sus command sets activos
+    # Si no hay personaje, solo mostrar comando de creación
+    if character:
+        active_set_names = await get_active_command_sets_for_character(character)
+        # Si el personaje ya existe, eliminar el set de creación de personaje
+        if "character_creation" in active_set_names:
+            active_set_names.remove("character_creation")
+    else:
+        # Sin personaje, solo mostrar comandos de creación de personaje
+        active_set_names = ["character_creation"]
+
+    telegram_commands = []
+    seen_commands = set()
+
+    for set_name in active_set_names:
+        for command_instance in COMMAND_SETS.get(set_name, []):
+            main_name = command_instance.names[0]
+            if main_name not in seen_commands:
+                telegram_commands.append(
+                    BotCommand(command=main_name, description=command_instance.description)
+                )
+                seen_commands.add(main_name)
+
+    return telegram_commands
+
+
+async def _is_menu_unchanged(telegram_id: int, fingerprint: str) -> bool:
+    """
+    Comprueba si la huella guardada para el chat coincide con la nueva.
+    Si Redis falla, asume que ha cambiado (es más seguro reenviar el menú).
+    """
+    try:
+        stored = await redis_client.get(_get_menu_fingerprint_key(telegram_id))
+        return stored == fingerprint
+    except Exception as e:
+        logging.warning(f"No se pudo leer la huella del menú de {telegram_id}: {e}")
+        return False
+
+
+async def _send_menu(telegram_id: int, commands: list[BotCommand], fingerprint: str, log_name: str):
+    """Envía el menú a Telegram y guarda su huella en Redis."""
+    try:
+        # Usamos un `BotCommandScopeChat` para aplicar estos comandos únicamente
+        # al chat con este jugador específico.
+        scope = BotCommandScopeChat(chat_id=telegram_id)
+        await bot.set_my_commands(commands=commands, scope=scope)
+        logging.info(f"Actualizados {len(commands)} comandos de Telegram para {log_name}.")
+    except Exception as e:
+        # Los errores al actualizar comandos no son críticos y no deben detener el juego.
+        logging.warning(f"No se pudieron actualizar los comandos de Telegram para {log_name}: {e}")
+        return
+
+    try:
+        ttl_seconds = settings.telegram_menu_fingerprint_ttl_days * 86400
+        await redis_client.set(_get_menu_fingerprint_key(telegram_id), fingerprint, ex=ttl_seconds)
+    except Exception as e:
+        logging.warning(f"No se pudo guardar la huella del menú de {log_name}: {e}")
+
+
+async def _flush_pending_menu(telegram_id: int):
+    """
+    Tarea en segundo plano: espera el periodo de debounce y envía el último
+    menú pendiente del chat (si sigue siendo distinto al ya enviado).
+
+    Mientras se envía un menú puede encolarse otro (update_telegram_commands
+    no crea una tarea nueva porque esta sigue registrada), así que se repite
+    hasta que no quede ninguno pendiente.
+    """
+    try:
+        while True:
+            await asyncio.sleep(settings.telegram_menu_debounce_seconds)
+            pending = _pending_menus.pop(telegram_id, None)
+            if not pending:
+                return
+
+            commands, fingerprint, log_name = pending
+            # Volvemos a comprobar: el jugador pudo volver al contexto original
+            # durante la espera (ej: ir al norte y volver al sur).
+            if await _is_menu_unchanged(telegram_id, fingerprint):
+                continue
+
+            await _send_menu(telegram_id, commands, fingerprint, log_name)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logging.exception(f"Error al vaciar el menú pendiente del chat {telegram_id}")
+    finally:
+        _flush_tasks.pop(telegram_id, None)
+
+
+async def flush_pending_menu_updates():
+    """
+    Envía inmediatamente todos los menús pendientes y cancela las esperas.
+    Se llama durante el apagado del bot para no perder actualizaciones.
+    """
+    for task in list(_flush_tasks.values()):
+        task.cancel()
+    _flush_tasks.clear()
+
+    pending = list(_pending_menus.items())
+    _pending_menus.clear()
+    for telegram_id, (commands, fingerprint, log_name) in pending:
+        await _send_menu(telegram_id, commands, fingerprint, log_name)
 
 
 async def update_telegram_commands(character: Character = None, account = None):
@@ -63,6 +287,11 @@ async def update_telegram_commands(character: Character = None, account = None):
     Actualiza la lista de comandos visibles en el menú '/' del cliente de Telegram
     para un personaje específico.
 
+    La llamada a la API solo se realiza si la lista calculada difiere de la
+    última enviada a ese chat. Los cambios se encolan y se envían en segundo
+    plano tras `telegram_menu.debounce_seconds`, de modo que esta función
+    no bloquea el flujo del comando que la invoca.
+
     Args:
         character: Personaje para el cual actualizar comandos (opcional)
         account: Cuenta de usuario (requerida si character es None)
@@ -75,46 +304,28 @@ async def update_telegram_commands(character: Character = None, account = None):
     if character:
         telegram_id = character.account.telegram_id
         log_name = character.name
-        account_obj = character.account
     else:
         telegram_id = account.telegram_id
         log_name = f"cuenta {telegram_id}"
-        account_obj = account
 
     try:
-        COMMAND_SETS = get_command_sets()
-
-        # Si hay personaje, obtener sus command sets activos
-        # Si no hay personaje, solo mostrar comando de creación
-        if character:
-            active_set_names = await get_active_command_sets_for_character(character)
-            # Si el personaje ya existe, eliminar el set de creación de personaje
-            if "character_creation" in active_set_names:
-                active_set_names.remove("character_creation")
-        else:
-            # Sin personaje, solo mostrar comandos de creación de personaje
-            active_set_names = ["character_creation"]
-
-        telegram_commands = []
-        seen_commands = set()
-
-        # Construimos la lista de objetos BotCommand que la API de Telegram espera.
-        for set_name in active_set_names:
-            for command_instance in COMMAND_SETS.get(set_name, []):
-                main_name = command_instance.names[0]
-                if main_name not in seen_commands:
-                    telegram_commands.append(
-                        BotCommand(command=main_name, description=command_instance.description)
-                    )
-                    seen_commands.add(main_name)
+        telegram_commands = await _build_telegram_commands(character)
+        fingerprint = _compute_menu_fingerprint(telegram_commands)
 
-        # Usamos un `BotCommandScopeChat` para aplicar estos comandos únicamente
-        # al chat con este jugador específico.
-        scope = BotCommandScopeChat(chat_id=telegram_id)
-        await bot.set_my_commands(commands=telegram_commands, scope=scope)
+        # Si ya hay un menú pendiente para este chat, lo sustituimos sin
+        # consultar Redis: la tarea de vaciado hará la comprobación final.
+        if telegram_id not in _pending_menus:
+            if await _is_menu_unchanged(telegram_id, fingerprint):
+                return
+
+        if settings.telegram_menu_debounce_seconds <= 0:
+            await _send_menu(telegram_id, telegram_commands, fingerprint, log_name)
+            return
 
-        logging.info(f"Actualizados {len(telegram_commands)} comandos de Telegram para {log_name}.")
+        _pending_menus[telegram_id] = (telegram_commands, fingerprint, log_name)
+        if telegram_id not in _flush_tasks:
+            _flush_tasks[telegram_id] = asyncio.create_task(_flush_pending_menu(telegram_id))
 
     except Exception as e:
         # Los errores al actualizar comandos no son críticos y no deben detener el juego.
-        logging.warning(f"No se pudieron actualizar los comandos de Telegram para {log_name}: {e}")
\ No newline at end of file
+        logging.warning(f"No se pudieron actualizar los comandos de Telegram para {log_name}: {e}")
@@ -0,0 +1,325 @@
+# src/services/delay_queue_service.py
+"""
+Módulo de Servicio de Cola de Retardos.
+
+Permite ejecutar un script "dentro de N segundos" o en una fecha concreta sin
+un objeto que haga polling en cada tick: una trampilla que se cierra sola, una
+manzana que reaparece, un efecto que se desvanece. Un efecto programado no
+cuesta nada hasta que vence.
+
+Diseño:
+- Los trabajos viven en Redis, así que sobreviven a un reinicio del bot:
+  - `delay_queue:due`  (sorted set): job_id -> instante de vencimiento (epoch).
+  - `delay_queue:jobs` (hash):       job_id -> trabajo serializado (JSON).
+- Una única corrutina (`_dispatcher_loop`) reclama de forma atómica los
+  trabajos vencidos (script Lua) y los ejecuta uno a uno, cada uno con su
+  propia sesión de base de datos. Entre tanda y tanda duerme hasta el
+  siguiente vencimiento (como mucho `poll_interval_seconds`).
+- Las entidades del contexto se guardan como IDs ("item:42", "room:3",
+  "character:7") y se vuelven a cargar al ejecutar el trabajo. Si alguna ya
+  no existe, el trabajo se descarta.
+
+Un trabajo reclamado se ejecuta como mucho una vez: si el proceso muere a
+mitad de su ejecución, no se repite.
+
+Ejemplo (desde un script global):
+    await delay_queue_service.schedule_in(
+        30,
+        "global:spawn_item(item_key='manzana_roja')",
+        delay_queue_service.context_ids_for(room=room),
+    )
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+import redis.asyncio as redis
+
+from src.config import settings
+
+
+# --- Configuración del Servicio ---
+
+redis_client = redis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    db=settings.redis_db,
+    decode_responses=True
+)
+
+DUE_KEY = "delay_queue:due"
+JOBS_KEY = "delay_queue:jobs"
+
+# Entidades que un trabajo puede llevar en su contexto, y su tipo.
+CONTEXT_ENTITY_TYPES = {"target": ("item", "room", "character"), "room": ("room",), "character": ("character",)}
+
+# Encola un trabajo si no existe ya otro con el mismo ID.
+#
+# KEYS[1] = sorted set de vencimientos
+# KEYS[2] = hash de trabajos
+# ARGV[1] = job_id
+# ARGV[2] = instante de vencimiento (epoch)
+# ARGV[3] = trabajo serializado (JSON)
+# Devuelve 1 si se encoló, 0 si ya existía.
+SCHEDULE_SCRIPT = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+return 1
+"""
+
+# Reclama (y borra) los trabajos vencidos, para que ningún otro proceso los
+# ejecute también.
+#
+# KEYS[1] = sorted set de vencimientos
+# KEYS[2] = hash de trabajos
+# ARGV[1] = instante actual (epoch)
+# ARGV[2] = máximo de trabajos a reclamar
+# Devuelve [job_id, json, job_id, json, ...].
+CLAIM_DUE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #ids == 0 then
+    return {}
+end
+redis.call('ZREM', KEYS[1], unpack(ids))
+local payloads = redis.call('HMGET', KEYS[2], unpack(ids))
+redis.call('HDEL', KEYS[2], unpack(ids))
+local claimed = {}
+for i, id in ipairs(ids) do
+    if payloads[i] then
+        table.insert(claimed, id)
+        table.insert(claimed, payloads[i])
+    end
+end
+return claimed
+"""
+
+_schedule_job = redis_client.register_script(SCHEDULE_SCRIPT)
+_claim_due_jobs = redis_client.register_script(CLAIM_DUE_SCRIPT)
+
+# Corrutina del dispatcher y evento para despertarla al encolar un trabajo.
+_dispatcher_task: Optional[asyncio.Task] = None
+_wakeup = asyncio.Event()
+
+
+@dataclass(frozen=True)
+class DelayedJob:
+    """Trabajo de la cola: un script string y los IDs de su contexto."""
+    job_id: str
+    script: str
+    context_ids: dict[str, str]   # {"target": "item:42", "room": "room:3"}
+    due_at: float                 # Epoch de vencimiento
+
+    def to_json(self) -> str:
+        return json.dumps({"script": self.script, "context": self.context_ids, "due_at": self.due_at})
+
+    @classmethod
+    def from_json(cls, job_id: str, raw: str) -> "DelayedJob":
+        data = json.loads(raw)
+        return cls(job_id=job_id, script=data["script"], context_ids=data["context"], due_at=data["due_at"])
+
+
+# ==============================================================================
+# API PÚBLICA
+# ==============================================================================
+
+def context_ids_for(**entities: Any) -> dict[str, str]:
+    """
+    Convierte entidades ORM en los IDs que guarda un trabajo.
+
+    Ejemplo:
+        context_ids_for(target=item, room=room) -> {"target": "item:42", "room": "room:3"}
+    """
+    return {
+        name: f"{type(entity).__name__.lower()}:{entity.id}"
+        for name, entity in entities.items()
+        if entity is not None
+    }
+
+
+def _validate_context_ids(context_ids: dict[str, str]):
+    """Lanza ValueError si el contexto no tiene la forma {"target": "item:42", ...}."""
+    for name, entity_key in context_ids.items():
+        allowed = CONTEXT_ENTITY_TYPES.get(name)
+        if allowed is None:
+            raise ValueError(f"Contexto no soportado en la cola de retardos: '{name}'")
+        entity_type, _, entity_id = entity_key.partition(":")
+        if entity_type not in allowed or not entity_id.isdigit():
+            raise ValueError(f"'{name}' debe ser '<{'|'.join(allowed)}>:<id>', se recibió '{entity_key}'")
+
+
+async def schedule_at(
+    when: datetime,
+    script: str,
+    context_ids: Optional[dict[str, str]] = None,
+    job_id: Optional[str] = None
+) -> Optional[str]:
+    """
+    Programa un script para una fecha concreta (naive = UTC).
+
+    Con `job_id`, la llamada es idempotente: si ya hay un trabajo pendiente
+    con ese ID no se encola otro y devuelve None.
+
+    Returns:
+        El ID del trabajo, o None si ya existía.
+    """
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    context_ids = dict(context_ids or {})
+    _validate_context_ids(context_ids)
+
+    job = DelayedJob(job_id or uuid.uuid4().hex, script, context_ids, when.timestamp())
+    created = await _schedule_job(keys=[DUE_KEY, JOBS_KEY], args=[job.job_id, job.due_at, job.to_json()])
+    if not created:
+        return None
+
+    _wakeup.set()
+    logging.debug(f"Cola de retardos: '{script}' programado para {when.isoformat()} ({job.job_id})")
+    return job.job_id
+
+
+async def schedule_in(
+    seconds: float,
+    script: str,
+    context_ids: Optional[dict[str, str]] = None,
+    job_id: Optional[str] = None
+) -> Optional[str]:
+    """
+    Programa un script para dentro de `seconds` segundos.
+
+    Ejemplo:
+        await schedule_in(30, "cerrar_trampilla", context_ids_for(target=trampilla))
+    """
+    return await schedule_at(
+        datetime.fromtimestamp(time.time() + seconds, tz=timezone.utc), script, context_ids, job_id
+    )
+
+
+async def cancel(job_id: str) -> bool:
+    """Cancela un trabajo pendiente. Devuelve True si existía."""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zrem(DUE_KEY, job_id)
+        pipe.hdel(JOBS_KEY, job_id)
+        removed, _ = await pipe.execute()
+    return bool(removed)
+
+
+async def count_pending() -> int:
+    """Número de trabajos pendientes."""
+    return await redis_client.zcard(DUE_KEY)
+
+
+# ==============================================================================
+# DISPATCHER
+# ==============================================================================
+
+def start():
+    """Arranca el dispatcher. Los trabajos vencidos durante un reinicio se ejecutan ahora."""
+    global _dispatcher_task
+    if _dispatcher_task is not None and not _dispatcher_task.done():
+        return
+    _dispatcher_task = asyncio.create_task(_dispatcher_loop())
+    logging.info("✅ Cola de retardos iniciada.")
+
+
+async def shutdown():
+    """Detiene el dispatcher. Los trabajos pendientes siguen en Redis."""
+    global _dispatcher_task
+    if _dispatcher_task is None:
+        return
+    _dispatcher_task.cancel()
+    try:
+        await _dispatcher_task
+    except asyncio.CancelledError:
+        pass
+    _dispatcher_task = None
+
+
+async def claim_due_jobs(now: Optional[float] = None) -> list[DelayedJob]:
+    """Reclama hasta `batch_size` trabajos vencidos, borrándolos de la cola."""
+    claimed = await _claim_due_jobs(
+        keys=[DUE_KEY, JOBS_KEY],
+        args=[now if now is not None else time.time(), settings.delay_queue_batch_size]
+    )
+    return [DelayedJob.from_json(job_id, raw) for job_id, raw in zip(claimed[::2], claimed[1::2])]
+
+
+async def _seconds_until_next_job() -> float:
+    """Espera hasta el siguiente vencimiento, acotada por `poll_interval_seconds`."""
+    poll_interval = settings.delay_queue_poll_interval_seconds
+    next_jobs = await redis_client.zrange(DUE_KEY, 0, 0, withscores=True)
+    if not next_jobs:
+        return poll_interval
+    return min(max(next_jobs[0][1] - time.time(), 0.0), poll_interval)
+
+
+async def _dispatcher_loop():
+    """Reclama y ejecuta los trabajos vencidos mientras el bot esté en marcha."""
+    while True:
+        _wakeup.clear()
+        try:
+            jobs = await claim_due_jobs()
+            for job in jobs:
+                await run_job(job)
+            if len(jobs) >= settings.delay_queue_batch_size:
+                continue  # Puede haber más trabajos vencidos
+            delay = await _seconds_until_next_job()
+        except Exception:
+            # Redis caído o similar: reintentar en el siguiente intervalo.
+            logging.exception("Error en el dispatcher de la cola de retardos")
+            delay = settings.delay_queue_poll_interval_seconds
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _load_context(session, context_ids: dict[str, str]) -> Optional[dict[str, Any]]:
+    """Carga las entidades del trabajo. None si alguna ya no existe."""
+    from src.models import Character, Item, Room
+    from src.services import player_service
+
+    models = {"item": Item, "room": Room}
+    context = {}
+    for name, entity_key in context_ids.items():
+        entity_type, _, entity_id = entity_key.partition(":")
+        if entity_type == "character":
+            entity = await player_service.get_character_with_relations_by_id(session, int(entity_id))
+        else:
+            entity = await session.get(models[entity_type], int(entity_id))
+        if entity is None:
+            return None
+        context[name] = entity
+    return context
+
+
+async def run_job(job: DelayedJob):
+    """
+    Ejecuta un trabajo con una sesión nueva. Los errores quedan aislados: se
+    registran y no afectan al resto de la cola.
+    """
+    from src.db import async_session_factory
+    from src.services import script_service
+
+    lateness = time.time() - job.due_at
+    if lateness > 60:
+        logging.info(f"Cola de retardos: '{job.script}' se ejecuta con {lateness:.0f}s de retraso")
+
+    try:
+        async with async_session_factory() as session:
+            context = await _load_context(session, job.context_ids)
+            if context is None:
+                logging.info(f"Cola de retardos: se descarta '{job.script}', su contexto ya no existe ({job.context_ids})")
+                return
+            await script_service.execute_script(job.script, session, **context)
+            await session.commit()
+    except Exception:
+        logging.exception(f"Error ejecutando el trabajo diferido '{job.script}' ({job.job_id})")
@@ -10,14 +10,33 @@ Responsabilidades:
 2. Ejecutar scripts definidos en prototipos según eventos.
 3. Permitir cancelación de acciones mediante scripts BEFORE.
 4. Soportar hooks globales para sistemas del motor.
+
+Los scripts de cada prototipo se normalizan una sola vez en una tabla de
+despacho (`DispatchTable`): tuplas ya filtradas por fase y ordenadas por
+prioridad para cada evento, más una máscara de bits con los eventos que el
+prototipo atiende. Si ni los hooks globales ni el objetivo atienden un
+evento, `trigger_event` retorna sin hacer nada (el caso de casi todos los
+objetos).
+
+Los eventos AFTER no pueden cancelar nada, así que los comandos los entregan
+con `dispatch_after_event` a una cola acotada que los ejecuta en segundo
+plano, cada uno con su propia sesión de base de datos (sección [events] de
+gameconfig.toml). La respuesta al jugador no espera a los scripts lentos.
 """
 
-from typing import Dict, List, Callable, Any, Optional
+from typing import Dict, List, Callable, Any, Optional, Mapping
 from enum import Enum
 from dataclasses import dataclass, field
+from types import MappingProxyType
+from collections import deque, defaultdict
+import asyncio
 import logging
+import time
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config import settings
+
 
 # Definición de eventos soportados
 class EventType(Enum):
@@ -81,6 +100,89 @@ class EventResult:
     data: Dict[str, Any] = field(default_factory=dict)  # Datos adicionales
 
 
+# Un bit por cada combinación fase + evento ("before_on_get", "after_on_look"...).
+EVENT_BITS: Dict[str, int] = {
+    f"{phase.value}_{event_type.value}": 1 << index
+    for index, (phase, event_type) in enumerate(
+        (phase, event_type) for phase in EventPhase for event_type in EventType
+    )
+}
+
+
+@dataclass(frozen=True)
+class ScriptEntry:
+    """Un script de evento ya normalizado."""
+    script: str
+    priority: int = 0
+    cancel_message: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class DispatchTable:
+    """
+    Scripts de un prototipo listos para despachar.
+
+    `handlers` asocia cada nombre de evento con fase ("before_on_get") a sus
+    scripts en orden de ejecución; `mask` tiene activos los bits
+    (`EVENT_BITS`) de los eventos con algún script.
+    """
+    handlers: Mapping[str, tuple[ScriptEntry, ...]]
+    mask: int = 0
+
+    def handles(self, event_name: str) -> bool:
+        return bool(self.mask & EVENT_BITS.get(event_name, 0))
+
+
+EMPTY_DISPATCH_TABLE = DispatchTable(handlers=MappingProxyType({}))
+
+
+@dataclass
+class AfterEventMetrics:
+    """Contadores de un evento AFTER (ver `get_after_event_metrics`)."""
+    deferred: int = 0        # Encolados para segundo plano
+    inline: int = 0          # Ejecutados en línea (opción desactivada u opt-out del prototipo)
+    overflow: int = 0        # Ejecutados en línea porque la cola estaba llena
+    completed: int = 0       # Terminados en segundo plano
+    failed: int = 0          # Con error en segundo plano
+    total_seconds: float = 0.0  # Tiempo acumulado en segundo plano
+
+    @property
+    def average_seconds(self) -> float:
+        finished = self.completed + self.failed
+        return self.total_seconds / finished if finished else 0.0
+
+
+@dataclass(frozen=True)
+class EntityRef:
+    """Referencia (clase, id) a una entidad ORM, para recargarla en otra sesión."""
+    cls: type
+    id: Any
+
+
+@dataclass(frozen=True)
+class DeferredAfterEvent:
+    """
+    Evento AFTER encolado. Las entidades se guardan como `EntityRef`: la
+    sesión del comando puede cerrarse antes de que se ejecute, así que el
+    worker las vuelve a cargar con su propia sesión.
+    """
+    event_type: EventType
+    character_id: Optional[int]
+    target: Optional[EntityRef]
+    room: Optional[EntityRef]
+    extra: Dict[str, Any]
+
+
+def _entity_ref(entity: Any) -> Optional[EntityRef]:
+    """Referencia a una entidad ORM persistida, o None si no lo es."""
+    if entity is None:
+        return None
+    state = sa_inspect(entity, raiseerr=False)
+    if state is None or not state.identity:
+        return None
+    return EntityRef(type(entity), state.identity[0])
+
+
 class EventHub:
     """
     Hub centralizado para manejo de eventos.
@@ -110,6 +212,13 @@ class EventHub:
     def __init__(self):
         # Hooks globales: funciones que escuchan TODOS los eventos de un tipo
         self._global_hooks: Dict[EventType, List[Callable]] = {}
+        # Tablas de despacho por prototipo: (tipo de entidad, key) -> tabla.
+        self._dispatch_tables: Dict[tuple[str, Any], DispatchTable] = {}
+        # Cola acotada de eventos AFTER diferidos y sus workers. Los workers
+        # solo viven mientras haya eventos pendientes.
+        self._after_queue: deque[DeferredAfterEvent] = deque()
+        self._after_workers: set[asyncio.Task] = set()
+        self._after_metrics: Dict[str, AfterEventMetrics] = defaultdict(AfterEventMetrics)
 
     async def trigger_event(
         self,
@@ -130,14 +239,21 @@ class EventHub:
         """
         # Construir nombre del evento con fase
         event_name = f"{phase.value}_{event_type.value}"
+        hooks = self._global_hooks.get(event_type)
+        table = self.get_dispatch_table(context.target) if context.target else EMPTY_DISPATCH_TABLE
+
+        # Nadie escucha este evento: no hay nada que hacer.
+        if not hooks and not table.handles(event_name):
+            return EventResult(success=True)
 
         # 1. Ejecutar hooks globales (si existen)
-        await self._execute_global_hooks(event_type, phase, context)
+        if hooks:
+            await self._execute_global_hooks(event_type, phase, context)
 
         # 2. Ejecutar scripts de la entidad objetivo
-        if context.target:
+        if table.handles(event_name):
             result = await self._execute_entity_scripts(
-                entity=context.target,
+                entries=table.handlers[event_name],
                 event_name=event_name,
                 context=context,
                 phase=phase
@@ -148,46 +264,184 @@ class EventHub:
 
         return EventResult(success=True)
 
-    async def _execute_entity_scripts(
+    async def dispatch_after_event(
         self,
-        entity: Any,
-        event_name: str,
-        context: EventContext,
-        phase: EventPhase
+        event_type: EventType,
+        context: EventContext
     ) -> EventResult:
         """
-        Ejecuta los scripts definidos en el prototipo de una entidad.
+        Dispara la fase AFTER de un evento sin bloquear al llamador.
 
-        Soporta tanto formato simple (string) como avanzado (lista con prioridades).
-        """
-        from src.services import script_service
+        Si alguien escucha el evento, se encola para ejecutarse en segundo
+        plano con su propia sesión. Se ejecuta en línea (como `trigger_event`)
+        si la opción está desactivada, si el prototipo del objetivo lo pide
+        con `"sync_after_events": True` o si la cola está llena.
 
-        # Obtener prototipo
-        if not hasattr(entity, 'prototype'):
+        El resultado de un evento diferido no está disponible: los llamadores
+        que necesiten `result.message` deben usar `trigger_event`.
+        """
+        event_name = f"{EventPhase.AFTER.value}_{event_type.value}"
+        table = self.get_dispatch_table(context.target) if context.target else EMPTY_DISPATCH_TABLE
+        if not self._global_hooks.get(event_type) and not table.handles(event_name):
             return EventResult(success=True)
 
-        prototype = entity.prototype
-        scripts = prototype.get("scripts", {})
+        metrics = self._after_metrics[event_name]
+        prototype = getattr(context.target, 'prototype', None) or {}
+        if not settings.events_defer_after_events or prototype.get("sync_after_events"):
+            metrics.inline += 1
+            return await self.trigger_event(event_type, EventPhase.AFTER, context)
+
+        if len(self._after_queue) >= settings.events_after_queue_size:
+            metrics.overflow += 1
+            logging.warning(f"Cola de eventos AFTER llena: '{event_name}' se ejecuta en línea.")
+            return await self.trigger_event(event_type, EventPhase.AFTER, context)
+
+        self._after_queue.append(DeferredAfterEvent(
+            event_type=event_type,
+            character_id=getattr(context.character, 'id', None),
+            target=_entity_ref(context.target),
+            room=_entity_ref(context.room),
+            extra={key: _entity_ref(value) or value for key, value in context.extra.items()},
+        ))
+        metrics.deferred += 1
+
+        if len(self._after_workers) < settings.events_after_workers:
+            from src.services.state_service import state_service
+
+            # El worker atiende eventos de otros comandos: sin la caché de este.
+            with state_service.detached():
+                task = asyncio.create_task(self._drain_after_queue())
+            self._after_workers.add(task)
+            task.add_done_callback(self._after_workers.discard)
 
-        # Obtener scripts para este evento
-        event_scripts = scripts.get(event_name)
+        return EventResult(success=True)
 
-        if not event_scripts:
-            return EventResult(success=True)
+    async def _drain_after_queue(self):
+        """Ejecuta eventos AFTER diferidos mientras queden en la cola."""
+        while self._after_queue:
+            await self._run_deferred_after_event(self._after_queue.popleft())
 
-        # Normalizar a lista de scripts
-        script_list = self._normalize_scripts(event_scripts, phase)
+    async def _run_deferred_after_event(self, job: DeferredAfterEvent):
+        """
+        Ejecuta un evento AFTER diferido con una sesión nueva. Los errores
+        quedan aislados: se registran y no afectan al resto de la cola.
+        """
+        from src.db import async_session_factory
+        from src.services import player_service
+
+        event_name = f"{EventPhase.AFTER.value}_{job.event_type.value}"
+        metrics = self._after_metrics[event_name]
+        started = time.perf_counter()
+
+        async def load(value):
+            return await session.get(value.cls, value.id) if isinstance(value, EntityRef) else value
+
+        try:
+            async with async_session_factory() as session:
+                character = None
+                if job.character_id is not None:
+                    character = await player_service.get_character_with_relations_by_id(session, job.character_id)
+
+                context = EventContext(
+                    session=session,
+                    character=character,
+                    target=await load(job.target),
+                    room=await load(job.room),
+                    extra={key: await load(value) for key, value in job.extra.items()},
+                )
+                await self.trigger_event(job.event_type, EventPhase.AFTER, context)
+                await session.commit()
+            metrics.completed += 1
+        except Exception:
+            metrics.failed += 1
+            logging.exception(f"Error ejecutando el evento diferido '{event_name}'")
+        finally:
+            metrics.total_seconds += time.perf_counter() - started
+
+    def get_after_event_metrics(self) -> Dict[str, AfterEventMetrics]:
+        """Copia de las métricas de eventos AFTER, por nombre de evento ("after_on_get")."""
+        return {name: AfterEventMetrics(**vars(metrics)) for name, metrics in self._after_metrics.items()}
+
+    def pending_after_events(self) -> int:
+        """Eventos AFTER encolados que aún no han empezado."""
+        return len(self._after_queue)
+
+    async def wait_for_after_events(self, timeout: float = 10.0):
+        """Espera (hasta `timeout` segundos) a los eventos AFTER pendientes. Se usa al apagar."""
+        if not self._after_workers:
+            return
+        done, pending = await asyncio.wait(set(self._after_workers), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending or self._after_queue:
+            logging.warning(f"Se descartaron {len(self._after_queue)} eventos AFTER pendientes al apagar el bot.")
+            self._after_queue.clear()
+
+    def get_dispatch_table(self, entity: Any) -> DispatchTable:
+        """
+        Devuelve la tabla de despacho del prototipo de una entidad,
+        construyéndola la primera vez que se pide para ese prototipo.
+        """
+        if not hasattr(entity, 'prototype'):
+            return EMPTY_DISPATCH_TABLE
 
-        # Ejecutar en orden de prioridad
-        for script_def in script_list:
-            script_string = script_def.get("script")
+        cache_key = (type(entity).__name__, getattr(entity, 'key', None))
+        table = self._dispatch_tables.get(cache_key)
+        if table is None:
+            table = self.build_dispatch_table(entity.prototype)
+            self._dispatch_tables[cache_key] = table
+        return table
 
-            if not script_string:
+    def build_dispatch_table(self, prototype: dict) -> DispatchTable:
+        """Normaliza los scripts de un prototipo (ver `_normalize_scripts`)."""
+        scripts = prototype.get("scripts", {})
+        if not scripts:
+            return EMPTY_DISPATCH_TABLE
+
+        handlers = {}
+        mask = 0
+        for event_name, event_scripts in scripts.items():
+            bit = EVENT_BITS.get(event_name)
+            if bit is None:
+                # Solo se disparan eventos con fase ("before_on_get").
                 continue
+            phase = EventPhase.BEFORE if event_name.startswith("before_") else EventPhase.AFTER
+            entries = tuple(
+                ScriptEntry(
+                    script=script_def["script"],
+                    priority=script_def.get("priority", 0),
+                    cancel_message=script_def.get("cancel_message"),
+                )
+                for script_def in self._normalize_scripts(event_scripts, phase)
+                if script_def.get("script")
+            )
+            if entries:
+                handlers[event_name] = entries
+                mask |= bit
+
+        return DispatchTable(handlers=MappingProxyType(handlers), mask=mask)
+
+    def clear_dispatch_tables(self):
+        """Descarta las tablas de despacho (tras cambiar los prototipos)."""
+        self._dispatch_tables.clear()
+
+    async def _execute_entity_scripts(
+        self,
+        entries: tuple[ScriptEntry, ...],
+        event_name: str,
+        context: EventContext,
+        phase: EventPhase
+    ) -> EventResult:
+        """
+        Ejecuta en orden de prioridad los scripts del prototipo de una entidad
+        para un evento (ya normalizados en su tabla de despacho).
+        """
+        from src.services import script_service
 
+        for entry in entries:
             try:
                 result = await script_service.execute_script(
-                    script_string=script_string,
+                    script_string=entry.script,
                     session=context.session,
                     character=context.character,
                     target=context.target,
@@ -200,7 +454,7 @@ class EventHub:
                     return EventResult(
                         success=True,
                         cancel_action=True,
-                        message=script_def.get("cancel_message", "La acción fue cancelada.")
+                        message=entry.cancel_message or "La acción fue cancelada."
                     )
 
             except Exception:
@@ -16,9 +16,36 @@ from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.item import Item
+from src.services import command_service
 from game_data.item_prototypes import ITEM_PROTOTYPES
 
 
+async def _affected_holders(session: AsyncSession, item_id: int, new_character_id: int | None = None) -> set[int]:
+    """
+    Personajes cuyos CommandSets activos cambian al mover el objeto: su
+    portador actual y, si se indica, el nuevo. Debe llamarse ANTES de mover
+    el objeto, ya que consulta quién lo lleva ahora mismo.
+    """
+    result = await session.execute(select(Item.character_id).where(Item.id == item_id))
+    return {
+        character_id
+        for character_id in (result.scalar_one_or_none(), new_character_id)
+        if character_id is not None
+    }
+
+
+def _invalidate_command_sets(character_ids: set[int]):
+    """
+    Invalida la caché de CommandSets activos de los personajes indicados.
+
+    Se llama antes y después del commit: un recálculo concurrente entre la
+    primera invalidación y el commit lee el portador anterior y volvería a
+    cachear sets obsoletos.
+    """
+    for character_id in character_ids:
+        command_service.invalidate_active_command_sets(character_id)
+
+
 async def spawn_item_in_room(session: AsyncSession, room_id: int, item_key: str) -> Item:
     """
     Crea una instancia de un prototipo de objeto y la coloca en una sala.
@@ -44,6 +71,8 @@ async def move_item_to_character(session: AsyncSession, item_id: int, character_
     Mueve un objeto al inventario de un personaje, quitándolo de cualquier
     otra ubicación (sala o contenedor).
     """
+    holders = await _affected_holders(session, item_id, new_character_id=character_id)
+    _invalidate_command_sets(holders)
     query = (
         update(Item)
         .where(Item.id == item_id)
@@ -51,6 +80,7 @@ async def move_item_to_character(session: AsyncSession, item_id: int, character_
     )
     await session.execute(query)
     await session.commit()
+    _invalidate_command_sets(holders)
 
 
 async def move_item_to_room(session: AsyncSession, item_id: int, room_id: int):
@@ -58,6 +88,8 @@ async def move_item_to_room(session: AsyncSession, item_id: int, room_id: int):
     Mueve un objeto al suelo de una sala, quitándolo de cualquier
     otra ubicación (inventario o contenedor).
     """
+    holders = await _affected_holders(session, item_id)
+    _invalidate_command_sets(holders)
     query = (
         update(Item)
         .where(Item.id == item_id)
@@ -65,6 +97,7 @@ async def move_item_to_room(session: AsyncSession, item_id: int, room_id: int):
     )
     await session.execute(query)
     await session.commit()
+    _invalidate_command_sets(holders)
 
 
 async def move_item_to_container(session: AsyncSession, item_id: int, container_id: int):
@@ -72,6 +105,8 @@ async def move_item_to_container(session: AsyncSession, item_id: int, container_
     Mueve un objeto al interior de otro objeto (contenedor), quitándolo de
     cualquier otra ubicación (sala o inventario).
     """
+    holders = await _affected_holders(session, item_id)
+    _invalidate_command_sets(holders)
     query = (
         update(Item)
         .where(Item.id == item_id)
@@ -79,6 +114,7 @@ async def move_item_to_container(session: AsyncSession, item_id: int, container_
     )
     await session.execute(query)
     await session.commit()
+    _invalidate_command_sets(holders)
 
 
 async def delete_item(session: AsyncSession, item_id: int) -> Item:
@@ -106,6 +142,9 @@ async def delete_item(session: AsyncSession, item_id: int) -> Item:
     if not item:
         raise ValueError(f"No existe un objeto con el ID '{item_id}'")
 
+    holders = {item.character_id} if item.character_id is not None else set()
+    _invalidate_command_sets(holders)
+
     try:
         # Si es un contenedor, eliminar referencia de los items contenidos
         # (opcional: podrías querer moverlos al suelo o inventario)
@@ -120,6 +159,7 @@ async def delete_item(session: AsyncSession, item_id: int) -> Item:
         # Eliminar el objeto
         await session.delete(item)
         await session.commit()
+        _invalidate_command_sets(holders)
 
         logging.info(f"Objeto eliminado: {item.get_name()} (ID: {item_id})")
         return item
@@ -0,0 +1,477 @@
+# src/services/movement_service.py
+"""
+Módulo de Servicio de Movimiento.
+
+Centraliza el desplazamiento de un personaje por una salida. Lo usan tanto
+los comandos de dirección (`/norte`, `/sur`...) como los botones de navegación.
+
+El movimiento se divide en dos partes para reducir la latencia percibida:
+
+1.  **Camino crítico (`move_character`):** Busca la salida en el grafo del
+    mundo, evalúa su lock, ejecuta los eventos BEFORE (`on_leave` y
+    `on_enter`) y, si nadie cancela, cambia `room_id` con un único UPDATE en
+    una sola transacción. Después, el llamador muestra la nueva sala.
+2.  **Efectos secundarios (`dispatch_side_effects`):** Los avisos de salida y
+    llegada a las salas, los eventos AFTER y la sincronización del menú de
+    comandos se ejecutan en segundo plano y en paralelo, cada uno con su
+    propia sesión de base de datos.
+
+Los eventos BEFORE se evalúan antes de cambiar de sala: si un script cancela
+la entrada, el personaje se queda donde estaba en lugar de quedar a medias.
+
+Recorridos (`walk_path`):
+`/ir 3n2e` encadena varios pasos en un solo comando. Cada paso se evalúa en
+orden (lock, BEFORE on_leave, BEFORE on_enter) y el recorrido se detiene en el
+primer bloqueo. Solo se escribe la sala final, el jugador recibe una única
+vista de sala y cada sala del camino recibe un solo aviso.
+"""
+
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.config import settings
+from src.db import async_session_factory
+from src.models import Character, Item, Room
+from src.services import broadcaster_service, command_service, permission_service, player_service, world_graph_service
+from src.services.event_service import event_service, EventType, EventPhase, EventContext
+from src.services.state_service import state_service
+from src.services.world_graph_service import GraphExit
+
+# Mapeo de direcciones opuestas para los mensajes de llegada
+OPPOSITE_DIRECTIONS = {
+    "norte": "sur",
+    "sur": "norte",
+    "este": "oeste",
+    "oeste": "este",
+    "arriba": "abajo",
+    "abajo": "arriba",
+    "dentro": "fuera",
+    "fuera": "dentro",
+    "noreste": "suroeste",
+    "suroeste": "noreste",
+    "noroeste": "sureste",
+    "sureste": "noroeste",
+}
+
+# Direcciones que se nombran con artículo en los avisos ("hacia el norte").
+COMPASS_DIRECTIONS = frozenset({
+    "norte", "sur", "este", "oeste", "noreste", "noroeste", "sureste", "suroeste",
+})
+
+# Abreviaturas de dirección aceptadas por `/ir` (las mismas que los comandos de movimiento).
+DIRECTION_ALIASES = {
+    "n": "norte",
+    "s": "sur",
+    "e": "este",
+    "o": "oeste",
+    "ar": "arriba",
+    "ab": "abajo",
+    "ne": "noreste",
+    "no": "noroeste",
+    "se": "sureste",
+    "so": "suroeste",
+}
+
+# Un tramo compacto de recorrido: repeticiones opcionales + dirección (ej: "3n", "2este").
+# Las alternativas más largas van primero para que "no" sea noroeste y no norte + oeste.
+_PATH_SEGMENT_PATTERN = "|".join(
+    sorted(set(DIRECTION_ALIASES) | set(OPPOSITE_DIRECTIONS), key=len, reverse=True)
+)
+_PATH_SEGMENT_RE = re.compile(rf"(\d*)({_PATH_SEGMENT_PATTERN})")
+_COMPACT_PATH_RE = re.compile(rf"(?:\d*(?:{_PATH_SEGMENT_PATTERN}))+")
+
+# Tareas de efectos secundarios en curso (para poder esperarlas al apagar).
+_side_effect_tasks: set[asyncio.Task] = set()
+
+
+@dataclass
+class MoveResult:
+    """Resultado del camino crítico de un movimiento."""
+    success: bool
+    message: str | None = None
+    exit: GraphExit | None = None
+    origin_room_id: int | None = None
+    destination_room_id: int | None = None
+    destination_room: Room | None = None
+    # Salidas recorridas en orden (una sola en un movimiento simple).
+    path: tuple[GraphExit, ...] = ()
+
+
+# ==============================================================================
+# CAMINO CRÍTICO
+# ==============================================================================
+
+def parse_path(args: list[str]) -> list[str]:
+    """
+    Convierte los argumentos de `/ir` en una lista de direcciones.
+
+    Acepta direcciones separadas por espacios (`norte norte este`), abreviaturas
+    (`n n e`) y tramos compactos con repeticiones (`3n2e`). Una palabra que no
+    es una dirección conocida se conserva tal cual, por si la sala tiene una
+    salida con ese nombre.
+
+    Raises:
+        ValueError: Si el recorrido está vacío o supera `movement_speedwalk_max_steps`.
+    """
+    max_steps = settings.movement_speedwalk_max_steps
+    directions = []
+
+    for arg in args:
+        token = arg.lower()
+        if token in OPPOSITE_DIRECTIONS or not _COMPACT_PATH_RE.fullmatch(token):
+            segments = [("", token)]
+        else:
+            segments = _PATH_SEGMENT_RE.findall(token)
+
+        for count, direction in segments:
+            repetitions = int(count) if count else 1
+            if len(directions) + repetitions > max_steps:
+                raise ValueError(f"El recorrido es demasiado largo (máximo {max_steps} pasos).")
+            directions.extend([DIRECTION_ALIASES.get(direction, direction)] * repetitions)
+
+    if not directions:
+        raise ValueError("Indica al menos una dirección. Ej: /ir 3n2e")
+    return directions
+
+
+def build_walk_command(path: tuple[GraphExit, ...]) -> str:
+    """
+    Construye el comando `/ir` que recorre un camino, agrupando las
+    repeticiones (ej: norte, norte, este -> "/ir 2n e").
+    """
+    short_names = {direction: alias for alias, direction in DIRECTION_ALIASES.items()}
+    segments = []
+    for step in path:
+        name = short_names.get(step.name, step.name)
+        if segments and segments[-1][1] == name:
+            segments[-1][0] += 1
+        else:
+            segments.append([1, name])
+    return "/ir " + " ".join(f"{count}{name}" if count > 1 else name for count, name in segments)
+
+
+async def load_rooms_for_view(session: AsyncSession, room_ids: set[int]) -> dict[int, Room]:
+    """
+    Carga, en una sola consulta, varias salas con lo que necesita
+    `format_room`: objetos (con su contenido) y personajes (con su cuenta).
+    Las salidas vienen del grafo.
+    """
+    result = await session.execute(
+        select(Room)
+        .where(Room.id.in_(room_ids))
+        .options(
+            selectinload(Room.items).selectinload(Item.contained_items),
+            selectinload(Room.characters).selectinload(Character.account),
+        )
+    )
+    return {room.id: room for room in result.scalars().all()}
+
+
+async def _check_exit_lock(character: Character, target_exit: GraphExit) -> str | None:
+    """Evalúa el lock de una salida con access type "traverse". Devuelve el motivo del bloqueo o None."""
+    can_pass, error_message = await permission_service.can_execute(
+        character,
+        target_exit.locks,
+        access_type="traverse"
+    )
+    if not can_pass:
+        return error_message or "Esa salida está bloqueada."
+    return None
+
+
+async def _check_step(
+    session: AsyncSession,
+    character: Character,
+    target_exit: GraphExit,
+    origin_room: Room | None,
+    destination_room: Room | None,
+    check_lock: bool = True
+) -> str | None:
+    """
+    Evalúa un paso del recorrido: lock de la salida, BEFORE on_leave y
+    BEFORE on_enter. Devuelve el motivo del bloqueo, o None si se puede pasar.
+    """
+    if check_lock:
+        blocker = await _check_exit_lock(character, target_exit)
+        if blocker:
+            return blocker
+
+    if not destination_room:
+        return "No puedes ir en esa dirección."
+
+    # EVENTO BEFORE ON_LEAVE - Puede cancelar el movimiento.
+    leave_result = await event_service.trigger_event(
+        event_type=EventType.ON_LEAVE,
+        phase=EventPhase.BEFORE,
+        context=EventContext(
+            session=session,
+            character=character,
+            target=None,
+            room=origin_room,
+            extra={"destination_room_id": destination_room.id, "direction": target_exit.name}
+        )
+    )
+    if leave_result.cancel_action:
+        return leave_result.message or "No puedes salir de aquí ahora."
+
+    # EVENTO BEFORE ON_ENTER - Se evalúa antes del cambio de sala para que
+    # una cancelación deje al personaje donde estaba.
+    enter_result = await event_service.trigger_event(
+        event_type=EventType.ON_ENTER,
+        phase=EventPhase.BEFORE,
+        context=EventContext(
+            session=session,
+            character=character,
+            target=None,
+            room=destination_room,
+            extra={"origin_room_id": target_exit.from_room_id, "direction": target_exit.name}
+        )
+    )
+    if enter_result.cancel_action:
+        return enter_result.message or "No puedes entrar ahí."
+
+    return None
+
+
+async def walk_path(session: AsyncSession, character: Character, directions: list[str]) -> MoveResult:
+    """
+    Recorre varias salidas seguidas, deteniéndose en el primer bloqueo.
+
+    Al terminar con al menos un paso, `character.room_id` y `character.room`
+    apuntan a la última sala alcanzada (cargada para `format_room`) y solo
+    esa sala se escribe en la base de datos.
+
+    Args:
+        session: Sesión de base de datos activa.
+        character: Personaje con su sala de origen cargada.
+        directions: Nombres de las salidas, en orden (ej: ["norte", "este"]).
+
+    Returns:
+        MoveResult: `success=False` si no se pudo dar ningún paso. Si el
+                    recorrido se detuvo a medias, `success=True` y `message`
+                    contiene el motivo.
+    """
+    graph = world_graph_service.get_world_graph()
+    origin_room_id = character.room_id
+
+    # 1. Resolver el camino en el grafo del mundo (sin consultas).
+    planned: list[GraphExit] = []
+    blocked_message = None
+    room_id = origin_room_id
+    for direction in directions:
+        target_exit = graph.get_exit(room_id, direction)
+        if not target_exit:
+            blocked_message = "No puedes ir en esa dirección."
+            if planned:
+                blocked_message = f"No hay salida hacia {direction.lower()} desde {planned[-1].to_room_name}."
+            break
+        planned.append(target_exit)
+        room_id = target_exit.to_room_id
+
+    if not planned:
+        return MoveResult(success=False, message=blocked_message)
+
+    # 2. El lock del primer paso se evalúa antes de cargar nada: un movimiento
+    #    bloqueado en la sala de origen no consulta la base de datos.
+    first_blocker = await _check_exit_lock(character, planned[0])
+    if first_blocker:
+        return MoveResult(success=False, message=first_blocker)
+
+    # 3. Cargar todas las salas del camino en una sola consulta.
+    rooms = await load_rooms_for_view(session, {e.to_room_id for e in planned})
+
+    # 4. Evaluar cada paso en orden. El personaje avanza en memoria para que
+    #    los locks y scripts del siguiente paso vean la sala correcta.
+    crossed: list[GraphExit] = []
+    current_room = character.room
+    for index, target_exit in enumerate(planned):
+        destination_room = rooms.get(target_exit.to_room_id)
+        blocker = await _check_step(
+            session, character, target_exit, current_room, destination_room, check_lock=index > 0
+        )
+        if blocker:
+            blocked_message = blocker
+            break
+        crossed.append(target_exit)
+        current_room = destination_room
+        set_committed_value(character, "room_id", current_room.id)
+        set_committed_value(character, "room", current_room)
+
+    if not crossed:
+        return MoveResult(success=False, message=blocked_message)
+
+    # 5. Cambio de estado: un único UPDATE con la sala final.
+    await session.execute(
+        update(Character).where(Character.id == character.id).values(room_id=current_room.id)
+    )
+    await session.commit()
+    command_service.invalidate_active_command_sets(character.id)
+
+    return MoveResult(
+        success=True,
+        message=blocked_message,
+        exit=crossed[-1],
+        origin_room_id=origin_room_id,
+        destination_room_id=current_room.id,
+        destination_room=current_room,
+        path=tuple(crossed),
+    )
+
+
+async def move_character(session: AsyncSession, character: Character, direction: str) -> MoveResult:
+    """
+    Mueve un personaje por la salida indicada si nada lo impide.
+
+    Es un recorrido de un solo paso (ver `walk_path`).
+
+    Returns:
+        MoveResult: `success=False` y `message` con el motivo si se bloqueó.
+    """
+    return await walk_path(session, character, [direction])
+
+
+# ==============================================================================
+# EFECTOS SECUNDARIOS (EN SEGUNDO PLANO)
+# ==============================================================================
+
+async def _broadcast_to_room(room_id: int, message_text: str, exclude_character_id: int):
+    """Envía un aviso a una sala con su propia sesión."""
+    async with async_session_factory() as session:
+        await broadcaster_service.send_message_to_room(
+            session=session,
+            room_id=room_id,
+            message_text=message_text,
+            exclude_character_id=exclude_character_id
+        )
+
+
+async def _run_after_events(character_id: int, path: tuple[GraphExit, ...]):
+    """
+    Ejecuta los eventos AFTER de cada paso del movimiento, en orden, con una
+    sesión y un personaje recién cargados.
+    """
+    async with async_session_factory() as session:
+        character = await player_service.get_character_with_relations_by_id(session, character_id)
+        if not character:
+            return
+
+        for step in path:
+            origin_room = await session.get(Room, step.from_room_id)
+            destination_room = await session.get(Room, step.to_room_id)
+
+            await event_service.trigger_event(
+                event_type=EventType.ON_LEAVE,
+                phase=EventPhase.AFTER,
+                context=EventContext(
+                    session=session,
+                    character=character,
+                    target=None,
+                    room=origin_room,
+                    extra={"destination_room_id": step.to_room_id, "direction": step.name}
+                )
+            )
+            await event_service.trigger_event(
+                event_type=EventType.ON_ENTER,
+                phase=EventPhase.AFTER,
+                context=EventContext(
+                    session=session,
+                    character=character,
+                    target=None,
+                    room=destination_room,
+                    extra={"origin_room_id": step.from_room_id, "direction": step.name}
+                )
+            )
+
+
+async def _sync_command_menu(character_id: int):
+    """
+    La sala de destino puede otorgar CommandSets: actualiza el menú de
+    Telegram sin esperar a los eventos AFTER (un script lento no lo retrasa).
+    """
+    async with async_session_factory() as session:
+        character = await player_service.get_character_with_relations_by_id(session, character_id)
+        if character:
+            await command_service.update_telegram_commands(character)
+
+
+def _direction_phrase(preposition: str, direction: str) -> str:
+    """
+    "hacia el norte", "desde el sur", pero "hacia arriba", "desde fuera": solo
+    los puntos cardinales llevan artículo (y las salidas con nombre propio no).
+    """
+    if direction in COMPASS_DIRECTIONS:
+        return f"{preposition} el {direction}"
+    return f"{preposition} {direction}"
+
+
+def _build_room_notices(character_name: str, path: tuple[GraphExit, ...]) -> dict[int, str]:
+    """
+    Agrupa los avisos de un movimiento por sala: cada sala del camino recibe un
+    único mensaje aunque el personaje haya pasado por ella más de una vez.
+    """
+    first, last = path[0], path[-1]
+    notices: dict[int, list[str]] = {}
+
+    notices.setdefault(first.from_room_id, []).append(
+        f"<i>{character_name} se ha ido {_direction_phrase('hacia', first.name)}.</i>"
+    )
+    for previous, following in zip(path, path[1:]):
+        notices.setdefault(previous.to_room_id, []).append(
+            f"<i>{character_name} pasa por aquí {_direction_phrase('hacia', following.name)}.</i>"
+        )
+    opposite_direction = OPPOSITE_DIRECTIONS.get(last.name, "alguna parte")
+    notices.setdefault(last.to_room_id, []).append(
+        f"<i>{character_name} ha llegado {_direction_phrase('desde', opposite_direction)}.</i>"
+    )
+
+    return {room_id: "\n".join(lines) for room_id, lines in notices.items()}
+
+
+async def _run_side_effects(character_id: int, character_name: str, result: MoveResult):
+    """Lanza en paralelo los avisos a las salas, los eventos AFTER y el menú."""
+    notices = _build_room_notices(character_name, result.path)
+
+    outcomes = await asyncio.gather(
+        *(
+            _broadcast_to_room(room_id, message_text, character_id)
+            for room_id, message_text in notices.items()
+        ),
+        _run_after_events(character_id, result.path),
+        _sync_command_menu(character_id),
+        return_exceptions=True,
+    )
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            logging.error(
+                f"Error en un efecto secundario del movimiento de {character_name}",
+                exc_info=outcome
+            )
+
+
+def dispatch_side_effects(character: Character, result: MoveResult) -> asyncio.Task:
+    """
+    Programa los efectos secundarios de un movimiento exitoso y retorna sin
+    esperarlos. Solo se capturan valores primitivos del personaje: la sesión
+    del llamador puede cerrarse antes de que terminen, y la tarea no hereda la
+    caché de estado del comando.
+    """
+    with state_service.detached():
+        task = asyncio.create_task(_run_side_effects(character.id, character.name, result))
+    _side_effect_tasks.add(task)
+    task.add_done_callback(_side_effect_tasks.discard)
+    return task
+
+
+async def wait_for_side_effects(timeout: float = 10.0):
+    """Espera (hasta `timeout` segundos) a los efectos secundarios pendientes. Se usa al apagar."""
+    if not _side_effect_tasks:
+        return
+    done, pending = await asyncio.wait(set(_side_effect_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
@@ -53,6 +53,23 @@ def _get_offline_notified_key(character_id: int) -> str:
 
 # --- Funciones Principales del Servicio ---
 
+async def touch_last_seen(character_id: int) -> bool:
+    """
+    Registra la actividad de un personaje usando solo Redis.
+
+    Returns:
+        bool: True si el personaje estaba marcado como desconectado (vuelve al juego).
+    """
+    # 1. Actualizar el timestamp de "última vez visto" en Redis.
+    key = _get_last_seen_key(character_id)
+    await redis_client.set(key, time.time())
+    await redis_client.expire(key, settings.last_seen_ttl)
+
+    # 2. Comprobar si el personaje estaba marcado como desconectado.
+    #    `getdel` obtiene y borra la clave atómicamente si existe.
+    return bool(await redis_client.getdel(_get_offline_notified_key(character_id)))
+
+
 async def update_last_seen(session: AsyncSession, character: Character):
     """
     Actualiza la última actividad de un personaje y le notifica si vuelve de estar desconectado.
@@ -61,17 +78,7 @@ async def update_last_seen(session: AsyncSession, character: Character):
     # Importamos aquí para evitar importaciones circulares.
     from src.services import broadcaster_service
 
-    char_id = character.id
-
-    # 1. Actualizar el timestamp de "última vez visto" en Redis.
-    key = _get_last_seen_key(char_id)
-    await redis_client.set(key, time.time())
-    await redis_client.expire(key, settings.last_seen_ttl)
-
-    # 2. Comprobar si el personaje estaba marcado como desconectado.
-    offline_notified_key = _get_offline_notified_key(char_id)
-    # `getdel` obtiene y borra la clave atómicamente si existe.
-    was_offline = await redis_client.getdel(offline_notified_key)
+    was_offline = await touch_last_seen(character.id)
 
     if was_offline:
         # El personaje estaba desconectado y acaba de volver. Se le notifica directamente.
@@ -97,6 +104,29 @@ async def is_character_online(character_id: int) -> bool:
     except (ValueError, TypeError):
         return False
 
+async def get_online_character_ids(character_ids: list[int]) -> set[int]:
+    """
+    Versión masiva de `is_character_online`: resuelve varios personajes con
+    un único MGET a Redis.
+    """
+    if not character_ids:
+        return set()
+
+    timestamps = await redis_client.mget([_get_last_seen_key(char_id) for char_id in character_ids])
+    now = time.time()
+    threshold = settings.online_threshold.total_seconds()
+
+    online_ids = set()
+    for char_id, last_seen_timestamp_str in zip(character_ids, timestamps):
+        if not last_seen_timestamp_str:
+            continue
+        try:
+            if now - float(last_seen_timestamp_str) < threshold:
+                online_ids.add(char_id)
+        except (ValueError, TypeError):
+            continue
+    return online_ids
+
 async def get_online_characters(session: AsyncSession) -> list[Character]:
     """
     Devuelve una lista de todos los objetos Character que se consideran "online".
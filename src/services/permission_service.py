@@ -9,9 +9,16 @@ permiso, utilizando el módulo `ast` de Python para un parseo seguro y potente.
 El sistema es extensible y soporta lógica booleana compleja:
 1. Un `lock_string` es una expresión similar a Python (ej: "rol(ADMIN) or (tiene_objeto(llave) and not rol(SUPERADMIN))").
 2. `ast.parse` convierte el string en un árbol de sintaxis abstracta (AST) de forma segura.
-3. La clase `LockEvaluator` (un `ast.NodeVisitor`) recorre el árbol y evalúa el resultado.
+3. `compile_lock` recorre el árbol una sola vez y lo convierte en closures de
+   Python (`CompiledLock`), cacheadas por string. Evaluar un lock ya no
+   parsea ni recorre el árbol: solo llama a esas funciones.
+   `and`/`or` cortocircuitan y evalúan primero las funciones síncronas, de
+   modo que `rol(ADMIN) or online()` no consulta Redis si el rol ya decide.
 4. Las funciones de lock (ej: `rol()`) están registradas en `LOCK_FUNCTIONS`.
 
+Todos los locks de comandos y prototipos se compilan y validan al arrancar
+(`validation_service.validate_lock_strings`).
+
 Sistema de Locks Contextuales:
 - Soporte para locks contextuales (diccionarios por access_type)
 - Soporte para lock functions asíncronas
@@ -22,6 +29,9 @@ Sistema de Locks Contextuales:
 import logging
 import ast # Módulo para parsear la sintaxis de Python de forma segura
 import inspect
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Callable, Awaitable
 from src.models import Character
 
@@ -123,6 +133,13 @@ async def _lock_online(character: Character, args: list[str]) -> bool:
     from src.services import online_service
     return await online_service.is_character_online(character.id)
 
+
+async def _prefetch_online(characters: list[Character], args: list[str]) -> dict[int, bool]:
+    """Presencia de todos los personajes con un único MGET (ver `can_execute_many`)."""
+    from src.services import online_service
+    online_ids = await online_service.get_online_character_ids([character.id for character in characters])
+    return {character.id: character.id in online_ids for character in characters}
+
 # ==============================================================================
 # REGISTRO DE FUNCIONES DE LOCK
 # ==============================================================================
@@ -139,88 +156,281 @@ LOCK_FUNCTIONS = {
     "online": _lock_online,  # Función asíncrona
 }
 
+# Relaciones del personaje que cada función de lock necesita tener cargadas.
+# El dispatcher las usa para construir el plan de carga mínimo de un comando.
+LOCK_FUNCTION_RELATIONS = {
+    "rol": {"account"},
+    "tiene_objeto": {"inventory"},
+    "en_sala": {"room"},
+    "en_categoria_sala": {"room"},
+    "tiene_tag_sala": {"room"},
+    "cuenta_items": {"inventory"},
+    "tiene_item_categoria": {"inventory"},
+    "tiene_item_tag": {"inventory"},
+    "online": set(),
+}
+
+# Precargas masivas para `can_execute_many`: `prefetch(characters, args)`
+# devuelve {character_id: resultado} para todos los personajes de una vez.
+# Mientras dura la evaluación masiva, la función de lock lee de ese resultado
+# en lugar de hacer una consulta por personaje.
+LOCK_FUNCTION_PREFETCHERS = {
+    "online": _prefetch_online,
+}
+
+# Resultados precargados de la evaluación masiva en curso:
+# {(nombre_función, args): {character_id: resultado}}.
+_prefetched_results: ContextVar[dict | None] = ContextVar("lock_prefetched_results", default=None)
+
+# Funciones de lock con efectos secundarios (registran, consumen, escriben...).
+# Un `and`/`or` que contenga alguna conserva el orden escrito en el lock; si
+# no, los operandos síncronos se evalúan antes que los asíncronos (ver
+# `_compile_node`). Todas las funciones actuales son consultas puras.
+LOCK_FUNCTIONS_WITH_SIDE_EFFECTS: set[str] = set()
+
+
 # ==============================================================================
-# MOTOR DEL SERVICIO DE PERMISOS (BASADO EN AST)
+# COMPILADOR DE LOCKS
 # ==============================================================================
 
-class LockEvaluator(ast.NodeVisitor):
+@dataclass(frozen=True)
+class CompiledLock:
     """
-    Un visitante de nodos AST que evalúa un lock string de forma segura.
-    Recorre el árbol de sintaxis y calcula el resultado booleano final.
+    Lock string compilado a una función de Python.
 
-    Soporta lock functions asíncronas.
+    `check(character)` devuelve el resultado directamente si ninguna función
+    del lock es asíncrona (`is_async=False`), o una corrutina si alguna lo es.
+    Usa `evaluate()` cuando no importe distinguir los dos casos.
     """
-    def __init__(self, character: Character):
-        self.character = character
-
-    async def visit_BoolOp(self, node: ast.BoolOp):
-        """Maneja operadores `and` y `or` con soporte async."""
-        # Evaluamos cada sub-expresión (pueden ser async)
-        sub_results = []
-        for value in node.values:
-            result = self.visit(value)
-            # Si el resultado es una corrutina, esperarlo
-            if inspect.iscoroutine(result):
-                result = await result
-            sub_results.append(result)
-
-        if isinstance(node.op, ast.And):
-            return all(sub_results)
-        elif isinstance(node.op, ast.Or):
-            return any(sub_results)
-        return False
+    source: str
+    check: Callable[[Character], bool | Awaitable[bool]]
+    is_async: bool
+    # Relaciones del personaje que necesita (None si usa funciones sin
+    # relaciones registradas, ver `LOCK_FUNCTION_RELATIONS`).
+    relations: frozenset[str] | None
+    # Funciones que no están en `LOCK_FUNCTIONS` (siempre evalúan a False).
+    unknown_functions: tuple[str, ...] = ()
+    # Llamadas distintas del lock como (nombre, args), para las precargas.
+    calls: tuple[tuple[str, tuple], ...] = ()
+
+    async def evaluate(self, character: Character) -> bool:
+        result = self.check(character)
+        if self.is_async:
+            result = await result
+        return bool(result)
 
-    async def visit_UnaryOp(self, node: ast.UnaryOp):
-        """Maneja el operador `not` con soporte async."""
-        if isinstance(node.op, ast.Not):
-            result = self.visit(node.operand)
-            # Si el resultado es una corrutina, esperarlo
-            if inspect.iscoroutine(result):
-                result = await result
-            return not result
-        return False
 
-    async def visit_Call(self, node: ast.Call):
-        """Maneja las llamadas a funciones de lock (ej: `rol(...)`) con soporte async."""
-        func_name = node.func.id.lower()
-        if func_name in LOCK_FUNCTIONS:
-            # Evaluamos los argumentos (que también son nodos AST)
-            args = []
-            for arg in node.args:
-                result = self.visit(arg)
-                if inspect.iscoroutine(result):
+def _compile_argument(node: ast.expr):
+    """Los argumentos de una función de lock son constantes o nombres (`rol(ADMIN)`)."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return node.id
+    raise TypeError(f"Construcción no soportada en lock string: {type(node).__name__}")
+
+
+def _compile_call(node: ast.Call) -> tuple[Callable, bool]:
+    """Compila una llamada a una función de lock (ej: `rol(ADMIN)`)."""
+    if not isinstance(node.func, ast.Name) or node.keywords:
+        raise TypeError(f"Construcción no soportada en lock string: {type(node.func).__name__}")
+
+    func_name = node.func.id.lower()
+    args = [_compile_argument(arg) for arg in node.args]
+    lock_func = LOCK_FUNCTIONS.get(func_name)
+
+    if lock_func is None:
+        def unknown_function(character):
+            logging.warning(f"Función de lock desconocida llamada: {func_name}")
+            return False  # Falla de forma segura si la función no está registrada.
+        return unknown_function, False
+
+    is_async = inspect.iscoroutinefunction(lock_func)
+    if func_name not in LOCK_FUNCTION_PREFETCHERS:
+        return (lambda character: lock_func(character, args)), is_async
+
+    # La función admite precarga: si hay un resultado precargado para este
+    # personaje (ver `can_execute_many`), se usa en lugar de consultar.
+    call_key = (func_name, tuple(args))
+
+    def get_prefetched(character):
+        prefetched = _prefetched_results.get()
+        results = prefetched.get(call_key) if prefetched else None
+        if results is not None and character.id in results:
+            return True, results[character.id]
+        return False, None
+
+    if not is_async:
+        def prefetched_call(character):
+            found, result = get_prefetched(character)
+            return result if found else lock_func(character, args)
+        return prefetched_call, False
+
+    async def prefetched_async_call(character):
+        found, result = get_prefetched(character)
+        return result if found else await lock_func(character, args)
+    return prefetched_async_call, True
+
+
+def _has_side_effects(node: ast.expr) -> bool:
+    """Indica si un subárbol llama a alguna función de `LOCK_FUNCTIONS_WITH_SIDE_EFFECTS`."""
+    return any(
+        isinstance(child, ast.Call)
+        and isinstance(child.func, ast.Name)
+        and child.func.id.lower() in LOCK_FUNCTIONS_WITH_SIDE_EFFECTS
+        for child in ast.walk(node)
+    )
+
+
+def _compile_node(node: ast.expr) -> tuple[Callable, bool]:
+    """
+    Compila un nodo del AST a una función `f(character)`.
+
+    Returns:
+        (función, es_asíncrona). Si es asíncrona, la función devuelve una corrutina.
+
+    Raises:
+        TypeError: Si el nodo no es una construcción permitida en un lock. Esto
+                   es una medida de seguridad crucial para prevenir la ejecución
+                   de código no deseado (atributos, subíndices, lambdas...).
+    """
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile_node(value) for value in node.values]
+        if not any(_has_side_effects(value) for value in node.values):
+            # Orden por coste: las funciones síncronas (memoria) antes que las
+            # asíncronas (Redis, BD). `sorted` es estable, así que dentro de
+            # cada grupo se respeta el orden escrito.
+            operands.sort(key=lambda operand: operand[1])
+        is_and = isinstance(node.op, ast.And)
+
+        if not any(is_async for _, is_async in operands):
+            functions = [func for func, _ in operands]
+            if is_and:
+                return (lambda character: all(func(character) for func in functions)), False
+            return (lambda character: any(func(character) for func in functions)), False
+
+        async def bool_op(character):
+            # Cortocircuito: el primer False en `and` o el primer True en `or`
+            # decide el resultado y el resto de operandos no se evalúa.
+            for func, is_async in operands:
+                result = func(character)
+                if is_async:
                     result = await result
-                args.append(result)
+                if bool(result) != is_and:
+                    return not is_and
+            return is_and
+        return bool_op, True
 
-            lock_func = LOCK_FUNCTIONS[func_name]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand, is_async = _compile_node(node.operand)
+        if not is_async:
+            return (lambda character: not operand(character)), False
 
-            # Verificar si la función es asíncrona
-            if inspect.iscoroutinefunction(lock_func):
-                return await lock_func(self.character, args)
-            else:
-                return lock_func(self.character, args)
+        async def not_op(character):
+            return not await operand(character)
+        return not_op, True
 
-        logging.warning(f"Función de lock desconocida llamada: {func_name}")
-        return False # Falla de forma segura si la función no está registrada.
+    if isinstance(node, ast.Call):
+        return _compile_call(node)
 
-    def visit_Constant(self, node: ast.Constant):
-        """Maneja valores constantes como strings o números."""
-        return node.value
+    if isinstance(node, (ast.Constant, ast.Name)):
+        value = _compile_argument(node)
+        return (lambda character: value), False
 
-    def visit_Name(self, node: ast.Name) -> str:
-        """
-        Maneja nombres/identificadores. Los tratamos como strings.
-        Esto permite escribir `rol(ADMIN)` en lugar de `rol('ADMIN')`.
-        """
-        return node.id
+    raise TypeError(f"Construcción no soportada en lock string: {type(node).__name__}")
+
+
+@lru_cache(maxsize=1024)
+def compile_lock(lock_string: str) -> CompiledLock:
+    """
+    Compila un lock string. Los locks son contenido estático, así que cada
+    string distinto se parsea y compila una sola vez (LRU por string).
+
+    Raises:
+        SyntaxError: Si el lock string no es una expresión válida.
+        TypeError: Si usa construcciones no permitidas.
+    """
+    tree = ast.parse(lock_string, mode='eval')
+    check, is_async = _compile_node(tree.body)
+
+    call_nodes = [
+        node for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+    ]
+    function_names = [node.func.id.lower() for node in call_nodes]
+    calls = {
+        (node.func.id.lower(), tuple(_compile_argument(arg) for arg in node.args)): None
+        for node in call_nodes
+    }
+    relations = set()
+    for func_name in function_names:
+        func_relations = LOCK_FUNCTION_RELATIONS.get(func_name)
+        if func_relations is None:
+            relations = None
+            break
+        relations.update(func_relations)
+
+    return CompiledLock(
+        source=lock_string,
+        check=check,
+        is_async=is_async,
+        relations=frozenset(relations) if relations is not None else None,
+        unknown_functions=tuple(sorted({name for name in function_names if name not in LOCK_FUNCTIONS})),
+        calls=tuple(calls),
+    )
+
+
+def get_lock_relations(locks: str | dict[str, str] | None) -> set[str] | None:
+    """
+    Devuelve las relaciones del personaje necesarias para evaluar un lock.
+
+    Args:
+        locks: Lock string simple o diccionario de locks contextuales.
+
+    Returns:
+        set[str]: Relaciones necesarias (vacío si el lock no usa ninguna).
+        None: Si no se puede determinar (lock inválido o función sin
+              relaciones registradas). El llamador debe cargar todo el grafo.
+    """
+    if not locks:
+        return set()
+
+    lock_strings = locks.values() if isinstance(locks, dict) else [locks]
+    relations = set()
+    for lock_string in lock_strings:
+        if not lock_string:
+            continue
+        try:
+            compiled = compile_lock(lock_string)
+        except (SyntaxError, TypeError):
+            return None
+        if compiled.relations is None:
+            return None
+        relations.update(compiled.relations)
+    return relations
+
+
+# ==============================================================================
+# EVALUACIÓN
+# ==============================================================================
+
+def _select_lock_string(locks: str | dict[str, str] | None, access_type: str) -> str:
+    """
+    Devuelve el lock string que aplica a un access_type ("" si no hay
+    restricción). En un diccionario se busca el tipo específico y, si no
+    existe, "default".
+
+    Raises:
+        TypeError: Si `locks` no es un string, un diccionario o None.
+    """
+    if locks is None:
+        return ""
+    if isinstance(locks, str):
+        # Backward compatibility: string simple equivale a "default"
+        return locks
+    if isinstance(locks, dict):
+        return locks.get(access_type) or locks.get("default", "")
+    raise TypeError(f"Tipo de lock inválido: {type(locks)}")
 
-    def generic_visit(self, node):
-        """
-        Método de captura para cualquier tipo de nodo no soportado.
-        Esto es una medida de seguridad crucial para prevenir la ejecución
-        de código no deseado (bucles, asignaciones, etc.).
-        """
-        raise TypeError(f"Construcción no soportada en lock string: {type(node).__name__}")
 
 async def can_execute(
     character: Character,
@@ -266,49 +476,29 @@ async def can_execute(
         >>> messages = {"get": "El cofre es demasiado pesado para levantarlo."}
         >>> can_pass, msg = await can_execute(char, locks, "get", messages)
     """
-    # 1. Normalizar locks a diccionario
-    if isinstance(locks, str):
-        # Backward compatibility: string simple se convierte a "default"
-        if not locks:  # Lock vacío = sin restricción
-            return True, ""
-        locks_dict = {"default": locks}
-    elif isinstance(locks, dict):
-        locks_dict = locks
-    elif locks is None:
-        # None se trata como sin lock
-        return True, ""
-    else:
+    # 1. Obtener el lock string para el access_type
+    try:
+        lock_string = _select_lock_string(locks, access_type)
+    except TypeError:
         # Tipo inválido, denegar por seguridad
         logging.error(f"Tipo de lock inválido: {type(locks)}")
         return False, "Error en la configuración de permisos."
 
-    # 2. Obtener el lock string para el access_type
-    # Primero intenta el tipo específico, luego "default"
-    lock_string = locks_dict.get(access_type) or locks_dict.get("default", "")
-
-    # 3. Lock vacío = sin restricción
+    # 2. Lock vacío = sin restricción
     if not lock_string:
         return True, ""
 
-    # 4. Evaluar el lock string (con soporte async)
+    # 3. Evaluar el lock compilado (cacheado por `compile_lock`).
     try:
-        # Parsear el string a un árbol AST. `mode='eval'` espera una sola expresión.
-        tree = ast.parse(lock_string, mode='eval')
-
-        # Crear una instancia de nuestro evaluador con el contexto del personaje.
-        evaluator = LockEvaluator(character)
-
-        # Visitar el árbol para obtener el resultado booleano (ahora async)
-        result = evaluator.visit(tree.body)
-
-        # Si el resultado es una corrutina, esperarlo
-        if inspect.iscoroutine(result):
+        compiled = compile_lock(lock_string)
+        result = compiled.check(character)
+        if compiled.is_async:
             result = await result
 
         if result:
             return True, ""
         else:
-            # 5. Mensaje de error personalizado o genérico
+            # 4. Mensaje de error personalizado o genérico
             if lock_messages and access_type in lock_messages:
                 error_message = lock_messages[access_type]
             else:
@@ -321,4 +511,58 @@ async def can_execute(
         return False, "Error en la definición de permisos de esta acción."
     except Exception:
         logging.exception(f"Error inesperado al evaluar el lock string: '{lock_string}'")
-        return False, "Error interno al comprobar los permisos."
\ No newline at end of file
+        return False, "Error interno al comprobar los permisos."
+
+
+async def can_execute_many(
+    characters: list[Character],
+    locks: str | dict[str, str] | None,
+    access_type: str = "default",
+) -> list[bool]:
+    """
+    Evalúa el mismo lock contra muchos personajes (audiencias de canales,
+    canales por defecto...).
+
+    El lock se compila una vez y, antes de evaluarlo, cada función con
+    precarga registrada (`LOCK_FUNCTION_PREFETCHERS`) resuelve a todos los
+    personajes de golpe: por ejemplo, `online()` hace un único MGET en lugar
+    de una consulta por personaje.
+
+    Returns:
+        list[bool]: Un resultado por personaje, en el mismo orden. Si el lock
+                    es inválido, todos son False.
+    """
+    characters = list(characters)
+    try:
+        lock_string = _select_lock_string(locks, access_type)
+    except TypeError:
+        logging.error(f"Tipo de lock inválido: {type(locks)}")
+        return [False] * len(characters)
+
+    if not lock_string:
+        return [True] * len(characters)
+    if not characters:
+        return []
+
+    try:
+        compiled = compile_lock(lock_string)
+
+        prefetched = {}
+        for call_key in compiled.calls:
+            prefetch = LOCK_FUNCTION_PREFETCHERS.get(call_key[0])
+            if prefetch is not None:
+                prefetched[call_key] = await prefetch(characters, list(call_key[1]))
+
+        token = _prefetched_results.set(prefetched)
+        try:
+            if compiled.is_async:
+                return [bool(await compiled.check(character)) for character in characters]
+            return [bool(compiled.check(character)) for character in characters]
+        finally:
+            _prefetched_results.reset(token)
+
+    except SyntaxError:
+        logging.error(f"Error de sintaxis en el lock string: '{lock_string}'")
+    except Exception:
+        logging.exception(f"Error inesperado al evaluar el lock string: '{lock_string}'")
+    return [False] * len(characters)
@@ -11,38 +11,132 @@ asegurando que toda la lógica de negocio esté centralizada y sea consistente.
 """
 
 import logging
-from sqlalchemy import select, update
+from sqlalchemy import inspect, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from src.models.account import Account
 from src.models.character import Character
 from src.models.room import Room
 from src.models.item import Item
 from src.models.exit import Exit
-from src.services import channel_service, command_service
+from src.services import account_cache_service, channel_service, command_service
 
 
-async def get_character_with_relations_by_id(session: AsyncSession, character_id: int) -> Character | None:
+# ==============================================================================
+# PERFILES DE CARGA DE RELACIONES
+#
+# Cada comando puede declarar en `Command.needs` qué relaciones del personaje
+# necesita. Este diccionario traduce cada nombre de relación a las opciones de
+# `selectinload` que la cargan. Así, un `/decir` no necesita cargar la sala con
+# todos sus objetos, salidas y personajes.
+# ==============================================================================
+
+CHARACTER_RELATION_LOADERS = {
+    "room": (
+        selectinload(Character.room),
+    ),
+    "room.items": (
+        selectinload(Character.room).selectinload(Room.items).selectinload(Item.contained_items),
+    ),
+    "room.exits": (
+        selectinload(Character.room).selectinload(Room.exits_from).selectinload(Exit.to_room),
+    ),
+    "room.characters": (
+        selectinload(Character.room).selectinload(Room.characters).selectinload(Character.account),
+    ),
+    "inventory": (
+        selectinload(Character.items).selectinload(Item.contained_items),
+    ),
+    "account": (
+        selectinload(Character.account),
+    ),
+    "settings": (
+        selectinload(Character.settings),
+    ),
+}
+
+# Perfil que se usa cuando no se declara ninguno. Las salidas de la sala no se
+# cargan: movimiento, teclados y `format_room` las leen del grafo del mundo
+# (`world_graph_service`). Quien necesite los objetos `Exit` debe pedir "room.exits".
+FULL_CHARACTER_RELATIONS = frozenset(CHARACTER_RELATION_LOADERS) - {"room.exits"}
+
+
+def build_character_load_options(needs: set[str] | frozenset[str] | None = None) -> list:
+    """
+    Construye la lista de opciones de carga para un conjunto de relaciones.
+
+    Args:
+        needs: Nombres de relaciones (claves de CHARACTER_RELATION_LOADERS).
+               Si es None, se cargan todas.
+
+    Raises:
+        ValueError: Si se pide una relación desconocida.
+    """
+    if needs is None:
+        needs = FULL_CHARACTER_RELATIONS
+
+    options = []
+    for relation in sorted(needs):
+        loaders = CHARACTER_RELATION_LOADERS.get(relation)
+        if loaders is None:
+            raise ValueError(f"Relación de personaje desconocida: '{relation}'")
+        options.extend(loaders)
+    return options
+
+
+def _is_relation_loaded(character: Character, relation: str) -> bool:
+    """Comprueba si una relación del personaje ya está cargada en memoria."""
+    path = relation.split(".")
+    attribute = "items" if path[0] == "inventory" else path[0]
+    if attribute in inspect(character).unloaded:
+        return False
+
+    if len(path) > 1 and character.room is not None:
+        room_attribute = "exits_from" if path[1] == "exits" else path[1]
+        return room_attribute not in inspect(character.room).unloaded
+    return True
+
+
+async def load_character_relations(session: AsyncSession, character: Character, needs: set[str]):
     """
-    Busca un personaje por su ID y carga explícitamente todas sus relaciones
+    Carga en un personaje ya obtenido las relaciones de `needs` que aún no
+    estén cargadas. Las relaciones ya cargadas no se vuelven a consultar.
+    """
+    missing = {relation for relation in needs if not _is_relation_loaded(character, relation)}
+    if not missing:
+        return
+
+    query = (
+        select(Character)
+        .where(Character.id == character.id)
+        .options(*build_character_load_options(missing))
+    )
+    await session.execute(query)
+
+
+async def get_character_with_relations_by_id(
+    session: AsyncSession,
+    character_id: int,
+    needs: set[str] | None = None
+) -> Character | None:
+    """
+    Busca un personaje por su ID y carga explícitamente sus relaciones
     críticas (sala, inventario, cuenta, configuraciones) en una sola consulta.
 
     Esta es una función de ayuda crucial para evitar errores de "carga perezosa"
     (lazy loading) en un entorno asíncrono.
+
+    Args:
+        needs: Relaciones a cargar (ver CHARACTER_RELATION_LOADERS).
+               None = todas las relaciones.
     """
     try:
         query = (
             select(Character)
             .where(Character.id == character_id)
-            .options(
-                selectinload(Character.room).selectinload(Room.items).selectinload(Item.contained_items),
-                selectinload(Character.room).selectinload(Room.exits_from).selectinload(Exit.to_room),
-                selectinload(Character.room).selectinload(Room.characters).selectinload(Character.account),
-                selectinload(Character.items).selectinload(Item.contained_items),
-                selectinload(Character.account),
-                selectinload(Character.settings)
-            )
+            .options(*build_character_load_options(needs))
         )
         result = await session.execute(query)
         return result.scalar_one_or_none()
@@ -50,15 +144,28 @@ async def get_character_with_relations_by_id(session: AsyncSession, character_id
         logging.exception(f"Error al obtener el personaje completo con ID {character_id}")
         return None
 
-async def get_or_create_account(session: AsyncSession, telegram_id: int) -> Account:
+async def get_or_create_account(session: AsyncSession, telegram_id: int, needs: set[str] | None = None) -> Account:
     """
     Busca una cuenta por su telegram_id. Si no existe, la crea.
-    Garantiza que el objeto `Account` devuelto contenga un `Character` completamente
-    cargado si este existe.
+    Garantiza que el objeto `Account` devuelto contenga un `Character` cargado
+    si este existe.
+
+    Args:
+        needs: Relaciones del personaje a cargar (ver CHARACTER_RELATION_LOADERS).
+               None = todas (comportamiento por defecto). Con un conjunto
+               explícito, cuenta y personaje se cargan en la misma consulta
+               y solo se añaden las relaciones pedidas.
     """
     try:
         # 1. Buscar la cuenta y su personaje asociado.
-        account_query = select(Account).where(Account.telegram_id == telegram_id).options(selectinload(Account.character))
+        if needs is None:
+            character_loader = selectinload(Account.character)
+        else:
+            # La cuenta ya la tenemos: no hace falta cargarla otra vez desde el personaje.
+            character_loader = selectinload(Account.character).options(
+                *build_character_load_options(set(needs) - {"account"})
+            )
+        account_query = select(Account).where(Account.telegram_id == telegram_id).options(character_loader)
         result = await session.execute(account_query)
         account = result.scalar_one_or_none()
 
@@ -76,7 +183,12 @@ async def get_or_create_account(session: AsyncSession, telegram_id: int) -> Acco
         if not account.character:
             return account
 
-        # 4. Si la cuenta y el personaje existen, usar nuestra función de ayuda para
+        # 4. Con un perfil de carga explícito, el personaje ya tiene lo que pidió.
+        if needs is not None:
+            set_committed_value(account.character, "account", account)
+            return account
+
+        # 5. Si la cuenta y el personaje existen, usar nuestra función de ayuda para
         #    asegurarnos de que el personaje está completamente cargado con todas sus relaciones.
         full_character = await get_character_with_relations_by_id(session, account.character.id)
         account.character = full_character
@@ -110,6 +222,7 @@ async def create_character(session: AsyncSession, telegram_id: int, character_na
     )
     session.add(new_character)
     await session.commit()
+    await account_cache_service.invalidate(telegram_id)
 
     # Recargamos el personaje por completo para tener todas las relaciones disponibles.
     full_character = await get_character_with_relations_by_id(session, new_character.id)
@@ -144,6 +257,9 @@ async def teleport_character(session: AsyncSession, character_id: int, to_room_i
     await session.execute(query)
     await session.commit()
 
+    # La sala puede otorgar CommandSets: el contexto del personaje ha cambiado.
+    command_service.invalidate_active_command_sets(character_id)
+
 
 async def delete_character(session: AsyncSession, character: Character) -> None:
     """
@@ -169,8 +285,11 @@ async def delete_character(session: AsyncSession, character: Character) -> None:
         logging.info(f"Eliminando personaje {character_name} (ID: {character.id}) de la cuenta {telegram_id}")
 
         # Eliminar el personaje (cascade eliminará items, settings, etc.)
+        character_id = character.id
         await session.delete(character)
         await session.commit()
+        command_service.invalidate_active_command_sets(character_id)
+        await account_cache_service.invalidate(telegram_id)
 
         logging.info(f"Personaje {character_name} eliminado exitosamente")
     except Exception:
@@ -0,0 +1,262 @@
+# src/services/reload_service.py
+"""
+Módulo de Servicio de Recarga en Caliente de `game_data`.
+
+Cambiar un prototipo (`ITEM_PROTOTYPES`, `ROOM_PROTOTYPES`,
+`CHANNEL_PROTOTYPES`) o un script global obligaba a reiniciar el bot, con
+minutos sin servicio y la pérdida de las cachés en memoria. Este servicio
+vuelve a importar los módulos de `game_data` con el bot en marcha
+(`/recargar` o, opcionalmente, al detectar cambios en los archivos).
+
+Cómo se hace el cambio sin interrumpir los comandos en curso:
+1.  **Intercambio síncrono:** Reimportar los módulos, copiar los prototipos
+    nuevos en los diccionarios existentes (todo el código guarda una
+    referencia a ellos: `from game_data.item_prototypes import ITEM_PROTOTYPES`)
+    y validar se hace sin ningún `await`. Para el resto de corrutinas del
+    event loop el cambio es atómico: ven los datos viejos o los nuevos, nunca
+    una mezcla.
+2.  **Validación:** Se ejecutan las mismas validaciones que al arrancar
+    (`validation_service.collect_errors`). Si hay errores o un módulo no se
+    puede importar, se restaura el estado anterior y la recarga se descarta.
+3.  **Cachés derivadas:** Se descartan las tablas de despacho de eventos, el
+    índice de comandos y los command sets activos; los scripts y locks ya
+    quedan recompilados por la validación.
+4.  **Mundo:** Se sincronizan salas, salidas y fixtures con la base de datos
+    (`sync_world_from_prototypes`), que publica un grafo del mundo nuevo, y
+    se recargan los scripts cron.
+
+La recarga afecta al proceso que la ejecuta. Con varios procesos del bot,
+cada uno debe recargar (el vigilante de archivos lo hace en todos).
+"""
+
+import asyncio
+import importlib
+import logging
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+
+
+# Módulos de prototipos y el diccionario que exporta cada uno.
+PROTOTYPE_MODULES = {
+    "game_data.room_prototypes": "ROOM_PROTOTYPES",
+    "game_data.item_prototypes": "ITEM_PROTOTYPES",
+    "game_data.channel_prototypes": "CHANNEL_PROTOTYPES",
+}
+
+GLOBAL_SCRIPTS_MODULE = "game_data.global_scripts"
+
+GAME_DATA_DIR = Path(__file__).resolve().parents[2] / "game_data"
+
+# Evita dos recargas a la vez (ej: /recargar mientras el vigilante recarga).
+_reload_lock = asyncio.Lock()
+
+# Fecha de modificación de cada archivo de game_data en la última comprobación.
+_watched_mtimes: dict[str, float] = {}
+
+
+@dataclass
+class ReloadResult:
+    """Resultado de una recarga."""
+    success: bool
+    errors: list[str] = field(default_factory=list)
+    rooms: int = 0
+    items: int = 0
+    channels: int = 0
+    global_scripts: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class _Snapshot:
+    """Estado anterior a la recarga, para poder restaurarlo si falla."""
+    namespaces: dict[str, dict[str, Any]]   # módulo -> copia de su __dict__
+    prototypes: dict[str, dict]             # módulo -> copia del contenido del diccionario
+    dynamic_channel_commands: list
+
+
+# ==============================================================================
+# INTERCAMBIO (síncrono: ningún await entre el primer cambio y la validación)
+# ==============================================================================
+
+def _take_snapshot() -> _Snapshot:
+    modules = [*PROTOTYPE_MODULES, GLOBAL_SCRIPTS_MODULE]
+    from commands.player.dynamic_channels import DYNAMIC_CHANNEL_COMMANDS
+
+    return _Snapshot(
+        namespaces={name: dict(sys.modules[name].__dict__) for name in modules},
+        prototypes={
+            name: dict(getattr(sys.modules[name], attr)) for name, attr in PROTOTYPE_MODULES.items()
+        },
+        dynamic_channel_commands=list(DYNAMIC_CHANNEL_COMMANDS),
+    )
+
+
+def _restore(snapshot: _Snapshot):
+    """Vuelve a dejar módulos, prototipos y comandos como estaban."""
+    from commands.player.dynamic_channels import DYNAMIC_CHANNEL_COMMANDS
+    from src.services import script_service
+
+    for name, namespace in snapshot.namespaces.items():
+        module = sys.modules[name]
+        module.__dict__.clear()
+        module.__dict__.update(namespace)
+
+    for name, contents in snapshot.prototypes.items():
+        live = getattr(sys.modules[name], PROTOTYPE_MODULES[name])
+        live.clear()
+        live.update(contents)
+
+    DYNAMIC_CHANNEL_COMMANDS[:] = snapshot.dynamic_channel_commands
+    # Los scripts se compilaron contra el registro nuevo durante la validación.
+    script_service.compile_script.cache_clear()
+
+
+def _swap_game_data(snapshot: _Snapshot):
+    """
+    Reimporta `game_data` y publica su contenido. Lanza la excepción del
+    import si un módulo tiene errores (el llamador restaura el estado).
+    """
+    from commands.player.dynamic_channels import DYNAMIC_CHANNEL_COMMANDS, generate_channel_commands
+
+    for name, attr in PROTOTYPE_MODULES.items():
+        module = importlib.reload(sys.modules[name])
+        # Mismo objeto diccionario, contenido nuevo: las referencias
+        # importadas en otros módulos ven los prototipos nuevos.
+        live = snapshot.namespaces[name][attr]
+        live.clear()
+        live.update(getattr(module, attr))
+        setattr(module, attr, live)
+
+    # El registro de scripts globales se crea de nuevo al reimportar (el código
+    # lo importa siempre de forma diferida, así que usará el nuevo).
+    global_scripts = importlib.reload(sys.modules[GLOBAL_SCRIPTS_MODULE])
+    global_scripts.register_all_global_scripts()
+
+    # Los comandos de canal se generan a partir de CHANNEL_PROTOTYPES.
+    DYNAMIC_CHANNEL_COMMANDS[:] = generate_channel_commands()
+
+
+def _clear_derived_caches():
+    """Descarta las cachés construidas a partir de los datos anteriores."""
+    from src.handlers.player import dispatcher
+    from src.services import command_service, event_service
+
+    event_service.clear_dispatch_tables()
+    dispatcher.invalidate_command_index()
+    command_service.invalidate_active_command_sets()
+
+
+# ==============================================================================
+# API PÚBLICA
+# ==============================================================================
+
+async def reload_game_data(session: AsyncSession) -> ReloadResult:
+    """
+    Recarga prototipos y scripts globales, valida y, si todo es correcto,
+    sincroniza el mundo. Si algo falla, el juego sigue con los datos anteriores.
+
+    Returns:
+        ReloadResult con el resultado y, si falló, los errores.
+    """
+    from src.services import permission_service, validation_service, world_loader_service
+    from src.services.scheduler_service import scheduler_service
+
+    async with _reload_lock:
+        started = time.perf_counter()
+        snapshot = _take_snapshot()
+
+        try:
+            _swap_game_data(snapshot)
+        except Exception as e:
+            _restore(snapshot)
+            logging.exception("Recarga de game_data descartada: error al importar")
+            return ReloadResult(False, [f"❌ Error importando game_data: {type(e).__name__}: {e}"])
+
+        # Recompilar los locks desde cero (la validación los deja en caché).
+        permission_service.compile_lock.cache_clear()
+        errors = validation_service.collect_errors()
+        if errors:
+            _restore(snapshot)
+            logging.error("Recarga de game_data descartada:\n" + "\n".join(errors))
+            return ReloadResult(False, errors)
+
+        _clear_derived_caches()
+
+        # Los procesos del pool tienen importada la versión anterior de los
+        # scripts cpu_bound: se recrean en la siguiente llamada.
+        old_pool = snapshot.namespaces[GLOBAL_SCRIPTS_MODULE].get("_process_pool")
+        if old_pool is not None:
+            old_pool.shutdown(wait=False, cancel_futures=True)
+
+        await world_loader_service.sync_world_from_prototypes(session)
+        await scheduler_service._reload_cron_scripts()
+
+        from game_data.global_scripts import global_script_registry
+        from game_data.room_prototypes import ROOM_PROTOTYPES
+        from game_data.item_prototypes import ITEM_PROTOTYPES
+        from game_data.channel_prototypes import CHANNEL_PROTOTYPES
+
+        result = ReloadResult(
+            success=True,
+            rooms=len(ROOM_PROTOTYPES),
+            items=len(ITEM_PROTOTYPES),
+            channels=len(CHANNEL_PROTOTYPES),
+            global_scripts=len(global_script_registry.list_all()),
+            seconds=time.perf_counter() - started,
+        )
+        logging.info(
+            f"♻️ game_data recargado en {result.seconds:.2f}s: {result.rooms} salas, "
+            f"{result.items} items, {result.channels} canales, {result.global_scripts} scripts globales."
+        )
+        return result
+
+
+def _scan_game_data() -> dict[str, float]:
+    """Fecha de modificación de cada archivo .py de game_data."""
+    return {str(path): path.stat().st_mtime for path in GAME_DATA_DIR.glob("*.py")}
+
+
+async def check_for_changes():
+    """
+    Recarga `game_data` si algún archivo cambió desde la última comprobación.
+    Se programa como job del scheduler cuando `reload.watch_game_data` está
+    activado. La primera llamada solo registra el estado actual.
+    """
+    from src.db import async_session_factory
+
+    global _watched_mtimes
+    current = _scan_game_data()
+    previous, _watched_mtimes = _watched_mtimes, current
+    if not previous or current == previous:
+        return
+
+    changed = sorted(Path(path).name for path in current.keys() | previous.keys()
+                     if current.get(path) != previous.get(path))
+    logging.info(f"♻️ Cambios detectados en game_data ({', '.join(changed)}), recargando...")
+
+    async with async_session_factory() as session:
+        result = await reload_game_data(session)
+    if not result.success:
+        logging.warning("♻️ La recarga automática falló; se siguen usando los datos anteriores.")
+
+
+def start_watcher():
+    """Programa la comprobación periódica de cambios en game_data."""
+    from src.services.scheduler_service import scheduler_service
+
+    _watched_mtimes.update(_scan_game_data())
+    scheduler_service.scheduler.add_job(
+        check_for_changes,
+        'interval',
+        seconds=settings.reload_watch_interval_seconds,
+        id="game_data_watcher",
+        replace_existing=True
+    )
+    logging.info("Vigilante de cambios en game_data activado.")
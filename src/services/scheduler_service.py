@@ -7,7 +7,8 @@ Scheduler híbrido que soporta:
 - Cron-based scheduling (calendario real)
 - Timestamp scheduling (eventos únicos en fecha/hora específica)
 
-Este servicio implementa scheduling híbrido con tick-based y cron-based.
+Los ticks y el cron se procesan aquí; los timestamps se delegan en
+`delay_queue_service`, que los guarda en Redis y los ejecuta al vencer.
 
 Responsabilidades:
 1. Mantener sistema de ticks para scripts periódicos.
@@ -29,7 +30,7 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models import Item, Room, Character
-from src.services import script_service, online_service, player_service
+from src.services import script_service, online_service, player_service, delay_queue_service
 from src.db import async_session_factory
 from src.config import settings
 
@@ -72,6 +73,11 @@ class SchedulerService:
         self.scheduler = AsyncIOScheduler()
         self._tick_counter = 0
 
+        # ID del último item procesado cuando el presupuesto del pulse se
+        # agotó: el siguiente pulse empieza por el item que le sigue, para que
+        # los del final de la lista no se queden siempre sin ejecutar.
+        self._tick_resume_after: Optional[int] = None
+
         # Cache de scripts cron (para evitar recargar prototipos cada tick)
         self._cron_scripts_cache: Dict[str, List[ScheduledScript]] = {}
 
@@ -126,48 +132,147 @@ class SchedulerService:
         if current_tick % 30 == 0:
             logging.debug(f"⏰ Global Pulse: Tick #{current_tick}")
 
-        async with async_session_factory() as session:
-            await self._process_tick_scripts(session, current_tick)
+        # Todos los scripts del pulse comparten un presupuesto de tiempo
+        with script_service.execution_budget(settings.scripts_pulse_budget_seconds):
+            async with async_session_factory() as session:
+                await self._process_tick_scripts(session, current_tick)
+
+    def _order_for_pulse(self, items: List[Item]) -> List[Item]:
+        """
+        Ordena los items por ID, empezando por el siguiente al último que se
+        procesó en un pulse que agotó su presupuesto.
+        """
+        items = sorted(items, key=lambda item: item.id)
+        if self._tick_resume_after is None:
+            return items
+        start = next((i for i, item in enumerate(items) if item.id > self._tick_resume_after), 0)
+        return items[start:] + items[:start]
 
     async def _process_tick_scripts(self, session: AsyncSession, current_tick: int):
         """
         Procesa tick_scripts de items con scheduling basado en ticks.
 
+        El presupuesto del pulse solo se comprueba entre items: un item
+        empezado ejecuta sus scripts para todos los personajes de la sala, así
+        que nadie recibe un script dos veces por quedarse el pulse a medias.
+
+        Todos los items usan la sesión del pulse (un commit por item). Solo si
+        un script se cancela por tiempo se abre una sesión nueva para el resto.
+
         NOTA: Carga todos los items y filtra en Python, ya que prototype es una
         propiedad Python, no una columna JSONB en la BD.
         """
         try:
-            # Cargar todos los items con sus relaciones
-            query = select(Item).options(
+            result = await session.execute(select(Item))
+            all_items = result.scalars().all()
+        except Exception:
+            logging.exception(f"Error en pulse tick #{current_tick}")
+            return
+
+        # Filtrar items que tienen tick_scripts (en Python)
+        items_with_scripts = [
+            item for item in all_items
+            if item.prototype.get("tick_scripts")
+        ]
+
+        ordered = self._order_for_pulse(items_with_scripts)
+        self._tick_resume_after, last_processed = None, self._tick_resume_after
+        replacement: Optional[AsyncSession] = None
+        try:
+            for item in ordered:
+                if script_service.budget_exhausted():
+                    # Los items restantes conservan su último tick y el siguiente
+                    # pulse empieza por ellos.
+                    self._tick_resume_after = last_processed
+                    logging.warning(f"Presupuesto del pulse #{current_tick} agotado; se pospone el resto de tick_scripts")
+                    break
+
+                # Sin presupuesto dentro del item: solo el tiempo máximo por llamada.
+                with script_service.execution_budget(None):
+                    discarded = await self._process_item_tick_scripts(session, item.id, current_tick)
+                last_processed = item.id
+
+                if discarded is not None:
+                    # La sesión pudo quedarse a mitad de una consulta: se
+                    # descarta y el tracking y el resto de items van en otra.
+                    await session.close()
+                    session = replacement = async_session_factory()
+                    await self._save_tick_tracking(session, item.id, discarded, current_tick)
+        finally:
+            if replacement is not None:
+                await replacement.close()
+
+    async def _process_item_tick_scripts(
+        self,
+        session: AsyncSession,
+        item_id: int,
+        current_tick: int
+    ) -> Optional[List[int]]:
+        """
+        Ejecuta los tick_scripts de un item y guarda sus cambios y su tracking
+        en un commit.
+
+        Returns:
+            None si todo se guardó. Si un script se canceló por tiempo (o falló
+            la base de datos), la sesión ya no es fiable y no se guarda nada:
+            devuelve los índices de los scripts ejecutados, cuyo tracking debe
+            guardar el llamador en otra sesión para no repetirlos.
+        """
+        # Cada item parte de un estado recién leído de la base de datos.
+        session.expunge_all()
+        executed: List[int] = []
+        try:
+            item = await session.get(Item, item_id, options=[
                 selectinload(Item.room),
                 selectinload(Item.character).selectinload(Character.room)
-            )
+            ])
+            if item is None:
+                return None
 
-            result = await session.execute(query)
-            all_items = result.scalars().all()
+            for idx, tick_script in enumerate(item.prototype.get("tick_scripts", [])):
+                ran = await self._process_single_tick_script(
+                    session=session,
+                    item=item,
+                    tick_script=tick_script,
+                    script_index=idx,
+                    current_tick=current_tick
+                )
+                if ran:
+                    executed.append(idx)
 
-            # Filtrar items que tienen tick_scripts (en Python)
-            items_with_scripts = [
-                item for item in all_items
-                if item.prototype.get("tick_scripts")
-            ]
+            if script_service.session_timed_out(session):
+                logging.warning(f"Tick script cancelado en item {item_id}: se descartan sus cambios")
+                return executed
 
-            for item in items_with_scripts:
-                tick_scripts = item.prototype.get("tick_scripts", [])
+            for idx in executed:
+                self._mark_tick_executed(item, idx, current_tick)
+            await session.commit()
+            return None
 
-                for idx, tick_script in enumerate(tick_scripts):
-                    await self._process_single_tick_script(
-                        session=session,
-                        item=item,
-                        tick_script=tick_script,
-                        script_index=idx,
-                        current_tick=current_tick
-                    )
+        except Exception:
+            logging.exception(f"Error procesando tick_scripts del item {item_id} (pulse #{current_tick})")
+            return executed
 
+    async def _save_tick_tracking(
+        self,
+        session: AsyncSession,
+        item_id: int,
+        executed: List[int],
+        current_tick: int
+    ):
+        """Guarda solo el tracking de los tick_scripts ejecutados de un item."""
+        if not executed:
+            return
+        try:
+            item = await session.get(Item, item_id)
+            if item is None:
+                return
+            for idx in executed:
+                self._mark_tick_executed(item, idx, current_tick)
             await session.commit()
-
         except Exception:
-            logging.exception(f"Error en pulse tick #{current_tick}")
+            logging.exception(f"Error guardando el tracking de tick_scripts del item {item_id}")
+            await session.rollback()
 
     async def _process_single_tick_script(
         self,
@@ -176,9 +281,13 @@ class SchedulerService:
         tick_script: dict,
         script_index: int,
         current_tick: int
-    ):
+    ) -> bool:
         """
         Procesa un tick_script individual con formato tick-based.
+
+        Returns:
+            True si tocaba ejecutarlo en este tick (el llamador actualiza el
+            tracking con `_mark_tick_executed`).
         """
         interval_ticks = tick_script.get("interval_ticks")
         script_string = tick_script.get("script")
@@ -186,29 +295,22 @@ class SchedulerService:
         is_permanent = tick_script.get("permanent", True)
 
         if not interval_ticks or not script_string:
-            return
-
-        # Clave para tracking en tick_data
-        tracking_key = f"script_{script_index}"
-
-        # Inicializar tick_data si no existe
-        if item.tick_data is None:
-            item.tick_data = {}
+            return False
 
         # Obtener datos de tracking
-        script_tracking = item.tick_data.get(tracking_key, {})
+        script_tracking = (item.tick_data or {}).get(f"script_{script_index}", {})
         last_executed_tick = script_tracking.get("last_executed_tick", 0)
         has_executed = script_tracking.get("has_executed", False)
 
         # Si es one-shot y ya se ejecutó, saltar
         if not is_permanent and has_executed:
-            return
+            return False
 
         # Verificar si debe ejecutarse en este tick
         ticks_since_last = current_tick - last_executed_tick
 
         if ticks_since_last < interval_ticks:
-            return  # Aún no es momento de ejecutar
+            return False  # Aún no es momento de ejecutar
 
         # Determinar la sala de contexto
         room = None
@@ -218,7 +320,7 @@ class SchedulerService:
             room = item.character.room
 
         if not room:
-            return  # No hay contexto de sala
+            return False  # No hay contexto de sala
 
         # Obtener personajes en la sala
         char_ids_query = select(Character.id).where(Character.room_id == room.id)
@@ -248,11 +350,18 @@ class SchedulerService:
             await script_service.execute_script(
                 script_string=script_string,
                 session=session,
+                timeout_category="tick",
                 **context
             )
 
-        # Actualizar tracking
-        item.tick_data[tracking_key] = {
+        return True
+
+    def _mark_tick_executed(self, item: Item, script_index: int, current_tick: int):
+        """Guarda en tick_data que el tick_script se ejecutó en este tick."""
+        if item.tick_data is None:
+            item.tick_data = {}
+
+        item.tick_data[f"script_{script_index}"] = {
             "last_executed_tick": current_tick,
             "has_executed": True
         }
@@ -272,38 +381,60 @@ class SchedulerService:
         """
         try:
             async with async_session_factory() as session:
-                # Cargar items con scheduled_scripts
-                query = select(Item).where(
-                    Item.prototype['scheduled_scripts'].astext.is_not(None)
-                )
-                result = await session.execute(query)
-                items = result.scalars().all()
+                # Cargar items con scheduled_scripts (filtrando en Python:
+                # prototype es una propiedad, no una columna)
+                result = await session.execute(select(Item))
+                items = [item for item in result.scalars().all() if item.prototype.get("scheduled_scripts")]
 
                 new_cache = {}
 
                 for item in items:
                     scheduled_scripts = item.prototype.get("scheduled_scripts", [])
 
-                    for script_def in scheduled_scripts:
-                        if "schedule" in script_def:
-                            # Es un cron script
-                            cron_expr = script_def["schedule"]
-
-                            scheduled_script = ScheduledScript(
-                                script_string=script_def["script"],
-                                schedule_type=ScheduledScriptType.CRON,
-                                cron_expression=cron_expr,
-                                permanent=script_def.get("permanent", True),
-                                is_global=script_def.get("global", False),
-                                category=script_def.get("category", "ambient")
+                    for idx, script_def in enumerate(scheduled_scripts):
+                        # Una definición mal formada (ej: un "at" que no es ISO 8601) no
+                        # debe dejar sin recargar los scripts del resto de items.
+                        try:
+                            if "at" in script_def:
+                                # Es un timestamp script: se delega en la cola de retardos
+                                scheduled_script = ScheduledScript(
+                                    script_string=script_def["script"],
+                                    schedule_type=ScheduledScriptType.TIMESTAMP,
+                                    execute_at=datetime.fromisoformat(script_def["at"]),
+                                    permanent=False,
+                                    is_global=True,
+                                    category=script_def.get("category", "ambient")
+                                )
+                                context_ids = {"target": f"item:{item.id}"}
+                                if item.room_id:
+                                    context_ids["room"] = f"room:{item.room_id}"
+                                await self.schedule_timestamp_script(
+                                    scheduled_script, context_ids, job_id=f"timestamp:item_{item.id}:{idx}"
+                                )
+
+                            elif "schedule" in script_def:
+                                # Es un cron script
+                                cron_expr = script_def["schedule"]
+
+                                scheduled_script = ScheduledScript(
+                                    script_string=script_def["script"],
+                                    schedule_type=ScheduledScriptType.CRON,
+                                    cron_expression=cron_expr,
+                                    permanent=script_def.get("permanent", True),
+                                    is_global=script_def.get("global", False),
+                                    category=script_def.get("category", "ambient")
+                                )
+
+                                # Agregar al cache por entity_id
+                                entity_key = f"item_{item.id}"
+                                if entity_key not in new_cache:
+                                    new_cache[entity_key] = []
+                                new_cache[entity_key].append(scheduled_script)
+                        except Exception:
+                            logging.exception(
+                                f"scheduled_scripts[{idx}] del item {item.id} ('{item.key}') no es válido; se omite"
                             )
 
-                            # Agregar al cache por entity_id
-                            entity_key = f"item_{item.id}"
-                            if entity_key not in new_cache:
-                                new_cache[entity_key] = []
-                            new_cache[entity_key].append(scheduled_script)
-
                 # TODO: Cargar rooms con scheduled_scripts (futuro)
 
                 self._cron_scripts_cache = new_cache
@@ -312,6 +443,33 @@ class SchedulerService:
         except Exception:
             logging.exception("Error recargando cron scripts")
 
+    # =================== TIMESTAMP SCHEDULING ===================
+
+    async def schedule_timestamp_script(
+        self,
+        script: ScheduledScript,
+        context_ids: Dict[str, str],
+        job_id: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Programa un script TIMESTAMP en la cola de retardos.
+
+        Se ejecuta una sola vez con el contexto dado (como un script global).
+        Un timestamp ya pasado se ignora, de modo que recargar los prototipos
+        no vuelve a ejecutar scripts que ya vencieron.
+
+        Returns:
+            El ID del trabajo, o None si no se programó (pasado o ya pendiente).
+        """
+        execute_at = script.execute_at
+        if execute_at.tzinfo is None:
+            execute_at = execute_at.replace(tzinfo=timezone.utc)
+
+        if execute_at <= datetime.now(timezone.utc):
+            return None
+
+        return await delay_queue_service.schedule_at(execute_at, script.script_string, context_ids, job_id=job_id)
+
     async def _process_cron_scripts(self):
         """
         Procesa todos los cron scripts que deben ejecutarse en este minuto.
@@ -395,6 +553,7 @@ class SchedulerService:
                 await script_service.execute_script(
                     script_string=script.script_string,
                     session=session,
+                    timeout_category="cron",
                     target=entity,
                     room=getattr(entity, 'room', entity),
                     execution_time=execution_time
@@ -427,6 +586,7 @@ class SchedulerService:
                     await script_service.execute_script(
                         script_string=script.script_string,
                         session=session,
+                        timeout_category="cron",
                         target=entity,
                         room=room,
                         character=character,
@@ -14,6 +14,16 @@ Funciona con un sistema de registro:
 4.  El método `execute_script` se encarga de parsear el string, buscar la
     función en el registro y ejecutarla con el contexto adecuado.
 
+Cada script string se parsea y resuelve una sola vez (`compile_script`,
+cacheado por string). Los scripts de los prototipos se compilan y validan al
+arrancar (`validation_service.validate_script_strings`).
+
+Cada llamada tiene un tiempo máximo según su origen (evento, tick o cron) y
+el pulse reparte un presupuesto total entre sus scripts. Un script que falla
+o se pasa de tiempo repetidamente en una entidad se pausa con espera
+exponencial y, tras varios fallos seguidos, se desactiva (circuit breaker).
+Todo se configura en la sección [scripts] de gameconfig.toml.
+
 Características:
 - Enhanced parser con soporte de argumentos complejos (strings con espacios, listas)
 - Soporte de scripts globales con prefijo "global:"
@@ -21,14 +31,23 @@ Características:
 """
 
 import re
+import time
 import random
+import asyncio
 import logging
-import shlex
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Mapping
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.character import Character
 from src.models.item import Item
 from src.models.room import Room
+from src.config import settings
 from src.services import broadcaster_service
 
 
@@ -92,57 +111,120 @@ SCRIPT_REGISTRY = {
 # Lógica interna del servicio para interpretar y ejecutar los scripts.
 # ==============================================================================
 
-def _parse_script_string(script_string: str) -> tuple[str, dict]:
+# Una llamada de script: `nombre`, `nombre()` o `nombre(clave=valor, ...)`.
+_SCRIPT_CALL_RE = re.compile(r"([\w:]+)(?:\((.*)\))?", re.DOTALL)
+
+# Un argumento `clave=valor`. El valor puede ir entre comillas (y contener
+# espacios y comas), ser una lista `[a,b]` o un token sin espacios ni comas.
+_ARGUMENT_RE = re.compile(r"""(\w+)\s*=\s*("[^"]*"|'[^']*'|\[[^\]]*\]|[^\s,]+)""")
+
+# Lo que puede haber entre argumentos: espacios y comas.
+_ARGUMENT_SEPARATOR_RE = re.compile(r"[\s,]*")
+
+
+@dataclass(frozen=True)
+class ParsedScript:
     """
-    Parsea un string de script como 'nombre(clave=valor, ...)' y devuelve
-    el nombre de la función y un diccionario de argumentos.
+    Script string ya parseado y resuelto contra los registros.
 
-    Enhanced Parser:
-    - Soporta strings con espacios: script(msg="Hola mundo")
-    - Soporta booleanos: script(activo=true)
-    - Soporta números: script(cantidad=50)
-    - Soporta listas: script(items=[espada,escudo])
-    - Usa shlex para parsing robusto
+    Los prototipos usan un puñado de strings constantes que se ejecutan en
+    cada tick, evento y cron, así que cada string distinto se parsea una sola
+    vez (`compile_script`). Ejecutarlo es buscar el registro y llamar.
     """
-    # Detectar si es un script global (prefijo "global:")
-    is_global = script_string.startswith("global:")
-    if is_global:
-        script_string = script_string[7:]  # Remover "global:"
+    source: str
+    name: str
+    # Argumentos del script (solo lectura).
+    kwargs: Mapping[str, Any]
+    is_global: bool
+    # Función registrada, o None si no se encontró al compilar.
+    function: Callable | None
+    # Problemas detectados al compilar (argumentos mal formados, parámetros
+    # de un script global que faltan o no son del tipo esperado...).
+    errors: tuple[str, ...] = ()
+    # False si el string no tiene la forma de una llamada de script.
+    is_call: bool = True
+
+
+def _parse_arguments(args_str: str) -> tuple[dict, list[str]]:
+    """
+    Parsea los argumentos `clave=valor` de un script.
 
-    match = re.match(r"([\w:]+)\((.*)\)", script_string)
-    if not match:
-        # Si el script no tiene paréntesis, se asume que no tiene argumentos.
-        return (script_string, {}), is_global
+    Enhanced Parser:
+    - Separados por comas y/o espacios: script(a=1, b=2) o script(a=1 b=2)
+    - Strings entre comillas con espacios o comas: script(msg="Hola, mundo")
+    - Booleanos, números y listas sin comillas: script(activo=true, items=[espada,escudo])
 
-    name, args_str = match.groups()
+    Returns:
+        (kwargs, errores)
+    """
     kwargs = {}
+    errors = []
+    position = 0
+
+    for match in _ARGUMENT_RE.finditer(args_str):
+        leftover = args_str[position:match.start()]
+        if not _ARGUMENT_SEPARATOR_RE.fullmatch(leftover):
+            errors.append(f"argumento mal formado '{leftover.strip(' ,')}' (esperado clave=valor)")
+        position = match.end()
+
+        key, value = match.groups()
+        if value[0] in "\"'":
+            # Un valor entre comillas siempre es un string.
+            kwargs[key] = value[1:-1]
+        else:
+            kwargs[key] = _parse_value(value)
+
+    leftover = args_str[position:]
+    if not _ARGUMENT_SEPARATOR_RE.fullmatch(leftover):
+        errors.append(f"argumento mal formado '{leftover.strip(' ,')}' (esperado clave=valor)")
+
+    return kwargs, errors
 
-    if args_str:
-        try:
-            # Usar shlex para parsing robusto de argumentos
-            tokens = shlex.split(args_str, posix=False)
 
-            for token in tokens:
-                if '=' not in token:
-                    logging.warning(f"Argumento mal formado en '{script_string}': '{token}' (esperado clave=valor)")
-                    continue
+@lru_cache(maxsize=1024)
+def compile_script(script_string: str) -> ParsedScript:
+    """
+    Parsea un script string ('nombre(clave=valor, ...)', con prefijo
+    "global:" para scripts globales) y lo resuelve contra `SCRIPT_REGISTRY`
+    o `global_script_registry`. Cacheado por string.
 
-                key, value = token.split('=', 1)
-                key = key.strip()
-                value = value.strip()
+    Los parámetros de los scripts globales se validan aquí, una vez, contra
+    los tipos declarados en el registro.
+    """
+    from game_data.global_scripts import global_script_registry
 
-                # Remover comillas si existen
-                if (value.startswith('"') and value.endswith('"')) or \
-                   (value.startswith("'") and value.endswith("'")):
-                    value = value[1:-1]
+    # Detectar si es un script global (prefijo "global:")
+    is_global = script_string.startswith("global:")
+    body = script_string.removeprefix("global:").strip()
 
-                # Convertir tipos
-                kwargs[key] = _parse_value(value)
+    match = _SCRIPT_CALL_RE.fullmatch(body)
+    if not match:
+        # No es una llamada de script: no se puede resolver.
+        return ParsedScript(script_string, body, MappingProxyType({}), is_global, None, is_call=False)
 
-        except Exception as e:
-            logging.warning(f"Error parseando argumentos en '{script_string}': {e}")
+    name, args_str = match.groups()
+    kwargs, errors = _parse_arguments(args_str or "")
 
-    return (name, kwargs), is_global
+    function = None
+    if is_global:
+        script_def = global_script_registry.get(name)
+        if script_def is not None:
+            function = script_def.function
+            try:
+                global_script_registry.validate_params(name, kwargs)
+            except ValueError as e:
+                errors.append(str(e))
+    else:
+        function = SCRIPT_REGISTRY.get(name)
+
+    return ParsedScript(
+        source=script_string,
+        name=name,
+        kwargs=MappingProxyType(kwargs),
+        is_global=is_global,
+        function=function,
+        errors=tuple(errors),
+    )
 
 
 def _parse_value(value: str):
@@ -178,7 +260,13 @@ def _parse_value(value: str):
     return value
 
 
-async def execute_script(script_string: str, session: AsyncSession, **context):
+async def execute_script(
+    script_string: str,
+    session: AsyncSession,
+    *,
+    timeout_category: str = "event",
+    **context
+):
     """
     El corazón del motor de scripts. Parsea el string, busca la función en
     el registro (local o global) y la ejecuta con el contexto proporcionado.
@@ -187,12 +275,15 @@ async def execute_script(script_string: str, session: AsyncSession, **context):
     - Soporte de scripts globales con prefijo "global:"
     - Enhanced parser con argumentos complejos
     - Integración con global_script_registry
+    - Tiempo máximo por llamada según `timeout_category` ("event", "tick" o
+      "cron", ver [scripts] en gameconfig.toml) y presupuesto del pulse
 
     Args:
         script_string (str): El string del script a ejecutar
             - Local: "script_name(arg=val)"
             - Global: "global:script_name(arg=val)"
         session (AsyncSession): La sesión de base de datos activa.
+        timeout_category (str): Origen de la llamada, para elegir su tiempo máximo.
         **context: Un diccionario con las entidades relevantes al evento
                    (ej: `character`, `target`, `room`).
 
@@ -202,31 +293,262 @@ async def execute_script(script_string: str, session: AsyncSession, **context):
     if not script_string:
         return
 
-    (script_name, kwargs), is_global = _parse_script_string(script_string)
+    parsed = compile_script(script_string)
+    script_name = parsed.name
 
-    # Scripts globales
-    if is_global:
+    if parsed.errors:
+        logging.error(f"Script '{script_string}' no se ejecuta: {'; '.join(parsed.errors)}")
+        return None
+
+    if parsed.is_global and parsed.function is None:
+        # No estaba registrado al compilar: el registro lo valida y lanza
+        # ValueError si sigue sin existir.
         from game_data.global_scripts import global_script_registry
 
-        try:
-            result = await global_script_registry.execute(
+        def call():
+            return global_script_registry.execute(
                 name=script_name,
                 context={**context, "session": session},
-                params=kwargs
+                params=dict(parsed.kwargs)
             )
-            return result
-        except Exception:
-            logging.exception(f"Error ejecutando script global '{script_name}'")
+    else:
+        script_function = parsed.function or SCRIPT_REGISTRY.get(script_name)
+        if script_function is None:
+            logging.warning(f"Script desconocido: '{script_name}' (no está en SCRIPT_REGISTRY ni en global_script_registry)")
             return None
 
-    # Scripts locales
-    if script_name in SCRIPT_REGISTRY:
-        script_function = SCRIPT_REGISTRY[script_name]
+        def call():
+            return script_function(session=session, **context, **parsed.kwargs)
+
+    return await _run_guarded(parsed, context, call, timeout_category, session)
+
+
+# ==============================================================================
+# SECCIÓN 4: TIEMPOS MÁXIMOS Y PRESUPUESTO DEL PULSE
+#
+# Cada llamada a un script tiene un tiempo máximo según su origen (evento,
+# tick o cron). Además, el pulse fija un presupuesto total (`execution_budget`)
+# que comparten todos sus scripts: cuando se agota, los scripts restantes no
+# se ejecutan en ese pulse. Un script que supera su tiempo se cancela y
+# cuenta como un fallo para el circuit breaker.
+#
+# Un script cancelado pudo quedarse a mitad de una consulta, dejando su sesión
+# de base de datos inservible. La sesión queda marcada (`session_timed_out`)
+# para que quien la gestiona descarte sus cambios en lugar de hacer commit.
+# ==============================================================================
+
+# Clave en `session.info` que marca una sesión con un script cancelado.
+TIMED_OUT_SESSION_KEY = "script_timed_out"
+
+# Instante (time.monotonic) en que se agota el presupuesto en curso, si lo hay.
+_budget_deadline: ContextVar[float | None] = ContextVar("script_budget_deadline", default=None)
+
+# Scripts cancelados por tiempo y scripts omitidos por presupuesto agotado.
+_timeouts: Counter = Counter()
+_budget_skips: Counter = Counter()
+
+
+def get_script_timeout(timeout_category: str) -> float:
+    """Tiempo máximo (en segundos) de una llamada según su origen."""
+    return getattr(settings, f"scripts_timeout_{timeout_category}_seconds", settings.scripts_timeout_event_seconds)
+
+
+@contextmanager
+def execution_budget(seconds: float | None):
+    """
+    Limita el tiempo total de los scripts ejecutados dentro del bloque
+    (y de las tareas que se creen desde él). Con None, el bloque no tiene
+    presupuesto aunque lo haya fuera (ej: terminar un objeto ya empezado).
+
+    Ejemplo:
+        with script_service.execution_budget(settings.scripts_pulse_budget_seconds):
+            await procesar_tick_scripts()
+    """
+    token = _budget_deadline.set(time.monotonic() + seconds if seconds is not None else None)
+    try:
+        yield
+    finally:
+        _budget_deadline.reset(token)
+
+
+def budget_exhausted() -> bool:
+    """True si hay un presupuesto en curso y ya se agotó."""
+    deadline = _budget_deadline.get()
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def session_timed_out(session: AsyncSession) -> bool:
+    """True si un script ejecutado con esta sesión se canceló por tiempo."""
+    return bool(session.info.get(TIMED_OUT_SESSION_KEY))
+
+
+def get_timeout_stats() -> dict[str, dict[str, int]]:
+    """Cancelaciones por tiempo y omisiones por presupuesto, por script string."""
+    return {"timeouts": dict(_timeouts), "budget_skips": dict(_budget_skips)}
+
+
+def reset_timeout_stats():
+    """Reinicia los contadores de `get_timeout_stats`."""
+    _timeouts.clear()
+    _budget_skips.clear()
+
+
+async def _call_with_deadline(
+    parsed: ParsedScript,
+    call: Callable[[], Awaitable],
+    timeout_category: str,
+    session: AsyncSession
+):
+    """
+    Ejecuta la llamada con el menor de su tiempo máximo y lo que quede del
+    presupuesto. Lanza TimeoutError si se supera, tras marcar la sesión.
+    """
+    timeout = get_script_timeout(timeout_category)
+    deadline = _budget_deadline.get()
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+
+    try:
+        return await asyncio.wait_for(call(), timeout=max(timeout, 0))
+    except asyncio.TimeoutError:
+        _timeouts[parsed.source] += 1
+        if session is not None:
+            session.info[TIMED_OUT_SESSION_KEY] = True
+        raise TimeoutError(f"tiempo agotado ({timeout:.1f}s, {timeout_category})") from None
+
+
+# ==============================================================================
+# SECCIÓN 5: CIRCUIT BREAKER
+#
+# Un script roto en un objeto con ticker fallaría (y registraría un traceback)
+# en cada pulse. Los fallos se cuentan por (entidad, script): tras cada fallo
+# consecutivo el script espera un tiempo que se duplica y, tras
+# `scripts.breaker_max_failures` fallos seguidos, se desactiva hasta que un
+# administrador lo reactive (/scriptsfallidos, /reactivarscript).
+# ==============================================================================
+
+@dataclass
+class ScriptBreaker:
+    """Estado de los fallos de un script en una entidad concreta."""
+    entity_key: str          # "item:42", "room:3", "character:7" o "global"
+    entity_label: str        # Nombre legible de la entidad
+    script: str              # Script string que falla
+    consecutive_failures: int = 0
+    retry_at: float = 0.0    # time.monotonic() a partir del cual se reintenta
+    disabled: bool = False
+    last_error: str = ""
+
+    def allows(self, now: float) -> bool:
+        return not self.disabled and now >= self.retry_at
+
+
+# Breakers de la instancia del bot: (entity_key, script) -> estado.
+_breakers: dict[tuple[str, str], ScriptBreaker] = {}
+
+
+def _get_breaker_entity(context: dict) -> tuple[str, str]:
+    """Entidad a la que se atribuye la ejecución: objetivo, sala o personaje."""
+    for name in ("target", "room", "character"):
+        entity = context.get(name)
+        entity_id = getattr(entity, "id", None)
+        if entity_id is not None:
+            label = entity.get_name() if hasattr(entity, "get_name") else getattr(entity, "name", "")
+            return f"{type(entity).__name__.lower()}:{entity_id}", label or ""
+    return "global", ""
+
+
+def _record_failure(breaker: ScriptBreaker, error: Exception):
+    """Cuenta un fallo, calcula la espera exponencial y desactiva si se supera el límite."""
+    breaker.consecutive_failures += 1
+    breaker.last_error = f"{type(error).__name__}: {error}"
+
+    if breaker.consecutive_failures >= settings.scripts_breaker_max_failures:
+        breaker.disabled = True
+        logging.error(
+            f"Script '{breaker.script}' desactivado en {breaker.entity_key} tras "
+            f"{breaker.consecutive_failures} fallos seguidos. Usa /reactivarscript para reactivarlo."
+        )
+        return
+
+    backoff = min(
+        settings.scripts_breaker_base_backoff_seconds * 2 ** (breaker.consecutive_failures - 1),
+        settings.scripts_breaker_max_backoff_seconds,
+    )
+    breaker.retry_at = time.monotonic() + backoff
+    logging.warning(
+        f"Script '{breaker.script}' falló en {breaker.entity_key} "
+        f"({breaker.consecutive_failures} seguidos); se reintentará en {backoff:.0f}s."
+    )
+
+
+async def _run_guarded(
+    parsed: ParsedScript,
+    context: dict,
+    call: Callable[[], Awaitable],
+    timeout_category: str,
+    session: AsyncSession
+):
+    """
+    Ejecuta un script con su tiempo máximo, respetando el presupuesto en
+    curso y su circuit breaker.
+    """
+    scope = "global" if parsed.is_global else "local"
+
+    if budget_exhausted():
+        _budget_skips[parsed.source] += 1
+        logging.debug(f"Presupuesto agotado: se omite el script '{parsed.name}'")
+        return None
+
+    if not settings.scripts_breaker_enabled:
         try:
-            result = await script_function(session=session, **context, **kwargs)
-            return result
+            return await _call_with_deadline(parsed, call, timeout_category, session)
+        except TimeoutError as error:
+            logging.warning(f"Script {scope} '{parsed.name}' cancelado: {error}")
+            return None
         except Exception:
-            logging.exception(f"Error ejecutando script local '{script_name}'")
+            logging.exception(f"Error ejecutando script {scope} '{parsed.name}'")
             return None
-    else:
-        logging.warning(f"Script desconocido: '{script_name}' (no está en SCRIPT_REGISTRY ni en global_script_registry)")
\ No newline at end of file
+
+    entity_key, entity_label = _get_breaker_entity(context)
+    key = (entity_key, parsed.source)
+    breaker = _breakers.get(key)
+    if breaker is not None and not breaker.allows(time.monotonic()):
+        return None
+
+    try:
+        result = await _call_with_deadline(parsed, call, timeout_category, session)
+    except Exception as error:
+        if breaker is None:
+            # Primer fallo de la racha: el traceback completo, una sola vez.
+            if isinstance(error, TimeoutError):
+                logging.warning(f"Script {scope} '{parsed.name}' cancelado en {entity_key}: {error}")
+            else:
+                logging.exception(f"Error ejecutando script {scope} '{parsed.name}' en {entity_key}")
+            breaker = _breakers[key] = ScriptBreaker(entity_key, entity_label, parsed.source)
+        _record_failure(breaker, error)
+        return None
+
+    if breaker is not None:
+        # Un éxito cierra el circuito.
+        del _breakers[key]
+    return result
+
+
+def get_tripped_scripts() -> list[ScriptBreaker]:
+    """Scripts con fallos recientes (en espera o desactivados), los desactivados primero."""
+    return sorted(
+        _breakers.values(),
+        key=lambda breaker: (not breaker.disabled, breaker.entity_key, breaker.script),
+    )
+
+
+def reset_script_breaker(entity_key: str, script: str) -> bool:
+    """Reactiva un script en una entidad. Retorna False si no tenía fallos registrados."""
+    return _breakers.pop((entity_key, script), None) is not None
+
+
+def reset_all_script_breakers() -> int:
+    """Reactiva todos los scripts. Retorna cuántos había."""
+    count = len(_breakers)
+    _breakers.clear()
+    return count
@@ -12,10 +12,15 @@ Responsabilidades:
 5. Namespace por entidad para evitar colisiones.
 """
 
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import Any, Dict, Optional, Union
 from datetime import datetime, timedelta
 import logging
 import json
+import math
+import time
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.attributes import flag_modified
@@ -25,6 +30,97 @@ from src.models import Item, Room, Character
 from src.config import settings
 
 
+@dataclass(frozen=True)
+class TransientEntry:
+    """Valor transiente leído de Redis y su vencimiento (epoch, None = no expira)."""
+    value: Any
+    expires_at: Optional[float] = None
+
+    def is_expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+
+# Caché del comando en curso: (prefijo de entidad, clave) -> TransientEntry o
+# None (no existe). Ver `StateService.command_cache`.
+_command_cache: ContextVar[dict | None] = ContextVar("state_command_cache", default=None)
+
+# Función Lua común a los scripts del formato "hash": borra los campos
+# vencidos (Redis solo expira el hash entero) y ajusta la expiración del hash
+# al campo que más dura (PERSIST si alguno no expira). Recorre el hash entero,
+# que tiene pocos campos por entidad.
+_SWEEP_HASH_LUA = """
+local function sweep(key, now)
+    local fields = redis.call('HGETALL', key)
+    local latest = nil
+    local persistent = false
+    for i = 1, #fields, 2 do
+        local expires_at = cjson.decode(fields[i + 1])['e']
+        if expires_at == cjson.null then
+            persistent = true
+        elseif expires_at <= now then
+            redis.call('HDEL', key, fields[i])
+        elseif latest == nil or expires_at > latest then
+            latest = expires_at
+        end
+    end
+    if persistent then
+        redis.call('PERSIST', key)
+    elseif latest ~= nil then
+        redis.call('PEXPIRE', key, math.ceil((latest - now) * 1000))
+    end
+end
+"""
+
+# Escribe campos en el hash de una entidad (formato "hash") y limpia el hash.
+#
+# KEYS[1] = hash de la entidad
+# ARGV[1] = instante actual (epoch)
+# ARGV[2..] = campo, valor, campo, valor...
+SET_HASH_FIELDS_SCRIPT = _SWEEP_HASH_LUA + """
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+sweep(KEYS[1], tonumber(ARGV[1]))
+return 1
+"""
+
+# Adquiere un cooldown si no está activo (formato "keys"): SET NX + PTTL.
+#
+# KEYS[1] = clave del cooldown
+# ARGV[1] = valor (JSON)
+# ARGV[2] = duración en milisegundos
+# Devuelve {1, duración} si se adquirió, o {0, ms restantes (-1 = sin TTL)}.
+ACQUIRE_COOLDOWN_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return {1, tonumber(ARGV[2])}
+end
+return {0, redis.call('PTTL', KEYS[1])}
+"""
+
+# Igual que ACQUIRE_COOLDOWN_SCRIPT, pero sobre un campo del hash de la
+# entidad (formato "hash"), cuyo vencimiento va dentro del propio valor.
+#
+# KEYS[1] = hash de la entidad
+# ARGV[1] = campo del cooldown
+# ARGV[2] = valor nuevo ({"v": true, "e": vencimiento})
+# ARGV[3] = duración en milisegundos
+# ARGV[4] = instante actual (epoch)
+ACQUIRE_HASH_COOLDOWN_SCRIPT = _SWEEP_HASH_LUA + """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if raw then
+    local expires_at = cjson.decode(raw)['e']
+    if expires_at == cjson.null then
+        return {0, -1}
+    end
+    local remaining = (expires_at - tonumber(ARGV[4])) * 1000
+    if remaining > 0 then
+        return {0, math.ceil(remaining)}
+    end
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+sweep(KEYS[1], tonumber(ARGV[4]))
+return {1, tonumber(ARGV[3])}
+"""
+
+
 class StateService:
     """
     Gestiona estado para scripts de forma unificada.
@@ -39,6 +135,7 @@ class StateService:
        - Se pierde al reiniciar
        - Ideal para cooldowns, buffs temporales, flags
        - Soporte de TTL (expiración automática)
+       - Lecturas y escrituras múltiples en un round trip (get_many/set_many)
 
     Ejemplo de uso:
         # Estado persistente
@@ -66,6 +163,9 @@ class StateService:
             db=settings.redis_db,
             decode_responses=False  # Manejamos serialización manualmente
         )
+        self._set_hash_fields = self.redis_client.register_script(SET_HASH_FIELDS_SCRIPT)
+        self._acquire_cooldown = self.redis_client.register_script(ACQUIRE_COOLDOWN_SCRIPT)
+        self._acquire_hash_cooldown = self.redis_client.register_script(ACQUIRE_HASH_COOLDOWN_SCRIPT)
 
     # =================== ESTADO PERSISTENTE (PostgreSQL) ===================
 
@@ -173,6 +273,23 @@ class StateService:
         flag_modified(entity, "script_state")
 
     # =================== ESTADO TRANSIENTE (Redis) ===================
+    #
+    # Dos formatos de almacenamiento (`[state] transient_backend`):
+    # - "keys": una clave de Redis por valor (script_state:item:42:on_cooldown),
+    #   con el TTL nativo de Redis.
+    # - "hash": un hash por entidad (script_state:item:42) con un campo por
+    #   valor. Redis 6 no expira campos sueltos, así que cada campo guarda su
+    #   vencimiento junto al valor ({"v": valor, "e": epoch}) y un campo vencido
+    #   se trata como inexistente; el hash completo expira con el campo más largo.
+    #
+    # En ambos formatos, leer N valores de una entidad (`get_many`, o un
+    # cooldown más su TTL) es un único round trip. Dentro de un comando
+    # (`command_cache`), cada valor se lee de Redis como mucho una vez.
+
+    def _entity_prefix(self, entity: Union[Item, Room, Character]) -> str:
+        """Namespace de la entidad: script_state:{entity_type}:{entity_id}"""
+        entity_type = entity.__class__.__name__.lower()
+        return f"script_state:{entity_type}:{entity.id}"
 
     def _make_redis_key(
         self,
@@ -180,13 +297,177 @@ class StateService:
         key: str
     ) -> str:
         """
-        Genera clave de Redis con namespace por entidad.
+        Genera clave de Redis con namespace por entidad (formato "keys").
 
         Formato: script_state:{entity_type}:{entity_id}:{key}
         Ejemplo: script_state:item:42:on_cooldown
         """
-        entity_type = entity.__class__.__name__.lower()
-        return f"script_state:{entity_type}:{entity.id}:{key}"
+        return f"{self._entity_prefix(entity)}:{key}"
+
+    @contextmanager
+    def command_cache(self):
+        """
+        Caché de lectura del estado transiente para la duración de un comando.
+        Las escrituras del comando se reflejan en la caché, así que un script
+        ve sus propios cambios.
+
+        Ejemplo (dispatcher):
+            with state_service.command_cache():
+                await found_cmd.execute(character, session, message, args)
+        """
+        token = _command_cache.set({})
+        try:
+            yield
+        finally:
+            _command_cache.reset(token)
+
+    @contextmanager
+    def detached(self):
+        """
+        Sin caché de comando. Las tareas en segundo plano se crean dentro de
+        este bloque: `asyncio.create_task` copia el contexto, y la tarea
+        seguiría leyendo la caché del comando (valores ya viejos) después de
+        que este termine.
+
+        Ejemplo:
+            with state_service.detached():
+                task = asyncio.create_task(_run_side_effects(...))
+        """
+        token = _command_cache.set(None)
+        try:
+            yield
+        finally:
+            _command_cache.reset(token)
+
+    async def _fetch_entries(
+        self,
+        entity: Union[Item, Room, Character],
+        keys: list[str]
+    ) -> Dict[str, Optional[TransientEntry]]:
+        """Lee de Redis (un round trip) los valores y vencimientos de varias claves."""
+        now = time.time()
+        entries: Dict[str, Optional[TransientEntry]] = {}
+
+        if settings.state_transient_backend == "hash":
+            raw_values = await self.redis_client.hmget(self._entity_prefix(entity), keys)
+            for key, raw in zip(keys, raw_values):
+                if raw is None:
+                    entries[key] = None
+                    continue
+                envelope = json.loads(raw)
+                entries[key] = TransientEntry(envelope["v"], envelope["e"])
+            return entries
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                redis_key = self._make_redis_key(entity, key)
+                pipe.get(redis_key)
+                pipe.pttl(redis_key)
+            results = await pipe.execute()
+
+        for key, raw, pttl in zip(keys, results[::2], results[1::2]):
+            if raw is None:
+                entries[key] = None
+                continue
+            expires_at = now + pttl / 1000 if pttl > 0 else None
+            entries[key] = TransientEntry(json.loads(raw), expires_at)
+        return entries
+
+    async def _read_entries(
+        self,
+        entity: Union[Item, Room, Character],
+        keys: list[str]
+    ) -> Dict[str, Optional[TransientEntry]]:
+        """
+        Valores vigentes de varias claves (None = no existe o venció), usando
+        la caché del comando si la hay.
+        """
+        cache = _command_cache.get()
+        prefix = self._entity_prefix(entity)
+
+        missing = [key for key in keys if cache is None or (prefix, key) not in cache]
+        fetched = await self._fetch_entries(entity, missing) if missing else {}
+        if cache is not None:
+            cache.update({(prefix, key): entry for key, entry in fetched.items()})
+
+        now = time.time()
+        entries = {}
+        for key in keys:
+            entry = fetched[key] if key in fetched else cache[(prefix, key)]
+            entries[key] = entry if entry is not None and not entry.is_expired(now) else None
+        return entries
+
+    def _cache_write(self, entity: Union[Item, Room, Character], entries: Dict[str, Optional[TransientEntry]]):
+        """Refleja una escritura en la caché del comando, si la hay."""
+        cache = _command_cache.get()
+        if cache is not None:
+            prefix = self._entity_prefix(entity)
+            cache.update({(prefix, key): entry for key, entry in entries.items()})
+
+    async def get_many(
+        self,
+        entity: Union[Item, Room, Character],
+        keys: list[str],
+        default: Any = None
+    ) -> Dict[str, Any]:
+        """
+        Obtiene varios valores del estado transiente en un solo round trip.
+
+        Ejemplo:
+            state = await state_service.get_many(target, ["cargas", "activada"])
+
+        Returns:
+            Diccionario clave -> valor (o default si no existe)
+        """
+        try:
+            entries = await self._read_entries(entity, list(keys))
+        except Exception:
+            logging.exception(f"Error obteniendo estado transiente: {self._entity_prefix(entity)} {list(keys)}")
+            return {key: default for key in keys}
+
+        return {key: entry.value if entry is not None else default for key, entry in entries.items()}
+
+    async def set_many(
+        self,
+        entity: Union[Item, Room, Character],
+        values: Dict[str, Any],
+        ttl: Optional[timedelta] = None
+    ):
+        """
+        Establece varios valores del estado transiente en un solo round trip.
+
+        Args:
+            entity: Entidad (Item, Room, Character)
+            values: Diccionario clave -> valor (JSON-serializable)
+            ttl: Tiempo de vida común (opcional). Si se omite, no expiran.
+        """
+        if not values:
+            return
+
+        ttl_ms = int(ttl.total_seconds() * 1000) if ttl else 0
+        now = time.time()
+        expires_at = now + ttl_ms / 1000 if ttl_ms else None
+
+        try:
+            if settings.state_transient_backend == "hash":
+                fields = []
+                for key, value in values.items():
+                    fields.extend([key, json.dumps({"v": value, "e": expires_at})])
+                await self._set_hash_fields(keys=[self._entity_prefix(entity)], args=[repr(now), *fields])
+            else:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for key, value in values.items():
+                        pipe.set(self._make_redis_key(entity, key), json.dumps(value), px=ttl_ms or None)
+                    await pipe.execute()
+        except Exception:
+            logging.exception(f"Error estableciendo estado transiente: {self._entity_prefix(entity)} {list(values)}")
+            return
+
+        self._cache_write(entity, {key: TransientEntry(value, expires_at) for key, value in values.items()})
+        logging.debug(
+            f"Estado transiente actualizado: {entity.__class__.__name__}#{entity.id} "
+            f"{values} (TTL: {ttl})"
+        )
 
     async def get_transient(
         self,
@@ -205,21 +486,7 @@ class StateService:
         Returns:
             Valor almacenado o default
         """
-        redis_key = self._make_redis_key(entity, key)
-
-        try:
-            value_json = await self.redis_client.get(redis_key)
-
-            if value_json is None:
-                return default
-
-            # Deserializar JSON
-            value = json.loads(value_json)
-            return value
-
-        except Exception:
-            logging.exception(f"Error obteniendo estado transiente: {redis_key}")
-            return default
+        return (await self.get_many(entity, [key], default))[key]
 
     async def set_transient(
         self,
@@ -237,29 +504,7 @@ class StateService:
             value: Valor a almacenar (debe ser JSON-serializable)
             ttl: Tiempo de vida (opcional). Si se omite, no expira.
         """
-        redis_key = self._make_redis_key(entity, key)
-
-        try:
-            # Serializar a JSON
-            value_json = json.dumps(value)
-
-            # Establecer en Redis con TTL opcional
-            if ttl:
-                await self.redis_client.setex(
-                    redis_key,
-                    int(ttl.total_seconds()),
-                    value_json
-                )
-            else:
-                await self.redis_client.set(redis_key, value_json)
-
-            logging.debug(
-                f"Estado transiente actualizado: {entity.__class__.__name__}#{entity.id} "
-                f"[{key}] = {value} (TTL: {ttl})"
-            )
-
-        except Exception:
-            logging.exception(f"Error estableciendo estado transiente: {redis_key}")
+        await self.set_many(entity, {key: value}, ttl)
 
     async def delete_transient(
         self,
@@ -273,12 +518,16 @@ class StateService:
             entity: Entidad (Item, Room, Character)
             key: Clave a eliminar
         """
-        redis_key = self._make_redis_key(entity, key)
-
         try:
-            await self.redis_client.delete(redis_key)
+            if settings.state_transient_backend == "hash":
+                await self.redis_client.hdel(self._entity_prefix(entity), key)
+            else:
+                await self.redis_client.delete(self._make_redis_key(entity, key))
         except Exception:
-            logging.exception(f"Error eliminando estado transiente: {redis_key}")
+            logging.exception(f"Error eliminando estado transiente: {self._make_redis_key(entity, key)}")
+            return
+
+        self._cache_write(entity, {key: None})
 
     async def exists_transient(
         self,
@@ -293,14 +542,12 @@ class StateService:
         Returns:
             True si la clave existe (y no ha expirado)
         """
-        redis_key = self._make_redis_key(entity, key)
-
         try:
-            exists = await self.redis_client.exists(redis_key)
-            return bool(exists)
+            entries = await self._read_entries(entity, [key])
         except Exception:
-            logging.exception(f"Error verificando existencia transiente: {redis_key}")
+            logging.exception(f"Error verificando existencia transiente: {self._make_redis_key(entity, key)}")
             return False
+        return entries[key] is not None
 
     async def get_ttl(
         self,
@@ -313,21 +560,16 @@ class StateService:
         Returns:
             Segundos restantes, o None si no existe o no tiene TTL
         """
-        redis_key = self._make_redis_key(entity, key)
-
         try:
-            ttl = await self.redis_client.ttl(redis_key)
-
-            # -2 = no existe, -1 = sin expiración
-            if ttl == -2 or ttl == -1:
-                return None
-
-            return ttl
-
+            entry = (await self._read_entries(entity, [key]))[key]
         except Exception:
-            logging.exception(f"Error obteniendo TTL: {redis_key}")
+            logging.exception(f"Error obteniendo TTL: {self._make_redis_key(entity, key)}")
             return None
 
+        if entry is None or entry.expires_at is None:
+            return None
+        return max(math.ceil(entry.expires_at - time.time()), 1)
+
     # =================== UTILIDADES ===================
 
     async def increment_persistent(
@@ -435,6 +677,54 @@ class StateService:
         """
         return await self.get_ttl(entity, f"cooldown_{cooldown_name}")
 
+    async def try_acquire_cooldown(
+        self,
+        entity: Union[Item, Room, Character],
+        cooldown_name: str,
+        duration: timedelta
+    ) -> tuple[bool, Optional[int]]:
+        """
+        Comprueba y establece un cooldown en una sola operación atómica (un
+        script Lua en Redis). A diferencia de is_on_cooldown() + set_cooldown(),
+        dos comandos simultáneos nunca pueden adquirirlo a la vez.
+
+        Ejemplo:
+            acquired, remaining = await state_service.try_acquire_cooldown(
+                target, 'rezar', timedelta(minutes=5)
+            )
+            if not acquired:
+                await context.send_message(character, f"Espera {remaining}s.")
+                return
+
+        Returns:
+            (True, duración en segundos) si se adquirió, o (False, segundos
+            restantes del cooldown activo; None si no tiene TTL).
+        """
+        key = f"cooldown_{cooldown_name}"
+        ttl_ms = max(int(duration.total_seconds() * 1000), 1)
+        now = time.time()
+
+        try:
+            if settings.state_transient_backend == "hash":
+                acquired, remaining_ms = await self._acquire_hash_cooldown(
+                    keys=[self._entity_prefix(entity)],
+                    args=[key, json.dumps({"v": True, "e": now + ttl_ms / 1000}), ttl_ms, repr(now)]
+                )
+            else:
+                acquired, remaining_ms = await self._acquire_cooldown(
+                    keys=[self._make_redis_key(entity, key)],
+                    args=[json.dumps(True), ttl_ms]
+                )
+        except Exception:
+            # Igual que is_on_cooldown(): si Redis falla, no se bloquea al jugador.
+            logging.exception(f"Error adquiriendo cooldown: {self._make_redis_key(entity, key)}")
+            return True, math.ceil(ttl_ms / 1000)
+
+        expires_at = now + remaining_ms / 1000 if remaining_ms >= 0 else None
+        self._cache_write(entity, {key: TransientEntry(True, expires_at)})
+        remaining = math.ceil(remaining_ms / 1000) if remaining_ms >= 0 else None
+        return bool(acquired), remaining
+
 
 # Instancia singleton
 state_service = StateService()
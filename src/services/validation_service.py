@@ -16,7 +16,9 @@ El sistema valida:
 1. Unicidad de aliases de comandos (incluyendo canales dinámicos)
 2. Unicidad de keys en prototipos de salas (rooms)
 3. Unicidad de keys en prototipos de items
-4. Más validaciones según sea necesario
+4. Lock strings de comandos y prototipos (se compilan y quedan cacheados)
+5. Script strings de prototipos contra los registros de scripts (ídem)
+6. Más validaciones según sea necesario
 
 Uso:
     from src.services import validation_service
@@ -146,19 +148,141 @@ def validate_channel_prototype_keys() -> List[str]:
     return errors
 
 
-def validate_all() -> None:
+def _collect_lock_strings() -> List[Tuple[str, str]]:
     """
-    Ejecuta todas las validaciones del sistema.
+    Recopila todos los lock strings del juego: comandos, salidas de salas,
+    objetos (simples o contextuales) y canales (lock y audiencia).
 
-    Si se detecta algún error, lanza una ValidationError con todos los mensajes.
-    Esta función debe ser llamada durante el arranque de la aplicación, antes
-    de iniciar el bot.
+    Returns:
+        Lista de tuplas (origen, lock_string), ej: ("item 'cofre' (open)", "tiene_objeto(llave)").
+    """
+    from src.handlers.player.dispatcher import COMMAND_SETS
 
-    Raises:
-        ValidationError: Si se detecta cualquier problema de validación.
+    locks = []
+
+    for set_name, commands in COMMAND_SETS.items():
+        for cmd in commands:
+            locks.append((f"comando '{set_name}.{cmd.names[0]}'", cmd.lock))
+
+    for room_key, room_data in ROOM_PROTOTYPES.items():
+        for direction, exit_data in room_data.get("exits", {}).items():
+            if isinstance(exit_data, dict):
+                locks.append((f"salida '{direction}' de la sala '{room_key}'", exit_data.get("locks", "")))
+
+    for item_key, item_data in ITEM_PROTOTYPES.items():
+        item_locks = item_data.get("locks", "")
+        if isinstance(item_locks, dict):
+            for access_type, lock_string in item_locks.items():
+                locks.append((f"item '{item_key}' ({access_type})", lock_string))
+        else:
+            locks.append((f"item '{item_key}'", item_locks))
+
+    for channel_key, channel_data in CHANNEL_PROTOTYPES.items():
+        locks.append((f"canal '{channel_key}' (lock)", channel_data.get("lock", "")))
+        locks.append((f"canal '{channel_key}' (audience)", channel_data.get("audience", "")))
+
+    return [(source, lock_string) for source, lock_string in locks if lock_string]
+
+
+def validate_lock_strings() -> List[str]:
     """
-    logging.info("🔍 Ejecutando validaciones de integridad del motor...")
+    Compila todos los lock strings del juego. Además de detectar errores al
+    arrancar, deja los locks compilados en la caché de `permission_service`.
+
+    Returns:
+        Lista de mensajes de error. Vacía si no hay problemas.
+    """
+    from src.services import permission_service
+
+    errors = []
+
+    for source, lock_string in _collect_lock_strings():
+        try:
+            compiled = permission_service.compile_lock(lock_string)
+        except SyntaxError:
+            errors.append(f"❌ Lock con sintaxis inválida en {source}: '{lock_string}'")
+            continue
+        except TypeError as e:
+            errors.append(f"❌ Lock no permitido en {source}: '{lock_string}' ({e})")
+            continue
+
+        if compiled.unknown_functions:
+            unknown = ", ".join(compiled.unknown_functions)
+            errors.append(f"❌ Lock con funciones desconocidas en {source}: '{lock_string}' ({unknown})")
+
+    return errors
+
+
+def _collect_script_strings() -> List[Tuple[str, str]]:
+    """
+    Recopila todos los script strings de los prototipos de salas y objetos:
+    scripts de eventos (simples o en lista), `tick_scripts` y `scheduled_scripts`.
+
+    Returns:
+        Lista de tuplas (origen, script_string), ej: ("item 'pocion' (after_on_use)", "global:curar_personaje(...)").
+    """
+    scripts = []
+
+    for kind, prototypes in (("sala", ROOM_PROTOTYPES), ("item", ITEM_PROTOTYPES)):
+        for key, data in prototypes.items():
+            for event_name, event_scripts in data.get("scripts", {}).items():
+                entries = event_scripts if isinstance(event_scripts, list) else [event_scripts]
+                for entry in entries:
+                    script_string = entry.get("script") if isinstance(entry, dict) else entry
+                    scripts.append((f"{kind} '{key}' ({event_name})", script_string))
+
+            for field in ("tick_scripts", "scheduled_scripts"):
+                for entry in data.get(field, []):
+                    scripts.append((f"{kind} '{key}' ({field})", entry.get("script")))
+
+    return [(source, script_string) for source, script_string in scripts if script_string]
 
+
+def validate_script_strings() -> List[str]:
+    """
+    Compila todos los script strings de los prototipos contra `SCRIPT_REGISTRY`
+    y `global_script_registry` (que debe estar ya registrado), validando los
+    tipos de los parámetros de los scripts globales. Los scripts quedan en la
+    caché de `script_service`.
+
+    Returns:
+        Lista de mensajes de error. Vacía si no hay problemas.
+    """
+    from src.services import script_service
+
+    # Compilar desde cero: una compilación previa al registro de los scripts
+    # globales no los habría encontrado.
+    script_service.compile_script.cache_clear()
+
+    errors = []
+
+    for source, script_string in _collect_script_strings():
+        parsed = script_service.compile_script(script_string)
+
+        if not parsed.is_call:
+            logging.warning(f"⚠️  El script de {source} no es una llamada a un script registrado; se ignorará.")
+            continue
+
+        if parsed.function is None:
+            registry = "global_script_registry" if parsed.is_global else "SCRIPT_REGISTRY"
+            errors.append(f"❌ Script desconocido en {source}: '{parsed.name}' (no está en {registry})")
+            continue
+
+        for error in parsed.errors:
+            errors.append(f"❌ Script inválido en {source}: {error}")
+
+    return errors
+
+
+def collect_errors() -> List[str]:
+    """
+    Ejecuta todas las validaciones y devuelve sus errores sin lanzar
+    excepciones. La usan `validate_all`, el reporte de `/validar` y
+    `reload_service` (para descartar una recarga con errores).
+
+    Returns:
+        Lista de mensajes de error. Vacía si no hay problemas.
+    """
     all_errors = []
 
     # Validación 1: Aliases de comandos
@@ -173,6 +297,30 @@ def validate_all() -> None:
     # Validación 4: Keys de prototipos de canales
     all_errors.extend(validate_channel_prototype_keys())
 
+    # Validación 5: Lock strings (compilados y cacheados)
+    all_errors.extend(validate_lock_strings())
+
+    # Validación 6: Script strings de prototipos (compilados y cacheados)
+    all_errors.extend(validate_script_strings())
+
+    return all_errors
+
+
+def validate_all() -> None:
+    """
+    Ejecuta todas las validaciones del sistema.
+
+    Si se detecta algún error, lanza una ValidationError con todos los mensajes.
+    Esta función debe ser llamada durante el arranque de la aplicación, antes
+    de iniciar el bot.
+
+    Raises:
+        ValidationError: Si se detecta cualquier problema de validación.
+    """
+    logging.info("🔍 Ejecutando validaciones de integridad del motor...")
+
+    all_errors = collect_errors()
+
     if all_errors:
         error_message = "\n".join([
             "\n⚠️  ERRORES DE VALIDACIÓN DETECTADOS ⚠️",
@@ -197,11 +345,7 @@ def get_validation_report() -> str:
     """
     lines = ["=== REPORTE DE VALIDACIÓN ===\n"]
 
-    errors = []
-    errors.extend(validate_command_aliases())
-    errors.extend(validate_room_prototype_keys())
-    errors.extend(validate_item_prototype_keys())
-    errors.extend(validate_channel_prototype_keys())
+    errors = collect_errors()
 
     if errors:
         lines.append("❌ ERRORES ENCONTRADOS:\n")
@@ -220,5 +364,7 @@ def get_validation_report() -> str:
     lines.append(f"  • Prototipos de salas: {room_count}")
     lines.append(f"  • Prototipos de items: {item_count}")
     lines.append(f"  • Prototipos de canales: {channel_count}")
+    lines.append(f"  • Lock strings: {len(_collect_lock_strings())}")
+    lines.append(f"  • Script strings: {len(_collect_script_strings())}")
 
     return "\n".join(lines)
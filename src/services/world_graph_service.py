@@ -0,0 +1,363 @@
+# src/services/world_graph_service.py
+"""
+Módulo de Servicio del Grafo del Mundo.
+
+Las salas y salidas son contenido estático: solo las crea o modifica
+`world_loader_service` al sincronizar `ROOM_PROTOTYPES`. Aun así, cada comando
+cargaba `Room.exits_from -> Exit.to_room` desde la base de datos y buscaba la
+salida recorriendo una lista.
+
+Este servicio construye, después de cada sincronización, un `WorldGraph`
+inmutable con:
+- Salas por ID y el índice key -> ID.
+- Nombre, descripción y prototipo de cada sala.
+- Salidas de cada sala, ordenadas por nombre e indexadas por dirección.
+- Los locks de las salidas, ya compilados y validados.
+
+Los lectores (movimiento, teclado de navegación, `format_room`) consultan el
+grafo sin ninguna consulta a la base de datos. Al re-sincronizar, se construye
+un grafo nuevo y se sustituye de una sola vez: un lector nunca ve un grafo a
+medio construir.
+
+Consultas espaciales:
+- `find_path`: camino más corto (BFS) entre dos salas, opcionalmente
+  respetando los locks de las salidas para un personaje.
+- `get_distances`: tabla sala -> distancia alrededor de una sala, cacheada
+  (LRU) hasta la próxima reconstrucción del grafo.
+- `get_random_room`: sala aleatoria en O(1), sin consultas.
+
+Uso:
+    graph = world_graph_service.get_world_graph()
+    exit_obj = graph.get_exit(character.room_id, "norte")
+"""
+
+import logging
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import Room, Exit
+from src.services import permission_service
+from game_data.room_prototypes import ROOM_PROTOTYPES
+
+
+# ==============================================================================
+# ESTRUCTURAS DEL GRAFO
+# ==============================================================================
+
+@dataclass(frozen=True)
+class GraphExit:
+    """Salida unidireccional entre dos salas."""
+    name: str
+    from_room_id: int
+    to_room_id: int
+    to_room_name: str
+    locks: str = ""
+
+
+@dataclass(frozen=True)
+class GraphRoom:
+    """Sala del grafo con sus salidas ordenadas por nombre."""
+    id: int
+    key: str | None
+    name: str
+    description: str
+    exits: tuple[GraphExit, ...] = ()
+    exits_by_name: Mapping[str, GraphExit] = field(default_factory=lambda: MappingProxyType({}))
+
+    @property
+    def prototype(self) -> dict:
+        """Prototipo de la sala en `game_data` (vacío si no tiene key)."""
+        if not self.key:
+            return {}
+        return ROOM_PROTOTYPES.get(self.key, {})
+
+
+@dataclass(frozen=True)
+class WorldGraph:
+    """Instantánea inmutable de todas las salas y salidas del mundo."""
+    rooms: Mapping[int, GraphRoom] = field(default_factory=lambda: MappingProxyType({}))
+    room_ids_by_key: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))
+    # Relaciones del personaje que necesitan los locks de todas las salidas
+    # (ver `permission_service.get_lock_relations`). None si alguno no se
+    # puede analizar y hay que cargar el grafo completo.
+    exit_lock_relations: frozenset[str] | None = frozenset()
+    # IDs de todas las salas, para muestrear una al azar en O(1).
+    room_ids: tuple[int, ...] = ()
+
+    def get_room(self, room_id: int) -> GraphRoom | None:
+        """Devuelve la sala con ese ID, o None si no existe."""
+        return self.rooms.get(room_id)
+
+    def get_room_id(self, key: str) -> int | None:
+        """Devuelve el ID de la sala con esa key de prototipo."""
+        return self.room_ids_by_key.get(key)
+
+    def get_exits(self, room_id: int) -> tuple[GraphExit, ...]:
+        """Devuelve las salidas de una sala, ordenadas por nombre."""
+        room = self.rooms.get(room_id)
+        return room.exits if room else ()
+
+    def get_exit(self, room_id: int, direction: str) -> GraphExit | None:
+        """Devuelve la salida de una sala en una dirección, o None si no existe."""
+        room = self.rooms.get(room_id)
+        if not room:
+            return None
+        return room.exits_by_name.get(direction.lower())
+
+
+# Grafo vigente. Se sustituye entero en cada reconstrucción.
+_world_graph = WorldGraph()
+
+
+# ==============================================================================
+# CONSTRUCCIÓN
+# ==============================================================================
+
+def _compile_exit_lock(exit_obj: Exit, room_key: str | None) -> str:
+    """
+    Compila el lock de una salida para que su evaluación no tenga que hacerlo
+    (queda en la caché de `permission_service.compile_lock`).
+
+    Un lock con errores de sintaxis se conserva tal cual: `can_execute` lo
+    rechazará al evaluarlo, así que la salida queda bloqueada.
+    """
+    if not exit_obj.locks:
+        return ""
+    try:
+        permission_service.compile_lock(exit_obj.locks)
+    except (SyntaxError, TypeError):
+        logging.error(
+            f"  -> Lock inválido en la salida '{exit_obj.name}' de la sala '{room_key}': "
+            f"'{exit_obj.locks}'. La salida quedará bloqueada."
+        )
+    return exit_obj.locks
+
+
+def _collect_lock_relations(rooms) -> frozenset[str] | None:
+    """Une las relaciones que necesitan los locks de todas las salidas."""
+    relations = set()
+    for room in rooms:
+        for exit_obj in room.exits:
+            exit_relations = permission_service.get_lock_relations(exit_obj.locks)
+            if exit_relations is None:
+                return None
+            relations |= exit_relations
+    return frozenset(relations)
+
+
+def build_world_graph(rooms: list[Room], exits: list[Exit]) -> WorldGraph:
+    """
+    Construye un grafo inmutable a partir de las filas de salas y salidas.
+
+    Args:
+        rooms: Todas las salas (solo se leen columnas, no relaciones).
+        exits: Todas las salidas.
+    """
+    rooms_by_id = {room.id: room for room in rooms}
+    exits_by_room: dict[int, list[GraphExit]] = {room.id: [] for room in rooms}
+
+    for exit_obj in exits:
+        origin = rooms_by_id.get(exit_obj.from_room_id)
+        destination = rooms_by_id.get(exit_obj.to_room_id)
+        if not origin or not destination:
+            logging.warning(f"  -> Salida '{exit_obj.name}' (ID {exit_obj.id}) con sala inexistente. Se ignora.")
+            continue
+
+        exits_by_room[origin.id].append(GraphExit(
+            name=exit_obj.name.lower(),
+            from_room_id=origin.id,
+            to_room_id=destination.id,
+            to_room_name=destination.name,
+            locks=_compile_exit_lock(exit_obj, origin.key),
+        ))
+
+    graph_rooms = {}
+    for room in rooms:
+        room_exits = tuple(sorted(exits_by_room[room.id], key=lambda e: e.name))
+        graph_rooms[room.id] = GraphRoom(
+            id=room.id,
+            key=room.key,
+            name=room.name,
+            description=room.description,
+            exits=room_exits,
+            exits_by_name=MappingProxyType({e.name: e for e in room_exits}),
+        )
+
+    return WorldGraph(
+        rooms=MappingProxyType(graph_rooms),
+        room_ids_by_key=MappingProxyType({room.key: room.id for room in rooms if room.key}),
+        exit_lock_relations=_collect_lock_relations(graph_rooms.values()),
+        room_ids=tuple(graph_rooms),
+    )
+
+
+async def rebuild_world_graph(session: AsyncSession) -> WorldGraph:
+    """
+    Lee salas y salidas de la base de datos (dos consultas), construye un grafo
+    nuevo y lo publica. Se llama al final de `sync_world_from_prototypes`.
+    """
+    global _world_graph
+
+    rooms = (await session.execute(select(Room))).scalars().all()
+    exits = (await session.execute(select(Exit))).scalars().all()
+
+    graph = build_world_graph(list(rooms), list(exits))
+    _world_graph = graph
+    _distances_from.cache_clear()
+
+    logging.info(f"  -> Grafo del mundo construido: {len(graph.rooms)} salas, {len(exits)} salidas.")
+    return graph
+
+
+def get_world_graph() -> WorldGraph:
+    """Devuelve el grafo vigente. Nunca se modifica: es seguro guardarlo en una variable."""
+    return _world_graph
+
+
+def set_world_graph(graph: WorldGraph) -> None:
+    """Publica un grafo ya construido (usado en tests)."""
+    global _world_graph
+    _world_graph = graph
+    _distances_from.cache_clear()
+
+
+# ==============================================================================
+# CONSULTAS ESPACIALES
+# ==============================================================================
+# El grafo no tiene coordenadas ni pesos (todas las salidas cuestan un paso),
+# así que BFS ya da el camino más corto; A* no aportaría nada sin una heurística.
+
+def find_room(query: str) -> GraphRoom | None:
+    """
+    Busca una sala por ID, key de prototipo o nombre (sin distinguir
+    mayúsculas). Si varias salas comparten nombre, devuelve la de menor ID.
+    """
+    graph = _world_graph
+    query = query.strip()
+    if query.isdigit():
+        return graph.get_room(int(query))
+
+    room_id = graph.get_room_id(query)
+    if room_id is not None:
+        return graph.get_room(room_id)
+
+    name = query.lower()
+    matches = [room for room in graph.rooms.values() if room.name.lower() == name]
+    return min(matches, key=lambda room: room.id) if matches else None
+
+
+async def get_passable_locks(character) -> frozenset[str]:
+    """
+    Evalúa, una sola vez cada uno, los locks distintos de las salidas del
+    mundo para un personaje. Devuelve los que puede atravesar.
+    """
+    lock_strings = {
+        exit_obj.locks
+        for room in _world_graph.rooms.values()
+        for exit_obj in room.exits
+        if exit_obj.locks
+    }
+    passable = set()
+    for lock_string in lock_strings:
+        can_pass, _ = await permission_service.can_execute(character, lock_string, access_type="traverse")
+        if can_pass:
+            passable.add(lock_string)
+    return frozenset(passable)
+
+
+def find_path(
+    from_room_id: int,
+    to_room_id: int,
+    passable_locks: frozenset[str] | None = None,
+    max_depth: int | None = None
+) -> tuple[GraphExit, ...] | None:
+    """
+    Camino más corto entre dos salas (BFS sobre el grafo vigente).
+
+    Args:
+        from_room_id: Sala de origen.
+        to_room_id: Sala de destino.
+        passable_locks: Locks que se pueden atravesar (ver `get_passable_locks`).
+                        None ignora los locks (ej: scripts y administradores).
+        max_depth: Máximo de pasos a explorar. None = sin límite.
+
+    Returns:
+        Las salidas a recorrer, en orden (vacío si origen y destino coinciden),
+        o None si no hay camino.
+    """
+    graph = _world_graph
+    if from_room_id not in graph.rooms or to_room_id not in graph.rooms:
+        return None
+    if from_room_id == to_room_id:
+        return ()
+
+    came_from: dict[int, GraphExit | None] = {from_room_id: None}
+    queue = deque([(from_room_id, 0)])
+    while queue:
+        room_id, depth = queue.popleft()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for exit_obj in graph.get_exits(room_id):
+            if exit_obj.to_room_id in came_from:
+                continue
+            if exit_obj.locks and passable_locks is not None and exit_obj.locks not in passable_locks:
+                continue
+            came_from[exit_obj.to_room_id] = exit_obj
+            if exit_obj.to_room_id == to_room_id:
+                return _rebuild_path(came_from, to_room_id)
+            queue.append((exit_obj.to_room_id, depth + 1))
+    return None
+
+
+def _rebuild_path(came_from: dict[int, GraphExit | None], to_room_id: int) -> tuple[GraphExit, ...]:
+    """Reconstruye el camino de BFS desde el destino hacia el origen."""
+    path = []
+    step = came_from[to_room_id]
+    while step is not None:
+        path.append(step)
+        step = came_from[step.from_room_id]
+    return tuple(reversed(path))
+
+
+@lru_cache(maxsize=1024)
+def _distances_from(room_id: int, max_depth: int) -> Mapping[int, int]:
+    """BFS sin locks desde una sala. Cacheada hasta que se publica otro grafo."""
+    graph = _world_graph
+    if room_id not in graph.rooms:
+        return MappingProxyType({})
+
+    distances = {room_id: 0}
+    queue = deque([room_id])
+    while queue:
+        current = queue.popleft()
+        depth = distances[current]
+        if depth >= max_depth:
+            continue
+        for exit_obj in graph.get_exits(current):
+            if exit_obj.to_room_id not in distances:
+                distances[exit_obj.to_room_id] = depth + 1
+                queue.append(exit_obj.to_room_id)
+    return MappingProxyType(distances)
+
+
+def get_distances(room_id: int, max_depth: int) -> Mapping[int, int]:
+    """
+    Tabla sala -> distancia (en pasos) de las salas a `max_depth` pasos o
+    menos de `room_id`, siguiendo las salidas sin tener en cuenta sus locks.
+    Incluye la propia sala con distancia 0.
+    """
+    return _distances_from(room_id, max_depth)
+
+
+def get_random_room() -> GraphRoom | None:
+    """Devuelve una sala al azar (O(1), sin consultas), o None si no hay salas."""
+    graph = _world_graph
+    if not graph.room_ids:
+        return None
+    return graph.rooms[random.choice(graph.room_ids)]
@@ -17,6 +17,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from src.models import Room, Exit, Item
+from src.services import world_graph_service
 from game_data.room_prototypes import ROOM_PROTOTYPES
 from game_data.item_prototypes import ITEM_PROTOTYPES
 
@@ -91,6 +92,7 @@ async def sync_world_from_prototypes(session: AsyncSession):
        aplicando los `locks` correspondientes. Todas las salidas deben estar
        explícitamente definidas en ambas direcciones en los prototipos.
     4. Sincroniza los fixtures (objetos de ambiente) de cada sala.
+    5. Reconstruye el grafo del mundo en memoria (`world_graph_service`).
     """
     logging.info("Sincronizando el mundo estático desde los prototipos...")
     try:
@@ -152,6 +154,9 @@ async def sync_world_from_prototypes(session: AsyncSession):
         await _sync_room_fixtures(session, room_key_to_id_map)
 
         await session.commit()
+
+        # --- PASO 5: Publicar el Grafo del Mundo ---
+        await world_graph_service.rebuild_world_graph(session)
         logging.info("¡Sincronización del mundo completada!")
     except Exception:
         logging.exception("Error fatal durante la sincronización del mundo.")
@@ -21,6 +21,7 @@ Responsabilidades:
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from typing import List, Dict, Any, Optional
 from src.models import Room
+from src.services import world_graph_service
 from src.templates import get_direction_icon
 
 
@@ -119,8 +120,11 @@ def create_room_navigation_keyboard(room: Room) -> Optional[InlineKeyboardMarkup
     Cada botón ejecuta el comando de movimiento correspondiente cuando se presiona.
     Los botones incluyen el ícono de dirección para mejor UX.
 
+    Las salidas se leen del grafo del mundo, por lo que no hace falta que la
+    sala tenga cargada la relación `exits_from`.
+
     Args:
-        room: Objeto Room con las salidas cargadas (room.exits_from)
+        room: Objeto Room (solo se usa su `id`)
 
     Returns:
         InlineKeyboardMarkup o None: Teclado con botones de salidas, o None si no hay salidas
@@ -129,16 +133,15 @@ def create_room_navigation_keyboard(room: Room) -> Optional[InlineKeyboardMarkup
         Si la sala tiene salidas "norte" y "sur":
         [ ⬆️ Norte ] [ ⬇️ Sur ]
     """
-    if not room.exits_from:
+    # Las salidas del grafo ya están ordenadas alfabéticamente
+    exits = world_graph_service.get_world_graph().get_exits(room.id)
+    if not exits:
         return None
 
     keyboard = InlineKeyboardMarkup(row_width=2)
     buttons = []
 
-    # Ordenar salidas alfabéticamente para consistencia
-    sorted_exits = sorted(room.exits_from, key=lambda e: e.name)
-
-    for exit in sorted_exits:
+    for exit in exits:
         # Obtener ícono de dirección
         icon = get_direction_icon(exit.name)
         direction_name = exit.name.capitalize()
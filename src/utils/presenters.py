@@ -23,7 +23,7 @@ from src.models.room import Room
 from src.models.character import Character
 from src.models.item import Item
 from src.db import async_session_factory
-from src.services import player_service
+from src.services import player_service, world_graph_service
 from src.templates import render_template, ICONS, get_direction_icon
 from src.config import settings
 
@@ -45,7 +45,8 @@ async def format_room(
 
     Args:
         room (Room): El objeto de la sala a formatear, con sus relaciones
-                     (`items`, `exits_from`, `characters`) ya cargadas.
+                     (`items`, `characters`) ya cargadas. Las salidas se
+                     leen del grafo del mundo (`world_graph_service`).
         viewing_character (Character, optional): El personaje que está mirando,
                                                   para excluirlo de la lista de personajes.
         max_items (int, optional): Máximo de items a mostrar. Default: settings.display_limits_max_room_items
@@ -78,6 +79,7 @@ async def format_room(
             'max_items': max_items,
             'max_characters': max_characters,
             'active_characters': active_characters,  # Usar lista filtrada
+            'exits': world_graph_service.get_world_graph().get_exits(room.id),
             'icon': lambda key: ICONS.get(key, ''),
             'get_direction_icon': get_direction_icon,
         }
@@ -241,6 +243,43 @@ async def format_who_list(
         return "<pre>❌ Error al mostrar la lista de jugadores.</pre>"
 
 
+async def send_room_view(
+    message: types.Message,
+    room: Room,
+    character: Character,
+    with_navigation_buttons: bool = True,
+    edit: bool = False,
+    header: str | None = None
+):
+    """
+    Envía (o edita) el mensaje con la descripción de una sala ya cargada.
+
+    A diferencia de `show_current_room`, no consulta la base de datos: la sala
+    debe tener cargados `items` y `characters` (ver
+    `movement_service.load_rooms_for_view`).
+
+    Args:
+        header: Texto opcional que se antepone a la descripción en el mismo
+                mensaje (ej: el resumen de un recorrido con `/ir`).
+    """
+    # Usamos nuestro formateador para construir el texto de la sala.
+    formatted_room = await format_room(room, viewing_character=character)
+    if header:
+        formatted_room = f"{header}\n{formatted_room}"
+
+    # Crear teclado de navegación si está habilitado
+    keyboard = None
+    if with_navigation_buttons:
+        from src.utils.inline_keyboards import create_room_navigation_keyboard
+        keyboard = create_room_navigation_keyboard(room)
+
+    # Enviar o editar mensaje
+    if edit:
+        await message.edit_text(formatted_room, parse_mode="HTML", reply_markup=keyboard)
+    else:
+        await message.answer(formatted_room, parse_mode="HTML", reply_markup=keyboard)
+
+
 async def show_current_room(
     message: types.Message,
     with_navigation_buttons: bool = True,
@@ -307,21 +346,7 @@ async def _show_current_room_impl(
 
             character = account.character
 
-        room = character.room
-        # Usamos nuestro formateador para construir el texto de la sala.
-        formatted_room = await format_room(room, viewing_character=character)
-
-        # Crear teclado de navegación si está habilitado
-        keyboard = None
-        if with_navigation_buttons:
-            from src.utils.inline_keyboards import create_room_navigation_keyboard
-            keyboard = create_room_navigation_keyboard(room)
-
-        # Enviar o editar mensaje
-        if edit:
-            await message.edit_text(formatted_room, parse_mode="HTML", reply_markup=keyboard)
-        else:
-            await message.answer(formatted_room, parse_mode="HTML", reply_markup=keyboard)
+        await send_room_view(message, character.room, character, with_navigation_buttons, edit)
 
     except Exception:
         error_msg = "❌ Ocurrió un error al mostrar tu ubicación actual."
@@ -7,6 +7,7 @@ los tests del proyecto.
 """
 
 import pytest
+from types import SimpleNamespace
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool
@@ -16,6 +17,20 @@ from src.models import Account, Character, Room, Exit, Item, CharacterSetting
 from game_data.room_prototypes import ROOM_PROTOTYPES
 
 
+@pytest.fixture(autouse=True)
+def clear_active_command_sets_cache():
+    """
+    Vacía la caché de CommandSets activos antes de cada test.
+
+    Los IDs de personaje se reutilizan entre bases de datos en memoria, por lo
+    que una entrada cacheada en un test podría filtrarse al siguiente.
+    """
+    from src.services import command_service
+    command_service.invalidate_active_command_sets()
+    yield
+    command_service.invalidate_active_command_sets()
+
+
 @pytest.fixture(scope="function")
 async def db_session() -> AsyncGenerator[AsyncSession, None]:
     """
@@ -171,6 +186,41 @@ async def sample_item(db_session: AsyncSession, sample_room: Room) -> Item:
     return item
 
 
+# --- Grafo del mundo en memoria (sin BD) ---
+
+def make_room(room_id, key, name, description=None):
+    """Sala falsa con los atributos que lee `build_world_graph`."""
+    if description is None:
+        description = f"Descripción de {name}"
+    return SimpleNamespace(id=room_id, key=key, name=name, description=description)
+
+
+def make_exit(exit_id, name, from_room_id, to_room_id, locks=""):
+    """Salida falsa con los atributos que lee `build_world_graph`."""
+    return SimpleNamespace(id=exit_id, name=name, from_room_id=from_room_id, to_room_id=to_room_id, locks=locks)
+
+
+@pytest.fixture
+def world_graph():
+    """
+    Publica grafos del mundo durante el test y restaura el anterior al final.
+
+    Uso:
+        graph = world_graph([make_room(1, "plaza", "Plaza")], [])
+    """
+    from src.services import world_graph_service
+
+    previous = world_graph_service.get_world_graph()
+
+    def install(rooms, exits):
+        graph = world_graph_service.build_world_graph(rooms, exits)
+        world_graph_service.set_world_graph(graph)
+        return graph
+
+    yield install
+    world_graph_service.set_world_graph(previous)
+
+
 # Marks personalizados para categorizar tests
 def pytest_configure(config):
     """
@@ -0,0 +1,171 @@
+# tests/test_services/test_account_cache_service.py
+"""
+Tests para el Account Cache Service.
+
+Este servicio guarda por telegram_id una instantánea de la cuenta (rol, ban,
+personaje) en un LRU en memoria respaldado por Redis.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.services import account_cache_service
+from src.services.account_cache_service import AccountSnapshot
+
+
+@pytest.fixture(autouse=True)
+def clear_account_cache():
+    """Vacía el LRU local antes y después de cada test."""
+    account_cache_service.clear_local_cache()
+    yield
+    account_cache_service.clear_local_cache()
+
+
+def make_fake_account(telegram_id=5000, is_banned=False, ban_expires_at=None, with_character=True):
+    """Crea una cuenta falsa con los atributos que usa la instantánea."""
+    character = SimpleNamespace(id=7, command_sets=["general", "movement"]) if with_character else None
+    return SimpleNamespace(
+        id=3,
+        telegram_id=telegram_id,
+        role="JUGADOR",
+        is_banned=is_banned,
+        ban_reason="spam" if is_banned else None,
+        ban_expires_at=ban_expires_at,
+        has_appealed=False,
+        character=character,
+    )
+
+
+@pytest.mark.asyncio
+class TestAccountSnapshot:
+    """Tests para la instantánea de cuenta."""
+
+    async def test_json_round_trip_keeps_all_fields(self):
+        """
+        Test: Serializar y deserializar una instantánea no pierde información.
+        """
+        expires = datetime(2030, 1, 1, 12, 30)
+        snapshot = account_cache_service.snapshot_from_account(
+            make_fake_account(is_banned=True, ban_expires_at=expires)
+        )
+
+        restored = AccountSnapshot.from_json(snapshot.to_json())
+
+        assert restored == snapshot
+        assert restored.command_sets == ("general", "movement")
+        assert restored.ban_expires_at == expires
+
+    async def test_account_without_character(self):
+        """
+        Test: Una cuenta sin personaje produce una instantánea sin character_id.
+        """
+        snapshot = account_cache_service.snapshot_from_account(make_fake_account(with_character=False))
+
+        assert snapshot.character_id is None
+        assert snapshot.command_sets == ()
+
+    async def test_expired_temporary_ban_is_detected(self):
+        """
+        Test: Un ban temporal vencido marca la instantánea como no utilizable.
+        """
+        past = datetime.utcnow() - timedelta(minutes=1)
+        future = datetime.utcnow() + timedelta(days=1)
+
+        expired = account_cache_service.snapshot_from_account(make_fake_account(is_banned=True, ban_expires_at=past))
+        active = account_cache_service.snapshot_from_account(make_fake_account(is_banned=True, ban_expires_at=future))
+        permanent = account_cache_service.snapshot_from_account(make_fake_account(is_banned=True))
+
+        assert expired.is_ban_expired() is True
+        assert active.is_ban_expired() is False
+        assert permanent.is_ban_expired() is False
+
+
+@pytest.mark.asyncio
+class TestAccountCache:
+    """Tests para get_snapshot(), store_snapshot() e invalidate()."""
+
+    async def test_stored_snapshot_is_served_from_memory(self):
+        """
+        Test: Tras guardar una instantánea, la lectura no consulta Redis.
+        """
+        account = make_fake_account()
+
+        with patch.object(account_cache_service, '_store_snapshot', AsyncMock(return_value=1)), \
+             patch.object(account_cache_service, 'redis_client') as mock_redis:
+            mock_redis.get = AsyncMock()
+
+            await account_cache_service.store_snapshot(account, loaded_at=0)
+            snapshot = await account_cache_service.get_snapshot(account.telegram_id)
+
+            assert snapshot.account_id == account.id
+            mock_redis.get.assert_not_called()
+
+    async def test_stale_read_is_not_stored(self):
+        """
+        Test: Si hubo una invalidación posterior a la lectura, no se guarda nada.
+        """
+        account = make_fake_account()
+
+        with patch.object(account_cache_service, '_store_snapshot', AsyncMock(return_value=0)), \
+             patch.object(account_cache_service, 'redis_client') as mock_redis:
+            mock_redis.get = AsyncMock(return_value=None)
+
+            await account_cache_service.store_snapshot(account, loaded_at=0)
+
+            assert await account_cache_service.get_snapshot(account.telegram_id) is None
+
+    async def test_redis_snapshot_fills_local_cache(self):
+        """
+        Test: Una instantánea leída de Redis queda en memoria para la siguiente lectura.
+        """
+        account = make_fake_account()
+        raw = account_cache_service.snapshot_from_account(account).to_json()
+
+        with patch.object(account_cache_service, 'redis_client') as mock_redis:
+            mock_redis.get = AsyncMock(return_value=raw)
+
+            first = await account_cache_service.get_snapshot(account.telegram_id)
+            second = await account_cache_service.get_snapshot(account.telegram_id)
+
+            assert first == second
+            mock_redis.get.assert_called_once_with(f"account_cache:{account.telegram_id}")
+
+    async def test_local_cache_evicts_least_recently_used(self):
+        """
+        Test: El LRU local no supera local_max_entries.
+        """
+        with patch.object(account_cache_service, '_store_snapshot', AsyncMock(return_value=1)), \
+             patch.object(account_cache_service.settings, 'account_cache_local_max_entries', 2):
+            for telegram_id in (1, 2, 3):
+                await account_cache_service.store_snapshot(make_fake_account(telegram_id=telegram_id), loaded_at=0)
+
+        assert list(account_cache_service._local_cache) == [2, 3]
+
+    async def test_invalidate_clears_memory_even_if_redis_fails(self):
+        """
+        Test: invalidate() borra la entrada local aunque Redis no responda.
+        """
+        account = make_fake_account()
+
+        with patch.object(account_cache_service, '_store_snapshot', AsyncMock(return_value=1)), \
+             patch.object(account_cache_service, 'redis_client') as mock_redis:
+            mock_redis.pipeline = MagicMock(side_effect=ConnectionError("redis caído"))
+            mock_redis.get = AsyncMock(side_effect=ConnectionError("redis caído"))
+
+            await account_cache_service.store_snapshot(account, loaded_at=0)
+            await account_cache_service.invalidate(account.telegram_id)
+
+            assert await account_cache_service.get_snapshot(account.telegram_id) is None
+
+    async def test_disabled_cache_never_returns_snapshots(self):
+        """
+        Test: Con la caché desactivada, get_snapshot() siempre devuelve None.
+        """
+        account = make_fake_account()
+
+        with patch.object(account_cache_service, '_store_snapshot', AsyncMock(return_value=1)):
+            await account_cache_service.store_snapshot(account, loaded_at=0)
+
+        with patch.object(account_cache_service.settings, 'account_cache_enabled', False):
+            assert await account_cache_service.get_snapshot(account.telegram_id) is None
@@ -0,0 +1,83 @@
+# tests/test_services/test_broadcaster_service.py
+"""
+Tests para el Broadcaster Service.
+
+Se centran en `send_message_to_area`, que resuelve los destinatarios de varias
+salas a la vez usando las tablas de distancias del grafo del mundo.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.services import broadcaster_service, online_service
+from tests.conftest import make_exit, make_room
+
+
+@pytest.fixture
+def line_graph(world_graph):
+    """Cuatro salas en línea: 1 - 2 - 3 - 4."""
+    rooms = [make_room(i, f"sala{i}", f"Sala{i}") for i in range(1, 5)]
+    exits = []
+    for i in range(1, 4):
+        exits.append(make_exit(i * 10, "este", i, i + 1))
+        exits.append(make_exit(i * 10 + 1, "oeste", i + 1, i))
+    return world_graph(rooms, exits)
+
+
+def make_session(rows):
+    """Sesión falsa cuya consulta devuelve las filas (id, room_id, telegram_id) indicadas."""
+    result = MagicMock()
+    result.all.return_value = [SimpleNamespace(id=i, room_id=r, telegram_id=t) for i, r, t in rows]
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+@pytest.mark.asyncio
+class TestSendMessageToArea:
+    """Tests para send_message_to_area()."""
+
+    async def test_sends_distance_variants_to_online_characters(self, line_graph):
+        """
+        Test: Cada personaje online del área recibe la variante de su distancia.
+        """
+        session = make_session([(1, 1, 100), (2, 2, 200), (3, 3, 300), (4, 3, 400)])
+        send_message = AsyncMock()
+
+        with patch.object(online_service, 'get_online_character_ids', AsyncMock(return_value={1, 2, 3})) as online, \
+             patch.object(broadcaster_service.bot, 'send_message', send_message):
+            sent = await broadcaster_service.send_message_to_area(
+                session, room_id=1, radius=2, message_text="¡DONG!",
+                distance_messages={2: "A lo lejos, suena una campana."},
+                exclude_character_id=1,
+            )
+
+        assert sent == 2
+        online.assert_awaited_once_with([2, 3, 4])
+        received = {call.kwargs["chat_id"]: call.kwargs["text"] for call in send_message.await_args_list}
+        assert received == {200: "¡DONG!", 300: "A lo lejos, suena una campana."}
+
+    async def test_failed_send_does_not_stop_the_rest(self, line_graph):
+        """
+        Test: Si un envío falla (ej: el jugador bloqueó el bot), el resto se envía igual.
+        """
+        session = make_session([(1, 1, 100), (2, 2, 200)])
+        send_message = AsyncMock(side_effect=[Exception("bloqueado"), None])
+
+        with patch.object(online_service, 'get_online_character_ids', AsyncMock(return_value={1, 2})), \
+             patch.object(broadcaster_service.bot, 'send_message', send_message):
+            sent = await broadcaster_service.send_message_to_area(session, room_id=1, radius=1, message_text="¡Hola!")
+
+        assert sent == 2
+        assert send_message.await_count == 2
+
+    async def test_unknown_room_sends_nothing(self, line_graph):
+        """
+        Test: Una sala que no está en el grafo no consulta la base de datos.
+        """
+        session = make_session([])
+
+        sent = await broadcaster_service.send_message_to_area(session, room_id=99, radius=3, message_text="¡Hola!")
+
+        assert sent == 0
+        session.execute.assert_not_called()
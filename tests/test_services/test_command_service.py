@@ -6,7 +6,10 @@ Este servicio maneja la lógica de qué comandos están disponibles para
 un personaje en función de su contexto (items, sala, rol).
 """
 
+import asyncio
 import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from src.services import command_service
@@ -182,6 +185,140 @@ class TestGetActiveCommandSetsForCharacter:
         assert len(active_sets) == len(set(active_sets))
 
 
+
+def make_fake_character(character_id=1, command_sets=None, items=None, room_id=1, role="JUGADOR"):
+    """
+    Helper que construye un personaje en memoria (sin BD) con los atributos que
+    lee get_active_command_sets_for_character().
+    """
+    return SimpleNamespace(
+        id=character_id,
+        name=f"Personaje{character_id}",
+        command_sets=command_sets if command_sets is not None else ["general"],
+        items=items or [],
+        room_id=room_id,
+        room=None,
+        account=SimpleNamespace(role=role, telegram_id=1000 + character_id),
+    )
+
+
+class CountingItem:
+    """Item falso que cuenta cuántas veces se consulta su prototipo."""
+
+    def __init__(self, key, grants=None):
+        self.key = key
+        self._grants = grants or []
+        self.prototype_reads = 0
+
+    @property
+    def prototype(self):
+        self.prototype_reads += 1
+        return {"grants_command_sets": self._grants}
+
+
+@pytest.mark.asyncio
+class TestActiveCommandSetsCache:
+    """Tests para la memoización de get_active_command_sets_for_character()."""
+
+    async def test_second_call_uses_cache(self):
+        """
+        Test: Si el contexto no cambia, la segunda llamada no recorre el inventario.
+        """
+        item = CountingItem("varita", grants=["magia"])
+        character = make_fake_character(items=[item])
+
+        first = await command_service.get_active_command_sets_for_character(character)
+        second = await command_service.get_active_command_sets_for_character(character)
+
+        assert "magia" in first
+        assert first == second
+        assert item.prototype_reads == 1
+
+    async def test_returns_copy_of_cached_list(self):
+        """
+        Test: Modificar la lista devuelta no debe corromper la caché.
+        """
+        character = make_fake_character()
+
+        first = await command_service.get_active_command_sets_for_character(character)
+        first.append("hackeado")
+        second = await command_service.get_active_command_sets_for_character(character)
+
+        assert "hackeado" not in second
+
+    async def test_room_change_recomputes(self):
+        """
+        Test: Cambiar de sala invalida la entrada por la huella de contexto.
+        """
+        item = CountingItem("varita", grants=["magia"])
+        character = make_fake_character(items=[item])
+
+        await command_service.get_active_command_sets_for_character(character)
+        character.room_id = 2
+        await command_service.get_active_command_sets_for_character(character)
+
+        assert item.prototype_reads == 2
+
+    async def test_role_change_recomputes(self):
+        """
+        Test: Un cambio de rol debe reflejarse sin invalidación explícita.
+        """
+        character = make_fake_character()
+
+        before = await command_service.get_active_command_sets_for_character(character)
+        character.account.role = "ADMIN"
+        after = await command_service.get_active_command_sets_for_character(character)
+
+        assert "spawning" not in before
+        assert "spawning" in after
+
+    async def test_explicit_invalidation_picks_up_new_items(self):
+        """
+        Test: Tras invalidar (ej: al mover un objeto), se recalculan los sets.
+        """
+        character = make_fake_character()
+
+        before = await command_service.get_active_command_sets_for_character(character)
+        character.items = [CountingItem("varita", grants=["magia"])]
+        stale = await command_service.get_active_command_sets_for_character(character)
+        command_service.invalidate_active_command_sets(character.id)
+        fresh = await command_service.get_active_command_sets_for_character(character)
+
+        assert "magia" not in before
+        assert stale == before
+        assert "magia" in fresh
+
+    async def test_entries_expire_after_ttl(self):
+        """
+        Test: Una entrada caducada se recalcula aunque nadie la invalide (otro proceso movió el objeto).
+        """
+        character = make_fake_character()
+
+        with patch.object(command_service.settings, "command_sets_cache_ttl_seconds", 30.0), \
+             patch.object(command_service.time, "monotonic", return_value=1000.0):
+            before = await command_service.get_active_command_sets_for_character(character)
+        character.items = [CountingItem("varita", grants=["magia"])]
+        with patch.object(command_service.time, "monotonic", return_value=1031.0):
+            after = await command_service.get_active_command_sets_for_character(character)
+
+        assert "magia" not in before
+        assert "magia" in after
+
+    async def test_zero_ttl_disables_cache(self):
+        """
+        Test: Con cache_ttl_seconds = 0 no se guarda nada y cada llamada recorre el inventario.
+        """
+        item = CountingItem("varita", grants=["magia"])
+        character = make_fake_character(items=[item])
+
+        with patch.object(command_service.settings, "command_sets_cache_ttl_seconds", 0):
+            await command_service.get_active_command_sets_for_character(character)
+            await command_service.get_active_command_sets_for_character(character)
+
+        assert item.prototype_reads == 2
+        assert character.id not in command_service._active_sets_cache
+
+
 class TestGetCommandSets:
     """Tests para la función get_command_sets()."""
 
@@ -222,3 +359,111 @@ class TestUpdateTelegramCommands:
             await command_service.update_telegram_commands(character)
         except Exception as e:
             pytest.fail(f"update_telegram_commands() lanzó excepción: {e}")
+
+
+@pytest.mark.asyncio
+class TestTelegramMenuFingerprint:
+    """Tests para la huella del menú y el debounce de update_telegram_commands()."""
+
+    async def test_fingerprint_is_stable_and_order_sensitive(self):
+        """
+        Test: La misma lista produce la misma huella; otro orden, otra distinta.
+        """
+        from aiogram.types import BotCommand
+        a = BotCommand(command="mirar", description="Mira")
+        b = BotCommand(command="decir", description="Habla")
+
+        assert command_service._compute_menu_fingerprint([a, b]) == command_service._compute_menu_fingerprint([a, b])
+        assert command_service._compute_menu_fingerprint([a, b]) != command_service._compute_menu_fingerprint([b, a])
+
+    async def test_unchanged_menu_skips_api_call(self):
+        """
+        Test: Si la huella guardada coincide, no se llama a set_my_commands.
+        """
+        character = make_fake_character()
+        commands = await command_service._build_telegram_commands(character)
+        fingerprint = command_service._compute_menu_fingerprint(commands)
+
+        with patch.object(command_service, 'redis_client') as mock_redis, \
+             patch.object(command_service, 'bot') as mock_bot, \
+             patch.object(command_service.settings, 'telegram_menu_debounce_seconds', 0):
+            mock_redis.get = AsyncMock(return_value=fingerprint)
+            mock_redis.set = AsyncMock()
+            mock_bot.set_my_commands = AsyncMock()
+
+            await command_service.update_telegram_commands(character)
+
+            mock_bot.set_my_commands.assert_not_called()
+            mock_redis.set.assert_not_called()
+
+    async def test_changed_menu_is_sent_and_stored(self):
+        """
+        Test: Si la huella cambia, se envía el menú y se guarda la nueva huella.
+        """
+        character = make_fake_character()
+
+        with patch.object(command_service, 'redis_client') as mock_redis, \
+             patch.object(command_service, 'bot') as mock_bot, \
+             patch.object(command_service.settings, 'telegram_menu_debounce_seconds', 0):
+            mock_redis.get = AsyncMock(return_value="huella_antigua")
+            mock_redis.set = AsyncMock()
+            mock_bot.set_my_commands = AsyncMock()
+
+            await command_service.update_telegram_commands(character)
+
+            mock_bot.set_my_commands.assert_called_once()
+            call_args = mock_redis.set.call_args
+            assert call_args[0][0] == f"telegram_menu:{character.account.telegram_id}"
+
+    async def test_rapid_updates_are_debounced(self):
+        """
+        Test: Varias actualizaciones seguidas producen una sola llamada a la API.
+        """
+        character = make_fake_character()
+
+        with patch.object(command_service, 'redis_client') as mock_redis, \
+             patch.object(command_service, 'bot') as mock_bot, \
+             patch.object(command_service.settings, 'telegram_menu_debounce_seconds', 0.01):
+            mock_redis.get = AsyncMock(return_value=None)
+            mock_redis.set = AsyncMock()
+            mock_bot.set_my_commands = AsyncMock()
+
+            for room_id in (2, 3, 4):
+                character.room_id = room_id
+                await command_service.update_telegram_commands(character)
+
+            await asyncio.sleep(0.05)
+
+            mock_bot.set_my_commands.assert_called_once()
+
+    async def test_menu_changed_during_send_is_not_lost(self):
+        """
+        Test: Un menú encolado mientras se envía el anterior se envía después.
+        """
+        character = make_fake_character()
+        sending = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_send(commands, scope):
+            sending.set()
+            await release.wait()
+
+        with patch.object(command_service, 'redis_client') as mock_redis, \
+             patch.object(command_service, 'bot') as mock_bot, \
+             patch.object(command_service.settings, 'telegram_menu_debounce_seconds', 0.01):
+            mock_redis.get = AsyncMock(return_value=None)
+            mock_redis.set = AsyncMock()
+            mock_bot.set_my_commands = AsyncMock(side_effect=slow_send)
+
+            await command_service.update_telegram_commands(character)
+            await sending.wait()
+
+            character.command_sets = ["general", "interaction"]
+            await command_service.update_telegram_commands(character)
+            release.set()
+            await asyncio.sleep(0.05)
+
+            assert mock_bot.set_my_commands.call_count == 2
+            last_menu = mock_bot.set_my_commands.call_args.kwargs["commands"]
+            assert last_menu == await command_service._build_telegram_commands(character)
+            assert character.account.telegram_id not in command_service._flush_tasks
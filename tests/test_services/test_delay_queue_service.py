@@ -0,0 +1,165 @@
+# tests/test_services/test_delay_queue_service.py
+"""
+Tests para el Delay Queue Service.
+
+Este servicio guarda en Redis scripts programados para "dentro de N segundos"
+o una fecha concreta, y un único dispatcher los ejecuta al vencer.
+"""
+
+import json
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.services import delay_queue_service
+from src.services.delay_queue_service import DelayedJob
+from src.services.scheduler_service import ScheduledScript, ScheduledScriptType, scheduler_service
+
+
+class Item(SimpleNamespace):
+    """Entidad falsa cuyo nombre de clase da el tipo ("item")."""
+
+
+class Room(SimpleNamespace):
+    """Entidad falsa cuyo nombre de clase da el tipo ("room")."""
+
+
+@pytest.fixture
+def fake_session():
+    """Sesión falsa devuelta por async_session_factory() (también en el scheduler)."""
+    session = MagicMock()
+    session.get = AsyncMock()
+    session.commit = AsyncMock()
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    with patch("src.db.async_session_factory", factory), \
+         patch("src.services.scheduler_service.async_session_factory", factory):
+        yield session
+
+
+@pytest.mark.asyncio
+class TestScheduling:
+    """Tests para context_ids_for(), schedule_in() y claim_due_jobs()."""
+
+    async def test_context_ids_from_entities(self):
+        """
+        Test: Las entidades se guardan como "tipo:id" y los None se omiten.
+        """
+        context_ids = delay_queue_service.context_ids_for(target=Item(id=42), room=Room(id=3), character=None)
+
+        assert context_ids == {"target": "item:42", "room": "room:3"}
+
+    async def test_invalid_context_is_rejected(self):
+        """
+        Test: Un contexto con nombres o tipos no soportados se rechaza antes de tocar Redis.
+        """
+        with patch.object(delay_queue_service, "_schedule_job", AsyncMock()) as schedule:
+            with pytest.raises(ValueError):
+                await delay_queue_service.schedule_in(5, "cerrar_trampilla", {"room": "item:3"})
+            with pytest.raises(ValueError):
+                await delay_queue_service.schedule_in(5, "cerrar_trampilla", {"session": "room:3"})
+
+        schedule.assert_not_called()
+
+    async def test_schedule_in_stores_due_time_and_payload(self):
+        """
+        Test: schedule_in() encola el trabajo con su vencimiento y el contexto serializado.
+        """
+        schedule = AsyncMock(return_value=1)
+
+        with patch.object(delay_queue_service, "_schedule_job", schedule):
+            job_id = await delay_queue_service.schedule_in(30, "cerrar_trampilla", {"target": "item:42"})
+
+        keys, (sent_id, due_at, raw) = schedule.await_args.kwargs["keys"], schedule.await_args.kwargs["args"]
+        assert keys == [delay_queue_service.DUE_KEY, delay_queue_service.JOBS_KEY]
+        assert sent_id == job_id
+        assert due_at == pytest.approx(time.time() + 30, abs=1)
+        assert json.loads(raw)["context"] == {"target": "item:42"}
+
+    async def test_existing_job_id_is_not_scheduled_twice(self):
+        """
+        Test: Con un job_id ya pendiente, schedule_at() no encola otro y devuelve None.
+        """
+        when = datetime.now(timezone.utc) + timedelta(hours=1)
+
+        with patch.object(delay_queue_service, "_schedule_job", AsyncMock(return_value=0)):
+            assert await delay_queue_service.schedule_at(when, "abrir_puertas", job_id="fijo") is None
+
+    async def test_claimed_jobs_are_parsed(self):
+        """
+        Test: claim_due_jobs() convierte la respuesta plana del script Lua en trabajos.
+        """
+        job = DelayedJob("abc", "cerrar_trampilla", {"target": "item:42"}, 100.0)
+
+        with patch.object(delay_queue_service, "_claim_due_jobs", AsyncMock(return_value=["abc", job.to_json()])):
+            assert await delay_queue_service.claim_due_jobs(now=200.0) == [job]
+
+
+@pytest.mark.asyncio
+class TestRunJob:
+    """Tests para run_job(), la delegación de los scripts TIMESTAMP y su recarga."""
+
+    async def test_job_runs_with_reloaded_context(self, fake_session):
+        """
+        Test: El script se ejecuta con las entidades recargadas y se hace commit.
+        """
+        item = Item(id=42)
+        fake_session.get.return_value = item
+        execute = AsyncMock()
+        job = DelayedJob("abc", "cerrar_trampilla", {"target": "item:42"}, time.time())
+
+        with patch("src.services.script_service.execute_script", execute):
+            await delay_queue_service.run_job(job)
+
+        execute.assert_awaited_once_with("cerrar_trampilla", fake_session, target=item)
+        fake_session.commit.assert_awaited_once()
+
+    async def test_job_with_missing_entity_is_dropped(self, fake_session):
+        """
+        Test: Si una entidad del contexto ya no existe, el script no se ejecuta.
+        """
+        fake_session.get.return_value = None
+        execute = AsyncMock()
+        job = DelayedJob("abc", "cerrar_trampilla", {"target": "item:42"}, time.time())
+
+        with patch("src.services.script_service.execute_script", execute):
+            await delay_queue_service.run_job(job)
+
+        execute.assert_not_called()
+        fake_session.commit.assert_not_called()
+
+    async def test_timestamp_scripts_are_delegated(self):
+        """
+        Test: Un script TIMESTAMP futuro va a la cola de retardos; uno pasado se ignora.
+        """
+        schedule_at = AsyncMock(return_value="timestamp:item_1:0")
+        future = ScheduledScript("abrir_puertas", ScheduledScriptType.TIMESTAMP,
+                                 execute_at=datetime.utcnow() + timedelta(hours=1))
+        past = ScheduledScript("abrir_puertas", ScheduledScriptType.TIMESTAMP,
+                               execute_at=datetime.utcnow() - timedelta(hours=1))
+
+        with patch.object(delay_queue_service, "schedule_at", schedule_at):
+            assert await scheduler_service.schedule_timestamp_script(future, {"target": "item:1"}) == "timestamp:item_1:0"
+            assert await scheduler_service.schedule_timestamp_script(past, {"target": "item:1"}) is None
+
+        schedule_at.assert_awaited_once()
+
+    async def test_malformed_definition_does_not_abort_reload(self, fake_session):
+        """
+        Test: Un "at" mal formado se omite y el resto de scheduled_scripts se recarga.
+        """
+        item = Item(id=1, key="campana", room_id=3, prototype={"scheduled_scripts": [
+            {"at": "mañana a las diez", "script": "abrir_puertas"},
+            {"schedule": "0 * * * *", "script": "tocar_campana"},
+        ]})
+        fake_session.execute = AsyncMock(return_value=MagicMock(
+            scalars=MagicMock(return_value=MagicMock(all=MagicMock(return_value=[item])))
+        ))
+
+        with patch.object(scheduler_service, "_cron_scripts_cache", {}):
+            await scheduler_service._reload_cron_scripts()
+            [cron] = scheduler_service._cron_scripts_cache["item_1"]
+
+        assert cron.script_string == "tocar_campana"
@@ -0,0 +1,158 @@
+# tests/test_services/test_event_service.py
+"""
+Tests para el Event Service.
+
+El hub de eventos normaliza los scripts de cada prototipo una sola vez en una
+tabla de despacho y no hace nada cuando nadie escucha un evento.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.services.event_service import (
+    EventHub, EventType, EventPhase, EventContext, EVENT_BITS, DeferredAfterEvent,
+)
+
+
+def make_entity(key, scripts):
+    return SimpleNamespace(key=key, prototype={"scripts": scripts})
+
+
+@pytest.fixture
+def hub():
+    """Un hub propio para no compartir hooks ni tablas con el singleton."""
+    return EventHub()
+
+
+@pytest.mark.asyncio
+class TestDispatchTables:
+    """Tests para build_dispatch_table() y get_dispatch_table()."""
+
+    async def test_scripts_are_filtered_and_sorted_once(self, hub):
+        """
+        Test: Los scripts quedan filtrados por fase y ordenados por prioridad, y la máscara refleja los eventos.
+        """
+        entity = make_entity("gema", {
+            "before_on_get": "comprobar_peso()",
+            "after_on_look": [
+                {"script": "bajo()", "priority": 1},
+                {"script": "alto()", "priority": 5, "cancel_message": "No."},
+                {"script": "otra_fase()", "phase": "before"},
+            ],
+            "on_look": "sin_fase()",
+        })
+
+        table = hub.get_dispatch_table(entity)
+
+        assert [entry.script for entry in table.handlers["after_on_look"]] == ["alto()", "bajo()"]
+        assert table.handles("before_on_get") and table.handles("after_on_look")
+        assert not table.handles("after_on_get")
+        assert table.mask == EVENT_BITS["before_on_get"] | EVENT_BITS["after_on_look"]
+        assert hub.get_dispatch_table(entity) is table
+
+    async def test_entity_without_scripts_has_empty_table(self, hub):
+        """
+        Test: Una entidad sin scripts (o sin prototipo) no atiende ningún evento.
+        """
+        assert hub.get_dispatch_table(make_entity("piedra", {})).mask == 0
+        assert hub.get_dispatch_table(SimpleNamespace(name="sin prototipo")).mask == 0
+
+
+@pytest.mark.asyncio
+class TestTriggerEvent:
+    """Tests para trigger_event()."""
+
+    async def test_event_without_listeners_returns_immediately(self, hub):
+        """
+        Test: Sin hooks ni scripts para el evento, no se ejecuta ningún script.
+        """
+        entity = make_entity("piedra", {"after_on_look": "mirar()"})
+        context = EventContext(session=MagicMock(), target=entity)
+
+        with patch("src.services.script_service.execute_script", AsyncMock()) as execute:
+            result = await hub.trigger_event(EventType.ON_GET, EventPhase.BEFORE, context)
+
+        assert result.success is True and result.cancel_action is False
+        execute.assert_not_awaited()
+
+    async def test_before_script_returning_false_cancels(self, hub):
+        """
+        Test: Un script BEFORE que devuelve False cancela la acción con su mensaje.
+        """
+        entity = make_entity("cofre", {"before_on_open": [
+            {"script": "cerrado()", "phase": "before", "cancel_message": "Está cerrado con llave."},
+        ]})
+        context = EventContext(session=MagicMock(), target=entity)
+
+        with patch("src.services.script_service.execute_script", AsyncMock(return_value=False)):
+            result = await hub.trigger_event(EventType.ON_OPEN, EventPhase.BEFORE, context)
+
+        assert result.cancel_action is True
+        assert result.message == "Está cerrado con llave."
+
+    async def test_global_hooks_run_without_entity_scripts(self, hub):
+        """
+        Test: Un hook global se ejecuta aunque el objetivo no tenga scripts.
+        """
+        hook = AsyncMock()
+        hub.register_global_hook(EventType.ON_GET, hook)
+        context = EventContext(session=MagicMock(), target=make_entity("piedra", {}))
+
+        await hub.trigger_event(EventType.ON_GET, EventPhase.AFTER, context)
+
+        hook.assert_awaited_once_with(EventPhase.AFTER, context)
+
+
+@pytest.mark.asyncio
+class TestDeferredAfterEvents:
+    """Tests para dispatch_after_event() y la cola de eventos AFTER."""
+
+    async def test_after_event_is_deferred_and_measured(self, hub):
+        """
+        Test: El evento AFTER se encola, el llamador no lo espera y se ejecuta después en segundo plano.
+        """
+        entity = make_entity("gema", {"after_on_look": "mirar()"})
+        context = EventContext(session=MagicMock(), target=entity)
+        run = AsyncMock()
+
+        with patch.object(hub, "_run_deferred_after_event", run):
+            result = await hub.dispatch_after_event(EventType.ON_LOOK, context)
+            assert result.success is True
+            assert hub.pending_after_events() == 1
+            run.assert_not_awaited()
+
+            await hub.wait_for_after_events()
+
+        run.assert_awaited_once()
+        assert hub.pending_after_events() == 0
+        assert hub.get_after_event_metrics()["after_on_look"].deferred == 1
+
+    async def test_prototype_opt_out_and_full_queue_run_inline(self, hub):
+        """
+        Test: Con "sync_after_events" o con la cola llena, el evento se ejecuta en línea.
+        """
+        sync_entity = SimpleNamespace(key="palanca", prototype={
+            "scripts": {"after_on_use": "activar()"}, "sync_after_events": True,
+        })
+        entity = make_entity("gema", {"after_on_use": "usar()"})
+
+        with patch("src.services.script_service.execute_script", AsyncMock()) as execute:
+            await hub.dispatch_after_event(EventType.ON_USE, EventContext(session=MagicMock(), target=sync_entity))
+            with patch("src.services.event_service.settings.events_after_queue_size", 0):
+                await hub.dispatch_after_event(EventType.ON_USE, EventContext(session=MagicMock(), target=entity))
+
+        assert execute.await_count == 2
+        metrics = hub.get_after_event_metrics()["after_on_use"]
+        assert (metrics.inline, metrics.overflow, metrics.deferred) == (1, 1, 0)
+
+    async def test_failed_deferred_event_is_isolated(self, hub):
+        """
+        Test: Un evento diferido que falla se cuenta como fallido sin propagar el error.
+        """
+        job = DeferredAfterEvent(EventType.ON_GET, character_id=None, target=None, room=None, extra={})
+
+        with patch("src.db.async_session_factory", side_effect=ConnectionError("bd caída")):
+            await hub._run_deferred_after_event(job)
+
+        metrics = hub.get_after_event_metrics()["after_on_get"]
+        assert (metrics.completed, metrics.failed) == (0, 1)
@@ -6,7 +6,8 @@ Este servicio maneja la creación y movimiento de objetos en el juego.
 """
 
 import pytest
-from src.services import item_service
+from unittest.mock import AsyncMock, MagicMock
+from src.services import command_service, item_service
 from src.models import Item
 
 
@@ -196,3 +197,46 @@ class TestItemLocationExclusivity:
         assert new_item.parent_item_id == container.id
         assert new_item.character_id is None  # Limpiado
         assert new_item.room_id is None  # Limpiado
+
+
+@pytest.mark.asyncio
+class TestCommandSetInvalidation:
+    """Tests para la invalidación de CommandSets al mover objetos."""
+
+    async def test_cache_refilled_before_commit_is_invalidated(self):
+        """
+        Test: Un recálculo concurrente antes del commit (que aún ve al portador
+        anterior) no deja sets obsoletos en caché.
+        """
+        holder = MagicMock()
+        holder.scalar_one_or_none.return_value = 7
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=holder)
+
+        async def concurrent_recompute():
+            command_service._active_sets_cache[7] = ((), ("obsoleto",), float("inf"))
+            command_service._active_sets_cache[8] = ((), ("obsoleto",), float("inf"))
+
+        session.commit = AsyncMock(side_effect=concurrent_recompute)
+
+        await item_service.move_item_to_character(session, item_id=1, character_id=8)
+
+        assert 7 not in command_service._active_sets_cache
+        assert 8 not in command_service._active_sets_cache
+
+    async def test_delete_invalidates_after_commit(self):
+        """
+        Test: delete_item() también invalida después del commit.
+        """
+        session = MagicMock()
+        session.get = AsyncMock(return_value=Item(id=1, key="espada_viviente", character_id=7))
+        session.delete = AsyncMock()
+
+        async def concurrent_recompute():
+            command_service._active_sets_cache[7] = ((), ("obsoleto",), float("inf"))
+
+        session.commit = AsyncMock(side_effect=concurrent_recompute)
+
+        await item_service.delete_item(session, item_id=1)
+
+        assert 7 not in command_service._active_sets_cache
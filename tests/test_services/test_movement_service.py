@@ -0,0 +1,290 @@
+# tests/test_services/test_movement_service.py
+"""
+Tests para el Movement Service.
+
+Este servicio mueve a un personaje por una salida: evalúa el lock y los
+eventos BEFORE, cambia de sala con un único UPDATE y deja los avisos y los
+eventos AFTER para un segundo plano.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.models import Character, Room
+from src.services import movement_service, world_graph_service
+from src.services.event_service import EventResult, EventPhase
+from src.services.movement_service import MoveResult
+from tests.conftest import make_exit, make_room
+
+
+@pytest.fixture
+def sample_graph(world_graph):
+    """
+    Plaza (1) -> Mercado (2) -> Puerto (4) hacia el norte, y Plaza -> Torre (3)
+    hacia arriba con lock de rol.
+    """
+    return world_graph(
+        [make_room(1, "plaza", "Plaza"), make_room(2, "mercado", "Mercado"),
+         make_room(3, "torre", "Torre"), make_room(4, "puerto", "Puerto")],
+        [make_exit(10, "norte", 1, 2), make_exit(11, "arriba", 1, 3, locks="rol(ADMIN)"),
+         make_exit(12, "norte", 2, 4)],
+    )
+
+
+@pytest.fixture
+def character():
+    """Personaje en memoria (sin sesión) situado en la plaza."""
+    return Character(id=7, name="Aria", room_id=1, room=Room(id=1, name="Plaza", description=""))
+
+
+@pytest.fixture
+def session():
+    mock_session = MagicMock()
+    mock_session.execute = AsyncMock()
+    mock_session.commit = AsyncMock()
+    return mock_session
+
+
+@pytest.mark.asyncio
+class TestMoveCharacter:
+    """Tests para move_character()."""
+
+    async def test_missing_exit_does_not_touch_database(self, sample_graph, character, session):
+        """
+        Test: Sin salida en esa dirección, no se consulta la base de datos.
+        """
+        result = await movement_service.move_character(session, character, "oeste")
+
+        assert result.success is False
+        session.execute.assert_not_called()
+
+    async def test_locked_exit_blocks_movement(self, sample_graph, character, session):
+        """
+        Test: Un lock que no se cumple bloquea el movimiento con su mensaje.
+        """
+        with patch.object(movement_service.permission_service, 'can_execute',
+                          AsyncMock(return_value=(False, "Solo administradores."))):
+            result = await movement_service.move_character(session, character, "arriba")
+
+        assert result.success is False
+        assert result.message == "Solo administradores."
+        assert character.room_id == 1
+
+    async def test_cancelled_enter_keeps_character_in_place(self, sample_graph, character, session):
+        """
+        Test: Si BEFORE ON_ENTER cancela, no hay UPDATE y el personaje sigue en su sala.
+        """
+        destination = Room(id=2, name="Mercado", description="")
+
+        async def fake_trigger(event_type, phase, context):
+            if context.room is destination:
+                return EventResult(success=True, cancel_action=True, message="La puerta está cerrada.")
+            return EventResult(success=True)
+
+        with patch.object(movement_service, 'load_rooms_for_view', AsyncMock(return_value={2: destination})), \
+             patch.object(movement_service.event_service, 'trigger_event', side_effect=fake_trigger):
+            result = await movement_service.move_character(session, character, "norte")
+
+        assert result.success is False
+        assert result.message == "La puerta está cerrada."
+        session.execute.assert_not_called()
+        session.commit.assert_not_called()
+        assert character.room_id == 1
+
+    async def test_successful_move_updates_room_in_one_transaction(self, sample_graph, character, session):
+        """
+        Test: Un movimiento exitoso hace un único UPDATE + commit y actualiza el personaje en memoria.
+        """
+        destination = Room(id=2, name="Mercado", description="")
+        trigger = AsyncMock(return_value=EventResult(success=True))
+
+        with patch.object(movement_service, 'load_rooms_for_view', AsyncMock(return_value={2: destination})), \
+             patch.object(movement_service.event_service, 'trigger_event', trigger):
+            result = await movement_service.move_character(session, character, "NORTE")
+
+        assert result.success is True
+        assert (result.origin_room_id, result.destination_room_id) == (1, 2)
+        assert result.exit.name == "norte"
+        assert session.execute.await_count == 1
+        session.commit.assert_awaited_once()
+        assert character.room_id == 2
+        assert character.room is destination
+        # Solo se ejecutan los eventos BEFORE en el camino crítico.
+        assert all(call.kwargs["phase"] == EventPhase.BEFORE for call in trigger.await_args_list)
+
+
+@pytest.mark.asyncio
+class TestWalkPath:
+    """Tests para parse_path() y walk_path() (comando /ir)."""
+
+    async def test_parse_path_formats(self):
+        """
+        Test: Se aceptan nombres completos, abreviaturas y tramos compactos.
+        """
+        assert movement_service.parse_path(["norte", "N", "e"]) == ["norte", "norte", "este"]
+        assert movement_service.parse_path(["3n2e"]) == ["norte"] * 3 + ["este"] * 2
+        assert movement_service.parse_path(["2ne"]) == ["noreste", "noreste"]
+        assert movement_service.parse_path(["dentro"]) == ["dentro"]
+
+    async def test_parse_path_limits(self):
+        """
+        Test: Un recorrido vacío o demasiado largo se rechaza.
+        """
+        with pytest.raises(ValueError):
+            movement_service.parse_path([])
+        with patch.object(movement_service.settings, 'movement_speedwalk_max_steps', 4):
+            with pytest.raises(ValueError):
+                movement_service.parse_path(["3n", "2e"])
+
+    async def test_build_walk_command_groups_repetitions(self, sample_graph):
+        """
+        Test: El camino sugerido por /camino se escribe como un comando /ir compacto.
+        """
+        path = world_graph_service.find_path(1, 4)
+
+        assert movement_service.build_walk_command(path) == "/ir 2n"
+        assert movement_service.parse_path(["2n"]) == [step.name for step in path]
+
+    async def test_walk_writes_only_final_room(self, sample_graph, character, session):
+        """
+        Test: Un recorrido de varios pasos carga las salas de una vez y hace un único UPDATE.
+        """
+        rooms = {2: Room(id=2, name="Mercado", description=""), 4: Room(id=4, name="Puerto", description="")}
+        load_rooms = AsyncMock(return_value=rooms)
+
+        with patch.object(movement_service, 'load_rooms_for_view', load_rooms), \
+             patch.object(movement_service.event_service, 'trigger_event',
+                          AsyncMock(return_value=EventResult(success=True))):
+            result = await movement_service.walk_path(session, character, ["norte", "norte"])
+
+        assert result.success is True and result.message is None
+        assert [step.to_room_id for step in result.path] == [2, 4]
+        load_rooms.assert_awaited_once_with(session, {2, 4})
+        assert session.execute.await_count == 1
+        session.commit.assert_awaited_once()
+        assert character.room is rooms[4]
+
+    async def test_walk_stops_at_first_blocker(self, sample_graph, character, session):
+        """
+        Test: El recorrido se detiene en el primer bloqueo y guarda la última sala alcanzada.
+        """
+        rooms = {2: Room(id=2, name="Mercado", description=""), 4: Room(id=4, name="Puerto", description="")}
+
+        async def fake_trigger(event_type, phase, context):
+            if context.room is rooms[4]:
+                return EventResult(success=True, cancel_action=True, message="El puerto está cerrado.")
+            return EventResult(success=True)
+
+        with patch.object(movement_service, 'load_rooms_for_view', AsyncMock(return_value=rooms)), \
+             patch.object(movement_service.event_service, 'trigger_event', side_effect=fake_trigger):
+            result = await movement_service.walk_path(session, character, ["norte", "norte", "norte"])
+
+        assert result.success is True
+        assert result.message == "El puerto está cerrado."
+        assert result.destination_room_id == 2
+        assert character.room_id == 2
+        session.commit.assert_awaited_once()
+
+    async def test_walk_stops_at_missing_exit(self, sample_graph, character, session):
+        """
+        Test: Una dirección sin salida a mitad del camino detiene el recorrido ahí.
+        """
+        rooms = {2: Room(id=2, name="Mercado", description="")}
+
+        with patch.object(movement_service, 'load_rooms_for_view', AsyncMock(return_value=rooms)), \
+             patch.object(movement_service.event_service, 'trigger_event',
+                          AsyncMock(return_value=EventResult(success=True))):
+            result = await movement_service.walk_path(session, character, ["norte", "oeste", "norte"])
+
+        assert [step.name for step in result.path] == ["norte"]
+        assert "oeste" in result.message and "Mercado" in result.message
+
+
+@pytest.mark.asyncio
+class TestSideEffects:
+    """Tests para dispatch_side_effects() y wait_for_side_effects()."""
+
+    async def test_failed_side_effect_does_not_stop_the_others(self, character):
+        """
+        Test: Si un aviso falla, el resto de efectos secundarios se ejecutan igual.
+        """
+        step = world_graph_service.GraphExit("norte", 1, 2, "Mercado")
+        result = MoveResult(success=True, exit=step, origin_room_id=1, destination_room_id=2, path=(step,))
+        broadcast = AsyncMock(side_effect=[ConnectionError("telegram caído"), None])
+        after_events = AsyncMock()
+        sync_menu = AsyncMock()
+
+        with patch.object(movement_service, '_broadcast_to_room', broadcast), \
+             patch.object(movement_service, '_run_after_events', after_events), \
+             patch.object(movement_service, '_sync_command_menu', sync_menu):
+            movement_service.dispatch_side_effects(character, result)
+            await movement_service.wait_for_side_effects()
+
+        assert broadcast.await_count == 2
+        assert "llegado desde el sur" in broadcast.await_args_list[1].args[1]
+        after_events.assert_awaited_once_with(7, (step,))
+        sync_menu.assert_awaited_once_with(7)
+        assert not movement_service._side_effect_tasks
+
+    async def test_menu_sync_does_not_wait_for_after_events(self, character):
+        """
+        Test: El menú de comandos se actualiza aunque los eventos AFTER sigan ejecutándose.
+        """
+        step = world_graph_service.GraphExit("norte", 1, 2, "Mercado")
+        result = MoveResult(success=True, exit=step, origin_room_id=1, destination_room_id=2, path=(step,))
+        release, menu_synced = asyncio.Event(), asyncio.Event()
+        sync_menu = AsyncMock(side_effect=lambda character_id: menu_synced.set())
+
+        async def slow_after_events(character_id, path):
+            await release.wait()
+
+        with patch.object(movement_service, '_broadcast_to_room', AsyncMock()), \
+             patch.object(movement_service, '_run_after_events', slow_after_events), \
+             patch.object(movement_service, '_sync_command_menu', sync_menu):
+            task = movement_service.dispatch_side_effects(character, result)
+            await asyncio.wait_for(menu_synced.wait(), timeout=1)
+            assert not task.done()
+            release.set()
+            await movement_service.wait_for_side_effects()
+
+    async def test_notices_are_grouped_per_room(self):
+        """
+        Test: En un recorrido, cada sala del camino recibe un solo aviso.
+        """
+        path = (
+            world_graph_service.GraphExit("norte", 1, 2, "Mercado"),
+            world_graph_service.GraphExit("este", 2, 5, "Muelle"),
+            world_graph_service.GraphExit("oeste", 5, 2, "Mercado"),
+        )
+
+        notices = movement_service._build_room_notices("Aria", path)
+
+        assert list(notices) == [1, 2, 5]
+        assert notices[1] == "<i>Aria se ha ido hacia el norte.</i>"
+        assert notices[2].count("\n") == 1 and "llegado desde el este" in notices[2]
+        assert "pasa por aquí hacia el oeste" in notices[5]
+
+    async def test_notices_only_use_an_article_for_compass_directions(self):
+        """
+        Test: "hacia arriba" y "desde abajo", no "hacia el arriba" ni "desde el abajo".
+        """
+        path = (
+            world_graph_service.GraphExit("arriba", 1, 3, "Torre"),
+            world_graph_service.GraphExit("norte", 3, 6, "Almenas"),
+            world_graph_service.GraphExit("dentro", 6, 7, "Garita"),
+        )
+
+        notices = movement_service._build_room_notices("Aria", path)
+
+        assert notices[1] == "<i>Aria se ha ido hacia arriba.</i>"
+        assert notices[3] == "<i>Aria pasa por aquí hacia el norte.</i>"
+        assert notices[7] == "<i>Aria ha llegado desde fuera.</i>"
+
+    async def test_move_command_needs_follow_exit_locks(self, sample_graph):
+        """
+        Test: CmdMove pide la sala más lo que exigen los locks de las salidas.
+        """
+        from commands.player.movement import MOVEMENT_COMMANDS
+
+        assert sample_graph.exit_lock_relations == {"account"}
+        assert MOVEMENT_COMMANDS[0].needs == {"room", "account"}
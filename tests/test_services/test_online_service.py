@@ -153,6 +153,36 @@ class TestIsCharacterOnline:
             assert is_online is False
 
 
+@pytest.mark.asyncio
+class TestGetOnlineCharacterIds:
+    """Tests para la función get_online_character_ids()."""
+
+    async def test_resolves_all_characters_with_one_mget(self):
+        """
+        Test: Debe consultar todos los timestamps en un solo MGET y filtrar los online.
+        """
+        current_time = time.time()
+        with patch.object(online_service, 'redis_client') as mock_redis:
+            mock_redis.mget = AsyncMock(return_value=[str(current_time - 60), str(current_time - 600), None, "x"])
+
+            online_ids = await online_service.get_online_character_ids([1, 2, 3, 4])
+
+            assert online_ids == {1}
+            mock_redis.mget.assert_awaited_once_with(
+                ["last_seen:1", "last_seen:2", "last_seen:3", "last_seen:4"]
+            )
+
+    async def test_empty_list_does_not_query_redis(self):
+        """
+        Test: Sin personajes no debe consultar Redis.
+        """
+        with patch.object(online_service, 'redis_client') as mock_redis:
+            mock_redis.mget = AsyncMock()
+
+            assert await online_service.get_online_character_ids([]) == set()
+            mock_redis.mget.assert_not_called()
+
+
 @pytest.mark.asyncio
 class TestGetOnlineCharacters:
     """Tests para la función get_online_characters()."""
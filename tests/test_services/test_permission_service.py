@@ -8,6 +8,8 @@ jugadores accedan a comandos de admin o viceversa.
 """
 
 import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 from src.services import permission_service
 from src.models import Account, Character, Item
 
@@ -591,3 +593,174 @@ class TestNewLockFunctions:
         # Character NO tiene item de categoría "armadura" → NO debería pasar
         can_pass, _ = await permission_service.can_execute(character, "tiene_item_categoria(armadura)")
         assert not can_pass, "No debería pasar si no tiene item de la categoría"
+
+
+class TestLockRelations:
+    """Tests para get_lock_relations(), usada para construir planes de carga."""
+
+    def test_empty_lock_needs_nothing(self):
+        """
+        Test: Un lock vacío no necesita ninguna relación.
+        """
+        assert permission_service.get_lock_relations("") == set()
+        assert permission_service.get_lock_relations(None) == set()
+
+    def test_relations_are_collected_from_all_functions(self):
+        """
+        Test: Se combinan las relaciones de todas las funciones del lock.
+        """
+        relations = permission_service.get_lock_relations("rol(ADMIN) or (tiene_objeto(llave) and en_sala(limbo))")
+        assert relations == {"account", "inventory", "room"}
+
+    def test_contextual_locks_are_combined(self):
+        """
+        Test: En locks contextuales se combinan todos los access_types.
+        """
+        relations = permission_service.get_lock_relations({"get": "cuenta_items(3)", "open": "tiene_tag_sala(cueva)"})
+        assert relations == {"inventory", "room"}
+
+    def test_unknown_function_requires_full_graph(self):
+        """
+        Test: Si el lock usa una función desconocida, se pide el grafo completo (None).
+        """
+        assert permission_service.get_lock_relations("funcion_inventada(x)") is None
+
+    def test_invalid_syntax_requires_full_graph(self):
+        """
+        Test: Un lock con sintaxis inválida devuelve None.
+        """
+        assert permission_service.get_lock_relations("rol(ADMIN") is None
+
+
+@pytest.mark.asyncio
+class TestCompiledLocks:
+    """Tests para compile_lock(): los locks se compilan una vez a closures."""
+
+    async def test_compiled_lock_is_cached(self):
+        """
+        Test: El mismo string devuelve el mismo lock compilado.
+        """
+        assert permission_service.compile_lock("rol(ADMIN)") is permission_service.compile_lock("rol(ADMIN)")
+
+    async def test_sync_lock_evaluates_without_await(self):
+        """
+        Test: Un lock sin funciones asíncronas devuelve el resultado directamente.
+        """
+        admin = SimpleNamespace(account=SimpleNamespace(role="ADMIN"), items=[])
+        compiled = permission_service.compile_lock("rol(ADMIN) and not tiene_objeto(llave)")
+
+        assert compiled.is_async is False
+        assert compiled.check(admin) is True
+        assert compiled.relations == {"account", "inventory"}
+
+    async def test_async_lock_is_awaited(self):
+        """
+        Test: Un lock con una función asíncrona se evalúa con await.
+        """
+        character = SimpleNamespace(id=1, account=SimpleNamespace(role="JUGADOR"))
+        compiled = permission_service.compile_lock("rol(ADMIN) or online()")
+
+        with patch("src.services.online_service.is_character_online", AsyncMock(return_value=True)):
+            assert compiled.is_async is True
+            assert await compiled.evaluate(character) is True
+
+    async def test_unsupported_constructs_are_rejected_at_compile_time(self):
+        """
+        Test: Atributos, subíndices o keywords no compilan.
+        """
+        for lock_string in ["__import__('os').system('ls')", "rol(x[0])", "rol(role=ADMIN)"]:
+            with pytest.raises(TypeError):
+                permission_service.compile_lock(lock_string)
+
+    async def test_unknown_function_is_reported(self):
+        """
+        Test: Las funciones desconocidas se registran en el lock compilado y evalúan a False.
+        """
+        compiled = permission_service.compile_lock("funcion_inventada(x)")
+
+        assert compiled.unknown_functions == ("funcion_inventada",)
+        assert compiled.check(SimpleNamespace()) is False
+
+    async def test_bool_ops_short_circuit_and_run_sync_functions_first(self):
+        """
+        Test: `and`/`or` cortocircuitan y las funciones síncronas van antes que las asíncronas.
+        """
+        admin = SimpleNamespace(id=1, account=SimpleNamespace(role="ADMIN"))
+        player = SimpleNamespace(id=2, account=SimpleNamespace(role="JUGADOR"))
+        is_online = AsyncMock(return_value=True)
+
+        with patch("src.services.online_service.is_character_online", is_online):
+            assert await permission_service.compile_lock("online() or rol(ADMIN)").evaluate(admin) is True
+            assert await permission_service.compile_lock("online() and rol(ADMIN)").evaluate(player) is False
+            is_online.assert_not_awaited()
+
+            assert await permission_service.compile_lock("online() and rol(JUGADOR)").evaluate(player) is True
+            is_online.assert_awaited_once()
+
+    async def test_functions_with_side_effects_keep_written_order(self):
+        """
+        Test: Si un operando tiene efectos secundarios, no se reordena el `and`/`or`.
+        """
+        calls = []
+
+        async def remote(character, args):
+            calls.append("remota")
+            return True
+
+        def local(character, args):
+            calls.append("local")
+            return True
+
+        with patch.dict(permission_service.LOCK_FUNCTIONS, {"remota": remote, "local": local}), \
+             patch.object(permission_service, "LOCK_FUNCTIONS_WITH_SIDE_EFFECTS", {"remota"}):
+            assert await permission_service.compile_lock("remota() and local()").evaluate(SimpleNamespace()) is True
+            assert calls == ["remota", "local"]
+
+            calls.clear()
+            assert await permission_service.compile_lock("local() and remota() and local(x)").evaluate(SimpleNamespace()) is True
+            assert calls == ["local", "remota", "local"]
+
+
+@pytest.mark.asyncio
+class TestCanExecuteMany:
+    """Tests para can_execute_many(): un lock evaluado contra muchos personajes."""
+
+    async def test_presence_is_prefetched_in_one_call(self):
+        """
+        Test: `online()` se resuelve para todos los personajes con una sola consulta masiva.
+        """
+        characters = [SimpleNamespace(id=i, account=SimpleNamespace(role="JUGADOR")) for i in (1, 2, 3)]
+        characters[2].account.role = "ADMIN"
+        online_ids = AsyncMock(return_value={2})
+        is_online = AsyncMock(return_value=False)
+
+        with patch("src.services.online_service.get_online_character_ids", online_ids), \
+             patch("src.services.online_service.is_character_online", is_online):
+            results = await permission_service.can_execute_many(characters, "rol(ADMIN) or online()")
+
+        assert results == [False, True, True]
+        online_ids.assert_awaited_once_with([1, 2, 3])
+        is_online.assert_not_awaited()
+
+    async def test_prefetch_does_not_leak_outside_batch(self):
+        """
+        Test: Fuera de can_execute_many, `online()` vuelve a consultar por personaje.
+        """
+        character = SimpleNamespace(id=1, account=SimpleNamespace(role="JUGADOR"))
+
+        with patch("src.services.online_service.get_online_character_ids", AsyncMock(return_value={1})), \
+             patch("src.services.online_service.is_character_online", AsyncMock(return_value=False)):
+            assert await permission_service.can_execute_many([character], "online()") == [True]
+            assert await permission_service.can_execute(character, "online()") == (False, "Permiso denegado.")
+
+    async def test_contextual_empty_and_invalid_locks(self):
+        """
+        Test: Locks contextuales, vacíos e inválidos se resuelven igual que en can_execute.
+        """
+        characters = [SimpleNamespace(id=1, account=SimpleNamespace(role="ADMIN")),
+                      SimpleNamespace(id=2, account=SimpleNamespace(role="JUGADOR"))]
+
+        assert await permission_service.can_execute_many(characters, {"get": "rol(ADMIN)"}, "get") == [True, False]
+        assert await permission_service.can_execute_many(characters, "") == [True, True]
+        assert await permission_service.can_execute_many(characters, "rol(ADMIN") == [False, False]
+        assert await permission_service.can_execute_many([], "rol(ADMIN)") == []
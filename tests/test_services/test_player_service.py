@@ -149,6 +149,38 @@ class TestGetCharacterWithRelations:
         assert character is None
 
 
+class TestCharacterLoadProfiles:
+    """Tests para los perfiles de carga de relaciones del personaje."""
+
+    def test_full_profile_when_needs_is_none(self):
+        """
+        Test: Sin perfil declarado se cargan todas las relaciones.
+        """
+        full_options = player_service.build_character_load_options(None)
+        explicit_options = player_service.build_character_load_options(player_service.FULL_CHARACTER_RELATIONS)
+
+        assert len(full_options) == len(explicit_options) == len(player_service.FULL_CHARACTER_RELATIONS)
+
+    def test_full_profile_skips_exits(self):
+        """
+        Test: Las salidas se leen del grafo del mundo, no del perfil completo.
+        """
+        assert "room.exits" not in player_service.FULL_CHARACTER_RELATIONS
+
+    def test_empty_profile_loads_nothing(self):
+        """
+        Test: Un perfil vacío no añade ninguna opción de carga.
+        """
+        assert player_service.build_character_load_options(set()) == []
+
+    def test_unknown_relation_raises(self):
+        """
+        Test: Pedir una relación desconocida es un error de programación.
+        """
+        with pytest.raises(ValueError):
+            player_service.build_character_load_options({"room.tesoros"})
+
+
 @pytest.mark.critical
 @pytest.mark.asyncio
 class TestTeleportCharacter:
@@ -0,0 +1,88 @@
+# tests/test_services/test_reload_service.py
+"""
+Tests para el Reload Service.
+
+Este servicio vuelve a importar los módulos de game_data con el bot en
+marcha, valida el resultado y lo publica, o restaura los datos anteriores si
+algo falla.
+"""
+
+import importlib
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.services import reload_service, validation_service, world_loader_service
+from src.services.scheduler_service import scheduler_service
+from game_data.item_prototypes import ITEM_PROTOTYPES
+
+
+@pytest.fixture(autouse=True)
+def no_world_sync():
+    """La sincronización con la base de datos y los cron scripts no forman parte de estos tests."""
+    with patch.object(world_loader_service, "sync_world_from_prototypes", AsyncMock()) as sync, \
+         patch.object(scheduler_service, "_reload_cron_scripts", AsyncMock()):
+        yield sync
+
+
+@pytest.mark.asyncio
+class TestReloadGameData:
+    """Tests para reload_game_data()."""
+
+    async def test_reload_keeps_dict_identity_and_syncs_world(self, no_world_sync):
+        """
+        Test: Los prototipos nuevos se publican en los mismos diccionarios y se sincroniza el mundo.
+        """
+        import game_data.item_prototypes as item_prototypes
+        from src.handlers.player import dispatcher
+
+        ITEM_PROTOTYPES["prototipo_temporal"] = {"name": "algo temporal"}
+        dispatcher._get_command_index()
+
+        result = await reload_service.reload_game_data(session=None)
+
+        assert result.success is True and result.errors == []
+        assert item_prototypes.ITEM_PROTOTYPES is ITEM_PROTOTYPES
+        assert "prototipo_temporal" not in ITEM_PROTOTYPES
+        assert result.items == len(ITEM_PROTOTYPES) and result.global_scripts > 0
+        assert dispatcher._command_index is None
+        no_world_sync.assert_awaited_once_with(None)
+
+    async def test_validation_errors_restore_previous_data(self, no_world_sync):
+        """
+        Test: Si la validación falla, el juego sigue con los prototipos y el registro anteriores.
+        """
+        import game_data.global_scripts as global_scripts
+
+        ITEM_PROTOTYPES["prototipo_temporal"] = {"name": "algo temporal"}
+        registry = global_scripts.global_script_registry
+
+        try:
+            with patch.object(validation_service, "collect_errors", return_value=["❌ Key duplicada"]):
+                result = await reload_service.reload_game_data(session=None)
+
+            assert result.success is False and result.errors == ["❌ Key duplicada"]
+            assert "prototipo_temporal" in ITEM_PROTOTYPES
+            assert global_scripts.global_script_registry is registry
+            no_world_sync.assert_not_called()
+        finally:
+            ITEM_PROTOTYPES.pop("prototipo_temporal", None)
+
+    async def test_import_error_restores_previous_data(self, no_world_sync):
+        """
+        Test: Un módulo de game_data que no se puede importar descarta la recarga.
+        """
+        import game_data.room_prototypes as room_prototypes
+
+        real_reload = importlib.reload
+        rooms = dict(room_prototypes.ROOM_PROTOTYPES)
+
+        def broken_reload(module):
+            if module.__name__ == "game_data.item_prototypes":
+                raise SyntaxError("invalid syntax")
+            return real_reload(module)
+
+        with patch.object(reload_service.importlib, "reload", side_effect=broken_reload):
+            result = await reload_service.reload_game_data(session=None)
+
+        assert result.success is False and "SyntaxError" in result.errors[0]
+        assert room_prototypes.ROOM_PROTOTYPES == rooms
+        no_world_sync.assert_not_called()
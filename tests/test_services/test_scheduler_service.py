@@ -0,0 +1,136 @@
+# tests/test_services/test_scheduler_service.py
+"""
+Tests para el Scheduler Service (tick_scripts).
+
+El pulse procesa los tick_scripts de todos los items en su sesión (un commit
+por item) y con un presupuesto de tiempo total que solo se comprueba entre
+items. Solo un script cancelado por tiempo obliga a abrir otra sesión.
+"""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.services import script_service
+from src.services.scheduler_service import SchedulerService
+
+
+def make_items(*ids):
+    return [SimpleNamespace(id=item_id, prototype={"tick_scripts": [{"interval_ticks": 1, "script": "latido"}]})
+            for item_id in ids]
+
+
+@pytest.fixture
+def pulse_session():
+    """Sesión del pulse que devuelve los items indicados en `session.items`."""
+    session = MagicMock()
+    session.items = []
+    result = MagicMock()
+    result.scalars.return_value.all.side_effect = lambda: session.items
+    session.execute = AsyncMock(return_value=result)
+    session.close = AsyncMock()
+    return session
+
+
+def make_session(item=None):
+    """Sesión de item con get(), commit() y close() asíncronos."""
+    session = MagicMock(info={})
+    session.get = AsyncMock(return_value=item)
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    session.close = AsyncMock()
+    return session
+
+
+def timed_out_on(*item_ids):
+    """_process_single_tick_script falso que se cancela por tiempo en los items indicados."""
+    async def run(session, item, **kwargs):
+        if item.id in item_ids:
+            session.info[script_service.TIMED_OUT_SESSION_KEY] = True
+        return True
+    return run
+
+
+@pytest.mark.asyncio
+class TestTickPulseBudget:
+    """Tests para el presupuesto del pulse y la rotación de items."""
+
+    async def test_budget_is_checked_between_items_and_rotates(self, pulse_session):
+        """
+        Test: Agotado el presupuesto, el item empezado termina, el resto se
+        pospone y el siguiente pulse empieza por el primero pendiente.
+        """
+        scheduler = SchedulerService()
+        pulse_session.items = make_items(3, 1, 2)
+        processed = []
+
+        async def slow_item(session, item_id, current_tick):
+            assert script_service.budget_exhausted() is False  # Sin presupuesto dentro del item
+            await asyncio.sleep(0.02)
+            processed.append(item_id)
+
+        with patch.object(scheduler, "_process_item_tick_scripts", side_effect=slow_item):
+            with script_service.execution_budget(0.01):
+                await scheduler._process_tick_scripts(pulse_session, current_tick=1)
+            assert processed == [1]
+
+            with script_service.execution_budget(10):
+                await scheduler._process_tick_scripts(pulse_session, current_tick=2)
+
+        assert processed == [1, 2, 3, 1]
+        assert scheduler._tick_resume_after is None
+
+
+@pytest.mark.asyncio
+class TestItemTickSession:
+    """Tests para la sesión con la que se procesan los items del pulse."""
+
+    async def test_items_share_the_pulse_session(self, pulse_session):
+        """
+        Test: Sin cancelaciones, todos los items usan la sesión del pulse (un commit por item).
+        """
+        scheduler = SchedulerService()
+        pulse_session.items = make_items(1, 2)
+        pulse_session.get = AsyncMock(side_effect=lambda model, item_id, **kwargs: SimpleNamespace(
+            id=item_id, tick_data=None, prototype=make_items(item_id)[0].prototype))
+        pulse_session.commit = AsyncMock()
+        pulse_session.info = {}
+        factory = MagicMock()
+
+        with patch("src.services.scheduler_service.async_session_factory", factory), \
+             patch.object(scheduler, "_process_single_tick_script", side_effect=timed_out_on()), \
+             patch("sqlalchemy.orm.attributes.flag_modified"):
+            await scheduler._process_tick_scripts(pulse_session, current_tick=5)
+
+        factory.assert_not_called()
+        assert pulse_session.commit.await_count == 2
+
+    async def test_timed_out_script_replaces_the_session_and_keeps_tracking(self, pulse_session):
+        """
+        Test: Si un script se cancela por tiempo, los cambios del item se
+        descartan, su tracking se guarda en una sesión nueva (para no
+        repetirlo) y el resto de items usan esa sesión.
+        """
+        scheduler = SchedulerService()
+        pulse_session.items = make_items(1, 2)
+        first = SimpleNamespace(id=1, tick_data=None, prototype=make_items(1)[0].prototype)
+        second = SimpleNamespace(id=2, tick_data=None, prototype=make_items(2)[0].prototype)
+        pulse_session.get = AsyncMock(return_value=first)
+        pulse_session.commit = AsyncMock()
+        pulse_session.info = {}
+        replacement = make_session()
+        replacement.get = AsyncMock(side_effect=lambda model, item_id, **kwargs: first if item_id == 1 else second)
+        factory = MagicMock(return_value=replacement)
+
+        with patch("src.services.scheduler_service.async_session_factory", factory), \
+             patch.object(scheduler, "_process_single_tick_script", side_effect=timed_out_on(1)), \
+             patch("sqlalchemy.orm.attributes.flag_modified"):
+            await scheduler._process_tick_scripts(pulse_session, current_tick=5)
+
+        pulse_session.commit.assert_not_called()
+        pulse_session.close.assert_awaited_once()
+        factory.assert_called_once()
+        assert replacement.commit.await_count == 2  # tracking del item 1 + item 2
+        replacement.close.assert_awaited_once()
+        assert first.tick_data == {"script_0": {"last_executed_tick": 5, "has_executed": True}}
+        assert second.tick_data == {"script_0": {"last_executed_tick": 5, "has_executed": True}}
@@ -0,0 +1,300 @@
+# tests/test_services/test_script_service.py
+"""
+Tests para el Script Service.
+
+Este servicio traduce los script strings de los prototipos a llamadas a las
+funciones registradas. Cada string distinto se parsea y resuelve una sola vez.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.services import script_service
+from game_data import global_scripts
+from game_data.global_scripts import GlobalScriptRegistry
+
+
+def tirar_botin(tiradas: int) -> list[int]:
+    """Cálculo puro de prueba para los scripts cpu_bound (picklable)."""
+    return [tirada % 7 for tirada in range(tiradas)]
+
+
+@pytest.fixture(autouse=True)
+def clear_script_cache():
+    """Vacía la caché de scripts compilados antes y después de cada test."""
+    script_service.compile_script.cache_clear()
+    yield
+    script_service.compile_script.cache_clear()
+
+
+@pytest.mark.asyncio
+class TestCompileScript:
+    """Tests para compile_script()."""
+
+    async def test_arguments_are_parsed_and_typed(self):
+        """
+        Test: Argumentos separados por comas o espacios, con comillas, listas, números y booleanos.
+        """
+        parsed = script_service.compile_script(
+            "mi_script(msg='Hola, mundo', cantidad=50 ratio=0.5, activo=true, items=[espada,escudo], num='7')"
+        )
+
+        assert parsed.name == "mi_script"
+        assert dict(parsed.kwargs) == {
+            "msg": "Hola, mundo", "cantidad": 50, "ratio": 0.5,
+            "activo": True, "items": ["espada", "escudo"], "num": "7",
+        }
+        assert parsed.errors == ()
+
+    async def test_compiled_script_is_cached_and_read_only(self):
+        """
+        Test: El mismo string devuelve el mismo script compilado y sus argumentos no se modifican.
+        """
+        parsed = script_service.compile_script("script_notificar_brillo_magico(color=rojo)")
+
+        assert script_service.compile_script("script_notificar_brillo_magico(color=rojo)") is parsed
+        assert parsed.function is script_service.script_notificar_brillo_magico
+        with pytest.raises(TypeError):
+            parsed.kwargs["color"] = "azul"
+
+    async def test_malformed_arguments_and_non_calls(self):
+        """
+        Test: Un argumento sin clave se reporta; un bloque de texto no es una llamada.
+        """
+        assert script_service.compile_script("mi_script(a=1, basura)").errors == (
+            "argumento mal formado 'basura' (esperado clave=valor)",
+        )
+        assert script_service.compile_script("\nif x:\n    pass\n").is_call is False
+
+    async def test_global_params_are_validated_once(self):
+        """
+        Test: Los parámetros de un script global se validan contra los tipos del registro al compilar.
+        """
+        from game_data.global_scripts import register_all_global_scripts
+        register_all_global_scripts()
+
+        valid = script_service.compile_script("global:curar_personaje(cantidad=5, mensaje='Bien')")
+        invalid = script_service.compile_script("global:curar_personaje(cantidad=cinco, mensaje='Bien')")
+
+        assert valid.is_global and valid.function is not None and valid.errors == ()
+        assert "cantidad" in invalid.errors[0]
+
+
+@pytest.mark.asyncio
+class TestExecuteScript:
+    """Tests para execute_script()."""
+
+    async def test_execution_does_not_reparse(self):
+        """
+        Test: Ejecutar dos veces el mismo script lo parsea una sola vez.
+        """
+        function = AsyncMock(return_value=True)
+        session = MagicMock()
+
+        with patch.dict(script_service.SCRIPT_REGISTRY, {"mi_script": function}), \
+             patch.object(script_service, "_parse_arguments", wraps=script_service._parse_arguments) as parse:
+            for _ in range(2):
+                assert await script_service.execute_script("mi_script(n=1)", session, character="aria") is True
+
+        parse.assert_called_once()
+        function.assert_awaited_with(session=session, character="aria", n=1)
+
+    async def test_script_with_errors_is_not_executed(self):
+        """
+        Test: Un script con argumentos inválidos no se ejecuta.
+        """
+        function = AsyncMock()
+
+        with patch.dict(script_service.SCRIPT_REGISTRY, {"mi_script": function}):
+            assert await script_service.execute_script("mi_script(sin_valor)", MagicMock()) is None
+
+        function.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestScriptCircuitBreaker:
+    """Tests para el circuit breaker por (entidad, script)."""
+
+    @pytest.fixture(autouse=True)
+    def clear_breakers(self):
+        script_service.reset_all_script_breakers()
+        yield
+        script_service.reset_all_script_breakers()
+
+    async def test_failing_script_backs_off_and_is_disabled(self):
+        """
+        Test: Tras un fallo el script espera; tras max_failures fallos seguidos queda desactivado.
+        """
+        function = AsyncMock(side_effect=RuntimeError("roto"))
+        item = MagicMock(id=42, get_name=MagicMock(return_value="una espada"))
+
+        with patch.dict(script_service.SCRIPT_REGISTRY, {"roto": function}), \
+             patch.object(script_service.settings, "scripts_breaker_max_failures", 3), \
+             patch.object(script_service.time, "monotonic", return_value=1000.0) as clock:
+            await script_service.execute_script("roto", MagicMock(), target=item)
+            await script_service.execute_script("roto", MagicMock(), target=item)
+            assert function.await_count == 1  # En espera: no se vuelve a ejecutar.
+
+            for _ in range(2):
+                clock.return_value += 1000
+                await script_service.execute_script("roto", MagicMock(), target=item)
+
+            clock.return_value += 1000
+            await script_service.execute_script("roto", MagicMock(), target=item)
+
+        assert function.await_count == 3
+        [breaker] = script_service.get_tripped_scripts()
+        assert breaker.disabled is True
+        assert breaker.entity_key.endswith(":42") and breaker.entity_label == "una espada"
+        assert "RuntimeError: roto" in breaker.last_error
+
+    async def test_success_resets_and_entities_are_independent(self):
+        """
+        Test: Un éxito cierra el circuito, y el fallo en una entidad no afecta a otra.
+        """
+        function = AsyncMock(side_effect=[RuntimeError("roto"), "ok"])
+        first, second = MagicMock(id=1), MagicMock(id=2)
+
+        with patch.dict(script_service.SCRIPT_REGISTRY, {"a_veces": function}):
+            await script_service.execute_script("a_veces", MagicMock(), target=first)
+            assert await script_service.execute_script("a_veces", MagicMock(), target=second) == "ok"
+
+            assert len(script_service.get_tripped_scripts()) == 1
+            [breaker] = script_service.get_tripped_scripts()
+            assert script_service.reset_script_breaker(breaker.entity_key, breaker.script) is True
+            assert script_service.get_tripped_scripts() == []
+
+
+@pytest.mark.asyncio
+class TestScriptTimeouts:
+    """Tests para los tiempos máximos por categoría y el presupuesto del pulse."""
+
+    @pytest.fixture(autouse=True)
+    def clear_state(self):
+        script_service.reset_all_script_breakers()
+        script_service.reset_timeout_stats()
+        yield
+        script_service.reset_all_script_breakers()
+        script_service.reset_timeout_stats()
+
+    async def test_slow_script_is_cancelled_and_recorded(self):
+        """
+        Test: Un script que supera el tiempo de su categoría se cancela y cuenta como fallo.
+        """
+        cancelled = False
+
+        async def slow(**kwargs):
+            nonlocal cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+
+        session = MagicMock(info={})
+
+        with patch.dict(script_service.SCRIPT_REGISTRY, {"lento": slow}), \
+             patch.object(script_service.settings, "scripts_timeout_tick_seconds", 0.01):
+            result = await script_service.execute_script(
+                "lento", session, timeout_category="tick", target=MagicMock(id=42)
+            )
+
+        assert result is None and cancelled is True
+        assert script_service.session_timed_out(session) is True
+        assert script_service.get_timeout_stats()["timeouts"] == {"lento": 1}
+        [breaker] = script_service.get_tripped_scripts()
+        assert "TimeoutError" in breaker.last_error
+
+    async def test_exhausted_budget_skips_scripts(self):
+        """
+        Test: Con el presupuesto agotado, los scripts no se ejecutan y se cuentan como omitidos.
+        """
+        function = AsyncMock()
+
+        with patch.dict(script_service.SCRIPT_REGISTRY, {"rapido": function}):
+            with script_service.execution_budget(0):
+                assert script_service.budget_exhausted() is True
+                await script_service.execute_script("rapido", MagicMock())
+            assert script_service.budget_exhausted() is False
+            await script_service.execute_script("rapido", MagicMock())
+
+        function.assert_awaited_once()
+        assert script_service.get_timeout_stats()["budget_skips"] == {"rapido": 1}
+
+
+@pytest.mark.asyncio
+class TestCpuBoundGlobalScripts:
+    """Tests para los scripts globales registrados con cpu_bound=True."""
+
+    async def test_compute_must_be_picklable(self):
+        """
+        Test: cpu_bound exige una función compute a nivel de módulo.
+        """
+        registry = GlobalScriptRegistry()
+
+        with pytest.raises(ValueError):
+            registry.register("botin", AsyncMock(), {"tiradas": int}, "Botín", cpu_bound=True)
+        with pytest.raises(ValueError):
+            registry.register("botin", AsyncMock(), {"tiradas": int}, "Botín", cpu_bound=True,
+                              compute=lambda tiradas: tiradas)
+
+    async def test_compute_gets_params_and_apply_gets_result(self):
+        """
+        Test: compute recibe solo los parámetros; la función async recibe el contexto y el resultado.
+        """
+        apply = AsyncMock()
+        registry = GlobalScriptRegistry()
+        registry.register("botin", apply, {"tiradas": int}, "Botín", cpu_bound=True, compute=tirar_botin)
+        session, room = MagicMock(), MagicMock(id=3)
+
+        with patch("game_data.global_scripts.global_script_registry", registry), \
+             patch.object(global_scripts.settings, "scripts_process_pool_workers", 0):
+            await script_service.execute_script("global:botin(tiradas=3)", session, room=room)
+
+        apply.assert_awaited_once_with(session=session, room=room, tiradas=3, resultado=[0, 1, 2])
+
+    async def test_compute_runs_in_process_pool(self):
+        """
+        Test: Con workers, compute se ejecuta en otro proceso y el resultado vuelve al loop.
+        """
+        with patch.object(global_scripts.settings, "scripts_process_pool_workers", 1):
+            try:
+                assert await global_scripts.run_cpu_bound(tirar_botin, {"tiradas": 9}) == [0, 1, 2, 3, 4, 5, 6, 0, 1]
+            finally:
+                global_scripts.shutdown_process_pool()
+
+    async def test_registered_script_runs_through_process_pool(self):
+        """
+        Test: repartir_botin se ejecuta de punta a punta con un pool real (spawn), crea los items
+        y avisa a la sala con un solo mensaje.
+        """
+        registry = GlobalScriptRegistry()
+        registry.register("repartir_botin", global_scripts.script_repartir_botin, {"tabla": str, "tiradas": int},
+                          "Botín", cpu_bound=True, compute=global_scripts.calcular_botin)
+        session, room = MagicMock(flush=AsyncMock(), commit=AsyncMock()), MagicMock(id=3)
+
+        with patch("game_data.global_scripts.global_script_registry", registry), \
+             patch.object(global_scripts.settings, "scripts_process_pool_workers", 1), \
+             patch("src.services.broadcaster_service.send_message_to_room", AsyncMock()) as send:
+            try:
+                await script_service.execute_script(
+                    "global:repartir_botin(tabla='pocion_curacion:1, no_existe:0', tiradas=3)",
+                    session, timeout_category="cron", room=room, target=room
+                )
+            finally:
+                global_scripts.shutdown_process_pool()
+
+        items = session.add_all.call_args.args[0]
+        assert [item.key for item in items] == ["pocion_curacion"] * 3
+        assert all(item.room_id == 3 for item in items)
+        send.assert_awaited_once()
+        assert "(x3)" in send.await_args.kwargs["message_text"]
+        session.commit.assert_awaited_once()
+
+    async def test_loot_rolls_are_capped(self):
+        """
+        Test: calcular_botin ignora pesos nulos y limita las tiradas a MAX_TIRADAS_BOTIN.
+        """
+        with patch.object(global_scripts, "MAX_TIRADAS_BOTIN", 5):
+            assert global_scripts.calcular_botin("espada_viviente, pocion_curacion:0", 50) == ["espada_viviente"] * 5
+        assert global_scripts.calcular_botin("pocion_curacion:0", 3) == []
@@ -0,0 +1,249 @@
+# tests/test_services/test_state_service.py
+"""
+Tests para el State Service (estado transiente y cooldowns).
+
+El estado transiente vive en Redis, como una clave por valor ("keys") o un
+hash por entidad ("hash"). Leer varios valores de una entidad cuesta un
+round trip, y dentro de un comando cada valor se lee como mucho una vez.
+"""
+
+import asyncio
+import fakeredis
+import json
+import time
+import pytest
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.config import settings
+from src.services.state_service import state_service, SET_HASH_FIELDS_SCRIPT, ACQUIRE_HASH_COOLDOWN_SCRIPT
+
+
+class Item(SimpleNamespace):
+    """Entidad falsa cuyo nombre de clase da el tipo ("item")."""
+
+
+@pytest.fixture
+def hash_backend():
+    """Estado transiente en formato "hash" y un cliente Redis falso."""
+    client = MagicMock()
+    client.hmget = AsyncMock()
+    client.hdel = AsyncMock()
+    with patch.object(settings, "state_transient_backend", "hash"), \
+         patch.object(state_service, "redis_client", client):
+        yield client
+
+
+@pytest.fixture
+def fake_hash_redis():
+    """Formato "hash" sobre Redis en memoria, con los scripts Lua reales."""
+    client = fakeredis.aioredis.FakeRedis()
+    with patch.object(settings, "state_transient_backend", "hash"), \
+         patch.object(state_service, "redis_client", client), \
+         patch.object(state_service, "_set_hash_fields", client.register_script(SET_HASH_FIELDS_SCRIPT)), \
+         patch.object(state_service, "_acquire_hash_cooldown", client.register_script(ACQUIRE_HASH_COOLDOWN_SCRIPT)):
+        yield client
+
+
+def envelope(value, expires_at=None) -> bytes:
+    return json.dumps({"v": value, "e": expires_at}).encode()
+
+
+@pytest.mark.asyncio
+class TestTransientHashBackend:
+    """Tests para get_many(), set_many() y la caché por comando en formato "hash"."""
+
+    async def test_get_many_is_one_round_trip(self, hash_backend):
+        """
+        Test: get_many() lee todos los valores con un solo HMGET y aplica el default.
+        """
+        hash_backend.hmget.return_value = [envelope(3), None]
+
+        values = await state_service.get_many(Item(id=42), ["cargas", "activada"], default=False)
+
+        assert values == {"cargas": 3, "activada": False}
+        hash_backend.hmget.assert_awaited_once_with("script_state:item:42", ["cargas", "activada"])
+
+    async def test_expired_fields_are_missing(self, hash_backend):
+        """
+        Test: Un campo cuyo vencimiento ya pasó se trata como inexistente.
+        """
+        hash_backend.hmget.return_value = [envelope(True, time.time() - 1)]
+
+        assert await state_service.exists_transient(Item(id=42), "cooldown_rezar") is False
+
+    async def test_ttl_comes_from_the_envelope(self, hash_backend):
+        """
+        Test: get_ttl() devuelve los segundos que quedan según el vencimiento guardado.
+        """
+        hash_backend.hmget.return_value = [envelope(True, time.time() + 29.5)]
+
+        assert await state_service.get_ttl(Item(id=42), "cooldown_rezar") == 30
+
+    async def test_command_cache_avoids_repeated_reads(self, hash_backend):
+        """
+        Test: Dentro de un comando, cada valor (incluso uno inexistente) se lee de Redis una sola vez.
+        """
+        hash_backend.hmget.return_value = [None]
+        item = Item(id=42)
+
+        with state_service.command_cache():
+            assert await state_service.is_on_cooldown(item, "rezar") is False
+            assert await state_service.get_cooldown_remaining(item, "rezar") is None
+
+        hash_backend.hmget.assert_awaited_once()
+
+    async def test_writes_update_the_command_cache(self, hash_backend):
+        """
+        Test: set_many() escribe con una sola llamada y el comando ve sus propios cambios sin releer.
+        """
+        set_fields = AsyncMock()
+        item = Item(id=42)
+
+        with patch.object(state_service, "_set_hash_fields", set_fields), state_service.command_cache():
+            await state_service.set_many(item, {"activada": True, "cargas": 2}, ttl=timedelta(seconds=30))
+            values = await state_service.get_many(item, ["activada", "cargas"])
+
+        assert values == {"activada": True, "cargas": 2}
+        hash_backend.hmget.assert_not_called()
+        keys, args = set_fields.await_args.kwargs["keys"], set_fields.await_args.kwargs["args"]
+        assert keys == ["script_state:item:42"]
+        assert json.loads(args[2]) == {"v": True, "e": pytest.approx(float(args[0]) + 30)}
+
+    async def test_detached_tasks_do_not_share_the_command_cache(self, hash_backend):
+        """
+        Test: Una tarea creada dentro de detached() lee de Redis, no la caché (vieja) del comando.
+        """
+        hash_backend.hmget.return_value = [envelope(1)]
+        item = Item(id=42)
+
+        with state_service.command_cache():
+            assert await state_service.get_transient(item, "cargas") == 1
+            with state_service.detached():
+                task = asyncio.create_task(state_service.get_transient(item, "cargas"))
+            hash_backend.hmget.return_value = [envelope(2)]
+            assert await task == 2
+            assert await state_service.get_transient(item, "cargas") == 1
+
+        assert hash_backend.hmget.await_count == 2
+
+    async def test_redis_errors_fail_open(self, hash_backend):
+        """
+        Test: Si Redis falla, get_many() devuelve los valores por defecto.
+        """
+        hash_backend.hmget.side_effect = ConnectionError("redis caído")
+
+        assert await state_service.get_many(Item(id=42), ["cargas"], default=0) == {"cargas": 0}
+
+
+@pytest.mark.asyncio
+class TestHashExpiredFields:
+    """Tests de la limpieza de campos vencidos en formato "hash" (scripts Lua reales)."""
+
+    async def test_write_removes_expired_fields(self, fake_hash_redis):
+        """
+        Test: Al escribir, los campos vencidos se borran aunque un campo sin TTL haga el hash persistente.
+        """
+        item = Item(id=42)
+        now = time.time()
+        await state_service.set_transient(item, "cooldown_rezar", True, ttl=timedelta(seconds=5))
+
+        with patch("src.services.state_service.time.time", return_value=now + 10):
+            await state_service.set_transient(item, "activada", True)
+
+        assert await fake_hash_redis.hkeys("script_state:item:42") == [b"activada"]
+        assert await fake_hash_redis.pttl("script_state:item:42") == -1
+
+    async def test_hash_expires_with_its_longest_field(self, fake_hash_redis):
+        """
+        Test: Sin campos persistentes, el hash expira con el campo que más dura (y vuelve a expirar
+        cuando el campo persistente desaparece).
+        """
+        item = Item(id=42)
+        await state_service.set_transient(item, "activada", True)
+        await state_service.set_transient(item, "cargas", 3, ttl=timedelta(seconds=60))
+        assert await fake_hash_redis.pttl("script_state:item:42") == -1
+
+        await state_service.delete_transient(item, "activada")
+        await state_service.try_acquire_cooldown(item, "rezar", timedelta(seconds=10))
+
+        assert 55_000 < await fake_hash_redis.pttl("script_state:item:42") <= 60_000
+
+    async def test_acquire_removes_expired_fields(self, fake_hash_redis):
+        """
+        Test: try_acquire_cooldown() también borra los campos vencidos.
+        """
+        item = Item(id=42)
+        now = time.time()
+        await state_service.set_transient(item, "temporal", 1, ttl=timedelta(seconds=1))
+
+        with patch("src.services.state_service.time.time", return_value=now + 5):
+            assert await state_service.try_acquire_cooldown(item, "rezar", timedelta(seconds=30)) == (True, 30)
+
+        assert await fake_hash_redis.hkeys("script_state:item:42") == [b"cooldown_rezar"]
+
+
+@pytest.mark.asyncio
+class TestTransientKeysBackend:
+    """Tests para get_many() en formato "keys"."""
+
+    async def test_get_many_pipelines_values_and_ttls(self):
+        """
+        Test: get_many() pide valor y TTL de cada clave en un único pipeline.
+        """
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[b"3", 10000, None, -2])
+        client = MagicMock()
+        client.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        client.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        with patch.object(settings, "state_transient_backend", "keys"), \
+             patch.object(state_service, "redis_client", client):
+            values = await state_service.get_many(Item(id=42), ["cargas", "activada"])
+
+        assert values == {"cargas": 3, "activada": None}
+        pipe.execute.assert_awaited_once()
+        pipe.get.assert_any_call("script_state:item:42:cargas")
+        pipe.pttl.assert_any_call("script_state:item:42:activada")
+
+
+@pytest.mark.asyncio
+class TestTryAcquireCooldown:
+    """Tests para try_acquire_cooldown()."""
+
+    async def test_acquired_in_one_call(self):
+        """
+        Test: Un cooldown libre se adquiere con una sola llamada al script Lua.
+        """
+        acquire = AsyncMock(return_value=[1, 30000])
+
+        with patch.object(settings, "state_transient_backend", "keys"), \
+             patch.object(state_service, "_acquire_cooldown", acquire):
+            result = await state_service.try_acquire_cooldown(Item(id=42), "rezar", timedelta(seconds=30))
+
+        assert result == (True, 30)
+        acquire.assert_awaited_once_with(keys=["script_state:item:42:cooldown_rezar"], args=["true", 30000])
+
+    async def test_active_cooldown_returns_remaining(self, hash_backend):
+        """
+        Test: Con el cooldown activo no se adquiere, y la comprobación posterior usa la caché del comando.
+        """
+        acquire = AsyncMock(return_value=[0, 12500])
+        item = Item(id=42)
+
+        with patch.object(state_service, "_acquire_hash_cooldown", acquire), state_service.command_cache():
+            assert await state_service.try_acquire_cooldown(item, "rezar", timedelta(seconds=30)) == (False, 13)
+            assert await state_service.is_on_cooldown(item, "rezar") is True
+
+        assert acquire.await_args.kwargs["keys"] == ["script_state:item:42"]
+        hash_backend.hmget.assert_not_called()
+
+    async def test_redis_errors_fail_open(self):
+        """
+        Test: Si Redis falla, el cooldown se considera adquirido (no se bloquea al jugador).
+        """
+        acquire = AsyncMock(side_effect=ConnectionError("redis caído"))
+
+        with patch.object(settings, "state_transient_backend", "keys"), \
+             patch.object(state_service, "_acquire_cooldown", acquire):
+            assert await state_service.try_acquire_cooldown(Item(id=42), "rezar", timedelta(seconds=30)) == (True, 30)
@@ -191,6 +191,71 @@ class TestChannelPrototypeValidation:
             assert len(errors) == 0
 
 
+class TestLockStringValidation:
+    """Tests para la validación (y precompilación) de lock strings."""
+
+    def test_game_locks_are_valid(self):
+        """
+        Test: Todos los locks actuales del juego deben compilar sin errores.
+        """
+        assert validation_service.validate_lock_strings() == []
+
+    def test_detect_invalid_locks(self):
+        """
+        Test: Debe detectar sintaxis inválida, construcciones no permitidas y funciones desconocidas.
+        """
+        prototypes = {
+            "cofre": {"locks": {"open": "tiene_objeto(llave", "get": "rol(ADMIN)"}},
+            "piedra": {"locks": "__import__('os').system('ls')"},
+            "estatua": {"locks": "funcion_inventada(x)"},
+        }
+
+        with patch("src.services.validation_service.ITEM_PROTOTYPES", prototypes), \
+             patch("src.services.validation_service.ROOM_PROTOTYPES", {}), \
+             patch("src.services.validation_service.CHANNEL_PROTOTYPES", {}), \
+             patch("src.handlers.player.dispatcher.COMMAND_SETS", {}):
+            errors = validation_service.validate_lock_strings()
+
+        assert len(errors) == 3
+        assert "cofre' (open)" in errors[0]
+        assert "piedra" in errors[1]
+        assert "funcion_inventada" in errors[2]
+
+
+class TestScriptStringValidation:
+    """Tests para la validación (y precompilación) de script strings."""
+
+    def test_game_scripts_are_valid(self):
+        """
+        Test: Todos los scripts de los prototipos deben resolverse con parámetros válidos.
+        """
+        from game_data.global_scripts import register_all_global_scripts
+        register_all_global_scripts()
+
+        assert validation_service.validate_script_strings() == []
+
+    def test_detect_invalid_scripts(self):
+        """
+        Test: Debe detectar scripts desconocidos y parámetros de tipo incorrecto.
+        """
+        from game_data.global_scripts import register_all_global_scripts
+        register_all_global_scripts()
+
+        prototypes = {
+            "pocion": {"scripts": {"after_on_use": "global:curar_personaje(cantidad=mucho, mensaje='Bien')"}},
+            "roca": {"tick_scripts": [{"interval_ticks": 5, "script": "script_inventado"}]},
+            "gema": {"scripts": {"after_on_look": [{"script": "script_notificar_brillo_magico(color=azul)"}]}},
+        }
+
+        with patch("src.services.validation_service.ITEM_PROTOTYPES", prototypes), \
+             patch("src.services.validation_service.ROOM_PROTOTYPES", {}):
+            errors = validation_service.validate_script_strings()
+
+        assert len(errors) == 2
+        assert "pocion' (after_on_use)" in errors[0] and "cantidad" in errors[0]
+        assert "script_inventado" in errors[1]
+
+
 @pytest.mark.critical
 class TestValidateAll:
     """Tests para la función validate_all() que ejecuta todas las validaciones."""
@@ -203,7 +268,8 @@ class TestValidateAll:
         with patch("src.services.validation_service.validate_command_aliases", return_value=[]), \
              patch("src.services.validation_service.validate_room_prototype_keys", return_value=[]), \
              patch("src.services.validation_service.validate_item_prototype_keys", return_value=[]), \
-             patch("src.services.validation_service.validate_channel_prototype_keys", return_value=[]):
+             patch("src.services.validation_service.validate_channel_prototype_keys", return_value=[]), \
+             patch("src.services.validation_service.validate_script_strings", return_value=[]):
 
             # No debería lanzar excepción
             try:
@@ -0,0 +1,151 @@
+# tests/test_services/test_world_graph_service.py
+"""
+Tests para el World Graph Service.
+
+Este servicio construye un grafo inmutable de salas y salidas que el
+movimiento, los teclados y `format_room` leen sin consultar la base de datos.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from src.services import world_graph_service
+from src.utils.inline_keyboards import create_room_navigation_keyboard
+from tests.conftest import make_exit, make_room
+
+
+@pytest.fixture
+def sample_graph(world_graph):
+    """Tres salas: plaza <-> mercado (norte/sur) y plaza -> torre (arriba, con lock)."""
+    rooms = [make_room(1, "plaza", "Plaza"), make_room(2, "mercado", "Mercado"), make_room(3, "torre", "Torre")]
+    exits = [
+        make_exit(10, "norte", 1, 2),
+        make_exit(11, "sur", 2, 1),
+        make_exit(12, "arriba", 1, 3, locks="rol(ADMIN)"),
+    ]
+    return world_graph(rooms, exits)
+
+
+@pytest.mark.asyncio
+class TestBuildWorldGraph:
+    """Tests para build_world_graph() y las consultas del grafo."""
+
+    async def test_exits_are_sorted_and_indexed(self, sample_graph):
+        """
+        Test: Las salidas quedan ordenadas por nombre y accesibles por dirección.
+        """
+        assert [e.name for e in sample_graph.get_exits(1)] == ["arriba", "norte"]
+        assert sample_graph.get_exit(1, "NORTE").to_room_id == 2
+        assert sample_graph.get_exit(1, "norte").to_room_name == "Mercado"
+        assert sample_graph.get_exit(1, "oeste") is None
+
+    async def test_room_lookup_by_key(self, sample_graph):
+        """
+        Test: El índice key -> ID y los datos de la sala están disponibles.
+        """
+        assert sample_graph.get_room_id("torre") == 3
+        assert sample_graph.get_room(2).name == "Mercado"
+        assert sample_graph.get_room(99) is None
+        assert sample_graph.get_exits(99) == ()
+
+    async def test_exit_locks_are_kept(self, sample_graph):
+        """
+        Test: El lock de la salida se conserva para evaluarlo al moverse.
+        """
+        assert sample_graph.get_exit(1, "arriba").locks == "rol(ADMIN)"
+
+    async def test_exit_to_missing_room_is_ignored(self):
+        """
+        Test: Una salida hacia una sala inexistente no entra en el grafo.
+        """
+        graph = world_graph_service.build_world_graph(
+            [make_room(1, "plaza", "Plaza")],
+            [make_exit(10, "norte", 1, 42)],
+        )
+        assert graph.get_exits(1) == ()
+
+    async def test_invalid_lock_does_not_break_build(self):
+        """
+        Test: Un lock con errores de sintaxis se registra pero no impide construir el grafo.
+        """
+        graph = world_graph_service.build_world_graph(
+            [make_room(1, "plaza", "Plaza"), make_room(2, "mercado", "Mercado")],
+            [make_exit(10, "norte", 1, 2, locks="rol(ADMIN")],
+        )
+        assert graph.get_exit(1, "norte").locks == "rol(ADMIN"
+
+    async def test_graph_is_immutable(self, sample_graph):
+        """
+        Test: Las colecciones del grafo no se pueden modificar.
+        """
+        with pytest.raises(TypeError):
+            sample_graph.rooms[4] = None
+        with pytest.raises(TypeError):
+            sample_graph.get_room(1).exits_by_name["oeste"] = None
+
+    async def test_navigation_keyboard_reads_graph(self, sample_graph):
+        """
+        Test: El teclado de navegación se construye con las salidas del grafo.
+        """
+        keyboard = create_room_navigation_keyboard(SimpleNamespace(id=1))
+        labels = [button.text for row in keyboard.inline_keyboard for button in row]
+
+        assert len(labels) == 2
+        assert "Arriba" in labels[0] and "Norte" in labels[1]
+        assert create_room_navigation_keyboard(SimpleNamespace(id=99)) is None
+
+
+@pytest.mark.asyncio
+class TestSpatialQueries:
+    """Tests para find_path(), get_distances(), find_room() y get_random_room()."""
+
+    async def test_find_path_is_shortest(self, sample_graph):
+        """
+        Test: BFS devuelve el camino más corto como lista de salidas.
+        """
+        path = world_graph_service.find_path(2, 3)
+
+        assert [step.name for step in path] == ["sur", "arriba"]
+        assert world_graph_service.find_path(1, 1) == ()
+        assert world_graph_service.find_path(3, 1) is None
+
+    async def test_find_path_skips_locked_exits(self, sample_graph):
+        """
+        Test: Con locks evaluados, una salida que no se puede atravesar no forma parte del camino.
+        """
+        assert world_graph_service.find_path(1, 3, passable_locks=frozenset()) is None
+        assert len(world_graph_service.find_path(1, 3, passable_locks=frozenset({"rol(ADMIN)"}))) == 1
+
+    async def test_passable_locks_are_evaluated_once(self, sample_graph):
+        """
+        Test: Cada lock distinto del mundo se evalúa una vez para el personaje.
+        """
+        can_execute = AsyncMock(return_value=(False, None))
+        with patch.object(world_graph_service.permission_service, 'can_execute', can_execute):
+            passable = await world_graph_service.get_passable_locks(SimpleNamespace())
+
+        assert passable == frozenset()
+        can_execute.assert_awaited_once()
+
+    async def test_distances_are_cached_until_graph_changes(self, sample_graph):
+        """
+        Test: La tabla de distancias se cachea y se descarta al publicar otro grafo.
+        """
+        distances = world_graph_service.get_distances(2, max_depth=2)
+
+        assert dict(distances) == {2: 0, 1: 1, 3: 2}
+        assert dict(world_graph_service.get_distances(2, max_depth=1)) == {2: 0, 1: 1}
+        assert world_graph_service.get_distances(2, max_depth=2) is distances
+
+        world_graph_service.set_world_graph(world_graph_service.WorldGraph())
+        assert dict(world_graph_service.get_distances(2, max_depth=2)) == {}
+
+    async def test_find_room_and_random_room(self, sample_graph):
+        """
+        Test: Una sala se encuentra por ID, key o nombre, y se puede muestrear al azar.
+        """
+        assert world_graph_service.find_room("3").name == "Torre"
+        assert world_graph_service.find_room("mercado").id == 2
+        assert world_graph_service.find_room("PLAZA").id == 1
+        assert world_graph_service.find_room("castillo") is None
+        assert world_graph_service.get_random_room().id in {1, 2, 3}
@@ -0,0 +1 @@
+# tests/test_systems/__init__.py
@@ -0,0 +1,140 @@
+# tests/test_systems/test_flood_control.py
+"""
+Tests para el control de flood (FloodControlMiddleware).
+
+Cada jugador tiene un "token bucket" en Redis: puede enviar una ráfaga de
+`burst` actualizaciones y recupera `refill_per_second` tokens por segundo.
+Los tests usan fakeredis, que ejecuta el script Lua real.
+"""
+
+import asyncio
+import fakeredis
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from aiogram.dispatcher.handler import CancelHandler
+from src.bot import middlewares
+from src.config import settings
+
+
+@pytest.fixture
+def fake_redis():
+    """Redis en memoria con el script del token bucket registrado."""
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    with patch.object(middlewares, "redis_client", client), \
+         patch.object(middlewares, "_token_bucket", client.register_script(middlewares.TOKEN_BUCKET_SCRIPT)):
+        yield client
+
+
+@pytest.fixture
+def bucket(fake_redis):
+    """Bucket pequeño y rápido: ráfaga de 2, recarga de 20 tokens por segundo."""
+    with patch.object(settings, "flood_control_burst", 2), \
+         patch.object(settings, "flood_control_refill_per_second", 20.0):
+        yield fake_redis
+
+
+def make_message(telegram_id: int = 1):
+    message = MagicMock()
+    message.from_user.id = telegram_id
+    message.answer = AsyncMock()
+    return message
+
+
+def make_callback(telegram_id: int = 1):
+    callback = MagicMock()
+    callback.from_user.id = telegram_id
+    callback.answer = AsyncMock()
+    return callback
+
+
+@pytest.mark.critical
+@pytest.mark.asyncio
+class TestTokenBucket:
+    """Tests para consume_token()."""
+
+    async def test_burst_then_empty(self, bucket):
+        """
+        Test: Se permiten `burst` actualizaciones seguidas y la siguiente se rechaza.
+        """
+        results = [await middlewares.consume_token(1) for _ in range(3)]
+
+        assert results == [True, True, False]
+
+    async def test_bucket_refills_over_time(self, bucket):
+        """
+        Test: Tras vaciar el bucket, se recupera un token al pasar 1/refill segundos.
+        """
+        for _ in range(3):
+            await middlewares.consume_token(1)
+
+        await asyncio.sleep(0.1)
+
+        assert await middlewares.consume_token(1) is True
+
+    async def test_buckets_are_per_player(self, bucket):
+        """
+        Test: Vaciar el bucket de un jugador no afecta a otro.
+        """
+        for _ in range(3):
+            await middlewares.consume_token(1)
+
+        assert await middlewares.consume_token(2) is True
+
+    async def test_redis_errors_let_updates_through(self):
+        """
+        Test: Si Redis no responde, la actualización pasa.
+        """
+        with patch.object(middlewares, "_token_bucket", AsyncMock(side_effect=ConnectionError("redis caído"))):
+            assert await middlewares.consume_token(1) is True
+
+
+@pytest.mark.asyncio
+class TestFloodControlActions:
+    """Tests para las acciones "warn" y "drop" del middleware."""
+
+    async def test_warn_answers_once_per_window(self, bucket):
+        """
+        Test: Con "warn", el primer mensaje descartado recibe un aviso y los siguientes no.
+        """
+        middleware = middlewares.FloodControlMiddleware()
+        message = make_message()
+
+        with patch.object(settings, "flood_control_action", "warn"):
+            for _ in range(2):
+                await middleware.on_pre_process_message(message, {})
+            for _ in range(2):
+                with pytest.raises(CancelHandler):
+                    await middleware.on_pre_process_message(message, {})
+
+        message.answer.assert_awaited_once()
+
+    async def test_drop_discards_silently(self, bucket):
+        """
+        Test: Con "drop", los mensajes descartados no reciben respuesta.
+        """
+        middleware = middlewares.FloodControlMiddleware()
+        message = make_message()
+
+        with patch.object(settings, "flood_control_action", "drop"):
+            for _ in range(2):
+                await middleware.on_pre_process_message(message, {})
+            with pytest.raises(CancelHandler):
+                await middleware.on_pre_process_message(message, {})
+
+        message.answer.assert_not_called()
+
+    async def test_dropped_callback_is_always_answered(self, bucket):
+        """
+        Test: Un callback descartado se responde (sin texto con "drop") para que el botón deje de cargar.
+        """
+        middleware = middlewares.FloodControlMiddleware()
+        callback = make_callback()
+
+        with patch.object(settings, "flood_control_action", "drop"):
+            for _ in range(2):
+                await middleware.on_pre_process_callback_query(callback, {})
+            callback.answer.assert_not_called()
+            with pytest.raises(CancelHandler):
+                await middleware.on_pre_process_callback_query(callback, {})
+
+        callback.answer.assert_awaited_once_with(None)
@@ -0,0 +1,150 @@
+# tests/test_systems/test_update_scheduler.py
+"""
+Tests para el UpdateScheduler.
+
+El planificador ejecuta las actualizaciones de cada jugador en orden (una
+cola FIFO por telegram_id) y limita cuántas se ejecutan a la vez en total.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.bot.update_scheduler import UpdateScheduler
+
+
+@pytest.mark.critical
+@pytest.mark.asyncio
+class TestUpdateScheduler:
+    """Tests para submit(), el drenado de colas y shutdown()."""
+
+    async def test_same_user_runs_in_fifo_order(self):
+        """
+        Test: Las tareas de un jugador se ejecutan de una en una y en orden de llegada.
+        """
+        scheduler = UpdateScheduler(max_concurrent=10, max_queue_per_user=10)
+        events = []
+
+        async def task(name, delay):
+            events.append(f"inicio {name}")
+            await asyncio.sleep(delay)
+            events.append(f"fin {name}")
+
+        for name, delay in (("a", 0.03), ("b", 0.01), ("c", 0)):
+            assert scheduler.submit(1, task, name, delay=delay)
+
+        await scheduler.shutdown(timeout=1)
+
+        assert events == ["inicio a", "fin a", "inicio b", "fin b", "inicio c", "fin c"]
+        assert scheduler.pending_count(1) == 0
+
+    async def test_different_users_run_in_parallel_up_to_the_cap(self):
+        """
+        Test: Jugadores distintos se ejecutan en paralelo, pero nunca más de max_concurrent a la vez.
+        """
+        scheduler = UpdateScheduler(max_concurrent=2, max_queue_per_user=10)
+        running = 0
+        peak = 0
+
+        async def task():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        for user_id in range(5):
+            scheduler.submit(user_id, task)
+
+        await scheduler.shutdown(timeout=1)
+
+        assert peak == 2
+
+    async def test_full_queue_rejects_task(self):
+        """
+        Test: Con la cola del jugador llena, submit() devuelve False y no encola la tarea.
+        """
+        scheduler = UpdateScheduler(max_concurrent=1, max_queue_per_user=2)
+        task = AsyncMock()
+
+        assert scheduler.submit(1, task) and scheduler.submit(1, task)
+        assert scheduler.submit(1, task) is False
+
+        await scheduler.shutdown(timeout=1)
+        assert task.await_count == 2
+
+    async def test_errors_do_not_stop_the_queue(self):
+        """
+        Test: Una tarea que falla no impide que se ejecuten las siguientes del mismo jugador.
+        """
+        scheduler = UpdateScheduler(max_concurrent=1, max_queue_per_user=10)
+        after = AsyncMock()
+
+        scheduler.submit(1, AsyncMock(side_effect=RuntimeError("fallo")))
+        scheduler.submit(1, after)
+        await scheduler.shutdown(timeout=1)
+
+        after.assert_awaited_once()
+
+    async def test_shutdown_drains_pending_queues(self):
+        """
+        Test: shutdown() espera a que se vacíen las colas antes de volver.
+        """
+        scheduler = UpdateScheduler(max_concurrent=1, max_queue_per_user=10)
+        done = []
+
+        async def task(n):
+            await asyncio.sleep(0.01)
+            done.append(n)
+
+        for n in range(3):
+            scheduler.submit(n % 2, task, n)
+
+        await scheduler.shutdown(timeout=1)
+
+        assert sorted(done) == [0, 1, 2]
+        assert scheduler._drainers == {}
+
+    async def test_shutdown_cancels_after_timeout(self):
+        """
+        Test: Lo que no termina dentro del timeout se cancela.
+        """
+        scheduler = UpdateScheduler(max_concurrent=1, max_queue_per_user=10)
+        cancelled = asyncio.Event()
+
+        async def stuck():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        scheduler.submit(1, stuck)
+        await asyncio.sleep(0)
+        await scheduler.shutdown(timeout=0.01)
+        await asyncio.sleep(0)
+
+        assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+class TestCharacterNameQueue:
+    """Tests para el nombre de personaje encolado en el flujo FSM."""
+
+    async def test_message_after_creation_is_processed_as_command(self):
+        """
+        Test: Si el personaje ya se creó cuando le llega el turno al mensaje
+        (dos mensajes seguidos), se procesa como un comando y no como un nombre.
+        """
+        from src.handlers import callbacks
+
+        state = MagicMock()
+        state.get_state = AsyncMock(return_value=None)
+        message = MagicMock()
+        process = AsyncMock()
+
+        with patch("src.handlers.player.dispatcher.process_command_message", process), \
+             patch.object(callbacks, "async_session_factory") as session_factory:
+            await callbacks._create_character_from_name(message, state)
+
+        process.assert_awaited_once_with(message)
+        session_factory.assert_not_called()
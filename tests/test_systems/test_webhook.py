@@ -0,0 +1,92 @@
+# tests/test_systems/test_webhook.py
+"""
+Tests para el modo webhook.
+
+El endpoint del webhook es público: solo se aceptan las peticiones que traen
+el token secreto registrado en Telegram.
+"""
+
+import pytest
+from aiohttp import web
+from pydantic import SecretStr
+from unittest.mock import AsyncMock, MagicMock, patch
+from aiogram.dispatcher.webhook import WebhookRequestHandler
+from src.bot import webhook
+from src.config import settings
+
+
+def make_handler(headers: dict) -> webhook.SecretTokenWebhookHandler:
+    """Manejador con una petición falsa que trae las cabeceras indicadas."""
+    request = MagicMock(headers=headers, remote="203.0.113.7")
+    return webhook.SecretTokenWebhookHandler(request)
+
+
+@pytest.mark.critical
+@pytest.mark.asyncio
+class TestSecretTokenWebhookHandler:
+    """Tests para la validación de la cabecera secreta."""
+
+    async def test_valid_token_is_accepted(self):
+        """
+        Test: Una petición con el token correcto se procesa.
+        """
+        handler = make_handler({webhook.SECRET_TOKEN_HEADER: "s3cret"})
+
+        with patch.object(settings, "webhook_secret_token", SecretStr("s3cret")), \
+             patch.object(WebhookRequestHandler, "post", AsyncMock(return_value="ok")) as post:
+            assert await handler.post() == "ok"
+
+        post.assert_awaited_once()
+
+    @pytest.mark.parametrize("headers", [{}, {webhook.SECRET_TOKEN_HEADER: "otro"}])
+    async def test_missing_or_wrong_token_is_rejected(self, headers):
+        """
+        Test: Sin cabecera o con un token distinto, la petición recibe 401.
+        """
+        with patch.object(settings, "webhook_secret_token", SecretStr("s3cret")), \
+             patch.object(WebhookRequestHandler, "post", AsyncMock()) as post:
+            with pytest.raises(web.HTTPUnauthorized):
+                await make_handler(headers).post()
+
+        post.assert_not_called()
+
+    async def test_no_configured_token_rejects_everything(self):
+        """
+        Test: Sin token configurado no se acepta ninguna petición (ni una con cabecera vacía).
+        """
+        with patch.object(settings, "webhook_secret_token", SecretStr("")), \
+             patch.object(WebhookRequestHandler, "post", AsyncMock()):
+            with pytest.raises(web.HTTPUnauthorized):
+                await make_handler({webhook.SECRET_TOKEN_HEADER: ""}).post()
+
+
+@pytest.mark.asyncio
+class TestWebhookSetup:
+    """Tests para validate_webhook_settings() y configure_webhook()."""
+
+    async def test_missing_secret_token_prevents_startup(self):
+        """
+        Test: El modo webhook no arranca sin WEBHOOK_SECRET_TOKEN.
+        """
+        with patch.object(settings, "webhook_url", "https://runegram.example.com"), \
+             patch.object(settings, "webhook_secret_token", SecretStr("")):
+            with pytest.raises(ValueError, match="WEBHOOK_SECRET_TOKEN"):
+                webhook.validate_webhook_settings()
+
+    async def test_configure_webhook_registers_url_and_token(self):
+        """
+        Test: Se registra la URL completa con el token secreto y sin certificado propio.
+        """
+        dispatcher = MagicMock()
+        dispatcher.bot.set_webhook = AsyncMock()
+
+        with patch.object(settings, "webhook_url", "https://runegram.example.com/"), \
+             patch.object(settings, "webhook_path", "/webhook"), \
+             patch.object(settings, "webhook_ssl_certificate", ""), \
+             patch.object(settings, "webhook_secret_token", SecretStr("s3cret")):
+            await webhook.configure_webhook(dispatcher)
+
+        args, kwargs = dispatcher.bot.set_webhook.await_args
+        assert args == ("https://runegram.example.com/webhook",)
+        assert kwargs["secret_token"] == "s3cret"
+        assert kwargs["certificate"] is None